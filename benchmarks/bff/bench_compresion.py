@@ -0,0 +1,92 @@
+"""
+Serialización y compresión de respuestas del BFF: tamaño y latencia.
+
+Con un listado de campanias representativo (50 y 1000 items) mide:
+- serialización: `json.dumps` de la stdlib frente a orjson (`RespuestaJSON.render`),
+- `CompresionMiddleware` sobre la respuesta completa con Accept-Encoding identity,
+  gzip y br: bytes enviados y tiempo por respuesta (incluye el paso por el middleware),
+- el mismo listado como NDJSON en streaming (un chunk por item, flush por chunk).
+
+No necesita el stack: el middleware se ejerce con una app ASGI mínima.
+Requiere orjson y brotli (bff-requirements.txt):
+
+    python benchmarks/bff/bench_compresion.py [repeticiones]
+"""
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src-alpespartner"))
+
+import orjson
+
+from bff.utils.compresion import CompresionMiddleware
+
+TAMANIOS = (50, 1_000)
+
+
+def _campanias(n: int):
+    inicio = datetime(2025, 1, 1)
+    return [
+        {
+            "id": f"campania-{i:06d}", "nombre": f"Campaña {i}", "descripcion": "Promoción de temporada " * 3,
+            "tipo": "PROMOCIONAL", "estado": "ACTIVA", "presupuesto": 1000.0 + i, "moneda": "USD",
+            "fecha_inicio": inicio, "fecha_fin": inicio + timedelta(days=30),
+            "afiliados": i % 40, "conversiones": i * 3, "comisiones": round(i * 1.7, 2),
+        }
+        for i in range(n)
+    ]
+
+
+def _app(chunks):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"etag", b'"v1"')]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+async def _responder(middleware, accept_encoding: str):
+    enviado = []
+
+    async def send(mensaje):
+        enviado.append(mensaje)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await middleware(scope, None, send)
+    return sum(len(m.get("body", b"")) for m in enviado if m["type"] == "http.response.body")
+
+
+def _medir(funcion, repeticiones: int):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - t0) / repeticiones * 1e6
+
+
+def main() -> None:
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    bucle = asyncio.new_event_loop()
+    for n in TAMANIOS:
+        datos = {"exito": True, "datos": _campanias(n), "timestamp": datetime.utcnow()}
+        cuerpo, us_json = _medir(lambda: json.dumps(datos, default=str).encode(), repeticiones)
+        cuerpo_orjson, us_orjson = _medir(lambda: orjson.dumps(datos, option=orjson.OPT_NON_STR_KEYS, default=str),
+                                          repeticiones)
+        print(f"{n} campanias: json {len(cuerpo)} B {us_json:.0f} µs | orjson {len(cuerpo_orjson)} B {us_orjson:.0f} µs")
+
+        lineas = [orjson.dumps(c, default=str) + b"\n" for c in datos["datos"]]
+        for etiqueta, chunks in (("completa", [cuerpo_orjson]), ("ndjson", lineas)):
+            middleware = CompresionMiddleware(_app(chunks))
+            for codificacion in ("identity", "gzip", "br"):
+                enviados, us = _medir(lambda: bucle.run_until_complete(_responder(middleware, codificacion)),
+                                      repeticiones)
+                print(f"  {etiqueta:8} {codificacion:8} {enviados:>8} B {us:>8.0f} µs")
+    bucle.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Fan-out del BFF hacia los microservicios: latencia con N peticiones concurrentes.
+
+Cada petición al BFF consulta en paralelo tres servicios (como el estado completo de
+una campaña: campaña, afiliados y métricas). Se lanzan N peticiones a la vez
+(500 por defecto) contra un servidor HTTP/1.1 keep-alive local que responde tras
+un retardo fijo, y se compara:
+- antes: `requests.Session` dentro de `run_in_executor` (el pool de threads por
+  defecto acota cuántas llamadas están realmente en vuelo),
+- después: `BaseClienteHTTP` con `httpx.AsyncClient` y pool propio por servicio.
+
+Reporta p50/p95/p99 de la latencia de cada fan-out y el tiempo total.
+Requiere httpx y requests:
+
+    python benchmarks/bff/bench_fanout_clientes.py [concurrencia] [retardo_ms]
+"""
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src-alpespartner"))
+
+import requests
+
+from bff.modulos.clientes.base_cliente import BaseClienteHTTP
+
+SERVICIOS = ("/campanias/c-1", "/afiliados?campania_id=c-1", "/metricas/c-1")
+CUERPO = b'{"exito": true, "datos": {"id": "c-1", "estado": "ACTIVA"}}'
+
+
+def _servidor(retardo_s: float, puertos) -> None:
+    """Servicio simulado en su propio proceso, para no competir con el cliente por el loop ni el GIL"""
+    async def atender(lector, escritor):
+        try:
+            while await lector.readuntil(b"\r\n\r\n"):
+                await asyncio.sleep(retardo_s)
+                escritor.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                               b"Content-Length: %d\r\n\r\n%s" % (len(CUERPO), CUERPO))
+                await escritor.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def servir():
+        servidor = await asyncio.start_server(atender, "127.0.0.1", 0, backlog=2048)
+        puertos.put(servidor.sockets[0].getsockname()[1])
+        await servidor.serve_forever()
+
+    asyncio.run(servir())
+
+
+class ClienteRequests:
+    """El cliente del diseño anterior: sesión bloqueante ejecutada en el pool de threads"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    async def get(self, endpoint: str):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None, lambda: self.session.request("GET", f"{self.base_url}{endpoint}", timeout=30)
+        )
+        return response.json()
+
+
+class ClienteServicio(BaseClienteHTTP):
+    pass
+
+
+async def _fanout(clientes):
+    t0 = time.perf_counter()
+    await asyncio.gather(*(cliente.get(ruta) for cliente, ruta in zip(clientes, SERVICIOS)))
+    return (time.perf_counter() - t0) * 1000
+
+
+async def _medir(clientes, concurrencia: int):
+    await _fanout(clientes)  # abre conexiones antes de medir
+    t0 = time.perf_counter()
+    latencias = sorted(await asyncio.gather(*(_fanout(clientes) for _ in range(concurrencia))))
+    total = (time.perf_counter() - t0) * 1000
+    return {
+        "p50_ms": round(statistics.median(latencias), 1),
+        "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1], 1),
+        "p99_ms": round(latencias[int(len(latencias) * 0.99) - 1], 1),
+        "total_ms": round(total, 1),
+    }
+
+
+async def _correr(base_url: str, concurrencia: int, retardo_ms: float) -> None:
+    print(f"{concurrencia} fan-outs concurrentes x {len(SERVICIOS)} servicios, retardo {retardo_ms} ms")
+
+    antes = [ClienteRequests(base_url) for _ in SERVICIOS]
+    print(f"  requests + executor: {await _medir(antes, concurrencia)}")
+
+    despues = [ClienteServicio(base_url) for _ in SERVICIOS]
+    print(f"  httpx.AsyncClient:   {await _medir(despues, concurrencia)}")
+    print(f"  coberturas lanzadas: {sum(c.coberturas_lanzadas for c in despues)}")
+    await BaseClienteHTTP.cerrar_todos()
+
+
+def main() -> None:
+    concurrencia = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    retardo_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    puertos = multiprocessing.Queue()
+    servidor = multiprocessing.Process(target=_servidor, args=(retardo_ms / 1000, puertos), daemon=True)
+    servidor.start()
+    try:
+        asyncio.run(_correr(f"http://127.0.0.1:{puertos.get()}", concurrencia, retardo_ms))
+    finally:
+        servidor.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+GET condicional del BFF: progreso de saga y estado completo de campaña.
+
+Por endpoint compara, con N peticiones secuenciales:
+- antes: GET sin validador (cuerpo completo en cada petición),
+- después: GET con `If-None-Match` del ETag de la primera respuesta (304 sin cuerpo
+  mientras la saga/campaña no cambie).
+
+Reporta p50/p95 de latencia, bytes recibidos y cuántas respuestas fueron 304.
+Necesita el stack levantado (docker-compose-alpespartner.yml, BFF en :8001) y una saga
+y una campaña existentes:
+
+    python benchmarks/bff/bench_get_condicional.py <saga_id> <campania_id> [N]
+
+BFF_BENCH_URL cambia la URL base (por defecto http://localhost:8001).
+Solo usa la biblioteca estándar.
+"""
+import os
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BASE = os.getenv("BFF_BENCH_URL", "http://localhost:8001").rstrip("/")
+
+
+def _get(ruta: str, etag: str = None):
+    peticion = urllib.request.Request(BASE + ruta, headers={"If-None-Match": etag} if etag else {})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(peticion) as r:
+            cuerpo, codigo, validador = r.read(), r.status, r.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        cuerpo, codigo, validador = b"", 304, e.headers.get("ETag")
+    return (time.perf_counter() - t0) * 1000, len(cuerpo), codigo, validador
+
+
+def _serie(ruta: str, n: int, etag: str = None):
+    muestras = [_get(ruta, etag) for _ in range(n)]
+    latencias = sorted(m[0] for m in muestras)
+    return {
+        "p50_ms": round(statistics.median(latencias), 2),
+        "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1], 2),
+        "bytes": sum(m[1] for m in muestras),
+        "304": sum(1 for m in muestras if m[2] == 304),
+    }
+
+
+def main() -> None:
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    saga_id, campania_id = sys.argv[1], sys.argv[2]
+    n = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    for ruta in (f"/bff/sagas/{saga_id}/progreso", f"/bff/campanias/{campania_id}/estado-completo"):
+        _, _, _, etag = _get(ruta)  # calienta caches y obtiene el validador
+        antes = _serie(ruta, n)
+        despues = _serie(ruta, n, etag)
+        print(f"{ruta} (n={n}, ETag {etag})")
+        print(f"  sin If-None-Match: {antes}")
+        print(f"  con If-None-Match: {despues}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Despacho de eventos de la unidad de trabajo: PyDispatcher frente a BusEventos.
+
+Mide el costo por evento de:
+- `pydispatch.dispatcher.send(signal=f"{Tipo}Dominio", ...)`, como lo hacía la UoW
+  (un handler por señal; PyDispatcher solo se usa aquí, no es dependencia del servicio),
+- `bus_eventos.publicar` (un evento) y `bus_eventos.publicar_lote` (el batch completo),
+con 1 y 5 handlers síncronos, y con un handler registrado en la clase base
+(el bus resuelve la jerarquía una vez y la cachea).
+
+No necesita BD ni broker:
+
+    pip install PyDispatcher==2.0.6   # opcional, para la columna de comparación
+    python benchmarks/campanias/bench_bus_eventos.py [eventos]
+"""
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src-alpespartner"))
+
+from campanias.seedwork.infraestructura.bus import BusEventos, Fase
+
+try:
+    from pydispatch import dispatcher
+except ImportError:
+    dispatcher = None
+
+
+class EventoBase:
+    pass
+
+
+@dataclass
+class CampaniaCreada(EventoBase):
+    id_campania: str = ""
+
+
+def _handler(evento=None):
+    return evento
+
+
+def _ns_por_evento(funcion, n: int) -> float:
+    t0 = time.perf_counter()
+    funcion()
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    eventos = [CampaniaCreada(id_campania=str(i)) for i in range(n)]
+
+    for cantidad in (1, 5):
+        handlers = [lambda evento=None: evento for _ in range(cantidad)]
+        fila = [f"{cantidad} handler(s)"]
+
+        if dispatcher is not None:
+            for h in handlers:
+                dispatcher.connect(h, signal="CampaniaCreadaDominio")
+
+            def con_pydispatch():
+                for evento in eventos:
+                    dispatcher.send(signal=f"{type(evento).__name__}Dominio", evento=evento)
+
+            fila.append(f"pydispatch {_ns_por_evento(con_pydispatch, n):7.0f} ns")
+            for h in handlers:
+                dispatcher.disconnect(h, signal="CampaniaCreadaDominio")
+
+        bus = BusEventos()
+        for h in handlers:
+            bus.suscribir(CampaniaCreada, h, Fase.DOMINIO)
+
+        def con_publicar():
+            for evento in eventos:
+                bus.publicar(evento, Fase.DOMINIO)
+
+        fila.append(f"publicar {_ns_por_evento(con_publicar, n):7.0f} ns")
+        fila.append(f"publicar_lote {_ns_por_evento(lambda: bus.publicar_lote(eventos, Fase.DOMINIO), n):7.0f} ns")
+        print(" | ".join(fila))
+
+    bus = BusEventos()
+    bus.suscribir(EventoBase, _handler, Fase.DOMINIO)
+    print(f"handler en clase base | publicar_lote {_ns_por_evento(lambda: bus.publicar_lote(eventos, Fase.DOMINIO), n):7.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Memoria de las campanias cargadas para proyecciones: bytes por agregado.
+
+Carga N agregados `Campaña` (1M por defecto) rehidratándolos desde filas con el
+mismo código del repositorio (`RepositorioCampaniasSQLAlchemy._a_entidad`: objetos
+valor, enums e id persistido) y mide con tracemalloc la memoria que queda retenida por la lista,
+dividida por N. Cuenta todo lo que el agregado mantiene vivo: el agregado, sus
+objetos valor, las listas de eventos y los textos de la fila.
+
+Con un ref de git como segundo argumento mide además el dominio de ese ref
+("antes", p. ej. el commit previo a las dataclasses con slots) en un proceso
+aparte, extrayendo su `campanias/` con `git archive`:
+
+    python benchmarks/campanias/bench_memoria_campanias.py [N] [ref_antes]
+
+Para 1M de agregados conviene tener ~3 GB libres. Necesita las dependencias del
+servicio (SQLAlchemy) para importar el repositorio; no abre conexiones.
+"""
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+RAIZ_REPO = Path(__file__).resolve().parents[2]
+sys.path.insert(0, os.getenv("BENCH_RAIZ_CAMPANIAS") or str(RAIZ_REPO / "src-alpespartner"))
+
+from campanias.modulos.dominio.entidades import Campaña
+from campanias.modulos.infraestructura.repositorios import RepositorioCampaniasSQLAlchemy
+
+MONEDAS = ("USD", "EUR", "COP")
+SEGMENTOS = ("jovenes", "familias", "empresas", "general")
+
+
+def _filas(n: int):
+    inicio = datetime(2025, 1, 1)
+    for i in range(n):
+        yield {
+            "id": f"{i:08x}-0000-4000-8000-000000000000",
+            "nombre": f"Campaña {i}",
+            "descripcion": f"Promoción de temporada {i}",
+            "estado": "ACTIVA",
+            "tipo": "PROMOCIONAL",
+            "canal_publicidad": "REDES_SOCIALES",
+            "objetivo": "Ventas",
+            "fecha_inicio": inicio,
+            "fecha_fin": inicio + timedelta(days=30),
+            "presupuesto": 1000.0 + i,
+            "moneda": MONEDAS[i % len(MONEDAS)],
+            "codigo_campana": f"C{i:07d}",
+            "segmento_audiencia": SEGMENTOS[i % len(SEGMENTOS)],
+        }
+
+
+def medir(n: int) -> None:
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    a_entidad = RepositorioCampaniasSQLAlchemy._a_entidad
+    campanias = [a_entidad(f) for f in _filas(n)]
+    segundos = time.perf_counter() - t0
+    retenido = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+    slots = hasattr(Campaña, "__slots__") and not hasattr(campanias[0], "__dict__")
+    print(f"  {'slots' if slots else '__dict__':8} {len(campanias):>9} agregados  "
+          f"{retenido / n:7.0f} B/agregado  {retenido / 2**20:8.1f} MiB  carga {segundos:.1f} s")
+
+
+def _medir_ref(ref: str, n: int) -> None:
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = Path(directorio) / "campanias.tar"
+        subprocess.run(["git", "-C", str(RAIZ_REPO), "archive", "-o", str(archivo), ref,
+                        "src-alpespartner/campanias"], check=True)
+        with tarfile.open(archivo) as tar:
+            tar.extractall(directorio, filter="data")
+        entorno = dict(os.environ, BENCH_RAIZ_CAMPANIAS=str(Path(directorio) / "src-alpespartner"))
+        print(f"{ref}:", flush=True)
+        subprocess.run([sys.executable, __file__, str(n)], env=entorno, check=True)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    if len(sys.argv) > 2:
+        _medir_ref(sys.argv[2], n)
+        print("árbol actual:", flush=True)
+    medir(n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Manejo de comandos con la unidad de trabajo: sesión serializada frente a ContextVar.
+
+Cada comando registra `k` batches `repositorio.agregar(entidad)` y hace commit
+(k = 1 y 20, como crear una campaña y crear un lote pequeño):
+
+- antes: la UoW vive serializada en una sesión (como en la sesión de Flask):
+  cada `registrar_batch`/`commit` la deserializa, la modifica y la vuelve a
+  serializar, y al confirmar ejecuta los batches de a uno (k llamadas a `agregar`);
+- después: `UnidadTrabajoSQLAlchemy` ligada con `ambito_unidad_trabajo()`, sin
+  serializar, que agrupa los `agregar` en un solo `agregar_muchos` dentro de una
+  transacción real (SQLite en memoria; su BEGIN/COMMIT queda incluido en la medición).
+
+El repositorio es en memoria en ambos casos, así se mide el costo de la UoW y no el
+de la BD. Requiere SQLAlchemy:
+
+    python benchmarks/campanias/bench_unidad_trabajo.py [comandos]
+"""
+import pickle
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src-alpespartner"))
+
+from sqlalchemy import create_engine
+
+from campanias.config.uow import UnidadTrabajoSQLAlchemy
+from campanias.seedwork.infraestructura.uow import (
+    Batch, Lock, UnidadTrabajo, UnidadTrabajoPuerto, ambito_unidad_trabajo
+)
+
+
+class RepositorioMemoria:
+    # contador de clase: la sesión serializada trabaja sobre copias del repositorio
+    llamadas = 0
+
+    def agregar(self, entidad):
+        RepositorioMemoria.llamadas += 1
+
+    def agregar_muchos(self, entidades):
+        RepositorioMemoria.llamadas += 1
+
+
+class UnidadTrabajoSerializable(UnidadTrabajo):
+    """La UoW del diseño anterior: batches en una lista, ejecutados de a uno al confirmar"""
+
+    def __init__(self):
+        self._batches = []
+
+    @property
+    def batches(self):
+        return self._batches
+
+    def savepoints(self):
+        return []
+
+    def _limpiar_batches(self):
+        self._batches = []
+
+    def commit(self):
+        for batch in self._batches:
+            batch.operacion(*batch.args, **batch.kwargs)
+        super().commit()
+
+    def rollback(self, savepoint=None):
+        super().rollback()
+
+    def savepoint(self):
+        raise NotImplementedError
+
+
+def _con_sesion(repositorio, entidades, comandos: int):
+    sesion = {"uow": pickle.dumps(UnidadTrabajoSerializable())}
+    for _ in range(comandos):
+        for entidad in entidades:
+            uow = pickle.loads(sesion["uow"])
+            uow.batches.append(Batch(repositorio.agregar, Lock.PESIMISTA, entidad))
+            sesion["uow"] = pickle.dumps(uow)
+        uow = pickle.loads(sesion["uow"])
+        uow.commit()
+        sesion["uow"] = pickle.dumps(uow)
+
+
+def _con_contextvar(engine, repositorio, entidades, comandos: int):
+    for _ in range(comandos):
+        with ambito_unidad_trabajo(UnidadTrabajoSQLAlchemy(engine)):
+            for entidad in entidades:
+                UnidadTrabajoPuerto.registrar_batch(repositorio.agregar, entidad)
+            UnidadTrabajoPuerto.commit()
+
+
+def main() -> None:
+    comandos = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    engine = create_engine("sqlite://")
+    for k in (1, 20):
+        entidades = [{"id": i, "nombre": f"campaña {i}", "presupuesto": 1000.0} for i in range(k)]
+        for etiqueta, correr in (
+            ("sesión serializada", lambda r: _con_sesion(r, entidades, comandos)),
+            ("ContextVar + lote", lambda r: _con_contextvar(engine, r, entidades, comandos)),
+        ):
+            repositorio, RepositorioMemoria.llamadas = RepositorioMemoria(), 0
+            t0 = time.perf_counter()
+            correr(repositorio)
+            us = (time.perf_counter() - t0) / comandos * 1e6
+            print(f"k={k:2} {etiqueta:20} {us:8.1f} µs/comando  "
+                  f"{RepositorioMemoria.llamadas / comandos:5.1f} llamadas al repositorio/comando")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,12 +18,22 @@ CREATE TABLE IF NOT EXISTS campanias (
     descripcion TEXT,
     fecha_inicio DATETIME,
     fecha_fin DATETIME,
-    estado ENUM('CREADA', 'ACTIVA', 'PAUSADA', 'FINALIZADA') DEFAULT 'CREADA',
-    tipo_campania ENUM('CONVERSION', 'BRANDING', 'PROMOCIONAL') DEFAULT 'CONVERSION',
+    estado ENUM('CREADA', 'ACTIVA', 'PAUSADA', 'FINALIZADA', 'CANCELADA') DEFAULT 'CREADA',
+    -- CONVERSION/BRANDING: valores históricos; el resto es TipoCampana del dominio
+    tipo_campania ENUM('CONVERSION', 'BRANDING', 'PROMOCIONAL', 'DESCUENTO', 'CASHBACK', 'PUNTOS', 'BANNER') DEFAULT 'CONVERSION',
+    canal_publicidad VARCHAR(32) NULL,
+    objetivo VARCHAR(32) NULL,
     presupuesto DECIMAL(10,2),
+    moneda CHAR(3) NOT NULL DEFAULT 'USD',
+    codigo_campana VARCHAR(64) NULL,
+    segmento_audiencia VARCHAR(255) NULL,
     meta_conversiones INT,
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    -- listados paginados (más recientes primero), con y sin filtro de estado
+    INDEX idx_canal (canal_publicidad),
+    INDEX idx_creacion (fecha_creacion, id),
+    INDEX idx_estado_creacion (estado, fecha_creacion, id)
 );
 
 -- Tabla de afiliados en campanias
@@ -37,6 +47,143 @@ CREATE TABLE IF NOT EXISTS campanias_afiliados (
     INDEX idx_afiliado (afiliado_id)
 );
 
+-- ==========================================
+-- Proyecciones de lectura de campanias
+-- ==========================================
+
+-- Journal de eventos que alimenta las proyecciones (posicion asignada por la BD)
+CREATE TABLE IF NOT EXISTS campanias_eventos (
+    posicion BIGINT AUTO_INCREMENT PRIMARY KEY,
+    evento_id VARCHAR(128) NOT NULL,
+    tipo VARCHAR(64) NOT NULL,
+    agregado_id VARCHAR(36) NOT NULL,
+    datos JSON NULL,
+    fecha DATETIME(6) NOT NULL,
+    UNIQUE KEY unique_evento (evento_id),
+    INDEX idx_agregado (agregado_id)
+);
+
+-- Última posición del journal aplicada por cada proyección
+CREATE TABLE IF NOT EXISTS proyecciones_checkpoint (
+    proyeccion VARCHAR(64) PRIMARY KEY,
+    ultima_posicion BIGINT NULL,
+    eventos BIGINT DEFAULT 0,
+    actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Eventos que no se pudieron proyectar ni solos: apartados para revisarlos a mano
+CREATE TABLE IF NOT EXISTS proyecciones_descartes (
+    evento_id VARCHAR(128) PRIMARY KEY,
+    tabla_journal VARCHAR(64) NOT NULL,
+    tipo VARCHAR(64) NOT NULL,
+    agregado_id VARCHAR(36) NOT NULL,
+    datos JSON NULL,
+    fecha DATETIME(6) NOT NULL,
+    error TEXT,
+    veces INT DEFAULT 1,
+    registrado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Vista de listado: columnas del listado + contadores principales
+CREATE TABLE IF NOT EXISTS campanias_vista_lista (
+    id VARCHAR(36) PRIMARY KEY,
+    nombre VARCHAR(255),
+    estado VARCHAR(20),
+    tipo VARCHAR(30),
+    canal_publicidad VARCHAR(30),
+    presupuesto DECIMAL(12,2),
+    moneda VARCHAR(3),
+    fecha_inicio DATETIME,
+    fecha_fin DATETIME,
+    fecha_creacion DATETIME,
+    afiliados INT DEFAULT 0,
+    conversiones INT DEFAULT 0,
+    ingresos DECIMAL(14,2) DEFAULT 0.00,
+    actualizado DATETIME(6),
+    INDEX idx_creacion (fecha_creacion, id),
+    INDEX idx_estado_creacion (estado, fecha_creacion, id)
+);
+
+-- Vista de detalle: la campaña completa con todos sus contadores en una fila
+CREATE TABLE IF NOT EXISTS campanias_vista_detalle (
+    id VARCHAR(36) PRIMARY KEY,
+    nombre VARCHAR(255),
+    descripcion TEXT,
+    estado VARCHAR(20),
+    tipo VARCHAR(30),
+    canal_publicidad VARCHAR(30),
+    objetivo VARCHAR(30),
+    fecha_inicio DATETIME,
+    fecha_fin DATETIME,
+    fecha_creacion DATETIME,
+    fecha_activacion DATETIME,
+    presupuesto DECIMAL(12,2),
+    moneda VARCHAR(3),
+    codigo_campana VARCHAR(50),
+    segmento_audiencia VARCHAR(100),
+    afiliados INT DEFAULT 0,
+    conversiones INT DEFAULT 0,
+    ingresos DECIMAL(14,2) DEFAULT 0.00,
+    comisiones INT DEFAULT 0,
+    monto_comisiones DECIMAL(14,2) DEFAULT 0.00,
+    actualizado DATETIME(6)
+);
+
+-- Contadores por campaña
+CREATE TABLE IF NOT EXISTS campanias_vista_conteos (
+    id VARCHAR(36) PRIMARY KEY,
+    afiliados INT DEFAULT 0,
+    conversiones INT DEFAULT 0,
+    ingresos DECIMAL(14,2) DEFAULT 0.00,
+    comisiones INT DEFAULT 0,
+    monto_comisiones DECIMAL(14,2) DEFAULT 0.00,
+    actualizado DATETIME(6)
+);
+
+-- Métricas de campanias por día
+CREATE TABLE IF NOT EXISTS campanias_metricas (
+    id VARCHAR(36) PRIMARY KEY,
+    campania_id VARCHAR(36) NOT NULL,
+    fecha DATE NOT NULL,
+    conversiones_total INT DEFAULT 0,
+    comisiones_generadas DECIMAL(10,2) DEFAULT 0.00,
+    comisiones_pagadas DECIMAL(10,2) DEFAULT 0.00,
+    ingresos_generados DECIMAL(10,2) DEFAULT 0.00,
+    clicks_total INT DEFAULT 0,
+    impresiones_total INT DEFAULT 0,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_campania (campania_id),
+    INDEX idx_fecha (fecha),
+    FOREIGN KEY (campania_id) REFERENCES campanias(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_campania_fecha (campania_id, fecha)
+);
+
+-- Métricas de rendimiento materializadas desde eventos de conversiones y comisiones
+CREATE TABLE IF NOT EXISTS campanias_metricas_totales (
+    campania_id VARCHAR(36) PRIMARY KEY,
+    conversiones_total INT DEFAULT 0,
+    ingresos_generados DECIMAL(14,2) DEFAULT 0.00,
+    comisiones_total INT DEFAULT 0,
+    comisiones_generadas DECIMAL(14,2) DEFAULT 0.00,
+    comisiones_pagadas DECIMAL(14,2) DEFAULT 0.00,
+    afiliados_unicos INT DEFAULT 0,
+    actualizado DATETIME(6)
+);
+
+-- Afiliados vistos por campaña y día (para contar afiliados únicos)
+CREATE TABLE IF NOT EXISTS campanias_metricas_afiliados (
+    campania_id VARCHAR(36) NOT NULL,
+    fecha DATE NOT NULL,
+    afiliado_id VARCHAR(36) NOT NULL,
+    PRIMARY KEY (campania_id, fecha, afiliado_id)
+);
+
+-- Campanias con métricas recibidas antes de existir en `campanias` (se reproyectan desde el journal)
+CREATE TABLE IF NOT EXISTS campanias_metricas_pendientes (
+    campania_id VARCHAR(36) PRIMARY KEY,
+    registrado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ==========================================
 -- Tablas de Afiliados
 -- ==========================================
@@ -91,7 +91,7 @@ CREATE TABLE IF NOT EXISTS saga_eventos (
     id VARCHAR(36) PRIMARY KEY,
     saga_id VARCHAR(36) NOT NULL,
     paso_id VARCHAR(36) NULL,
-    tipo_evento ENUM('SAGA_INICIADA', 'PASO_INICIADO', 'PASO_COMPLETADO', 'PASO_FALLIDO', 'COMPENSACION_INICIADA', 'COMPENSACION_COMPLETADA', 'SAGA_COMPLETADA', 'SAGA_FALLIDA', 'SAGA_CANCELADA') NOT NULL,
+    tipo_evento ENUM('SAGA_INICIADA', 'PASO_INICIADO', 'PASO_COMPLETADO', 'PASO_FALLIDO', 'COMPENSACION_INICIADA', 'COMPENSACION_COMPLETADA', 'SAGA_COMPLETADA', 'SAGA_FALLIDA', 'SAGA_CANCELADA', 'SAGA_ACTUALIZADA') NOT NULL,
     detalle TEXT,
     datos_evento JSON NULL,
     timestamp_evento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -122,6 +122,21 @@ CREATE TABLE IF NOT EXISTS saga_metricas (
     UNIQUE KEY unique_tipo_fecha (tipo_saga, fecha)
 );
 
+-- Histogramas de latencia (buckets log-lineales en ms) por saga/paso/servicio
+-- nombre_paso = servicio = '*' para la duración total de la saga
+CREATE TABLE IF NOT EXISTS saga_latencias (
+    tipo_saga VARCHAR(100) NOT NULL,
+    nombre_paso VARCHAR(255) NOT NULL,
+    servicio VARCHAR(100) NOT NULL,
+    total BIGINT DEFAULT 0,
+    suma_ms BIGINT DEFAULT 0,
+    max_ms BIGINT DEFAULT 0,
+    buckets JSON NOT NULL, -- {"indice_bucket": conteo}
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (tipo_saga, nombre_paso, servicio),
+    INDEX idx_servicio (servicio)
+);
+
 -- ==========================================
 -- Datos de ejemplo
 -- ==========================================
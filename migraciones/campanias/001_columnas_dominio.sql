@@ -0,0 +1,17 @@
+-- ==========================================
+-- campanias: columnas y vocabularios del dominio
+-- ==========================================
+-- init-campanias.sql / init-alpespartner.sql ya crean la tabla así; este script es
+-- para volúmenes creados antes (los init-*.sql solo corren con el volumen vacío).
+-- Correr una vez contra la BD del servicio:
+--   mysql -h 127.0.0.1 -P 3307 -u root -p campanias < migraciones/campanias/001_columnas_dominio.sql
+
+ALTER TABLE campanias
+    MODIFY estado ENUM('CREADA', 'ACTIVA', 'PAUSADA', 'FINALIZADA', 'CANCELADA') DEFAULT 'CREADA',
+    MODIFY tipo_campania ENUM('CONVERSION', 'BRANDING', 'PROMOCIONAL', 'DESCUENTO', 'CASHBACK', 'PUNTOS', 'BANNER') DEFAULT 'CONVERSION',
+    ADD COLUMN canal_publicidad VARCHAR(32) NULL AFTER tipo_campania,
+    ADD COLUMN objetivo VARCHAR(32) NULL AFTER canal_publicidad,
+    ADD COLUMN moneda CHAR(3) NOT NULL DEFAULT 'USD' AFTER presupuesto,
+    ADD COLUMN codigo_campana VARCHAR(64) NULL AFTER moneda,
+    ADD COLUMN segmento_audiencia VARCHAR(255) NULL AFTER codigo_campana,
+    ADD INDEX idx_canal (canal_publicidad);
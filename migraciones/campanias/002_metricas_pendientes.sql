@@ -0,0 +1,17 @@
+-- ==========================================
+-- campanias_metricas: lo pagado por día y campanias pendientes
+-- ==========================================
+-- init-campanias.sql / init-alpespartner.sql ya crean las tablas así; este script es
+-- para volúmenes creados antes (los init-*.sql solo corren con el volumen vacío).
+-- Correr una vez contra la BD del servicio y luego reconstruir la proyección
+-- `campanias_metricas` desde el journal para completar la columna nueva:
+--   mysql -h 127.0.0.1 -P 3307 -u root -p campanias < migraciones/campanias/002_metricas_pendientes.sql
+--   python -m campanias.modulos.infraestructura.proyecciones campanias_metricas
+
+ALTER TABLE campanias_metricas
+    ADD COLUMN comisiones_pagadas DECIMAL(10,2) DEFAULT 0.00 AFTER comisiones_generadas;
+
+CREATE TABLE IF NOT EXISTS campanias_metricas_pendientes (
+    campania_id VARCHAR(36) PRIMARY KEY,
+    registrado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
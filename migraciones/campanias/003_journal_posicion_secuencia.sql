@@ -0,0 +1,49 @@
+-- ==========================================
+-- campanias_eventos: posición AUTO_INCREMENT y descartes de proyecciones
+-- ==========================================
+-- init-campanias.sql / init-alpespartner.sql ya crean las tablas así; este script es
+-- para volúmenes creados antes (los init-*.sql solo corren con el volumen vacío).
+-- Renumera el journal en su orden actual y traduce los checkpoints a la posición nueva.
+-- Correr una vez con el servicio detenido:
+--   mysql -h 127.0.0.1 -P 3307 -u root -p campanias < migraciones/campanias/003_journal_posicion_secuencia.sql
+-- `campanias_eventos_anterior` queda como respaldo; se puede borrar después.
+
+CREATE TABLE campanias_eventos_nuevo (
+    posicion BIGINT AUTO_INCREMENT PRIMARY KEY,
+    evento_id VARCHAR(128) NOT NULL,
+    tipo VARCHAR(64) NOT NULL,
+    agregado_id VARCHAR(36) NOT NULL,
+    datos JSON NULL,
+    fecha DATETIME(6) NOT NULL,
+    UNIQUE KEY unique_evento (evento_id),
+    INDEX idx_agregado (agregado_id)
+);
+
+INSERT INTO campanias_eventos_nuevo (evento_id, tipo, agregado_id, datos, fecha)
+SELECT evento_id, tipo, agregado_id, datos, fecha FROM campanias_eventos ORDER BY posicion;
+
+RENAME TABLE campanias_eventos TO campanias_eventos_anterior,
+             campanias_eventos_nuevo TO campanias_eventos;
+
+UPDATE proyecciones_checkpoint c
+SET ultima_posicion = (
+    SELECT MAX(n.posicion)
+    FROM campanias_eventos n
+    JOIN campanias_eventos_anterior a ON a.evento_id = n.evento_id
+    WHERE a.posicion <= c.ultima_posicion
+)
+WHERE c.ultima_posicion IS NOT NULL;
+
+ALTER TABLE proyecciones_checkpoint MODIFY ultima_posicion BIGINT NULL;
+
+CREATE TABLE IF NOT EXISTS proyecciones_descartes (
+    evento_id VARCHAR(128) PRIMARY KEY,
+    tabla_journal VARCHAR(64) NOT NULL,
+    tipo VARCHAR(64) NOT NULL,
+    agregado_id VARCHAR(36) NOT NULL,
+    datos JSON NULL,
+    fecha DATETIME(6) NOT NULL,
+    error TEXT,
+    veces INT DEFAULT 1,
+    registrado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
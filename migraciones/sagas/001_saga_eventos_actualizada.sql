@@ -0,0 +1,9 @@
+-- ==========================================
+-- saga_eventos: tipo SAGA_ACTUALIZADA
+-- ==========================================
+-- init-sagas.sql ya crea la tabla así; este script es para volúmenes creados antes
+-- (los init-*.sql solo corren con el volumen vacío). Correr una vez contra la BD de sagas:
+--   mysql -h 127.0.0.1 -P 3312 -u root -p sagas < migraciones/sagas/001_saga_eventos_actualizada.sql
+
+ALTER TABLE saga_eventos
+    MODIFY tipo_evento ENUM('SAGA_INICIADA', 'PASO_INICIADO', 'PASO_COMPLETADO', 'PASO_FALLIDO', 'COMPENSACION_INICIADA', 'COMPENSACION_COMPLETADA', 'SAGA_COMPLETADA', 'SAGA_FALLIDA', 'SAGA_CANCELADA', 'SAGA_ACTUALIZADA') NOT NULL;
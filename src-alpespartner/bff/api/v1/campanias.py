@@ -1,11 +1,11 @@
-from fastapi import APIRouter, HTTPException, Query, Path
+from fastapi import APIRouter, HTTPException, Query, Path, Request
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any
 from pydantic import BaseModel, Field
 from datetime import datetime
 
 from ...modulos.servicios.campanias_service import campanias_service
-from ...utils.responses import RespuestaBFF, ManejadorErroresBFF
+from ...utils.responses import RespuestaBFF, ManejadorErroresBFF, acepta_ndjson, coincide_etag
 
 router = APIRouter(prefix="/bff/campanias", tags=["BFF - campanias"])
 
@@ -19,6 +19,7 @@ class LanzarCampaniaCompletaRequest(BaseModel):
     fecha_inicio: datetime = Field(..., description="Fecha de inicio de la campaña")
     fecha_fin: datetime = Field(..., description="Fecha de fin de la campaña")
     presupuesto: float = Field(..., gt=0, description="Presupuesto de la campaña")
+    prioridad: str = Field("MEDIA", description="Prioridad de la saga (BAJA, MEDIA, ALTA, CRITICA)")
     
     # Opciones de la saga
     buscar_afiliados_automatico: bool = Field(True, description="Buscar afiliados automáticamente")
@@ -61,6 +62,11 @@ async def lanzar_campania_completa(request: LanzarCampaniaCompletaRequest) -> JS
         # Delegar al servicio de campanias
         resultado = await campanias_service.lanzar_campania_completa(datos_campania)
         
+        if resultado.get("rechazada"):
+            return ManejadorErroresBFF.error_saturacion(
+                resultado.get("mensaje"), resultado.get("reintentar_en", 1)
+            )
+        
         if resultado.get("exito"):
             return RespuestaBFF.saga_iniciada(
                 saga_id=resultado.get("comando_id"),  # Usar comando_id como identificador temporal
@@ -79,6 +85,7 @@ async def lanzar_campania_completa(request: LanzarCampaniaCompletaRequest) -> JS
 
 @router.get("/{campania_id}/estado-completo", summary="Estado completo de campaña")
 async def obtener_estado_completo_campania(
+    request: Request,
     campania_id: str = Path(..., description="ID de la campaña")
 ) -> JSONResponse:
     """
@@ -89,14 +96,18 @@ async def obtener_estado_completo_campania(
     - Afiliados asociados
     - Métricas de conversión
     - Resumen de comisiones
+    
+    Responde con ETag; con If-None-Match vigente devuelve 304 sin cuerpo.
     """
     try:
-        campania_completa = await campanias_service.obtener_campania_completa(campania_id)
+        etag, campania_completa = await campanias_service.obtener_campania_completa_con_etag(campania_id)
+        if coincide_etag(request, etag):
+            return RespuestaBFF.no_modificada(etag)
         
-        return RespuestaBFF.exitosa(
+        return RespuestaBFF.con_etag(RespuestaBFF.exitosa(
             datos=campania_completa,
             mensaje="Estado completo de campaña obtenido exitosamente"
-        )
+        ), etag)
         
     except Exception as e:
         if "404" in str(e):
@@ -110,6 +121,7 @@ async def obtener_estado_completo_campania(
 
 @router.get("/", summary="Listar campanias con resumen")
 async def listar_campanias_con_resumen(
+    request: Request,
     estado: Optional[str] = Query(None, description="Filtrar por estado"),
     tipo: Optional[str] = Query(None, description="Filtrar por tipo"),
     incluir_metricas: bool = Query(True, description="Incluir métricas de cada campaña"),
@@ -120,24 +132,31 @@ async def listar_campanias_con_resumen(
     Lista campanias con resumen de métricas agregadas de múltiples microservicios.
     
     Permite filtrar por estado y tipo, e incluir métricas de conversión.
+    Con `Accept: application/x-ndjson` se devuelven todas las campanias del filtro
+    en streaming (una por línea), enriquecidas de a una página por vez.
     """
+    if acepta_ndjson(request):
+        return RespuestaBFF.lista_ndjson(
+            campanias_service.iterar_campanias_con_resumen(
+                estado=estado, tipo=tipo, incluir_metricas=incluir_metricas
+            )
+        )
+    
     try:
+        # La paginación se resuelve en campanias: solo se enriquece la página pedida
         resultado = await campanias_service.listar_campanias_con_resumen(
             estado=estado,
             tipo=tipo,
-            incluir_metricas=incluir_metricas
+            incluir_metricas=incluir_metricas,
+            pagina=pagina,
+            tamanio_pagina=tamanio_pagina
         )
         
         campanias = resultado.get("campanias", [])
         total = resultado.get("total", 0)
         
-        # Aplicar paginación
-        inicio = (pagina - 1) * tamanio_pagina
-        fin = inicio + tamanio_pagina
-        campanias_paginadas = campanias[inicio:fin]
-        
         return RespuestaBFF.lista_paginada(
-            elementos=campanias_paginadas,
+            elementos=campanias,
             total=total,
             pagina=pagina,
             tamanio_pagina=tamanio_pagina,
@@ -165,7 +184,9 @@ async def obtener_dashboard_campanias() -> JSONResponse:
             resumen=dashboard.get("resumen", {}),
             datos_principales={
                 "campanias_recientes": dashboard.get("campanias_recientes", []),
-                "timestamp": dashboard.get("timestamp")
+                "timestamp": dashboard.get("timestamp"),
+                "edad_segundos": dashboard.get("edad_segundos"),
+                "construida_en": dashboard.get("construida_en")
             },
             mensaje="Dashboard obtenido exitosamente"
         )
@@ -183,6 +204,7 @@ async def activar_campania(
     try:
         from ...modulos.clientes.campanias_cliente import cliente_campanias
         resultado = await cliente_campanias.activar_campania(campania_id)
+        campanias_service.invalidar_campania(campania_id, "ACTIVA")
         
         return RespuestaBFF.exitosa(
             datos=resultado,
@@ -201,6 +223,7 @@ async def pausar_campania(
     try:
         from ...modulos.clientes.campanias_cliente import cliente_campanias
         resultado = await cliente_campanias.pausar_campania(campania_id)
+        campanias_service.invalidar_campania(campania_id, "PAUSADA")
         
         return RespuestaBFF.exitosa(
             datos=resultado,
@@ -219,6 +242,7 @@ async def finalizar_campania(
     try:
         from ...modulos.clientes.campanias_cliente import cliente_campanias
         resultado = await cliente_campanias.finalizar_campania(campania_id)
+        campanias_service.invalidar_campania(campania_id, "FINALIZADA")
         
         return RespuestaBFF.exitosa(
             datos=resultado,
@@ -1,19 +1,48 @@
-from fastapi import APIRouter, HTTPException, Query, Path
-from fastapi.responses import JSONResponse
-from typing import Optional
+import json
+from fastapi import APIRouter, HTTPException, Query, Path, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 from ...modulos.servicios.sagas_service import sagas_service
-from ...utils.responses import RespuestaBFF, ManejadorErroresBFF
+from ...utils.responses import RespuestaBFF, ManejadorErroresBFF, acepta_ndjson, coincide_etag
 
 router = APIRouter(prefix="/bff/sagas", tags=["BFF - Sagas"])
 
 
+class EstadosSagasRequest(BaseModel):
+    """Request para consultar el estado de varias sagas"""
+    saga_ids: List[str] = Field(..., min_length=1, description="IDs de las sagas")
+
+
 class CancelarSagaRequest(BaseModel):
     """Request para cancelar una saga"""
     razon: Optional[str] = Field(None, description="Razón de la cancelación")
 
 
+@router.post("/estado:batch", summary="Estado de varias sagas")
+async def obtener_estados_sagas(
+    request: EstadosSagasRequest,
+    usar_cache: bool = Query(True, description="Usar cache para mejorar rendimiento")
+) -> JSONResponse:
+    """
+    Obtiene el estado de varias sagas en una sola llamada.
+    
+    Pensado para frontends que siguen muchos lanzamientos a la vez:
+    reemplaza N llamadas a `/{saga_id}/estado` por una.
+    """
+    try:
+        resultado = await sagas_service.obtener_estados_sagas(request.saga_ids, usar_cache=usar_cache)
+        
+        return RespuestaBFF.exitosa(
+            datos=resultado,
+            mensaje=f"Estado de {len(resultado['estados'])} sagas obtenido exitosamente"
+        )
+        
+    except Exception as e:
+        return ManejadorErroresBFF.procesar_error_microservicio(e, "campanias")
+
+
 @router.get("/{saga_id}/estado", summary="Estado de saga")
 async def obtener_estado_saga(
     saga_id: str = Path(..., description="ID de la saga"),
@@ -47,6 +76,7 @@ async def obtener_estado_saga(
 
 @router.get("/{saga_id}/progreso", summary="Progreso detallado de saga")
 async def obtener_progreso_saga(
+    request: Request,
     saga_id: str = Path(..., description="ID de la saga")
 ) -> JSONResponse:
     """
@@ -57,14 +87,20 @@ async def obtener_progreso_saga(
     - Tiempo transcurrido por paso
     - Porcentaje de completitud
     - Tiempo estimado restante
+    
+    Propaga el ETag de campanias; con If-None-Match vigente devuelve 304 sin cuerpo.
     """
     try:
-        progreso = await sagas_service.obtener_progreso_detallado(saga_id)
+        progreso, etag = await sagas_service.obtener_progreso_condicional(
+            saga_id, request.headers.get("if-none-match")
+        )
+        if progreso is None or coincide_etag(request, etag):
+            return RespuestaBFF.no_modificada(etag)
         
-        return RespuestaBFF.exitosa(
+        return RespuestaBFF.con_etag(RespuestaBFF.exitosa(
             datos=progreso,
             mensaje="Progreso de saga obtenido exitosamente"
-        )
+        ), etag)
         
     except Exception as e:
         if "404" in str(e) or "no encontrada" in str(e).lower():
@@ -105,29 +141,39 @@ async def cancelar_saga(
 
 @router.get("/", summary="Listar sagas activas")
 async def listar_sagas_activas(
-    pagina: int = Query(1, ge=1, description="Número de página"),
-    tamanio_pagina: int = Query(10, ge=1, le=100, description="Tamaño de página")
+    request: Request,
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior"),
+    tamanio_pagina: int = Query(10, ge=1, le=100, description="Tamaño de página"),
+    estado: Optional[str] = Query(None, description="Estados separados por comas (por defecto, los activos)"),
+    tipo: Optional[str] = Query(None, description="Tipo de saga"),
+    desde: Optional[str] = Query(None, description="Fecha de inicio mínima (ISO 8601)")
 ) -> JSONResponse:
     """
-    Lista todas las sagas activas en el sistema.
+    Lista las sagas activas en el sistema, más recientes primero.
     
-    Útil para monitoreo y administración de sagas en progreso.
+    Paginación por cursor: usar `paginacion.siguiente_cursor` de la respuesta
+    para pedir la página siguiente. Útil para monitoreo y administración de sagas en progreso.
+    
+    Con `Accept: application/x-ndjson` se devuelven todas las sagas del filtro en streaming
+    (una por línea), recorriendo las páginas en el servidor.
     """
+    if acepta_ndjson(request):
+        return RespuestaBFF.lista_ndjson(
+            sagas_service.iterar_sagas(estado=estado, tipo=tipo, desde=desde)
+        )
+    
     try:
-        resultado = await sagas_service.listar_sagas_activas()
-        
-        sagas = resultado.get("sagas", [])
-        total = resultado.get("total", 0)
-        
-        # Aplicar paginación
-        inicio = (pagina - 1) * tamanio_pagina
-        fin = inicio + tamanio_pagina
-        sagas_paginadas = sagas[inicio:fin]
+        resultado = await sagas_service.listar_sagas_activas(
+            cursor=cursor,
+            limite=tamanio_pagina,
+            estado=estado,
+            tipo=tipo,
+            desde=desde
+        )
         
-        return RespuestaBFF.lista_paginada(
-            elementos=sagas_paginadas,
-            total=total,
-            pagina=pagina,
+        return RespuestaBFF.lista_cursor(
+            elementos=resultado.get("sagas", []),
+            siguiente_cursor=resultado.get("siguiente_cursor"),
             tamanio_pagina=tamanio_pagina,
             mensaje="Sagas activas obtenidas exitosamente"
         )
@@ -136,6 +182,38 @@ async def listar_sagas_activas(
         return ManejadorErroresBFF.procesar_error_microservicio(e, "campanias")
 
 
+@router.get("/{saga_id}/eventos", summary="Stream de progreso de saga (SSE)")
+async def stream_eventos_saga(
+    request: Request,
+    saga_id: str = Path(..., description="ID de la saga"),
+    timeout_segundos: int = Query(300, ge=30, le=3600, description="Duración máxima del stream")
+) -> StreamingResponse:
+    """
+    Server-Sent Events con el progreso de una saga.
+    
+    Envía el estado actual al conectarse y luego cada cambio apenas el BFF
+    lo recibe de `eventos-saga-campania` (sin polling). El stream se cierra
+    cuando la saga llega a un estado terminal.
+    
+    Uso desde el navegador: `new EventSource('/bff/sagas/{saga_id}/eventos')`
+    """
+    async def generar():
+        async for evento in sagas_service.stream_eventos_saga(saga_id, timeout_segundos):
+            if await request.is_disconnected():
+                break
+            if evento.get("estado") == "HEARTBEAT":
+                yield ": heartbeat\n\n"
+                continue
+            yield f"event: saga\ndata: {json.dumps(evento, default=str)}\n\n"
+        yield "event: fin\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{saga_id}/monitorear", summary="Monitorear saga hasta completación")
 async def monitorear_saga(
     saga_id: str = Path(..., description="ID de la saga"),
@@ -25,6 +25,7 @@ class LanzarCampaniaCompletaPayload(Record):
     presupuesto = Double()
     moneda = String()
     segmento_audiencia = String()
+    prioridad = String()  # BAJA | MEDIA | ALTA | CRITICA (admisión de sagas)
 
 
 class ComandoLanzarCampaniaCompleta(Record):
@@ -24,10 +24,53 @@ class ConfiguracionBFF:
     # HTTP Client Configuration
     timeout_segundos: int = int(os.getenv("HTTP_TIMEOUT", "30"))
     reintentos: int = int(os.getenv("HTTP_RETRIES", "3"))
+    http_timeout_conexion_segundos: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    http_max_conexiones: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))  # por microservicio
+    http_max_conexiones_keepalive: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+    http_keepalive_segundos: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    http_concurrencia_por_servicio: int = int(os.getenv("HTTP_MAX_CONCURRENCY_PER_HOST", "200"))
+    http2: bool = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+    backoff_base_segundos: float = float(os.getenv("HTTP_BACKOFF_BASE", "0.2"))  # base * 2**intento
+    
+    # Compresión de respuestas
+    compresion_min_bytes: int = int(os.getenv("BFF_COMPRESSION_MIN_BYTES", "1024"))
+    compresion_nivel_gzip: int = int(os.getenv("BFF_GZIP_LEVEL", "6"))
+    compresion_calidad_brotli: int = int(os.getenv("BFF_BROTLI_QUALITY", "5"))
+    
+    # Circuit breaker por microservicio
+    circuito_ventana_segundos: float = float(os.getenv("CB_WINDOW_SECONDS", "30"))
+    circuito_min_muestras: int = int(os.getenv("CB_MIN_SAMPLES", "20"))
+    circuito_umbral_errores: float = float(os.getenv("CB_ERROR_RATE", "0.5"))
+    circuito_umbral_latencia_ms: float = float(os.getenv("CB_SLOW_CALL_MS", "2000"))
+    circuito_umbral_lentas: float = float(os.getenv("CB_SLOW_CALL_RATE", "0.8"))
+    circuito_espera_apertura_segundos: float = float(os.getenv("CB_OPEN_SECONDS", "15"))
+    circuito_sondas: int = int(os.getenv("CB_HALF_OPEN_PROBES", "3"))
+    
+    # Hedging de GETs y plazo de endpoints agregados
+    hedging_get: bool = os.getenv("HTTP_HEDGING", "true").lower() in ("1", "true", "yes")
+    hedging_min_ms: float = float(os.getenv("HTTP_HEDGING_MIN_MS", "50"))
+    plazo_agregados_segundos: float = float(os.getenv("AGGREGATE_DEADLINE_SECONDS", "3"))
+    
+    # Dashboard precalculado
+    intervalo_reconstruccion_dashboard: float = float(os.getenv("BFF_DASHBOARD_REBUILD_SECONDS", "60"))
+    topico_eventos_afiliados: str = os.getenv("BFF_TOPICO_AFILIADOS", "evento-afiliado")
+    topico_eventos_campanias: str = os.getenv("BFF_TOPICO_CAMPANIAS", "eventos-campania")
     
     # Saga Configuration
     intervalo_polling_saga: int = int(os.getenv("SAGA_POLLING_INTERVAL", "5"))  # segundos
     timeout_saga_segundos: int = int(os.getenv("SAGA_TIMEOUT", "300"))  # 5 minutos
+    ventana_lote_estados_ms: int = int(os.getenv("SAGA_BATCH_WINDOW_MS", "20"))  # agrupa polls concurrentes
+    max_lote_estados_saga: int = int(os.getenv("SAGA_BATCH_MAX", "200"))  # igual que campanias
+    
+    # Cache Configuration
+    cache_max_entradas: int = int(os.getenv("BFF_CACHE_MAX_ENTRIES", "10000"))
+    cache_ttl_estado_saga: float = float(os.getenv("SAGA_CACHE_TTL", os.getenv("SAGA_POLLING_INTERVAL", "5")))  # segundos
+    cache_ttl_metricas: float = float(os.getenv("METRICAS_CACHE_TTL", "30"))  # segundos
+    cache_ventana_obsoleta: float = float(os.getenv("BFF_CACHE_STALE_SECONDS", "10"))  # stale-while-revalidate
+    # Copias validadas por ETag: el progreso se revalida siempre (304 barato); el estado completo
+    # agrega servicios sin versión, así que su ETag vale mientras dure esta entrada
+    cache_ttl_progreso_saga: float = float(os.getenv("SAGA_PROGRESO_CACHE_TTL", "300"))  # segundos
+    cache_ttl_estado_completo: float = float(os.getenv("CAMPANIA_COMPLETA_CACHE_TTL", "10"))  # segundos
     
     # Pulsar Configuration
     #pulsar_host: str = os.getenv("PULSAR_HOST", "alpespartner-broker")
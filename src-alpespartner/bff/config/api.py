@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import config
+from ..utils.compresion import CompresionMiddleware
+from ..utils.responses import RespuestaJSON
+
 
 def configurar_api() -> FastAPI:
     """Configura la aplicación FastAPI del BFF"""
@@ -10,7 +14,8 @@ def configurar_api() -> FastAPI:
         description="Backend For Frontend - Simple orquestador para campanias",
         version="1.0.0",
         docs_url="/bff/docs",
-        redoc_url="/bff/redoc"
+        redoc_url="/bff/redoc",
+        default_response_class=RespuestaJSON
     )
     
     # CORS middleware para permitir requests desde frontend
@@ -22,4 +27,12 @@ def configurar_api() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # gzip/brotli según Accept-Encoding para respuestas grandes y streams NDJSON
+    app.add_middleware(
+        CompresionMiddleware,
+        tamanio_minimo=config.compresion_min_bytes,
+        nivel_gzip=config.compresion_nivel_gzip,
+        calidad_brotli=config.compresion_calidad_brotli
+    )
+    
     return app
\ No newline at end of file
@@ -103,7 +103,8 @@ class DespachadorBFF:
                 fecha_fin=fecha_fin_ts,
                 presupuesto=float(datos_campania.get('presupuesto', 0.0)),
                 moneda=datos_campania.get('moneda', 'USD'),
-                segmento_audiencia=datos_campania.get('segmento_audiencia', 'general')
+                segmento_audiencia=datos_campania.get('segmento_audiencia', 'general'),
+                prioridad=(datos_campania.get('prioridad') or 'MEDIA').upper()
             )
             
             # Crear comando CloudEvent
@@ -8,6 +8,7 @@ from .config.api import configurar_api
 from .config import config
 from .api.v1.campanias import router as campanias_router
 from .api.v1.sagas import router as sagas_router
+from .utils.cache import estadisticas_caches
 
 # Configurar logging
 logging.basicConfig(
@@ -32,6 +33,15 @@ async def lifespan(app: FastAPI):
     logger.info(f"   - URL Notificaciones: {config.url_notificaciones}")
     logger.info(f"   - Timeout HTTP: {config.timeout_segundos}s")
     logger.info(f"   - Reintentos HTTP: {config.reintentos}")
+    logger.info(f"   - Pool HTTP: {config.http_max_conexiones} conexiones/servicio, HTTP/2: {config.http2}")
+    
+    # Suscripción única a eventos de saga (push hacia SSE / monitorear)
+    from .modulos.servicios.difusor_sagas import difusor_sagas
+    tarea_difusor = asyncio.create_task(difusor_sagas.escuchar())
+    
+    # Instantánea del dashboard (reconstrucción periódica + eventos)
+    from .modulos.servicios.campanias_service import campanias_service
+    tarea_dashboard = asyncio.create_task(campanias_service.dashboard.ejecutar())
     
     # Inicialización
     try:
@@ -48,6 +58,17 @@ async def lifespan(app: FastAPI):
     # Limpieza al cerrar
     logger.info("🛑 Cerrando BFF AlpesPartner...")
     
+    for tarea in (tarea_difusor, tarea_dashboard):
+        tarea.cancel()
+        try:
+            await tarea
+        except asyncio.CancelledError:
+            pass
+    
+    # Cerrar pools de conexiones HTTP hacia los microservicios
+    from .modulos.clientes.base_cliente import BaseClienteHTTP
+    await BaseClienteHTTP.cerrar_todos()
+    
     # Limpiar cache de sagas
     try:
         from .modulos.servicios.sagas_service import sagas_service
@@ -99,6 +120,19 @@ async def health_check():
     }
 
 
+@app.get("/bff/cache")
+async def estadisticas_cache():
+    """Contadores de los caches del BFF (aciertos, fallos, desalojos, cargas compartidas)"""
+    return estadisticas_caches()
+
+
+@app.get("/bff/circuitos")
+async def estado_circuitos():
+    """Estado de los circuit breakers y del hedging por microservicio"""
+    from .modulos.clientes.base_cliente import BaseClienteHTTP
+    return {cliente.base_url: cliente.estadisticas() for cliente in BaseClienteHTTP._instancias}
+
+
 @app.get("/bff/info")
 async def info():
     """Información del BFF y microservicios"""
@@ -119,6 +153,9 @@ async def info():
             "estado_campania": "/bff/campanias/{id}/estado-completo",
             "estado_saga": "/bff/sagas/{saga_id}/estado",
             "progreso_saga": "/bff/sagas/{saga_id}/progreso",
+            "eventos_saga": "/bff/sagas/{saga_id}/eventos",
+            "cache": "/bff/cache",
+            "circuitos": "/bff/circuitos",
             "dashboard": "/bff/campanias/dashboard"
         }
     }
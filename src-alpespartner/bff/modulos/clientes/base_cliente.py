@@ -2,8 +2,10 @@ import asyncio
 from typing import Any, Dict, Optional, List
 from abc import ABC, abstractmethod
 import logging
-import requests
+import time
+import httpx
 from ...config import config
+from .resiliencia import InterruptorCircuito, CERRADO
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +23,30 @@ class ClienteHTTPException(Exception):
 class BaseClienteHTTP(ABC):
     """Cliente HTTP base para comunicación con microservicios"""
     
+    # Todos los clientes creados, para cerrar sus pools al apagar el BFF
+    _instancias: List["BaseClienteHTTP"] = []
+    
     def __init__(self, base_url: str):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
-        self.session.headers.update({"Content-Type": "application/json"})
+        # Pool keep-alive propio por microservicio; HTTP/2 se negocia (ALPN) cuando el destino es https
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Content-Type": "application/json"},
+            timeout=httpx.Timeout(config.timeout_segundos, connect=config.http_timeout_conexion_segundos),
+            limits=httpx.Limits(
+                max_connections=config.http_max_conexiones,
+                max_keepalive_connections=config.http_max_conexiones_keepalive,
+                keepalive_expiry=config.http_keepalive_segundos
+            ),
+            http2=config.http2
+        )
+        # Tope de peticiones concurrentes hacia este servicio (el resto espera turno)
+        self._limite_concurrencia = asyncio.Semaphore(config.http_concurrencia_por_servicio)
+        self.en_vuelo = 0
+        self.circuito = InterruptorCircuito(self.base_url)
+        self.coberturas_lanzadas = 0
+        self.coberturas_ganadas = 0
+        BaseClienteHTTP._instancias.append(self)
         
     async def _hacer_request(
         self,
@@ -32,55 +54,162 @@ class BaseClienteHTTP(ABC):
         endpoint: str,
         datos: Optional[Dict] = None,
         params: Optional[Dict] = None,
-        headers: Optional[Dict] = None
-    ) -> Dict[str, Any]:
-        """Realiza una petición HTTP con reintentos"""
+        headers: Optional[Dict] = None,
+        cobertura: bool = False,
+        con_cabeceras: bool = False
+    ) -> Any:
+        """Realiza una petición HTTP con reintentos, protegida por el circuit breaker del servicio"""
         
         url = f"{self.base_url}{endpoint}"
-        request_headers = self.session.headers.copy()
-        if headers:
-            request_headers.update(headers)
         
         for intento in range(config.reintentos):
-            try:
-                # Ejecutar en thread pool para no bloquear el loop asyncio
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: self.session.request(
-                        metodo,
-                        url,
-                        json=datos,
-                        params=params,
-                        headers=request_headers,
-                        timeout=config.timeout_segundos
-                    )
+            if not self.circuito.permitir():
+                # Falla rápido en lugar de esperar timeouts contra un servicio caído
+                raise ClienteHTTPException(
+                    f"Circuito abierto hacia {self.base_url}",
+                    status_code=503
                 )
-                
-                if response.status_code >= 400:
-                    raise ClienteHTTPException(
-                        f"Error HTTP {response.status_code}: {response.text}",
-                        status_code=response.status_code,
-                        response_data=response.text
-                    )
-                
-                return response.json()
+            try:
+                if cobertura:
+                    return await self._enviar_con_cobertura(metodo, endpoint, datos, params, headers, con_cabeceras)
+                return await self._enviar(metodo, endpoint, datos, params, headers, con_cabeceras)
                         
-            except requests.exceptions.Timeout:
+            except httpx.TimeoutException:
                 logger.warning(f"Timeout en intento {intento + 1} para {url}")
                 if intento == config.reintentos - 1:
                     raise ClienteHTTPException(f"Timeout después de {config.reintentos} intentos")
-                await asyncio.sleep(2 ** intento)  # Backoff exponencial
+                await asyncio.sleep(config.backoff_base_segundos * 2 ** intento)  # Backoff exponencial
                 
-            except requests.exceptions.RequestException as e:
+            except httpx.HTTPError as e:
                 logger.error(f"Error de cliente en intento {intento + 1}: {e}")
                 if intento == config.reintentos - 1:
                     raise ClienteHTTPException(f"Error de conexión: {str(e)}")
-                await asyncio.sleep(2 ** intento)
+                await asyncio.sleep(config.backoff_base_segundos * 2 ** intento)
+    
+    async def _enviar(
+        self,
+        metodo: str,
+        endpoint: str,
+        datos: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        con_cabeceras: bool = False
+    ) -> Any:
+        """Un solo envío; registra resultado y latencia en el circuit breaker"""
+        inicio = time.monotonic()
+        try:
+            async with self._limite_concurrencia:
+                self.en_vuelo += 1
+                try:
+                    response = await self.client.request(
+                        metodo,
+                        endpoint,
+                        json=datos,
+                        params=params,
+                        headers=headers
+                    )
+                finally:
+                    self.en_vuelo -= 1
+        except httpx.HTTPError:
+            self.circuito.registrar(False, (time.monotonic() - inicio) * 1000)
+            raise
+        except asyncio.CancelledError:
+            self.circuito.cancelada()
+            raise
+        
+        # Los 4xx son errores del llamador, no del servicio
+        self.circuito.registrar(response.status_code < 500, (time.monotonic() - inicio) * 1000)
+        
+        if response.status_code >= 400:
+            raise ClienteHTTPException(
+                f"Error HTTP {response.status_code}: {response.text}",
+                status_code=response.status_code,
+                response_data=response.text
+            )
+        
+        # 304 (GET condicional): el recurso no cambió y no trae cuerpo
+        cuerpo = None if response.status_code == 304 else response.json()
+        if con_cabeceras:
+            return cuerpo, response.headers
+        return cuerpo
+    
+    async def _enviar_con_cobertura(
+        self,
+        metodo: str,
+        endpoint: str,
+        datos: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        con_cabeceras: bool = False
+    ) -> Any:
+        """
+        Hedging para peticiones idempotentes: si la primera no respondió en el p95
+        observado del servicio, se lanza una segunda y gana la que responda primero.
+        """
+        p95 = self.circuito.p95_ms() if self.circuito.estado == CERRADO else None
+        if not config.hedging_get or p95 is None:
+            return await self._enviar(metodo, endpoint, datos, params, headers, con_cabeceras)
+        
+        primera = asyncio.ensure_future(self._enviar(metodo, endpoint, datos, params, headers, con_cabeceras))
+        try:
+            hechas, _ = await asyncio.wait({primera}, timeout=max(p95, config.hedging_min_ms) / 1000)
+            if hechas:
+                return primera.result()
+        except asyncio.CancelledError:
+            primera.cancel()
+            raise
+        
+        self.coberturas_lanzadas += 1
+        segunda = asyncio.ensure_future(self._enviar(metodo, endpoint, datos, params, headers, con_cabeceras))
+        pendientes = {primera, segunda}
+        try:
+            while True:
+                hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechas:
+                    if tarea.exception() is None:
+                        if tarea is segunda:
+                            self.coberturas_ganadas += 1
+                        return tarea.result()
+                    # Una respuesta HTTP de error es definitiva; un fallo de transporte espera a la otra
+                    if isinstance(tarea.exception(), ClienteHTTPException) or not pendientes:
+                        raise tarea.exception()
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "en_vuelo": self.en_vuelo,
+            "coberturas_lanzadas": self.coberturas_lanzadas,
+            "coberturas_ganadas": self.coberturas_ganadas,
+            "circuito": self.circuito.estadisticas()
+        }
+    
+    async def cerrar(self):
+        """Cierra las conexiones keep-alive del pool"""
+        await self.client.aclose()
+    
+    @classmethod
+    async def cerrar_todos(cls):
+        await asyncio.gather(*(cliente.cerrar() for cliente in cls._instancias), return_exceptions=True)
     
     async def get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Realiza una petición GET"""
-        return await self._hacer_request("GET", endpoint, params=params)
+        return await self._hacer_request("GET", endpoint, params=params, cobertura=True)
+    
+    async def get_con_cabeceras(self, endpoint: str, params: Optional[Dict] = None):
+        """Realiza una petición GET y devuelve (cuerpo, cabeceras)"""
+        return await self._hacer_request("GET", endpoint, params=params, cobertura=True, con_cabeceras=True)
+    
+    async def get_condicional(self, endpoint: str, etag: Optional[str] = None, params: Optional[Dict] = None):
+        """
+        GET con If-None-Match; devuelve (cuerpo, cabeceras).
+        cuerpo es None si el servicio respondió 304 (la versión `etag` sigue vigente).
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        return await self._hacer_request(
+            "GET", endpoint, params=params, headers=headers, cobertura=True, con_cabeceras=True
+        )
     
     async def post(self, endpoint: str, datos: Dict[str, Any]) -> Dict[str, Any]:
         """Realiza una petición POST"""
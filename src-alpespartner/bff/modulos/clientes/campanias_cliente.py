@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from .base_cliente import BaseClienteHTTP
 from ...config import config
 
@@ -21,6 +21,28 @@ class ClienteCampanias(BaseClienteHTTP):
     async def listar_campanias(self) -> List[Dict[str, Any]]:
         return await self.get("/campanias/")
     
+    async def listar_campanias_pagina(
+        self,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        limite: int = 10,
+        desplazamiento: int = 0
+    ) -> Dict[str, Any]:
+        """Una página de campanias filtrada en el microservicio; el total viene en X-Total-Count"""
+        params: Dict[str, Any] = {"limite": limite, "desplazamiento": desplazamiento}
+        if estado:
+            params["estado"] = estado
+        if tipo:
+            params["tipo"] = tipo
+        
+        cuerpo, cabeceras = await self.get_con_cabeceras("/campanias/", params=params)
+        campanias = cuerpo if isinstance(cuerpo, list) else cuerpo.get("campanias", [])
+        total = cabeceras.get("X-Total-Count")
+        return {
+            "campanias": campanias,
+            "total": int(total) if total is not None else desplazamiento + len(campanias)
+        }
+    
     # async def listar_campanias(
     #     self,
     #     estado: Optional[str] = None,
@@ -64,10 +86,50 @@ class ClienteCampanias(BaseClienteHTTP):
         """Consulta el estado actual de una saga"""
         return await self.get(f"/sagas/{saga_id}/estado")
     
+    async def consultar_estados_sagas(self, saga_ids: List[str]) -> Dict[str, Any]:
+        """Consulta el estado de varias sagas en una sola llamada"""
+        return await self.post("/sagas/estado:batch", {"saga_ids": saga_ids})
+    
     async def obtener_progreso_saga(self, saga_id: str) -> Dict[str, Any]:
         """Obtiene el progreso detallado de una saga"""
         return await self.get(f"/sagas/{saga_id}/progreso")
     
+    async def obtener_progreso_saga_condicional(
+        self,
+        saga_id: str,
+        etag: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Progreso con GET condicional: (progreso, etag); progreso es None si
+        campanias respondió 304 porque `etag` sigue vigente.
+        """
+        cuerpo, cabeceras = await self.get_condicional(f"/sagas/{saga_id}/progreso", etag)
+        return cuerpo, cabeceras.get("ETag", etag)
+    
+    async def listar_sagas(
+        self,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        desde: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limite: int = 50
+    ) -> Dict[str, Any]:
+        """Lista sagas paginando por cursor (keyset) en campanias"""
+        params = {"limit": limite}
+        if estado:
+            params["estado"] = estado
+        if tipo:
+            params["tipo"] = tipo
+        if desde:
+            params["desde"] = desde
+        if cursor:
+            params["cursor"] = cursor
+        return await self.get("/sagas/", params=params)
+    
+    async def verificar_admision_saga(self, prioridad: str = "MEDIA") -> Dict[str, Any]:
+        """Chequeo de admisión previo a lanzar una saga (429 si la cola de esa prioridad está llena)"""
+        return await self.get("/sagas/admision", params={"prioridad": prioridad})
+    
     async def cancelar_saga(self, saga_id: str) -> Dict[str, Any]:
         """Cancela una saga en progreso"""
         return await self.post(f"/sagas/{saga_id}/cancelar", {})
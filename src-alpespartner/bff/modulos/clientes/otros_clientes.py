@@ -68,6 +68,10 @@ class ClienteConversiones(BaseClienteHTTP):
     async def obtener_metricas_campania(self, campania_id: str) -> Dict[str, Any]:
         """Obtiene métricas de conversión de una campaña"""
         return await self.get(f"/conversiones/campania/{campania_id}/metricas")
+    
+    async def obtener_metricas_campanias(self, campania_ids: List[str]) -> Dict[str, Any]:
+        """Obtiene métricas de conversión de varias campanias en una sola llamada"""
+        return await self.post("/conversiones/metricas:batch", {"campania_ids": campania_ids})
 
 
 class ClienteNotificaciones(BaseClienteHTTP):
@@ -0,0 +1,181 @@
+"""
+Resiliencia de las llamadas del BFF a los microservicios
+
+- InterruptorCircuito: uno por microservicio. Ventana móvil (por tiempo) de
+  resultados y latencias; abre el circuito si la tasa de errores o de llamadas
+  lentas supera el umbral y, pasado un tiempo, deja pasar unas pocas sondas
+  (semi-abierto) antes de volver a cerrarlo.
+- reunir_con_plazo: para endpoints agregados; espera las partes hasta un plazo
+  global y devuelve lo que haya llegado, indicando qué faltó.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, List, Optional, Tuple
+
+from ...config import config
+
+CERRADO = "CERRADO"
+ABIERTO = "ABIERTO"
+SEMI_ABIERTO = "SEMI_ABIERTO"
+
+
+class InterruptorCircuito:
+    """Circuit breaker con ventana móvil de errores y latencias"""
+
+    def __init__(
+        self,
+        nombre: str,
+        ventana_segundos: float = config.circuito_ventana_segundos,
+        min_muestras: int = config.circuito_min_muestras,
+        umbral_errores: float = config.circuito_umbral_errores,
+        umbral_latencia_ms: float = config.circuito_umbral_latencia_ms,
+        umbral_lentas: float = config.circuito_umbral_lentas,
+        espera_apertura_segundos: float = config.circuito_espera_apertura_segundos,
+        sondas: int = config.circuito_sondas
+    ):
+        self.nombre = nombre
+        self.ventana_segundos = ventana_segundos
+        self.min_muestras = min_muestras
+        self.umbral_errores = umbral_errores
+        self.umbral_latencia_ms = umbral_latencia_ms
+        self.umbral_lentas = umbral_lentas
+        self.espera_apertura = espera_apertura_segundos
+        self.sondas = max(1, sondas)
+
+        self.estado = CERRADO
+        self._abierto_desde = 0.0
+        self._sondas_en_curso = 0
+        self._sondas_exitosas = 0
+
+        # (instante, exito, latencia_ms) y contadores corridos de la ventana
+        self._muestras: Deque[Tuple[float, bool, float]] = deque()
+        self._errores = 0
+        self._lentas = 0
+        self._p95_ms: Optional[float] = None
+        self._p95_desde = 0  # muestras registradas desde el último cálculo de p95
+
+        self.rechazadas = 0
+        self.aperturas = 0
+
+    # Admisión
+    def permitir(self) -> bool:
+        if self.estado == CERRADO:
+            return True
+        if self.estado == ABIERTO:
+            if time.monotonic() - self._abierto_desde < self.espera_apertura:
+                self.rechazadas += 1
+                return False
+            self.estado = SEMI_ABIERTO
+            self._sondas_en_curso = 0
+            self._sondas_exitosas = 0
+        # Semi-abierto: solo pasan `sondas` llamadas a la vez
+        if self._sondas_en_curso >= self.sondas:
+            self.rechazadas += 1
+            return False
+        self._sondas_en_curso += 1
+        return True
+
+    # Resultados
+    def cancelada(self):
+        """La llamada admitida no terminó (cancelada): libera su lugar de sonda"""
+        if self.estado == SEMI_ABIERTO:
+            self._sondas_en_curso = max(0, self._sondas_en_curso - 1)
+
+    def registrar(self, exito: bool, latencia_ms: float):
+        ahora = time.monotonic()
+        if self.estado == SEMI_ABIERTO:
+            self._sondas_en_curso = max(0, self._sondas_en_curso - 1)
+            if not exito:
+                self._abrir(ahora)
+                return
+            self._sondas_exitosas += 1
+            if self._sondas_exitosas >= self.sondas:
+                self._cerrar()
+            return
+        if self.estado == ABIERTO:
+            # Respuesta tardía de una llamada admitida antes de abrir
+            return
+
+        lenta = latencia_ms >= self.umbral_latencia_ms
+        self._muestras.append((ahora, exito, latencia_ms))
+        self._errores += not exito
+        self._lentas += lenta
+        self._p95_desde += 1
+        self._purgar(ahora)
+
+        total = len(self._muestras)
+        if total >= self.min_muestras and (
+            self._errores / total >= self.umbral_errores
+            or self._lentas / total >= self.umbral_lentas
+        ):
+            self._abrir(ahora)
+
+    def _purgar(self, ahora: float):
+        limite = ahora - self.ventana_segundos
+        while self._muestras and self._muestras[0][0] < limite:
+            _, exito, latencia_ms = self._muestras.popleft()
+            self._errores -= not exito
+            self._lentas -= latencia_ms >= self.umbral_latencia_ms
+
+    def _abrir(self, ahora: float):
+        self.estado = ABIERTO
+        self._abierto_desde = ahora
+        self.aperturas += 1
+
+    def _cerrar(self):
+        self.estado = CERRADO
+        self._muestras.clear()
+        self._errores = 0
+        self._lentas = 0
+        self._p95_ms = None
+        self._p95_desde = 0
+
+    # Latencia para hedging
+    def p95_ms(self) -> Optional[float]:
+        """p95 de las llamadas exitosas de la ventana (None si hay pocas muestras)"""
+        if self._p95_ms is None or self._p95_desde >= self.min_muestras:
+            latencias = sorted(ms for _, exito, ms in self._muestras if exito)
+            self._p95_desde = 0
+            self._p95_ms = latencias[int(0.95 * (len(latencias) - 1))] if len(latencias) >= self.min_muestras else None
+        return self._p95_ms
+
+    def estadisticas(self) -> Dict[str, Any]:
+        self._purgar(time.monotonic())
+        total = len(self._muestras)
+        return {
+            "estado": self.estado,
+            "muestras": total,
+            "tasa_errores": round(self._errores / total, 4) if total else 0.0,
+            "tasa_lentas": round(self._lentas / total, 4) if total else 0.0,
+            "p95_ms": self.p95_ms(),
+            "aperturas": self.aperturas,
+            "rechazadas": self.rechazadas
+        }
+
+
+async def reunir_con_plazo(
+    partes: Dict[str, Awaitable[Any]],
+    plazo_segundos: float = config.plazo_agregados_segundos
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Ejecuta las partes de un agregado en paralelo y espera como máximo `plazo_segundos`.
+    Devuelve ({nombre: resultado o excepción}, [nombres que no llegaron a tiempo]);
+    las partes pendientes se cancelan.
+    """
+    tareas = {nombre: asyncio.ensure_future(parte) for nombre, parte in partes.items()}
+    if not tareas:
+        return {}, []
+    hechas, pendientes = await asyncio.wait(tareas.values(), timeout=plazo_segundos)
+    for tarea in pendientes:
+        tarea.cancel()
+
+    resultados: Dict[str, Any] = {}
+    faltantes: List[str] = []
+    for nombre, tarea in tareas.items():
+        if tarea in hechas:
+            resultados[nombre] = tarea.exception() or tarea.result()
+        else:
+            faltantes.append(nombre)
+    return resultados, faltantes
@@ -1,6 +1,10 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import asyncio
 from datetime import datetime, timedelta
+import hashlib
+import orjson
+from ..clientes.base_cliente import ClienteHTTPException
+from ..clientes.resiliencia import reunir_con_plazo
 from ..clientes.campanias_cliente import cliente_campanias
 from ..clientes.otros_clientes import (
     cliente_afiliados,
@@ -8,28 +12,91 @@ from ..clientes.otros_clientes import (
     cliente_conversiones,
     cliente_notificaciones
 )
+from .dashboard import InstantaneaDashboard
 from ...despachadores import despachador_bff
+from ...config import config
+from ...utils.cache import CacheAsincrona
 
 
 class CampaniasService:
     """Servicio de agregación para campanias que combina datos de múltiples microservicios"""
     
+    def __init__(self):
+        # Las métricas de conversión se piden por campaña en cada listado/detalle
+        self._cache_metricas = CacheAsincrona(
+            "metricas_conversion",
+            max_entradas=config.cache_max_entradas,
+            ttl_segundos=config.cache_ttl_metricas,
+            ventana_obsoleta_segundos=config.cache_ventana_obsoleta
+        )
+        # Estado completo ya agregado, con su ETag (hash del contenido): un GET condicional
+        # que acierta responde 304 sin volver a consultar los cuatro servicios
+        self._cache_completa = CacheAsincrona(
+            "campania_completa",
+            max_entradas=config.cache_max_entradas,
+            ttl_segundos=config.cache_ttl_estado_completo
+        )
+        # Resumen del dashboard precalculado (la tarea de fondo se arranca en el lifespan)
+        self.dashboard = InstantaneaDashboard(
+            self._cargar_datos_dashboard,
+            intervalo_reconstruccion=config.intervalo_reconstruccion_dashboard,
+            topico_afiliados=config.topico_eventos_afiliados,
+            topico_campanias=config.topico_eventos_campanias
+        )
+    
     async def obtener_campania_completa(self, campania_id: str) -> Dict[str, Any]:
         """
         Obtiene información completa de una campaña agregando datos de todos los microservicios
         """
+        _, respuesta = await self.obtener_campania_completa_con_etag(campania_id)
+        return respuesta
+    
+    async def obtener_campania_completa_con_etag(self, campania_id: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Estado completo y su ETag. Mientras la entrada siga en cache, un GET condicional
+        se resuelve comparando el ETag sin consultar ningún microservicio.
+        """
+        etag, respuesta = await self._cache_completa.obtener(
+            campania_id, lambda: self._construir_campania_completa(campania_id)
+        )
+        if respuesta["parcial"]:
+            # Una respuesta incompleta no se guarda: el próximo request reintenta todo
+            self._cache_completa.invalidar(campania_id)
+        return etag, respuesta
+    
+    def invalidar_campania(self, campania_id: str, estado: Optional[str] = None):
+        """Cambio hecho a través del BFF: descarta el estado completo y actualiza el dashboard"""
+        self._cache_completa.invalidar(campania_id)
+        if estado:
+            self.dashboard.campania_cambio_estado(campania_id, estado)
+    
+    @staticmethod
+    def _etag_contenido(campania_id: str, respuesta: Dict[str, Any]) -> str:
+        # El timestamp de armado no forma parte de la versión
+        contenido = {k: v for k, v in respuesta.items() if k != "timestamp"}
+        huella = hashlib.sha1(orjson.dumps(contenido, option=orjson.OPT_SORT_KEYS, default=str)).hexdigest()
+        return f'"{campania_id}.{huella[:20]}"'
+    
+    async def _construir_campania_completa(self, campania_id: str) -> Tuple[str, Dict[str, Any]]:
         try:
-            # Obtener información básica de la campaña
-            campania = await cliente_campanias.obtener_campania(campania_id)
+            # Información básica y datos relacionados en paralelo, con un plazo global:
+            # un servicio lento no retrasa la respuesta, solo deja su sección vacía
+            partes, faltantes = await reunir_con_plazo({
+                "campania": cliente_campanias.obtener_campania(campania_id),
+                "afiliados": self._obtener_afiliados_campania(campania_id),
+                "metricas": self._obtener_metricas_conversiones(campania_id),
+                "comisiones": self._obtener_resumen_comisiones(campania_id)
+            })
             
-            # Obtener datos relacionados en paralelo
-            tareas = [
-                self._obtener_afiliados_campania(campania_id),
-                self._obtener_metricas_conversiones(campania_id),
-                self._obtener_resumen_comisiones(campania_id)
-            ]
+            campania = partes.get("campania")
+            if campania is None:
+                raise Exception(f"campanias no respondió en {config.plazo_agregados_segundos}s")
+            if isinstance(campania, Exception):
+                raise campania
             
-            afiliados, metricas, comisiones = await asyncio.gather(*tareas, return_exceptions=True)
+            afiliados = partes.get("afiliados", [])
+            metricas = partes.get("metricas", {})
+            comisiones = partes.get("comisiones", {})
             
             # Construir respuesta agregada
             respuesta = {
@@ -37,10 +104,12 @@ class CampaniasService:
                 "afiliados": afiliados if not isinstance(afiliados, Exception) else [],
                 "metricas": metricas if not isinstance(metricas, Exception) else {},
                 "comisiones": comisiones if not isinstance(comisiones, Exception) else {},
+                "parcial": bool(faltantes),
+                "secciones_faltantes": faltantes,
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            return respuesta
+            return self._etag_contenido(campania_id, respuesta), respuesta
             
         except Exception as e:
             raise Exception(f"Error al obtener campaña completa: {str(e)}")
@@ -49,52 +118,105 @@ class CampaniasService:
         self,
         estado: Optional[str] = None,
         tipo: Optional[str] = None,
-        incluir_metricas: bool = True
+        incluir_metricas: bool = True,
+        pagina: int = 1,
+        tamanio_pagina: int = 10
     ) -> Dict[str, Any]:
         """
-        Lista campanias con resumen de métricas de cada una
+        Lista una página de campanias con resumen de métricas de cada una.
+        Filtro y paginación los resuelve campanias; las métricas de la página
+        se piden a conversiones en una sola llamada.
         """
         try:
-            # Obtener lista de campanias
-            campanias_response = await cliente_campanias.listar_campanias(
+            pagina_resp = await cliente_campanias.listar_campanias_pagina(
                 estado=estado,
-                tipo=tipo
+                tipo=tipo,
+                limite=tamanio_pagina,
+                desplazamiento=(pagina - 1) * tamanio_pagina
             )
             
-            campanias = campanias_response.get("campanias", [])
+            campanias = pagina_resp.get("campanias", [])
+            sin_metricas: List[str] = []
             
             if incluir_metricas and campanias:
-                # Obtener métricas para todas las campanias en paralelo
-                tareas_metricas = [
-                    self._obtener_metricas_conversiones(campania["id"])
-                    for campania in campanias
-                ]
-                
-                metricas_resultados = await asyncio.gather(*tareas_metricas, return_exceptions=True)
+                # Métricas de toda la página en un solo lote (hasta el plazo global)
+                ids = [campania["id"] for campania in campanias]
+                resultados, faltantes = await reunir_con_plazo({
+                    "metricas": self._obtener_metricas_conversiones_lote(ids)
+                })
+                metricas_por_id = resultados.get("metricas", {})
+                if faltantes or isinstance(metricas_por_id, Exception):
+                    metricas_por_id = {}
                 
                 # Combinar campanias con sus métricas
-                for i, campania in enumerate(campanias):
-                    metricas = metricas_resultados[i]
-                    if not isinstance(metricas, Exception):
-                        campania["metricas"] = metricas
-                    else:
-                        campania["metricas"] = {}
+                for campania in campanias:
+                    metricas = metricas_por_id.get(campania["id"])
+                    if metricas is None:
+                        sin_metricas.append(campania["id"])
+                    campania["metricas"] = metricas or {}
             
             return {
                 "campanias": campanias,
-                "total": len(campanias),
+                "total": pagina_resp.get("total", len(campanias)),
+                "pagina": pagina,
+                "tamanio_pagina": tamanio_pagina,
+                "parcial": bool(sin_metricas),
+                "campanias_sin_metricas": sin_metricas,
                 "timestamp": datetime.utcnow().isoformat()
             }
             
         except Exception as e:
             raise Exception(f"Error al listar campanias con resumen: {str(e)}")
     
+    async def iterar_campanias_con_resumen(
+        self,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        incluir_metricas: bool = True,
+        tamanio_lote: int = 200
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Recorre todas las campanias que cumplen el filtro, de a una página por vez
+        (para streaming NDJSON): nunca hay más de `tamanio_lote` campanias en memoria.
+        """
+        pagina = 1
+        while True:
+            resultado = await self.listar_campanias_con_resumen(
+                estado=estado,
+                tipo=tipo,
+                incluir_metricas=incluir_metricas,
+                pagina=pagina,
+                tamanio_pagina=tamanio_lote
+            )
+            campanias = resultado.get("campanias", [])
+            for campania in campanias:
+                yield campania
+            if len(campanias) < tamanio_lote or pagina * tamanio_lote >= resultado.get("total", 0):
+                return
+            pagina += 1
+    
     async def lanzar_campania_completa(self, datos_campania: Dict[str, Any]) -> Dict[str, Any]:
         """
         Lanza una campaña completa enviando comando via Pulsar al microservicio de campanias.
         AHORA USA EVENTOS EN LUGAR DE HTTP - Arquitectura corregida.
         """
         try:
+            # 🚦 Load shedding: si campanias no tiene lugar para esta prioridad, 429 inmediato
+            prioridad = (datos_campania.get("prioridad") or "MEDIA").upper()
+            try:
+                await cliente_campanias.verificar_admision_saga(prioridad)
+            except ClienteHTTPException as e:
+                if e.status_code == 429:
+                    return {
+                        "exito": False,
+                        "rechazada": True,
+                        "error": f"Capacidad de sagas {prioridad} agotada",
+                        "mensaje": "Demasiadas sagas en curso, reintente más tarde",
+                        "reintentar_en": 1,
+                        "timestamp": datetime.utcnow().isoformat()
+                    }
+                # si el chequeo no responde se publica igual: la cola de campanias sigue acotando
+
             # 🎯 ENVIAR COMANDO VIA PULSAR (NO HTTP)
             resultado = despachador_bff.lanzar_campania_completa(datos_campania)
             
@@ -125,43 +247,42 @@ class CampaniasService:
     
     async def obtener_dashboard_resumen(self) -> Dict[str, Any]:
         """
-        Obtiene un resumen completo para el dashboard del frontend
+        Obtiene un resumen completo para el dashboard del frontend.
+        Se sirve desde la instantánea en memoria (no consulta a los microservicios).
         """
         try:
-            # Obtener datos de todos los microservicios en paralelo
-            tareas = [
-                cliente_campanias.listar_campanias(),
-                cliente_afiliados.listar_afiliados(activo=True),
-                self._obtener_estadisticas_generales()
-            ]
-            
-            campanias_resp, afiliados_resp, estadisticas = await asyncio.gather(
-                *tareas, return_exceptions=True
-            )
-            
-            # Procesar resultados
-            campanias = campanias_resp.get("campanias", []) if not isinstance(campanias_resp, Exception) else []
-            afiliados = afiliados_resp.get("afiliados", []) if not isinstance(afiliados_resp, Exception) else []
-            
-            # Calcular métricas del dashboard
-            campanias_activas = len([c for c in campanias if c.get("estado") == "ACTIVA"])
-            campanias_total = len(campanias)
-            afiliados_activos = len(afiliados)
-            
-            return {
-                "resumen": {
-                    "campanias_activas": campanias_activas,
-                    "campanias_total": campanias_total,
-                    "afiliados_activos": afiliados_activos,
-                    "rendimiento_general": estadisticas if not isinstance(estadisticas, Exception) else {}
-                },
-                "campanias_recientes": campanias[:5],  # Últimas 5 campanias
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            return await self.dashboard.obtener()
             
         except Exception as e:
             raise Exception(f"Error al obtener dashboard: {str(e)}")
     
+    async def _cargar_datos_dashboard(self) -> Dict[str, Any]:
+        """
+        Carga completa para (re)construir la instantánea del dashboard.
+        Una sección queda en None si su microservicio falló o no respondió a tiempo.
+        """
+        partes, _ = await reunir_con_plazo({
+            "campanias": cliente_campanias.listar_campanias(),
+            "afiliados": cliente_afiliados.listar_afiliados(activo=True),
+            "estadisticas": self._obtener_estadisticas_generales()
+        })
+        campanias_resp = partes.get("campanias")
+        afiliados_resp = partes.get("afiliados")
+        estadisticas = partes.get("estadisticas")
+        
+        if isinstance(campanias_resp, list):
+            campanias = campanias_resp
+        elif isinstance(campanias_resp, dict):
+            campanias = campanias_resp.get("campanias", [])
+        else:
+            campanias = None
+        
+        return {
+            "campanias": campanias,
+            "afiliados": afiliados_resp.get("afiliados", []) if isinstance(afiliados_resp, dict) else None,
+            "estadisticas": estadisticas if isinstance(estadisticas, dict) else None
+        }
+    
     # Métodos auxiliares privados
     async def _obtener_afiliados_campania(self, campania_id: str) -> List[Dict[str, Any]]:
         """Obtiene los afiliados asociados a una campaña"""
@@ -174,10 +295,34 @@ class CampaniasService:
     async def _obtener_metricas_conversiones(self, campania_id: str) -> Dict[str, Any]:
         """Obtiene métricas de conversión de una campaña"""
         try:
-            return await cliente_conversiones.obtener_metricas_campania(campania_id)
+            return await self._cache_metricas.obtener(
+                campania_id, lambda: cliente_conversiones.obtener_metricas_campania(campania_id)
+            )
         except:
             return {}
     
+    async def _obtener_metricas_conversiones_lote(self, campania_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Métricas de conversión de varias campanias: las que están en cache se
+        responden local y el resto se pide con una sola llamada en lote.
+        """
+        metricas: Dict[str, Dict[str, Any]] = {}
+        faltantes: List[str] = []
+        for campania_id in campania_ids:
+            en_cache = self._cache_metricas.consultar(campania_id)
+            if en_cache is not None:
+                metricas[campania_id] = en_cache
+            else:
+                faltantes.append(campania_id)
+        
+        if faltantes:
+            respuesta = await cliente_conversiones.obtener_metricas_campanias(faltantes)
+            for campania_id, valor in respuesta.get("metricas", {}).items():
+                metricas[campania_id] = valor
+                self._cache_metricas.poner(campania_id, valor)
+        
+        return metricas
+    
     async def _obtener_resumen_comisiones(self, campania_id: str) -> Dict[str, Any]:
         """Obtiene resumen de comisiones de una campaña"""
         try:
@@ -0,0 +1,260 @@
+"""
+📊 Instantánea del dashboard de campanias
+
+El BFF mantiene en memoria el resumen del dashboard en lugar de listar todas las
+campanias y afiliados en cada request:
+
+- Una tarea de fondo (lifespan) lo construye al arrancar y lo reconstruye
+  completo cada `intervalo_reconstruccion` segundos.
+- Entre reconstrucciones se actualiza de forma incremental con:
+  - eventos de saga del difusor (saga COMPLETADA → se trae esa campaña),
+  - cambios de estado hechos a través del propio BFF (activar/pausar/finalizar),
+  - eventos de `eventos-campania` (creada/activada/pausada/actualizada → se trae esa
+    campaña; eliminada → se quita), también los cambios hechos fuera del BFF,
+  - eventos de `evento-afiliado` (creado/activado/desactivado).
+- Cada réplica necesita todos los eventos: se leen con un Reader (suscripción no
+  durable, ver `LectorTopico`), así un redeploy no deja suscripciones huérfanas
+  acumulando backlog; lo perdido mientras estuvo caída lo cubre la reconstrucción.
+- La vista se precalcula en cada cambio, así servirla es O(1) e incluye su antigüedad.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import re
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from ..clientes.campanias_cliente import cliente_campanias
+from .difusor_sagas import difusor_sagas
+from ...config import config
+from ...utils.lector_pulsar import LectorTopico
+
+logger = logging.getLogger(__name__)
+
+# Los eventos de afiliados se publican como repr del dataclass: "AfiliadoActivado(id_afiliado='...', ...)"
+_PATRON_EVENTO_AFILIADO = re.compile(r"^(\w+)\(.*?id_afiliado='([^']+)'")
+# Los de campanias, como {"payload": "CampaniaActivada(..., id_campania='...', ...)"}
+_PATRON_EVENTO_CAMPANIA = re.compile(r"^(\w+)\(.*?id_campania='([^']+)'")
+
+# Eventos de campaña que cambian lo que muestra el dashboard (el resto se ignora)
+_EVENTOS_CAMPANIA = {"CampaniaCreada", "CampaniaActivada", "CampaniaPausada", "CampaniaActualizada"}
+
+CAMPANIAS_RECIENTES = 5
+
+
+class InstantaneaDashboard:
+    """Resumen del dashboard en memoria, actualizado por eventos y reconstruido periódicamente"""
+
+    def __init__(
+        self,
+        cargador: Callable[[], Awaitable[Dict[str, Any]]],
+        intervalo_reconstruccion: float = 60.0,
+        topico_afiliados: str = "evento-afiliado",
+        topico_campanias: str = "eventos-campania"
+    ):
+        # cargador() → {"campanias": [...] | None, "afiliados": [...] | None, "estadisticas": {...} | None}
+        # (None en una sección = no se pudo obtener; se conserva la anterior)
+        self._cargador = cargador
+        self.intervalo_reconstruccion = intervalo_reconstruccion
+        self.topico_afiliados = topico_afiliados
+        self.topico_campanias = topico_campanias
+
+        self._campanias: Dict[str, Dict[str, Any]] = {}
+        self._activas = 0
+        self._afiliados_activos: Set[str] = set()
+        self._estadisticas: Dict[str, Any] = {}
+        self._vista: Optional[Dict[str, Any]] = None
+
+        self.construida_en: Optional[datetime] = None
+        self.actualizada_en: Optional[datetime] = None
+        self.reconstrucciones = 0
+        self.actualizaciones_incrementales = 0
+        self._lock_reconstruccion = asyncio.Lock()
+
+        difusor_sagas.agregar_oyente(self._al_evento_saga)
+
+    # Lectura
+    async def obtener(self) -> Dict[str, Any]:
+        """Vista precalculada; solo el primer request (antes de la primera construcción) espera"""
+        if self._vista is None:
+            await self.reconstruir()
+            if self._vista is None:
+                raise Exception("Dashboard aún no disponible")
+        return {
+            **self._vista,
+            "edad_segundos": round((datetime.utcnow() - self.actualizada_en).total_seconds(), 3),
+            "construida_en": self.construida_en.isoformat()
+        }
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "campanias": len(self._campanias),
+            "afiliados_activos": len(self._afiliados_activos),
+            "reconstrucciones": self.reconstrucciones,
+            "actualizaciones_incrementales": self.actualizaciones_incrementales,
+            "construida_en": self.construida_en.isoformat() if self.construida_en else None,
+            "actualizada_en": self.actualizada_en.isoformat() if self.actualizada_en else None
+        }
+
+    # Reconstrucción completa
+    async def reconstruir(self):
+        if self._lock_reconstruccion.locked():
+            # Ya hay una en curso: se espera esa en lugar de lanzar otra
+            async with self._lock_reconstruccion:
+                return
+        async with self._lock_reconstruccion:
+            datos = await self._cargador()
+            if datos.get("campanias") is not None:
+                self._campanias = {str(c.get("id")): c for c in datos["campanias"]}
+                self._activas = sum(1 for c in self._campanias.values() if self._es_activa(c))
+            if datos.get("afiliados") is not None:
+                self._afiliados_activos = {str(a.get("id")) for a in datos["afiliados"]}
+            if datos.get("estadisticas") is not None:
+                self._estadisticas = datos["estadisticas"]
+            self.construida_en = datetime.utcnow()
+            self.reconstrucciones += 1
+            self._recalcular_vista()
+
+    # Actualizaciones incrementales
+    def campania_actualizada(self, campania: Dict[str, Any]):
+        """Alta o modificación de una campaña"""
+        campania_id = str(campania.get("id"))
+        anterior = self._campanias.get(campania_id)
+        self._activas += self._es_activa(campania) - (self._es_activa(anterior) if anterior else 0)
+        self._campanias[campania_id] = campania
+        self._cambio_incremental()
+
+    def campania_cambio_estado(self, campania_id: str, estado: str):
+        anterior = self._campanias.get(campania_id)
+        if anterior is None:
+            return  # aún no conocida: la traerá la próxima reconstrucción
+        self.campania_actualizada({**anterior, "estado": estado})
+
+    def campania_eliminada(self, campania_id: str):
+        anterior = self._campanias.pop(campania_id, None)
+        if anterior is None:
+            return
+        self._activas -= self._es_activa(anterior)
+        self._cambio_incremental()
+
+    def campania_evento(self, tipo: str, campania_id: str):
+        if tipo == "CampaniaEliminada":
+            self.campania_eliminada(campania_id)
+        elif tipo in _EVENTOS_CAMPANIA:
+            asyncio.ensure_future(self._traer_campania(campania_id))
+
+    def afiliado_evento(self, tipo: str, afiliado_id: str):
+        if tipo in ("AfiliadoCreado", "AfiliadoActivado"):
+            self._afiliados_activos.add(afiliado_id)
+        elif tipo == "AfiliadoDesactivado":
+            self._afiliados_activos.discard(afiliado_id)
+        else:
+            return
+        self._cambio_incremental()
+
+    def _al_evento_saga(self, evento: Dict[str, Any]):
+        # saga_id == id de la campaña lanzada por el BFF
+        if evento.get("estado") == "COMPLETADA" and evento.get("saga_id"):
+            asyncio.ensure_future(self._traer_campania(evento["saga_id"]))
+
+    async def _traer_campania(self, campania_id: str):
+        try:
+            self.campania_actualizada(await cliente_campanias.obtener_campania(campania_id))
+        except Exception as e:
+            logger.debug(f"Dashboard: no se pudo traer la campaña {campania_id}: {e}")
+
+    def _cambio_incremental(self):
+        self.actualizaciones_incrementales += 1
+        if self._vista is not None:
+            self._recalcular_vista()
+
+    # Vista
+    @staticmethod
+    def _es_activa(campania: Dict[str, Any]) -> bool:
+        return str(campania.get("estado", "")).upper() == "ACTIVA"
+
+    def _recalcular_vista(self):
+        recientes = heapq.nlargest(
+            CAMPANIAS_RECIENTES,
+            self._campanias.values(),
+            key=lambda c: str(c.get("fecha_creacion") or "")
+        )
+        self.actualizada_en = datetime.utcnow()
+        self._vista = {
+            "resumen": {
+                "campanias_activas": self._activas,
+                "campanias_total": len(self._campanias),
+                "afiliados_activos": len(self._afiliados_activos),
+                "rendimiento_general": self._estadisticas
+            },
+            "campanias_recientes": recientes,
+            "timestamp": self.actualizada_en.isoformat()
+        }
+
+    # Tareas de fondo
+    async def ejecutar(self):
+        """Tarea de fondo (lifespan): reconstrucción periódica + eventos de campanias y afiliados"""
+        tareas = [
+            asyncio.create_task(self._escuchar(self.topico_campanias, self._parsear_evento_campania, self.campania_evento)),
+            asyncio.create_task(self._escuchar(self.topico_afiliados, self._parsear_evento_afiliado, self.afiliado_evento)),
+        ]
+        try:
+            while True:
+                try:
+                    await self.reconstruir()
+                except Exception as e:
+                    logger.error(f"❌ Error reconstruyendo dashboard: {e}")
+                await asyncio.sleep(self.intervalo_reconstruccion)
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+
+    async def _escuchar(self, topico: str, parsear: Callable[[bytes], Optional[tuple]], aplicar: Callable[..., None]):
+        url = f"pulsar://{config.pulsar_host}:6650"
+        while True:
+            try:
+                # Reader (suscripción no durable): cada réplica necesita todos los eventos y lo
+                # perdido mientras estuvo caída lo cubre la reconstrucción
+                async with LectorTopico(url, topico) as lector:
+                    logger.info(f"📊 Dashboard escuchando {topico}")
+                    async for datos in lector:
+                        evento = parsear(datos)
+                        if evento:
+                            aplicar(*evento)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error en suscripción a {topico}: {e}; reintentando en 5s")
+                await asyncio.sleep(5)
+
+    @staticmethod
+    def _parsear_evento_campania(datos: bytes) -> Optional[tuple]:
+        texto = datos.decode("utf-8", errors="replace")
+        try:
+            crudo = json.loads(texto)
+        except ValueError:
+            return None  # Avro u otro formato: lo cubre la próxima reconstrucción
+        if not isinstance(crudo, dict):
+            return None
+        if isinstance(crudo.get("payload"), str):
+            coincidencia = _PATRON_EVENTO_CAMPANIA.match(crudo["payload"])
+            return coincidencia.groups() if coincidencia else None
+        # evento de integración: {"type": "CampaniaCreada", "data": {"id_campania": ...}}
+        tipo, data = crudo.get("type") or crudo.get("tipo"), crudo.get("data") or crudo
+        campania_id = data.get("id_campania") if isinstance(data, dict) else None
+        return (tipo, str(campania_id)) if tipo and campania_id else None
+
+    @staticmethod
+    def _parsear_evento_afiliado(datos: bytes) -> Optional[tuple]:
+        texto = datos.decode("utf-8", errors="replace")
+        try:
+            crudo = json.loads(texto)
+            tipo, afiliado_id = crudo.get("tipo"), crudo.get("id_afiliado")
+            return (tipo, str(afiliado_id)) if tipo and afiliado_id else None
+        except (ValueError, AttributeError):
+            pass
+        coincidencia = _PATRON_EVENTO_AFILIADO.match(texto)
+        return coincidencia.groups() if coincidencia else None
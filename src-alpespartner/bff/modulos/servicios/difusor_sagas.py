@@ -0,0 +1,162 @@
+"""
+📡 Difusor de eventos de saga para el BFF
+
+El BFF se suscribe una sola vez a `eventos-saga-campania` y reparte cada evento
+a los clientes interesados en esa saga (SSE / monitorear_saga), en lugar de que
+cada cliente haga polling contra campanias.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from ...config import config
+from ...utils.lector_pulsar import LectorTopico
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_TERMINALES_SAGA = {"COMPLETADA", "FALLIDA", "CANCELADA", "COMPENSADA"}
+
+# Respuestas de los servicios compensadores (PLAN_COMPENSACION_CAMPANIA en campanias)
+PASOS_COMPENSACION = frozenset({"compensar_busqueda_afiliados", "compensar_comisiones"})
+
+
+def _estado_saga_desde_paso(paso: Optional[str], estado_paso: str) -> Optional[str]:
+    """
+    Mismo criterio que `estado_saga_por_paso` en el consumidor de campanias: el paso de
+    afiliados completa la saga y, si falla, la deja COMPENSANDO. Las respuestas de
+    compensación no la cierran. El cierre de una compensación (COMPENSADA o FALLIDA)
+    no se publica en el tópico: se lee de campanias.
+    """
+    if paso in PASOS_COMPENSACION:
+        return "COMPENSANDO"
+    valor = (estado_paso or "").upper()
+    if valor in ("OK", "EXITO", "EXITO_OK", "COMPLETADO") or "SUCCESS" in valor:
+        return "COMPLETADA"
+    if valor in ("FALLIDO", "ERROR", "FAIL") or "FAIL" in valor or "ERROR" in valor:
+        return "COMPENSANDO"
+    return None
+
+
+class SuscriptorSaga:
+    """Un cliente esperando eventos de una saga, con buffer acotado"""
+
+    def __init__(self, saga_id: str, tamanio_buffer: int):
+        self.saga_id = saga_id
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=tamanio_buffer)
+        self.descartados = 0
+
+    def entregar(self, evento: Dict[str, Any]):
+        # Cliente lento: se descarta el evento más viejo, el más reciente siempre llega
+        if self.cola.full():
+            try:
+                self.cola.get_nowait()
+                self.descartados += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.cola.put_nowait(evento)
+
+    async def siguiente(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Siguiente evento, o None si vence el timeout"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class DifusorEventosSaga:
+    """Suscripción única a Pulsar + conjuntos de suscriptores por saga"""
+
+    def __init__(self, topico: str = "eventos-saga-campania", tamanio_buffer: int = 32):
+        self.topico = topico
+        self.tamanio_buffer = tamanio_buffer
+        self._suscriptores: Dict[str, Set[SuscriptorSaga]] = {}
+        # Oyentes de todos los eventos (p. ej. la instantánea del dashboard)
+        self._oyentes: List[Callable[[Dict[str, Any]], None]] = []
+        self.conectado = False
+        self.eventos_recibidos = 0
+
+    # Gestión de suscriptores
+    def suscribir(self, saga_id: str) -> SuscriptorSaga:
+        suscriptor = SuscriptorSaga(saga_id, self.tamanio_buffer)
+        self._suscriptores.setdefault(saga_id, set()).add(suscriptor)
+        return suscriptor
+
+    def desuscribir(self, suscriptor: SuscriptorSaga):
+        conjunto = self._suscriptores.get(suscriptor.saga_id)
+        if conjunto is not None:
+            conjunto.discard(suscriptor)
+            if not conjunto:
+                del self._suscriptores[suscriptor.saga_id]
+
+    def agregar_oyente(self, oyente: Callable[[Dict[str, Any]], None]):
+        """Registra un callback (síncrono) que recibe todos los eventos de saga"""
+        self._oyentes.append(oyente)
+    
+    def publicar(self, evento: Dict[str, Any]):
+        """Entrega un evento a todos los suscriptores de su saga (O(suscriptores de esa saga))"""
+        for suscriptor in list(self._suscriptores.get(evento.get("saga_id"), ())):
+            suscriptor.entregar(evento)
+        for oyente in self._oyentes:
+            try:
+                oyente(evento)
+            except Exception as e:
+                logger.warning(f"Oyente de eventos de saga falló: {e}")
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "conectado": self.conectado,
+            "eventos_recibidos": self.eventos_recibidos,
+            "sagas_observadas": len(self._suscriptores),
+            "clientes": sum(len(s) for s in self._suscriptores.values())
+        }
+
+    @staticmethod
+    def normalizar(crudo: Dict[str, Any]) -> Dict[str, Any]:
+        """Evento JSON de `eventos-saga-campania` → evento para el frontend"""
+        estado_paso = crudo.get("estado")
+        return {
+            "saga_id": crudo.get("saga_id"),
+            "paso": crudo.get("paso"),
+            "estado_paso": estado_paso,
+            "estado": _estado_saga_desde_paso(crudo.get("paso"), estado_paso) or "EN_PROGRESO",
+            "detalle": crudo.get("detalle") or {},
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    # Consumo
+    async def escuchar(self):
+        """Tarea de fondo (lifespan): lee el tópico y reparte; reconecta si se cae"""
+        url = f"pulsar://{config.pulsar_host}:6650"
+        while True:
+            try:
+                # Reader (suscripción no durable): cada instancia ve todos los eventos
+                # sin dejar una suscripción huérfana por hostname tras cada redeploy
+                async with LectorTopico(url, self.topico) as lector:
+                    self.conectado = True
+                    logger.info(f"📡 BFF escuchando {self.topico}")
+
+                    async for datos in lector:
+                        try:
+                            crudo = json.loads(datos.decode("utf-8"))
+                            self.eventos_recibidos += 1
+                            self.publicar(self.normalizar(crudo))
+                        except Exception as e:
+                            logger.warning(f"Evento de saga inválido: {e}")
+
+            except asyncio.CancelledError:
+                self.conectado = False
+                raise
+            except Exception as e:
+                self.conectado = False
+                logger.error(f"❌ Error en suscripción a {self.topico}: {e}; reintentando en 5s")
+                await asyncio.sleep(5)
+
+
+# Instancia singleton del difusor
+difusor_sagas = DifusorEventosSaga(
+    tamanio_buffer=int(os.getenv("SAGA_STREAM_BUFFER", "32"))
+)
@@ -1,73 +1,197 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import asyncio
-from datetime import datetime, timedelta
+import logging
+from datetime import datetime
 from ..clientes.campanias_cliente import cliente_campanias
+from .difusor_sagas import difusor_sagas, ESTADOS_TERMINALES_SAGA
 from ...config import config
+from ...utils.cache import CacheAsincrona
+
+logger = logging.getLogger(__name__)
+
+
+# Estados no terminales de una saga (lo que el dashboard considera "activa")
+ESTADOS_SAGA_ACTIVA = "INICIADA,EN_PROGRESO,COMPENSANDO"
+
+
+class CoalescedorEstadosSaga:
+    """
+    Agrupa las consultas de estado de saga que llegan dentro de una misma ventana
+    (tick) en una sola llamada a `POST /sagas/estado:batch`. Consultas concurrentes
+    por la misma saga comparten el mismo future.
+    """
+    
+    def __init__(self, ventana_ms: int, max_lote: int):
+        self.ventana = ventana_ms / 1000
+        self.max_lote = max_lote
+        self._pendientes: Dict[str, asyncio.Future] = {}
+        self._programado = False
+    
+    async def obtener(self, saga_id: str) -> Dict[str, Any]:
+        futuro = self._pendientes.get(saga_id)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().create_future()
+            self._pendientes[saga_id] = futuro
+            if len(self._pendientes) >= self.max_lote:
+                self._despachar()
+            elif not self._programado:
+                self._programado = True
+                asyncio.get_running_loop().call_later(self.ventana, self._despachar)
+        return await asyncio.shield(futuro)
+    
+    def _despachar(self):
+        self._programado = False
+        if not self._pendientes:
+            return
+        lote, self._pendientes = self._pendientes, {}
+        asyncio.ensure_future(self._resolver(lote))
+    
+    async def _resolver(self, lote: Dict[str, asyncio.Future]):
+        try:
+            respuesta = await cliente_campanias.consultar_estados_sagas(list(lote))
+            estados = respuesta.get("estados", {})
+            for saga_id, futuro in lote.items():
+                if futuro.done():
+                    continue
+                if saga_id in estados:
+                    futuro.set_result(estados[saga_id])
+                else:
+                    futuro.set_exception(Exception(f"Saga {saga_id} no encontrada (404)"))
+        except Exception as e:
+            for futuro in lote.values():
+                if not futuro.done():
+                    futuro.set_exception(e)
 
 
 class SagasService:
     """Servicio para seguimiento y gestión de sagas"""
     
     def __init__(self):
-        self._cache_estados = {}  # Cache simple para estados de saga
-        self._cache_ttl = timedelta(seconds=config.intervalo_polling_saga)
+        self._cache_estados = CacheAsincrona(
+            "estados_saga",
+            max_entradas=config.cache_max_entradas,
+            ttl_segundos=config.cache_ttl_estado_saga,
+            ventana_obsoleta_segundos=config.cache_ventana_obsoleta
+        )
+        # Último progreso visto por saga junto a su ETag: se revalida siempre contra
+        # campanias, que responde 304 sin armar el detalle si la versión no cambió
+        self._cache_progreso = CacheAsincrona(
+            "progreso_saga",
+            max_entradas=config.cache_max_entradas,
+            ttl_segundos=config.cache_ttl_progreso_saga
+        )
+        self._coalescedor = CoalescedorEstadosSaga(
+            config.ventana_lote_estados_ms, config.max_lote_estados_saga
+        )
     
     async def obtener_estado_saga(self, saga_id: str, usar_cache: bool = True) -> Dict[str, Any]:
         """
         Obtiene el estado actual de una saga
         """
         try:
-            # Verificar cache si está habilitado
-            if usar_cache and saga_id in self._cache_estados:
-                entrada_cache = self._cache_estados[saga_id]
-                if datetime.utcnow() - entrada_cache["timestamp"] < self._cache_ttl:
-                    return entrada_cache["estado"]
-            
-            # Obtener estado del microservicio de campanias
-            estado = await cliente_campanias.consultar_estado_saga(saga_id)
-            
-            # Actualizar cache
+            # Estado del microservicio de campanias (agrupado con otros polls del mismo tick);
+            # con cache, los fallos concurrentes por la misma saga comparten una sola carga
             if usar_cache:
-                self._cache_estados[saga_id] = {
-                    "estado": estado,
-                    "timestamp": datetime.utcnow()
-                }
+                return await self._cache_estados.obtener(
+                    saga_id, lambda: self._coalescedor.obtener(saga_id)
+                )
             
+            estado = await self._coalescedor.obtener(saga_id)
+            self._cache_estados.poner(saga_id, estado)
             return estado
             
         except Exception as e:
             raise Exception(f"Error al obtener estado de saga {saga_id}: {str(e)}")
     
+    async def obtener_estados_sagas(self, saga_ids: List[str], usar_cache: bool = True) -> Dict[str, Any]:
+        """
+        Obtiene el estado de varias sagas: lo que está en cache se responde local,
+        el resto va en lotes de `max_lote_estados_saga` a campanias.
+        """
+        try:
+            ahora = datetime.utcnow()
+            estados: Dict[str, Any] = {}
+            faltantes: List[str] = []
+            for saga_id in dict.fromkeys(saga_ids):
+                estado = self._cache_estados.consultar(saga_id) if usar_cache else None
+                if estado is not None:
+                    estados[saga_id] = estado
+                else:
+                    faltantes.append(saga_id)
+            
+            no_encontradas: List[str] = []
+            tam = config.max_lote_estados_saga
+            lotes = [faltantes[i:i + tam] for i in range(0, len(faltantes), tam)]
+            respuestas = await asyncio.gather(*[cliente_campanias.consultar_estados_sagas(l) for l in lotes])
+            for respuesta in respuestas:
+                for saga_id, estado in respuesta.get("estados", {}).items():
+                    estados[saga_id] = estado
+                    self._cache_estados.poner(saga_id, estado)
+                no_encontradas.extend(respuesta.get("no_encontradas", []))
+            
+            return {
+                "estados": estados,
+                "no_encontradas": no_encontradas,
+                "timestamp": ahora.isoformat()
+            }
+            
+        except Exception as e:
+            raise Exception(f"Error al obtener estados de sagas: {str(e)}")
+    
     async def obtener_progreso_detallado(self, saga_id: str) -> Dict[str, Any]:
         """
         Obtiene el progreso detallado de una saga con información de cada paso
         """
+        progreso, _ = await self.obtener_progreso_condicional(saga_id)
+        return progreso
+    
+    async def obtener_progreso_condicional(
+        self,
+        saga_id: str,
+        etag_cliente: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Progreso detallado con validador: devuelve (progreso, etag).
+        progreso es None cuando campanias confirmó (304) el `etag_cliente` reenviado.
+        """
         try:
-            progreso = await cliente_campanias.obtener_progreso_saga(saga_id)
-            
-            # Enriquecer con información adicional para el frontend
-            pasos_procesados = []
-            for paso in progreso.get("pasos", []):
-                paso_enriquecido = {
-                    **paso,
-                    "tiempo_transcurrido": self._calcular_tiempo_transcurrido(paso),
-                    "progreso_porcentaje": self._calcular_porcentaje_paso(paso)
-                }
-                pasos_procesados.append(paso_enriquecido)
-            
-            resultado = {
-                **progreso,
-                "pasos": pasos_procesados,
-                "progreso_total": self._calcular_progreso_total(pasos_procesados),
-                "tiempo_estimado_restante": self._estimar_tiempo_restante(pasos_procesados),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            guardado = self._cache_progreso.consultar(saga_id)
+            # Con copia local se revalida la propia (así un 304 se sirve desde cache);
+            # sin ella, se reenvía el validador del cliente
+            etag_envio = guardado[0] if guardado else etag_cliente
+            crudo, etag = await cliente_campanias.obtener_progreso_saga_condicional(saga_id, etag_envio)
+            
+            if crudo is None:
+                if guardado is None:
+                    return None, etag
+                crudo = guardado[1]
+            elif etag:
+                self._cache_progreso.poner(saga_id, (etag, crudo))
             
-            return resultado
+            return self._enriquecer_progreso(crudo), etag
             
         except Exception as e:
             raise Exception(f"Error al obtener progreso de saga {saga_id}: {str(e)}")
     
+    def _enriquecer_progreso(self, progreso: Dict[str, Any]) -> Dict[str, Any]:
+        # Enriquecer con información adicional para el frontend
+        pasos_procesados = []
+        for paso in progreso.get("pasos", []):
+            paso_enriquecido = {
+                **paso,
+                "tiempo_transcurrido": self._calcular_tiempo_transcurrido(paso),
+                "progreso_porcentaje": self._calcular_porcentaje_paso(paso)
+            }
+            pasos_procesados.append(paso_enriquecido)
+        
+        return {
+            **progreso,
+            "pasos": pasos_procesados,
+            "progreso_total": self._calcular_progreso_total(pasos_procesados),
+            "tiempo_estimado_restante": self._estimar_tiempo_restante(pasos_procesados),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
     async def monitorear_saga(
         self,
         saga_id: str,
@@ -81,6 +205,31 @@ class SagasService:
         timeout = timeout_segundos or config.timeout_saga_segundos
         inicio = datetime.utcnow()
         
+        if difusor_sagas.conectado:
+            # Push: se espera el evento en lugar de consultar a campanias cada N segundos
+            async for estado in self.stream_eventos_saga(saga_id, timeout):
+                if estado.get("estado") == "HEARTBEAT":
+                    continue
+                if callback_progreso:
+                    await callback_progreso(estado)
+                estado_saga = estado.get("estado")
+                if estado_saga in ESTADOS_TERMINALES_SAGA:
+                    return {
+                        "saga_id": saga_id,
+                        "estado_final": estado_saga,
+                        "tiempo_total": (datetime.utcnow() - inicio).total_seconds(),
+                        "exito": estado_saga == "COMPLETADA",
+                        "detalles": estado
+                    }
+            return {
+                "saga_id": saga_id,
+                "estado_final": "TIMEOUT",
+                "tiempo_total": timeout,
+                "exito": False,
+                "mensaje": f"Saga no completada en {timeout} segundos"
+            }
+        
+        # Respaldo si el BFF no está conectado a Pulsar: polling
         while (datetime.utcnow() - inicio).total_seconds() < timeout:
             try:
                 estado = await self.obtener_estado_saga(saga_id, usar_cache=False)
@@ -91,7 +240,7 @@ class SagasService:
                 
                 # Verificar si la saga terminó
                 estado_saga = estado.get("estado")
-                if estado_saga in ["COMPLETADA", "FALLIDA", "CANCELADA"]:
+                if estado_saga in ESTADOS_TERMINALES_SAGA:
                     return {
                         "saga_id": saga_id,
                         "estado_final": estado_saga,
@@ -117,6 +266,57 @@ class SagasService:
             "mensaje": f"Saga no completada en {timeout} segundos"
         }
     
+    async def stream_eventos_saga(self, saga_id: str, timeout_segundos: Optional[int] = None):
+        """
+        Generador de estados de una saga: primero el estado actual (una lectura),
+        luego cada evento recibido por el difusor, hasta estado terminal o timeout.
+        Produce {"estado": "HEARTBEAT"} cuando no hay novedades, para mantener viva la conexión.
+        El cierre de una compensación no llega como evento: mientras la saga está
+        COMPENSANDO se vuelve a leer su estado en cada intervalo de polling.
+        """
+        timeout = timeout_segundos or config.timeout_saga_segundos
+        inicio = datetime.utcnow()
+        # Suscribirse ANTES de leer el estado actual para no perder eventos intermedios
+        suscriptor = difusor_sagas.suscribir(saga_id)
+        ultimo_estado = None
+        try:
+            try:
+                actual = await self.obtener_estado_saga(saga_id, usar_cache=False)
+                yield {"saga_id": saga_id, **actual}
+                ultimo_estado = actual.get("estado")
+                if ultimo_estado in ESTADOS_TERMINALES_SAGA:
+                    return
+            except Exception as e:
+                if "no encontrada" not in str(e).lower():
+                    raise
+                # aún no creada en campanias (comando en cola): se esperan sus eventos
+            
+            while True:
+                restante = timeout - (datetime.utcnow() - inicio).total_seconds()
+                if restante <= 0:
+                    return
+                compensando = ultimo_estado == "COMPENSANDO"
+                espera = config.intervalo_polling_saga if compensando else 15
+                evento = await suscriptor.siguiente(timeout=min(espera, restante))
+                if evento is None and compensando:
+                    try:
+                        actual = await self.obtener_estado_saga(saga_id, usar_cache=False)
+                    except Exception as e:
+                        logger.warning(f"No se pudo leer el estado de la saga {saga_id}: {e}")
+                    else:
+                        if actual.get("estado") != ultimo_estado:
+                            evento = {"saga_id": saga_id, **actual}
+                if evento is None:
+                    yield {"saga_id": saga_id, "estado": "HEARTBEAT"}
+                    continue
+                self._cache_estados.invalidar(saga_id)
+                yield evento
+                ultimo_estado = evento.get("estado")
+                if ultimo_estado in ESTADOS_TERMINALES_SAGA:
+                    return
+        finally:
+            difusor_sagas.desuscribir(suscriptor)
+    
     async def cancelar_saga(self, saga_id: str, razon: Optional[str] = None) -> Dict[str, Any]:
         """
         Cancela una saga en progreso
@@ -125,8 +325,7 @@ class SagasService:
             resultado = await cliente_campanias.cancelar_saga(saga_id)
             
             # Limpiar cache
-            if saga_id in self._cache_estados:
-                del self._cache_estados[saga_id]
+            self._cache_estados.invalidar(saga_id)
             
             return {
                 "exito": True,
@@ -146,27 +345,65 @@ class SagasService:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
-    async def listar_sagas_activas(self) -> Dict[str, Any]:
+    async def listar_sagas_activas(
+        self,
+        cursor: Optional[str] = None,
+        limite: int = 10,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        desde: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Lista todas las sagas activas en el sistema
+        Lista sagas (por defecto las activas) de a una página, reenviando el cursor
+        a campanias: nunca se trae el histórico completo para paginar en memoria.
         """
         try:
-            # Nota: Este endpoint tendría que existir en el microservicio de campanias
-            # Por ahora simulamos la estructura
-            sagas_activas = []
+            pagina = await cliente_campanias.listar_sagas(
+                estado=estado or ESTADOS_SAGA_ACTIVA,
+                tipo=tipo,
+                desde=desde,
+                cursor=cursor,
+                limite=limite
+            )
+            sagas = pagina.get("sagas", [])
             
             return {
-                "sagas": sagas_activas,
-                "total": len(sagas_activas),
+                "sagas": sagas,
+                "total": len(sagas),
+                "siguiente_cursor": pagina.get("siguiente_cursor"),
                 "timestamp": datetime.utcnow().isoformat()
             }
             
         except Exception as e:
             raise Exception(f"Error al listar sagas activas: {str(e)}")
     
+    async def iterar_sagas(
+        self,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        desde: Optional[str] = None,
+        tamanio_lote: int = 200
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Recorre todas las sagas del filtro siguiendo el cursor (para streaming NDJSON)"""
+        cursor = None
+        while True:
+            pagina = await self.listar_sagas_activas(
+                cursor=cursor, limite=tamanio_lote, estado=estado, tipo=tipo, desde=desde
+            )
+            for saga in pagina.get("sagas", []):
+                yield saga
+            cursor = pagina.get("siguiente_cursor")
+            if not cursor:
+                return
+    
     def limpiar_cache(self):
-        """Limpia el cache de estados de saga"""
-        self._cache_estados.clear()
+        """Limpia el cache de estados y de progreso de saga"""
+        self._cache_estados.limpiar()
+        self._cache_progreso.limpiar()
+    
+    def estadisticas_cache(self) -> Dict[str, Any]:
+        """Contadores del cache de estados (aciertos, fallos, desalojos...)"""
+        return self._cache_estados.estadisticas()
     
     # Métodos auxiliares privados
     def _calcular_tiempo_transcurrido(self, paso: Dict[str, Any]) -> Optional[float]:
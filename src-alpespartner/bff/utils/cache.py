@@ -0,0 +1,165 @@
+"""
+Cache asíncrona acotada (TTL + LRU) para los servicios del BFF.
+
+- Máximo de entradas: al superarlo se desaloja la usada hace más tiempo.
+- TTL por entrada; pasado el TTL, durante `ventana_obsoleta_segundos` se sigue
+  respondiendo el valor viejo mientras se recarga en segundo plano
+  (stale-while-revalidate).
+- Single-flight por clave: si muchas peticiones fallan a la vez sobre la misma
+  clave, se hace una sola carga y todas esperan su resultado.
+- Contadores de aciertos/fallos/desalojos para `/bff/cache`.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Entrada:
+    __slots__ = ("valor", "expira")
+
+    def __init__(self, valor: Any, expira: float):
+        self.valor = valor
+        self.expira = expira
+
+
+class CacheAsincrona:
+    """Cache TTL-LRU con carga single-flight; pensada para un solo event loop"""
+
+    def __init__(
+        self,
+        nombre: str,
+        max_entradas: int,
+        ttl_segundos: float,
+        ventana_obsoleta_segundos: float = 0.0
+    ):
+        self.nombre = nombre
+        self.max_entradas = max(1, max_entradas)
+        self.ttl = ttl_segundos
+        self.ventana_obsoleta = max(0.0, ventana_obsoleta_segundos)
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._en_vuelo: Dict[Hashable, asyncio.Task] = {}
+
+        # Contadores
+        self.aciertos = 0
+        self.aciertos_obsoletos = 0
+        self.fallos = 0
+        self.cargas = 0
+        self.cargas_compartidas = 0
+        self.errores_carga = 0
+        self.desalojos = 0
+
+        _caches[nombre] = self
+
+    async def obtener(self, clave: Hashable, cargador: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Devuelve el valor de `clave`, cargándolo con `cargador` si no está o venció.
+        Los errores del cargador se propagan y no se guardan.
+        """
+        entrada = self._entradas.get(clave)
+        if entrada is not None:
+            ahora = time.monotonic()
+            if ahora < entrada.expira:
+                self.aciertos += 1
+                self._entradas.move_to_end(clave)
+                return entrada.valor
+            if ahora < entrada.expira + self.ventana_obsoleta:
+                # Se responde lo que hay y se refresca en segundo plano
+                self.aciertos_obsoletos += 1
+                self._entradas.move_to_end(clave)
+                self._cargar(clave, cargador)
+                return entrada.valor
+            del self._entradas[clave]
+
+        self.fallos += 1
+        # shield: si el cliente que disparó la carga se cancela, los demás siguen esperando
+        return await asyncio.shield(self._cargar(clave, cargador))
+
+    def consultar(self, clave: Hashable) -> Optional[Any]:
+        """Valor vigente de `clave` sin cargar nada (None si no hay o venció)"""
+        entrada = self._entradas.get(clave)
+        if entrada is not None and time.monotonic() < entrada.expira:
+            self.aciertos += 1
+            self._entradas.move_to_end(clave)
+            return entrada.valor
+        self.fallos += 1
+        return None
+
+    def poner(self, clave: Hashable, valor: Any, ttl_segundos: Optional[float] = None):
+        """Guarda un valor ya obtenido por otra vía (p. ej. una consulta en lote)"""
+        ttl = self.ttl if ttl_segundos is None else ttl_segundos
+        self._entradas[clave] = _Entrada(valor, time.monotonic() + ttl)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+
+    def invalidar(self, clave: Hashable):
+        """Descarta la entrada; una carga en curso ya no guardará su resultado"""
+        self._entradas.pop(clave, None)
+        self._en_vuelo.pop(clave, None)
+
+    def limpiar(self):
+        self._entradas.clear()
+        self._en_vuelo.clear()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        consultas = self.aciertos + self.aciertos_obsoletos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "ttl_segundos": self.ttl,
+            "ventana_obsoleta_segundos": self.ventana_obsoleta,
+            "aciertos": self.aciertos,
+            "aciertos_obsoletos": self.aciertos_obsoletos,
+            "fallos": self.fallos,
+            "tasa_acierto": round((self.aciertos + self.aciertos_obsoletos) / consultas, 4) if consultas else None,
+            "cargas": self.cargas,
+            "cargas_compartidas": self.cargas_compartidas,
+            "cargas_en_vuelo": len(self._en_vuelo),
+            "errores_carga": self.errores_carga,
+            "desalojos": self.desalojos
+        }
+
+    # Carga single-flight
+    def _cargar(self, clave: Hashable, cargador: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        tarea = self._en_vuelo.get(clave)
+        if tarea is not None:
+            self.cargas_compartidas += 1
+            return tarea
+        self.cargas += 1
+        tarea = asyncio.ensure_future(self._ejecutar_carga(clave, cargador))
+        # Evita "Task exception was never retrieved" en refrescos de fondo sin espera
+        tarea.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._en_vuelo[clave] = tarea
+        return tarea
+
+    async def _ejecutar_carga(self, clave: Hashable, cargador: Callable[[], Awaitable[Any]]) -> Any:
+        tarea = asyncio.current_task()
+        vigente = False
+        try:
+            valor = await cargador()
+        except Exception as e:
+            self.errores_carga += 1
+            logger.debug(f"Cache {self.nombre}: error cargando {clave}: {e}")
+            raise
+        finally:
+            # Si la clave se invalidó mientras cargaba, el resultado ya no se guarda
+            if self._en_vuelo.get(clave) is tarea:
+                del self._en_vuelo[clave]
+                vigente = True
+        if vigente:
+            self.poner(clave, valor)
+        return valor
+
+
+# Registro de caches del proceso (para exponer sus contadores)
+_caches: Dict[str, CacheAsincrona] = {}
+
+
+def estadisticas_caches() -> Dict[str, Dict[str, Any]]:
+    return {nombre: cache.estadisticas() for nombre, cache in _caches.items()}
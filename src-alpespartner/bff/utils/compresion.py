@@ -0,0 +1,156 @@
+"""
+Compresión de respuestas del BFF (middleware ASGI)
+
+- Negocia `br` (preferido) o `gzip` según Accept-Encoding.
+- Respuestas completas: solo se comprimen si superan `tamanio_minimo` bytes.
+- Respuestas en streaming (NDJSON): se comprimen por chunk con flush, así cada
+  bloque llega al cliente en cuanto se produce.
+- SSE (`text/event-stream`) y respuestas ya codificadas se dejan pasar tal cual.
+- Toda respuesta comprimible lleva `Vary: Accept-Encoding` (también las que salen sin
+  comprimir), y un ETag fuerte se debilita al codificar: los bytes ya no son los
+  de la representación que validaba.
+"""
+
+import zlib
+from typing import Optional
+
+import brotli
+
+TIPOS_EXCLUIDOS = ("text/event-stream",)
+
+
+class _Compresor:
+    """Interfaz común para gzip y brotli en modo streaming"""
+
+    def __init__(self, codificacion: str, nivel_gzip: int, calidad_brotli: int):
+        self.codificacion = codificacion
+        if codificacion == "br":
+            self._br = brotli.Compressor(quality=calidad_brotli)
+        else:
+            # wbits 16+MAX_WBITS → formato gzip
+            self._gz = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos: bytes, final: bool) -> bytes:
+        if self.codificacion == "br":
+            salida = self._br.process(datos)
+            return salida + (self._br.finish() if final else self._br.flush())
+        salida = self._gz.compress(datos)
+        return salida + self._gz.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _con_vary(headers: list) -> list:
+    """Agrega Accept-Encoding al Vary existente (o la cabecera) si aún no está"""
+    for i, (k, v) in enumerate(headers):
+        if k.lower() == b"vary":
+            if v.strip() == b"*" or b"accept-encoding" in v.lower():
+                return headers
+            headers = list(headers)
+            headers[i] = (k, v + b", Accept-Encoding")
+            return headers
+    return [*headers, (b"vary", b"Accept-Encoding")]
+
+
+def _etag_debil(headers: list) -> list:
+    return [
+        (k, b"W/" + v) if k.lower() == b"etag" and not v.startswith(b"W/") else (k, v)
+        for k, v in headers
+    ]
+
+
+def _comprimible(headers: dict) -> bool:
+    tipo = headers.get(b"content-type", b"").decode("latin-1")
+    return b"content-encoding" not in headers and not tipo.startswith(TIPOS_EXCLUIDOS)
+
+
+def _elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                q = float(parametros.strip()[2:])
+            except ValueError:
+                q = 0.0
+        aceptadas[nombre.strip()] = q
+    for codificacion in ("br", "gzip"):
+        if aceptadas.get(codificacion, 0) > 0:
+            return codificacion
+    return None
+
+
+class CompresionMiddleware:
+
+    def __init__(self, app, tamanio_minimo: int = 1024, nivel_gzip: int = 6, calidad_brotli: int = 5):
+        self.app = app
+        self.tamanio_minimo = tamanio_minimo
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cabeceras = dict(scope.get("headers") or [])
+        codificacion = _elegir_codificacion(cabeceras.get(b"accept-encoding", b"").decode("latin-1"))
+        if codificacion is None:
+            async def sin_codificar(mensaje):
+                # la misma URL con otro Accept-Encoding devuelve otra representación
+                if mensaje["type"] == "http.response.start":
+                    headers = mensaje.get("headers", [])
+                    if _comprimible({k.lower(): v for k, v in headers}):
+                        mensaje = {**mensaje, "headers": _con_vary(headers)}
+                await send(mensaje)
+
+            await self.app(scope, receive, sin_codificar)
+            return
+
+        inicio = None        # mensaje http.response.start retenido
+        compresor = None     # None = aún sin decidir; False = sin comprimir
+
+        async def enviar(mensaje):
+            nonlocal inicio, compresor
+            if mensaje["type"] == "http.response.start":
+                inicio = mensaje
+                return
+            if mensaje["type"] != "http.response.body":
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+
+            if compresor is None:
+                headers = {k.lower(): v for k, v in inicio.get("headers", [])}
+                if not _comprimible(headers):
+                    compresor = False
+                    await send(inicio)
+                elif not mas and len(cuerpo) < self.tamanio_minimo:
+                    compresor = False
+                    await send({**inicio, "headers": _con_vary(inicio.get("headers", []))})
+                else:
+                    compresor = _Compresor(codificacion, self.nivel_gzip, self.calidad_brotli)
+                    nuevas = _con_vary(_etag_debil([
+                        (k, v) for k, v in inicio.get("headers", [])
+                        if k.lower() not in (b"content-length", b"content-encoding")
+                    ]))
+                    nuevas.append((b"content-encoding", codificacion.encode()))
+                    if not mas:
+                        # Respuesta completa: se comprime de una vez y se informa el largo final
+                        cuerpo = compresor.comprimir(cuerpo, final=True)
+                        nuevas.append((b"content-length", str(len(cuerpo)).encode()))
+                        await send({**inicio, "headers": nuevas})
+                        await send({"type": "http.response.body", "body": cuerpo, "more_body": False})
+                        return
+                    await send({**inicio, "headers": nuevas})
+
+            if compresor is False:
+                await send(mensaje)
+                return
+            await send({
+                "type": "http.response.body",
+                "body": compresor.comprimir(cuerpo, final=not mas),
+                "more_body": mas
+            })
+
+        await self.app(scope, receive, enviar)
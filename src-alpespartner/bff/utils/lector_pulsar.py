@@ -0,0 +1,53 @@
+"""
+Lectura de un tópico de Pulsar para los repartos en memoria del BFF.
+
+Cada réplica del BFF necesita ver todos los eventos, pero no los que se publicaron
+mientras estaba caída (lo que tiene en memoria se reconstruye al arrancar). Un
+Reader usa una suscripción no durable que el broker borra al desconectarse: un
+redeploy no deja suscripciones huérfanas acumulando backlog, y no hay nada que
+confirmar.
+
+El cliente de Pulsar es bloqueante: cada lectura corre en un thread con un plazo
+corto, así cancelar la tarea no queda esperando al próximo mensaje.
+"""
+
+import asyncio
+
+import pulsar
+
+
+class LectorTopico:
+    """`async with LectorTopico(url, topico) as lector: async for datos in lector: ...`"""
+
+    def __init__(self, url: str, topico: str, espera_ms: int = 1000):
+        self.url = url
+        self.topico = topico
+        self.espera_ms = espera_ms
+        self._cliente = None
+        self._lector = None
+
+    async def __aenter__(self) -> "LectorTopico":
+        self._cliente = pulsar.Client(self.url)
+        try:
+            # desde el último mensaje publicado: solo los eventos nuevos
+            self._lector = await asyncio.to_thread(
+                self._cliente.create_reader, self.topico, pulsar.MessageId.latest
+            )
+        except BaseException:
+            self._cliente.close()
+            raise
+        return self
+
+    async def __aexit__(self, *excepcion) -> None:
+        self._cliente.close()
+
+    def __aiter__(self) -> "LectorTopico":
+        return self
+
+    async def __anext__(self) -> bytes:
+        while True:
+            try:
+                mensaje = await asyncio.to_thread(self._lector.read_next, self.espera_ms)
+            except pulsar.Timeout:
+                continue
+            return mensaje.data()
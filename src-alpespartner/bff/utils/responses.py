@@ -1,7 +1,51 @@
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterable, Dict, Iterable, Optional, Union
 from datetime import datetime
-from fastapi import status
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+_OPCIONES_JSON = orjson.OPT_NON_STR_KEYS
+MEDIA_NDJSON = "application/x-ndjson"
+
+
+def _a_json(contenido: Any) -> bytes:
+    # orjson serializa datetime/date/UUID/dataclasses de forma nativa; lo demás como str
+    return orjson.dumps(contenido, option=_OPCIONES_JSON, default=str)
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse serializada con orjson (clase de respuesta por defecto del BFF)"""
+    
+    def render(self, content: Any) -> bytes:
+        return _a_json(content)
+
+
+def acepta_ndjson(request: Request) -> bool:
+    """El cliente pidió la lista como NDJSON (Accept: application/x-ndjson)"""
+    return MEDIA_NDJSON in request.headers.get("accept", "")
+
+
+def _opaco(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_debil(etag: Optional[str]) -> Optional[str]:
+    """
+    Validador débil (`W/"..."`): el BFF envuelve y enriquece el cuerpo de otro servicio
+    con campos volátiles (`timestamp`, `tiempo_transcurrido`), así que dos respuestas de
+    la misma versión no son iguales byte a byte.
+    """
+    if not etag or etag.startswith("W/"):
+        return etag
+    return f"W/{etag}"
+
+
+def coincide_etag(request: Request, etag: Optional[str]) -> bool:
+    """El If-None-Match del cliente ya nombra la versión `etag` (→ 304; comparación débil)"""
+    if not etag:
+        return False
+    candidatos = [c.strip() for c in request.headers.get("if-none-match", "").split(",")]
+    return "*" in candidatos or _opaco(etag) in {_opaco(c) for c in candidatos if c}
 
 
 class RespuestaBFF:
@@ -18,10 +62,26 @@ class RespuestaBFF:
             "exito": True,
             "mensaje": mensaje,
             "datos": datos,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcnow(),
             "codigo": codigo_estado
         }
-        return JSONResponse(content=respuesta, status_code=codigo_estado)
+        return RespuestaJSON(content=respuesta, status_code=codigo_estado)
+    
+    @staticmethod
+    def con_etag(respuesta: Response, etag: Optional[str]) -> Response:
+        """Agrega el validador (débil) a una respuesta completa (el cliente revalida en cada uso)"""
+        if etag:
+            respuesta.headers["ETag"] = etag_debil(etag)
+            respuesta.headers["Cache-Control"] = "no-cache"
+        return respuesta
+    
+    @staticmethod
+    def no_modificada(etag: str) -> Response:
+        """304 sin cuerpo: la copia del cliente sigue vigente"""
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag_debil(etag), "Cache-Control": "no-cache"}
+        )
     
     @staticmethod
     def error(
@@ -35,14 +95,14 @@ class RespuestaBFF:
             "exito": False,
             "mensaje": mensaje,
             "detalle": detalle,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcnow(),
             "codigo": codigo_estado
         }
         
         if datos_adicionales:
             respuesta.update(datos_adicionales)
         
-        return JSONResponse(content=respuesta, status_code=codigo_estado)
+        return RespuestaJSON(content=respuesta, status_code=codigo_estado)
     
     @staticmethod
     def saga_iniciada(
@@ -111,6 +171,25 @@ class RespuestaBFF:
         
         return RespuestaBFF.exitosa(datos=datos, mensaje=mensaje)
     
+    @staticmethod
+    def lista_cursor(
+        elementos: list,
+        siguiente_cursor: Optional[str],
+        tamanio_pagina: int = 10,
+        mensaje: str = "Lista obtenida exitosamente"
+    ) -> JSONResponse:
+        """Respuesta para listas paginadas por cursor (sin total ni número de página)"""
+        datos = {
+            "elementos": elementos,
+            "paginacion": {
+                "tamanio_pagina": tamanio_pagina,
+                "siguiente_cursor": siguiente_cursor,
+                "tiene_siguiente": siguiente_cursor is not None
+            }
+        }
+        
+        return RespuestaBFF.exitosa(datos=datos, mensaje=mensaje)
+    
     @staticmethod
     def dashboard(
         resumen: Dict,
@@ -121,10 +200,38 @@ class RespuestaBFF:
         datos = {
             "resumen": resumen,
             "datos": datos_principales,
-            "ultima_actualizacion": datetime.utcnow().isoformat()
+            "ultima_actualizacion": datetime.utcnow()
         }
         
         return RespuestaBFF.exitosa(datos=datos, mensaje=mensaje)
+    
+    @staticmethod
+    def lista_ndjson(
+        elementos: Union[Iterable[Any], AsyncIterable[Any]],
+        tamanio_bloque: int = 500
+    ) -> StreamingResponse:
+        """
+        Lista en streaming como NDJSON: un elemento JSON por línea, enviados en
+        bloques de `tamanio_bloque` para no materializar el documento completo.
+        """
+        async def generar():
+            bloque = []
+            if hasattr(elementos, "__aiter__"):
+                async for elemento in elementos:
+                    bloque.append(_a_json(elemento))
+                    if len(bloque) >= tamanio_bloque:
+                        yield b"\n".join(bloque) + b"\n"
+                        bloque = []
+            else:
+                for elemento in elementos:
+                    bloque.append(_a_json(elemento))
+                    if len(bloque) >= tamanio_bloque:
+                        yield b"\n".join(bloque) + b"\n"
+                        bloque = []
+            if bloque:
+                yield b"\n".join(bloque) + b"\n"
+        
+        return StreamingResponse(generar(), media_type=MEDIA_NDJSON)
 
 
 class ManejadorErroresBFF:
@@ -168,6 +275,18 @@ class ManejadorErroresBFF:
             datos_adicionales={"campo": campo, "valor": valor}
         )
     
+    @staticmethod
+    def error_saturacion(detalle: str, reintentar_en: int = 1) -> JSONResponse:
+        """429: el orquestador no admite más sagas de esa prioridad por ahora"""
+        respuesta = RespuestaBFF.error(
+            mensaje="Servicio saturado",
+            detalle=detalle,
+            codigo_estado=status.HTTP_429_TOO_MANY_REQUESTS,
+            datos_adicionales={"reintentar_en": reintentar_en}
+        )
+        respuesta.headers["Retry-After"] = str(reintentar_en)
+        return respuesta
+    
     @staticmethod
     def error_saga_no_encontrada(saga_id: str) -> JSONResponse:
         """Error específico para saga no encontrada"""
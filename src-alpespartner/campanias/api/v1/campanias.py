@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from dataclasses import asdict
+import os
 import uuid
 
 # Comandos y Consultas
 from campanias.modulos.aplicacion.comandos.crear_campana import (
     CrearCampana, ActivarCampana, AgregarAfiliadoACampana
 )
+from campanias.modulos.aplicacion.comandos.crear_campanas_lote import CrearCampanasLote
 from campanias.modulos.aplicacion.handlers import (
-    ObtenerCampaniaPorId, ObtenerTodasLasCampanias, ObtenerCampaniasActivas
+    ObtenerCampaniaPorId, ObtenerTodasLasCampanias, ObtenerCampaniasActivas,
+    ObtenerResumenCampania, ObtenerListadoCampanias, TAMANO_PAGINA_POR_DEFECTO
 )
+from campanias.modulos.aplicacion.queries.queries_campanas import BuscarCampanasPorCriterios, ObtenerMetricasCampana
 
 # Ejecutores
 from campanias.seedwork.aplicacion.comandos import ejecutar_commando
@@ -38,6 +43,11 @@ class CrearCampaniaRequest(BaseModel):
     codigo_campana: Optional[str] = None
     segmento_audiencia: Optional[str] = None
 
+class CrearCampaniasLoteRequest(BaseModel):
+    """Modelo de request para crear muchas campanias de una vez"""
+    campanias: List[CrearCampaniaRequest]
+    todo_o_nada: bool = False  # si alguna es inválida no se crea ninguna
+
 class ActivarCampaniaRequest(BaseModel):
     """Modelo de request para activar una campaña"""
     fecha_activacion: str  # ISO format
@@ -50,17 +60,17 @@ class AgregarAfiliadoRequest(BaseModel):
     fecha_asignacion: str  # ISO format
 
 class CampaniaResponse(BaseModel):
-    """Modelo de respuesta para campanias"""
+    """Modelo de respuesta para campanias (opcionales: columnas que la tabla puede no tener)"""
     id: str
     nombre: str
-    descripcion: str
-    tipo: str
-    canal_publicidad: str
-    objetivo: str
-    fecha_inicio: str
-    fecha_fin: str
-    fecha_creacion: str
-    fecha_actualizacion: str
+    descripcion: Optional[str] = None
+    tipo: Optional[str] = None
+    canal_publicidad: Optional[str] = None
+    objetivo: Optional[str] = None
+    fecha_inicio: Optional[str] = None
+    fecha_fin: Optional[str] = None
+    fecha_creacion: Optional[str] = None
+    fecha_actualizacion: Optional[str] = None
     presupuesto: float
     moneda: str
     codigo_campana: Optional[str] = None
@@ -73,6 +83,8 @@ class CampaniaResponse(BaseModel):
 
 router = APIRouter(prefix="/campanias", tags=["campanias"])
 
+MAX_CAMPANIAS_POR_LOTE = int(os.getenv("CAMPANIAS_LOTE_MAX", "10000"))
+
 # ==========================================
 # ENDPOINTS DE COMANDOS (WRITE OPERATIONS)
 # ==========================================
@@ -128,6 +140,66 @@ def crear_campania(request: CrearCampaniaRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
+@router.post(":batch", response_model=dict)
+def crear_campanias_lote(request: CrearCampaniasLoteRequest, response: Response):
+    """
+    Crea muchas campanias en una sola operación.
+
+    - Valida cada campaña; las inválidas se informan sin detener al resto
+      (salvo `todo_o_nada`, que rechaza el lote completo).
+    - Las válidas se insertan en una transacción con un INSERT multi-fila.
+    - Sus eventos CampaniaCreada se publican en un solo envío por lotes.
+
+    Devuelve el resultado por campaña, en el mismo orden del request.
+    """
+    if len(request.campanias) > MAX_CAMPANIAS_POR_LOTE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {MAX_CAMPANIAS_POR_LOTE} campanias"
+        )
+    try:
+        timestamp_actual = datetime.now().isoformat()
+        comando = CrearCampanasLote(
+            campanias=[
+                CrearCampana(
+                    id=str(uuid.uuid4()),
+                    fecha_creacion=timestamp_actual,
+                    fecha_actualizacion=timestamp_actual,
+                    nombre=item.nombre,
+                    descripcion=item.descripcion,
+                    tipo_campana=item.tipo_campana,
+                    canal_publicidad=item.canal_publicidad,
+                    objetivo_campana=item.objetivo_campana,
+                    fecha_inicio=item.fecha_inicio,
+                    fecha_fin=item.fecha_fin,
+                    presupuesto=item.presupuesto,
+                    moneda=item.moneda,
+                    codigo_campana=item.codigo_campana or f"CAMP-{str(uuid.uuid4())[:8].upper()}",
+                    segmento_audiencia=item.segmento_audiencia or "general"
+                )
+                for item in request.campanias
+            ],
+            todo_o_nada=request.todo_o_nada
+        )
+        resultados = ejecutar_commando(comando)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+    creadas = sum(1 for r in resultados if r.estado == "CREADA")
+    if creadas == 0:
+        response.status_code = status.HTTP_400_BAD_REQUEST if resultados else status.HTTP_200_OK
+    elif creadas < len(resultados):
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    else:
+        response.status_code = status.HTTP_201_CREATED
+    return {
+        "total": len(resultados),
+        "creadas": creadas,
+        "rechazadas": len(resultados) - creadas,
+        "eventos_enviados": sum(1 for r in resultados if r.evento_publicado),
+        "resultados": [asdict(r) for r in resultados]
+    }
+
 @router.put("/{id_campania}/activar", response_model=dict)
 def activar_campania(id_campania: str, request: ActivarCampaniaRequest):
     """
@@ -194,6 +266,78 @@ def agregar_afiliado_a_campania(id_campania: str, request: AgregarAfiliadoReques
 # ENDPOINTS DE CONSULTAS (READ OPERATIONS)
 # ==========================================
 
+@router.get("/listado/", response_model=List[dict])
+def listar_campanias_vista(
+    estado: Optional[str] = None,
+    limite: int = Query(50, ge=1, le=500),
+    desplazamiento: int = Query(0, ge=0)
+):
+    """
+    Lista campanias desde la vista de lectura (`campanias_vista_lista`): cada fila ya
+    trae afiliados, conversiones e ingresos, sin consultar otros servicios.
+    """
+    try:
+        query = ObtenerListadoCampanias(estado=estado, limite=limite, desplazamiento=desplazamiento)
+        return ejecutar_query(query).resultado or []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+@router.get("/buscar/", response_model=dict)
+def buscar_campanias(
+    texto: Optional[str] = None,
+    presupuesto_minimo: Optional[float] = Query(None, ge=0),
+    presupuesto_maximo: Optional[float] = Query(None, ge=0),
+    canal: Optional[str] = None,
+    segmento: Optional[str] = None,
+    limite: int = Query(10, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Búsqueda por texto (nombre/descripción), rango de presupuesto, canal y segmento
+    sobre el índice en memoria de campanias.
+    """
+    try:
+        query = BuscarCampanasPorCriterios(
+            texto_busqueda=texto,
+            presupuesto_minimo=presupuesto_minimo,
+            presupuesto_maximo=presupuesto_maximo,
+            canal_marketing=canal,
+            segmento_audiencia=segmento,
+            limite=limite,
+            offset=offset
+        )
+        return ejecutar_query(query).resultado
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+@router.get("/{id_campania}/resumen", response_model=dict)
+def obtener_resumen_campania(id_campania: str):
+    """
+    Campaña con sus contadores (afiliados, conversiones, ingresos, comisiones) leída de
+    una sola fila de `campanias_vista_detalle`, mantenida por las proyecciones.
+    """
+    try:
+        resultado = ejecutar_query(ObtenerResumenCampania(id_campania=id_campania))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+    if not resultado.resultado:
+        raise HTTPException(status_code=404, detail="Campaña no encontrada en la vista")
+    return resultado.resultado
+
+@router.get("/{id_campania}/metricas", response_model=dict)
+def obtener_metricas_campania(id_campania: str, fecha_desde: Optional[str] = None, fecha_hasta: Optional[str] = None):
+    """
+    Conversiones, ingresos, comisiones y afiliados únicos de la campaña, materializados
+    desde eventos-conversion / eventos-comision (van unos segundos detrás de los eventos).
+    """
+    try:
+        query = ObtenerMetricasCampana(id_campana=id_campania, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta)
+        return ejecutar_query(query).resultado
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
 @router.get("/{id_campania}", response_model=CampaniaResponse)
 def obtener_campania(id_campania: str):
     """Obtiene una campaña específica por su ID"""
@@ -228,8 +372,12 @@ def obtener_campania(id_campania: str):
 
 @router.get("/", response_model=List[CampaniaResponse])
 def listar_campanias(
+    response: Response,
     estado: Optional[str] = None,
-    tipo: Optional[str] = None
+    tipo: Optional[str] = None,
+    limite: int = Query(TAMANO_PAGINA_POR_DEFECTO, ge=1, le=500, description="Tamaño de página"),
+    desplazamiento: Optional[int] = Query(None, ge=0, description="Campanias a saltar (paginación con total)"),
+    cursor: Optional[str] = Query(None, description="Cursor keyset (cabecera X-Next-Cursor de la página anterior)")
 ):
     """
     Lista todas las campanias con filtros opcionales.
@@ -237,12 +385,23 @@ def listar_campanias(
     Parámetros:
     - estado: activa, pausada, finalizada, borrador
     - tipo: promocional, descuento, cashback
+    - limite: tamaño de página (siempre acotado)
+    - cursor: paginación keyset (sin COUNT), el modo por defecto; la siguiente página va en
+      la cabecera X-Next-Cursor desde la primera
+    - desplazamiento: paginación por desplazamiento; el total filtrado va en la cabecera X-Total-Count
     """
     try:
-        query = ObtenerTodasLasCampanias(estado=estado, tipo=tipo)
+        query = ObtenerTodasLasCampanias(
+            estado=estado, tipo=tipo, desplazamiento=desplazamiento, limite=limite, cursor=cursor
+        )
         resultado = ejecutar_query(query)
         
         campanias_dto: List[CampañaDTO] = resultado.resultado or []
+        total = getattr(resultado, "total", len(campanias_dto))
+        if total >= 0:
+            response.headers["X-Total-Count"] = str(total)
+        if getattr(resultado, "siguiente_cursor", None):
+            response.headers["X-Next-Cursor"] = resultado.siguiente_cursor
         
         return [
             CampaniaResponse(
@@ -265,22 +424,33 @@ def listar_campanias(
             for campania in campanias_dto
         ]
         
+    except ValueError as e:
+        # cursor inválido
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.get("/activas/", response_model=List[CampaniaResponse])
-def listar_campanias_activas(canal_publicidad: Optional[str] = None):
+def listar_campanias_activas(
+    response: Response,
+    canal_publicidad: Optional[str] = None,
+    limite: int = Query(TAMANO_PAGINA_POR_DEFECTO, ge=1, le=500, description="Tamaño de página"),
+    cursor: Optional[str] = Query(None, description="Cursor keyset (cabecera X-Next-Cursor de la página anterior)")
+):
     """
-    Lista todas las campanias activas con filtro opcional por canal.
+    Lista las campanias activas con filtro opcional por canal, paginadas por keyset.
     
     Parámetros:
     - canal_publicidad: web, social_media, email, mobile_app, tv, radio
+    - limite / cursor: la siguiente página va en la cabecera X-Next-Cursor
     """
     try:
-        query = ObtenerCampaniasActivas(canal_publicidad=canal_publicidad)
+        query = ObtenerCampaniasActivas(canal_publicidad=canal_publicidad, limite=limite, cursor=cursor)
         resultado = ejecutar_query(query)
         
         campanias_dto: List[CampañaDTO] = resultado.resultado or []
+        if getattr(resultado, "siguiente_cursor", None):
+            response.headers["X-Next-Cursor"] = resultado.siguiente_cursor
         
         return [
             CampaniaResponse(
@@ -303,6 +473,9 @@ def listar_campanias_activas(canal_publicidad: Optional[str] = None):
             for campania in campanias_dto
         ]
         
+    except ValueError as e:
+        # cursor inválido
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
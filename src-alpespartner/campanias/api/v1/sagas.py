@@ -1,18 +1,25 @@
 """
 🎭 API REST para monitoreo de Sagas (alineada con SagaLoggerV2)
-- GET /sagas/{saga_id}           → snapshot (estado/fechas/finalizada)
-- GET /sagas/{saga_id}/progreso  → detalle (saga + pasos)
+- GET /sagas/{saga_id}           → snapshot (estado/fechas/finalizada); ETag + If-None-Match → 304
+- GET /sagas/{saga_id}/progreso  → detalle (saga + pasos); ETag + If-None-Match → 304
 - GET /sagas/{saga_id}/estado    → estado ultra-rápido (para polling)
 - GET /sagas/{saga_id}/pasos     → lista de pasos (con duración por paso)
+- GET /sagas/admision            → ¿hay lugar para una saga de esta prioridad? (429 si no)
+- GET /sagas/metricas            → rollups diarios de saga_metricas por tipo
+- GET /sagas/latencias           → p50/p95/p99 por (tipo_saga, paso, servicio)
+- GET /sagas/                    → listado paginado por cursor (estado/tipo/desde)
+- POST /sagas/estado:batch       → estado de hasta MAX_LOTE_ESTADOS sagas en una consulta
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, date, timezone
 import logging
 import os
 
 from campanias.sagas.saga_logger_v2 import SagaLoggerV2
+from campanias.sagas.admision import controlador_admision, Prioridad
 
 router = APIRouter(prefix="/sagas", tags=["Sagas - Monitoreo"])
 
@@ -20,9 +27,38 @@ router = APIRouter(prefix="/sagas", tags=["Sagas - Monitoreo"])
 storage_type = os.getenv("SAGAS_STORAGE_TYPE", "sqlite")
 saga_logger = SagaLoggerV2(storage_type=storage_type)
 
+MAX_LOTE_ESTADOS = int(os.getenv("SAGAS_MAX_LOTE_ESTADOS", "200"))
+
+
+class EstadosSagasRequest(BaseModel):
+    saga_ids: List[str] = Field(..., min_length=1, description="IDs de saga a consultar")
+
 # ---------------------------
 # Helpers
 # ---------------------------
+def _etag_saga(saga_id: str, vista: str, version: str) -> str:
+    # Una representación por vista: snapshot y progreso no comparten validador
+    return f'"{saga_id}.{vista}.{version}"'
+
+def _coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+def _no_modificada(request: Request, saga_id: str, vista: str) -> Tuple[Optional[str], Optional[Response]]:
+    """
+    Consulta solo la versión de la saga (por PK) antes de armar el payload.
+    Devuelve (etag, 304 si el cliente ya tiene esa versión); 404 si la saga no existe.
+    """
+    version = saga_logger.version_saga(saga_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail=f"Saga {saga_id} no encontrada")
+    etag = _etag_saga(saga_id, vista, version)
+    if _coincide_etag(request.headers.get("if-none-match"), etag):
+        return etag, Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return etag, None
+
 def _calc_duracion_s(seg_ini: Optional[str], seg_fin: Optional[str]) -> Optional[float]:
     if not seg_ini or not seg_fin:
         return None
@@ -48,12 +84,117 @@ def _calc_progreso(pasos: List[Dict[str, Any]]) -> Dict[str, Any]:
 # Endpoints
 # ---------------------------
 
+@router.get("/")
+def listar_sagas(
+    estado: Optional[str] = Query(None, description="Estado o lista separada por comas (EN_PROGRESO,COMPENSANDO)"),
+    tipo: Optional[str] = Query(None, description="tipo_saga"),
+    desde: Optional[datetime] = Query(None, description="fecha_inicio mínima"),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior"),
+    limit: int = Query(50, ge=1, le=200),
+) -> Dict[str, Any]:
+    """
+    Listado de sagas con paginación keyset sobre (fecha_inicio, id), más recientes primero.
+    Devuelve solo columnas de resumen y `siguiente_cursor` para pedir la página siguiente.
+    """
+    estados = [e.strip().upper() for e in estado.split(",") if e.strip()] if estado else None
+    if desde is not None and desde.tzinfo is not None:
+        desde = desde.astimezone(timezone.utc).replace(tzinfo=None)  # la BD guarda UTC naive
+    try:
+        return saga_logger.listar_sagas(estados=estados, tipo=tipo, desde=desde, cursor=cursor, limite=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error listando sagas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/estado:batch")
+def obtener_estados_sagas(request: EstadosSagasRequest) -> Dict[str, Any]:
+    """
+    Estado de varias sagas en una sola consulta (`WHERE id IN (...)`).
+    Las que no existen se devuelven en `no_encontradas` en lugar de un 404.
+    """
+    ids = list(dict.fromkeys(request.saga_ids))  # sin duplicados, conserva el orden
+    if len(ids) > MAX_LOTE_ESTADOS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_LOTE_ESTADOS} sagas por lote")
+    try:
+        estados = saga_logger.obtener_estados_sagas(ids)
+        return {
+            "estados": estados,
+            "no_encontradas": [sid for sid in ids if sid not in estados],
+        }
+    except Exception as e:
+        logging.error(f"Error obteniendo estados de {len(ids)} sagas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Debe declararse antes de /{saga_id} para no ser capturado como un saga_id
+@router.get("/admision")
+def verificar_admision(prioridad: str = "MEDIA") -> Dict[str, Any]:
+    """
+    Chequeo barato de admisión (lo usa el BFF antes de publicar el comando).
+    Responde 429 + Retry-After si la cola de esa prioridad está llena.
+    """
+    p = Prioridad.normalizar(prioridad)
+    estado = controlador_admision.estado()
+    if not controlador_admision.puede_admitir(p):
+        raise HTTPException(
+            status_code=429,
+            detail=f"Cola de sagas {p.value} llena, reintente más tarde",
+            headers={"Retry-After": "1"},
+        )
+    return {"admitida": True, "prioridad": p.value, **estado}
+
+
+@router.get("/metricas")
+def obtener_metricas_sagas(
+    tipo: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+) -> Dict[str, Any]:
+    """
+    Métricas por tipo de saga y día, leídas de los rollups de `saga_metricas`
+    (sin escanear `sagas`). Sin fechas: el día de hoy (UTC). Puede ir hasta
+    SAGAS_METRICAS_INTERVALO segundos detrás de lo último registrado.
+    """
+    if saga_logger.metricas is None:
+        raise HTTPException(status_code=404, detail="No existe la tabla saga_metricas")
+    try:
+        filas = saga_logger.metricas.consultar(tipo_saga=tipo, desde=desde, hasta=hasta)
+        return {"metricas": filas, "total": len(filas)}
+    except Exception as e:
+        logging.error(f"Error obteniendo métricas de sagas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/latencias")
+def obtener_latencias_sagas(tipo: Optional[str] = None, servicio: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Percentiles de duración (ms) por tipo de saga, paso y servicio, desde los
+    histogramas de `saga_latencias`. Ordenado por p95: el primero es quien más pesa.
+    """
+    if saga_logger.latencias is None:
+        raise HTTPException(status_code=404, detail="No existe la tabla saga_latencias")
+    try:
+        filas = saga_logger.latencias.percentiles(tipo_saga=tipo, servicio=servicio)
+        return {"latencias": filas, "total": len(filas)}
+    except Exception as e:
+        logging.error(f"Error obteniendo latencias de sagas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{saga_id}")
-def obtener_saga(saga_id: str) -> Dict[str, Any]:
+def obtener_saga(saga_id: str, request: Request, response: Response) -> Dict[str, Any]:
     """
     Snapshot de la saga: estado, fechas y si está finalizada.
+    Con If-None-Match igual a la versión vigente responde 304 sin leer pasos.
     """
     try:
+        etag, no_modificada = _no_modificada(request, saga_id, "snapshot")
+        if no_modificada:
+            return no_modificada
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
         data = saga_logger.obtener_estado_saga(saga_id)
         if not data:
             raise HTTPException(status_code=404, detail=f"Saga {saga_id} no encontrada")
@@ -75,11 +216,18 @@ def obtener_saga(saga_id: str) -> Dict[str, Any]:
 
 
 @router.get("/{saga_id}/progreso")
-def obtener_progreso_saga(saga_id: str) -> Dict[str, Any]:
+def obtener_progreso_saga(saga_id: str, request: Request, response: Response) -> Dict[str, Any]:
     """
     Detalle completo: estado + lista de pasos con timestamps y detalle.
+    Con If-None-Match igual a la versión vigente responde 304 sin armar el detalle.
     """
     try:
+        etag, no_modificada = _no_modificada(request, saga_id, "progreso")
+        if no_modificada:
+            return no_modificada
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
         data = saga_logger.obtener_progreso_detallado(saga_id)
         if not data:
             raise HTTPException(status_code=404, detail=f"Saga {saga_id} no encontrada")
@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from campanias.seedwork.infraestructura.uow import UnidadTrabajo, Batch
+
+
+@dataclass
+class Savepoint:
+    transaccion: Any        # NestedTransaction de SQLAlchemy (SAVEPOINT en la BD)
+    ejecutados: int         # batches ya ejecutados cuando se tomó
+
+
+def _agregable(batch: Batch) -> bool:
+    """`repositorio.agregar(entidad)` de un repositorio que sabe insertar en lote"""
+    destino = getattr(batch.operacion, "__self__", None)
+    return (
+        getattr(batch.operacion, "__name__", "") == "agregar"
+        and hasattr(destino, "agregar_muchos")
+        and len(batch.args) == 1
+        and not batch.kwargs
+    )
+
+
+class UnidadTrabajoSQLAlchemy(UnidadTrabajo):
+    """
+    Unidad de trabajo sobre una conexión de SQLAlchemy.
+
+    - Los batches se acumulan y se ejecutan al hacer commit (o al tomar un savepoint),
+      todos en la misma transacción; `agregar` consecutivos sobre el mismo repositorio
+      se agrupan en un solo `agregar_muchos`.
+    - `savepoint()` ejecuta lo pendiente y abre un SAVEPOINT real;
+      `rollback(savepoint)` vuelve a él y descarta los eventos posteriores.
+    - Los repositorios usan la conexión de la UoW mientras su transacción está abierta
+      (`conexion_actual`), así sus escrituras quedan dentro de ella.
+    """
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from campanias.config.db import engine
+        self.engine = engine
+        self._batches: List[Batch] = []
+        self._ejecutados: List[Batch] = []
+        self._savepoints: List[Savepoint] = []
+        self._conexion = None
+        self._transaccion = None
+
+    @property
+    def batches(self) -> List[Batch]:
+        return self._batches
+
+    def savepoints(self) -> List[Savepoint]:
+        return list(self._savepoints)
+
+    def pendiente(self) -> bool:
+        return bool(self._batches) or self._conexion is not None
+
+    def conexion_para(self, engine):
+        if self._conexion is not None and str(engine.url) == str(self.engine.url):
+            return self._conexion
+        return None
+
+    def _limpiar_batches(self):
+        self._batches = []
+        self._ejecutados = []
+        self._savepoints = []
+
+    def _obtener_eventos(self, batches=None):
+        # al hacer commit los batches ya se ejecutaron: los eventos salen de ambos
+        return super()._obtener_eventos(self._ejecutados + self._batches if batches is None else batches)
+
+    # Transacción
+    def _abrir(self):
+        if self._conexion is None:
+            self._conexion = self.engine.connect()
+            self._transaccion = self._conexion.begin()
+
+    def _cerrar(self):
+        if self._conexion is not None:
+            self._conexion.close()
+        self._conexion = None
+        self._transaccion = None
+
+    def flush(self):
+        """Ejecuta los batches pendientes dentro de la transacción, agrupando las inserciones"""
+        if not self._batches:
+            return
+        self._abrir()
+        pendientes, self._batches = self._batches, []
+        grupo: List[Batch] = []
+        for batch in pendientes:
+            if grupo and not (_agregable(batch) and batch.operacion.__self__ is grupo[0].operacion.__self__):
+                self._ejecutar(grupo)
+                grupo = []
+            if _agregable(batch):
+                grupo.append(batch)
+            else:
+                self._ejecutar([batch])
+        if grupo:
+            self._ejecutar(grupo)
+        self._ejecutados.extend(pendientes)
+
+    @staticmethod
+    def _ejecutar(grupo: List[Batch]):
+        if len(grupo) > 1:
+            grupo[0].operacion.__self__.agregar_muchos([batch.args[0] for batch in grupo])
+        else:
+            batch = grupo[0]
+            batch.operacion(*batch.args, **batch.kwargs)
+
+    def commit(self):
+        try:
+            self.flush()
+            if self._transaccion is not None:
+                self._transaccion.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self._cerrar()
+        # eventos de integración solo después de confirmar
+        super().commit()
+
+    def rollback(self, savepoint: Optional[Savepoint] = None):
+        if savepoint is not None and savepoint in self._savepoints:
+            indice = self._savepoints.index(savepoint)
+            savepoint.transaccion.rollback()
+            del self._savepoints[indice:]
+            del self._ejecutados[savepoint.ejecutados:]
+            self._batches = []
+            return
+        try:
+            if self._transaccion is not None and self._transaccion.is_active:
+                self._transaccion.rollback()
+        finally:
+            self._cerrar()
+            super().rollback()
+
+    def savepoint(self) -> Savepoint:
+        self.flush()
+        self._abrir()
+        punto = Savepoint(self._conexion.begin_nested(), len(self._ejecutados))
+        self._savepoints.append(punto)
+        return punto
@@ -19,9 +19,15 @@ from campanias.modulos.infraestructura.schema.v1.comandos import ComandoLanzarCa
 from campanias.modulos.infraestructura.schema.v1.comandos import (
     ComandoLanzarCampaniaCompleta, ComandoCancelarSaga
 )
-from campanias.modulos.aplicacion.handlers import HandlerComandosBFF
+from campanias.modulos.aplicacion.handlers import HandlerComandosBFF, invalidar_cache_campania
 from campanias.eventos import EventoSagaCampania
 from .sagas.saga_logger_v2 import SagaLoggerV2
+from .sagas.admision import SagaRechazada
+from campanias.despachadores import Despachador, PASOS_COMPENSACION
+from campanias.modulos.infraestructura.proyecciones import a_evento_proyectable, motor_proyecciones_campanias
+from campanias.seedwork.infraestructura.proyecciones import ProyeccionesSaturadas
+from campanias.modulos.infraestructura.busqueda import indice_campanias
+from campanias.seedwork.infraestructura.uow import ambito_unidad_trabajo
 log = logging.getLogger(__name__)
 #saga_logger = SagaLogger()
 
@@ -54,6 +60,46 @@ def _norm_estado(valor: str) -> str:
     return "fallido"
 
 
+def estado_saga_por_paso(paso: Optional[str], estado_norm: str) -> Optional[str]:
+	"""
+	Estado en que deja la saga el evento de un paso (None: no la cambia). El paso de
+	afiliados es el único de la saga: la completa o, si falla, arranca su compensación.
+	Las respuestas de compensación no la cierran; eso lo decide el despachador.
+	El BFF (difusor_sagas) replica este criterio.
+	"""
+	if paso in PASOS_COMPENSACION:
+		return EstadoSaga.COMPENSANDO
+	if estado_norm == "completado":
+		return EstadoSaga.COMPLETADA
+	if estado_norm == "fallido":
+		return EstadoSaga.COMPENSANDO
+	return None
+
+
+# Tareas de ack diferido (referencia fuerte hasta que terminan)
+_confirmaciones_pendientes: set = set()
+
+
+def _confirmar_al_resolver(consumidor, mensaje, pendiente) -> None:
+	"""
+	Ack diferido: el mensaje queda sin confirmar hasta que `pendiente` (futuro asyncio
+	o concurrent.futures) se resuelve; si falla se hace nack y Pulsar lo reentrega.
+	Si el proceso cae antes, el mensaje nunca se confirmó y se reentrega al reiniciar.
+	"""
+	async def confirmar():
+		try:
+			await asyncio.wrap_future(pendiente)
+		except Exception as e:
+			logging.error(f'Error completando mensaje {mensaje.message_id()}: {e}')
+			await consumidor.negative_acknowledge(mensaje)
+		else:
+			await consumidor.acknowledge(mensaje)
+
+	tarea = asyncio.create_task(confirmar())
+	_confirmaciones_pendientes.add(tarea)
+	tarea.add_done_callback(_confirmaciones_pendientes.discard)
+
+
 async def suscribirse_a_topico(topico: str, suscripcion: str, schema: Record, tipo_consumidor:_pulsar.ConsumerType=_pulsar.ConsumerType.Shared):
 	SagaLoggerV2.init_db() 
 	try:
@@ -70,14 +116,40 @@ async def suscribirse_a_topico(topico: str, suscripcion: str, schema: Record, ti
 					datos = mensaje.value()
 					try:
 						print(f'Evento recibido: {datos}')
-						# Procesar comando de lanzar campaña completa
-						if isinstance(datos, ComandoLanzarCampaniaCompleta):
-							print("Procesando comando para lanzar campaña completa...")
-							await HandlerComandosBFF.handle_lanzar_campania_completa(datos)
-						elif isinstance(datos, ComandoCancelarSaga):
-							print("Procesando comando para cancelar saga...")
-							await HandlerComandosBFF.handle_cancelar_saga(datos)
-						await consumidor.acknowledge(mensaje)
+						pendiente = None
+						# Una unidad de trabajo por mensaje
+						with ambito_unidad_trabajo():
+							# Procesar comando de lanzar campaña completa
+							if isinstance(datos, ComandoLanzarCampaniaCompleta):
+								print("Procesando comando para lanzar campaña completa...")
+								# se confirma cuando la saga arranca, no al encolarla
+								pendiente = await HandlerComandosBFF.handle_lanzar_campania_completa(datos)
+							elif isinstance(datos, ComandoCancelarSaga):
+								print("Procesando comando para cancelar saga...")
+								HandlerComandosBFF.handle_cancelar_saga(datos)
+							else:
+								# Eventos de campanias/conversiones/comisiones → vistas de lectura
+								# (el id del mensaje es estable entre reentregas: sirve para deduplicar)
+								evento = a_evento_proyectable(datos, evento_id=f'{topico}:{mensaje.message_id()}')
+								if evento is not None:
+									# se confirma cuando el lote que lo contiene quedó en el journal
+									pendiente = motor_proyecciones_campanias().registrar(evento)
+									if evento.tipo.startswith("Campania"):
+										invalidar_cache_campania(evento.agregado_id)
+										indice_campanias.aplicar(evento)
+						if pendiente is not None:
+							_confirmar_al_resolver(consumidor, mensaje, pendiente)
+						else:
+							await consumidor.acknowledge(mensaje)
+					except SagaRechazada as e:
+						# Cola de admisión llena: Pulsar lo reentrega más tarde (backpressure)
+						logging.warning(f'Comando diferido por admisión: {e.motivo}')
+						await consumidor.negative_acknowledge(mensaje)
+					except ProyeccionesSaturadas as e:
+						# BD de proyecciones sin escribir: no confirmar ni seguir leyendo por un rato
+						logging.warning(f'Proyecciones saturadas, se difiere el evento: {e}')
+						await consumidor.negative_acknowledge(mensaje)
+						await asyncio.sleep(1)
 					except Exception as e:
 						logging.error(f'Error procesando mensaje: {e}')
 						traceback.print_exc()
@@ -93,7 +165,9 @@ async def suscribirse_eventos_saga(
     tipo_consumidor: _pulsar.ConsumerType = _pulsar.ConsumerType.Shared,
 ):
     url = f"pulsar://{pulsar_host}:6650"
-    logger = SagaLoggerV2(storage_type=os.getenv("SAGAS_STORAGE_TYPE", "sqlite"))
+    # el despachador cierra las compensaciones con la respuesta de cada servicio
+    despachador = Despachador()
+    logger = despachador.saga_logger
 
     try:
         async with aiopulsar.connect(url) as cliente:
@@ -116,13 +190,31 @@ async def suscribirse_eventos_saga(
 
                         estado_norm = _norm_estado(estado_in)
 
+                        if paso in PASOS_COMPENSACION:
+                            # respuesta de un servicio compensador: cierra ese paso y avanza
+                            # la compensación (la saga sigue COMPENSANDO hasta que respondan todos)
+                            if estado_norm in ("completado", "fallido"):
+                                ok = estado_norm == "completado"
+                                error = None if ok else str(detalle.get("motivo") if isinstance(detalle, dict) else detalle)
+                                # bloqueante (BD + ack de la ola siguiente): fuera del loop
+                                await asyncio.to_thread(
+                                    despachador.registrar_respuesta_compensacion, saga_id, paso, ok, error
+                                )
+                            await consumidor.acknowledge(msg)
+                            continue
+
                         logger.actualizar_estado_paso(saga_id, paso, estado_norm, detalle)
 
-                        # Si solo usas el paso de Afiliados y quieres cerrar la saga aquí:
-                        if estado_norm == "completado":
-                            logger.actualizar_estado_saga(saga_id, EstadoSaga.COMPLETADA, "Afiliados completado")
-                        elif estado_norm == "fallido":
-                            logger.actualizar_estado_saga(saga_id, EstadoSaga.FALLIDA, "Afiliados fallido")
+                        nuevo_estado = estado_saga_por_paso(paso, estado_norm)
+                        if nuevo_estado == EstadoSaga.COMPLETADA:
+                            despachador.actualizar_estado_saga(saga_id, EstadoSaga.COMPLETADA, "Afiliados completado")
+                        elif nuevo_estado == EstadoSaga.COMPENSANDO:
+                            # afiliados falló: se deshace lo publicado (COMPENSANDO → COMPENSADA o FALLIDA)
+                            saga = logger.obtener_estado_saga(saga_id) or {}
+                            contexto = saga.get("contexto") if isinstance(saga.get("contexto"), dict) else {}
+                            await asyncio.to_thread(
+                                despachador.compensar_saga_campania, {"id": contexto.get("campania_id")}, saga_id
+                            )
 
                         await consumidor.acknowledge(msg)
 
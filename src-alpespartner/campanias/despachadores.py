@@ -1,62 +1,168 @@
 # campanias/despachadores.py
-import os, logging, traceback, uuid, json
-from typing import Any, Dict
+import os, logging, traceback, uuid, json, threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 import pulsar
 from pulsar.schema import AvroSchema, Record
 
 from campanias.seedwork.infraestructura import utils
-from campanias.sagas.saga_logger_v2 import SagaLoggerV2, EstadoSaga
+from campanias.sagas.saga_logger_v2 import SagaLoggerV2, EstadoSaga, EstadoPaso
+from campanias.sagas.admision import controlador_admision
 from campanias.modulos.infraestructura.schema.v1.comandos import (
     ComandoBuscarAfiliadosElegibles,
     BuscarAfiliadosElegiblesPayload,
 )
 
+# Plan de compensación de la saga "lanzar campaña completa".
+# `depende_de` lista las compensaciones que deben estar confirmadas antes de publicar
+# ésta; las que no dependen entre sí salen juntas en la misma ola.
+# `espera_respuesta`: el paso se cierra con la respuesta del servicio compensador en
+# `eventos-saga-campania`; si es False se cierra con el ack del broker. Afiliados y
+# comisiones todavía no consumen estos comandos ni responden, así que sus pasos se
+# confirman con el ack hasta que implementen la respuesta.
+PLAN_COMPENSACION_CAMPANIA: Tuple[Dict[str, Any], ...] = (
+    {
+        "nombre_paso": "compensar_busqueda_afiliados",
+        "servicio_destino": "afiliados",
+        "topico_pulsar": "comando-cancelar-busqueda-afiliados",
+        "accion": "cancelar",
+        "depende_de": (),
+        "espera_respuesta": False,
+    },
+    {
+        "nombre_paso": "compensar_comisiones",
+        "servicio_destino": "comisiones",
+        "topico_pulsar": "comando-desconfigurar-comisiones",
+        "accion": "desconfigurar",
+        "depende_de": (),
+        "espera_respuesta": False,
+    },
+)
+
+PASOS_COMPENSACION = frozenset(p["nombre_paso"] for p in PLAN_COMPENSACION_CAMPANIA)
+
+_ESTADOS_TERMINALES = frozenset({
+    EstadoSaga.COMPLETADA, EstadoSaga.FALLIDA, EstadoSaga.CANCELADA, EstadoSaga.COMPENSADA,
+})
+
+
+def _olas_compensacion(plan) -> List[List[Dict[str, Any]]]:
+    """Agrupa el plan en olas: cada ola solo depende de compensaciones de olas anteriores."""
+    pendientes = list(plan)
+    hechos: set = set()
+    olas: List[List[Dict[str, Any]]] = []
+    while pendientes:
+        ola = [p for p in pendientes if set(p.get("depende_de", ())) <= hechos]
+        if not ola:
+            raise RuntimeError("Dependencias cíclicas o inexistentes en el plan de compensación")
+        olas.append(ola)
+        hechos |= {p["nombre_paso"] for p in ola}
+        pendientes = [p for p in pendientes if p not in ola]
+    return olas
+
+
 class Despachador:
     """
     Orquesta la saga de campaña completa enviando comandos por Pulsar
     y registra el progreso en SagaLoggerV2.
     """
+    # Cliente y productores compartidos por todas las instancias (uno por proceso)
+    _cliente: Optional[pulsar.Client] = None
+    _productores: Dict[Tuple[str, Optional[str]], Any] = {}
+    _lock = threading.Lock()
+
     def __init__(self):
         self.broker_url = f'pulsar://{utils.broker_host()}:6650'
+        self.timeout_ack_segundos = float(os.getenv("SAGA_COMPENSACION_TIMEOUT", "10"))
+        # plazo para que el servicio compensador responda antes de dar el paso por fallido
+        self.timeout_respuesta_segundos = float(os.getenv("SAGA_COMPENSACION_TIMEOUT_RESPUESTA", "120"))
         storage_type = os.getenv("SAGAS_STORAGE_TYPE", "sqlite")
         self.saga_logger = SagaLoggerV2(storage_type=storage_type)
         print(f"🎭 Despachador inicializado con SagaLogger {storage_type.upper()}")
 
 
     # --------- Publicación ----------
-    def _send_avro(self, cliente: pulsar.Client, topico: str, mensaje: Record):
-        productor = cliente.create_producer(topico, schema=AvroSchema(mensaje.__class__))
-        productor.send(mensaje)
+    def _productor(self, topico: str, schema_class=None):
+        key = (topico, schema_class.__name__ if schema_class else None)
+        productor = Despachador._productores.get(key)
+        if productor is not None:
+            return productor
+        with Despachador._lock:
+            if Despachador._cliente is None:
+                Despachador._cliente = pulsar.Client(self.broker_url)
+            productor = Despachador._productores.get(key)
+            if productor is None:
+                if schema_class:
+                    productor = Despachador._cliente.create_producer(topico, schema=AvroSchema(schema_class))
+                else:
+                    productor = Despachador._cliente.create_producer(topico)
+                Despachador._productores[key] = productor
+        return productor
+
+    @classmethod
+    def cerrar(cls):
+        """Cierra productores y cliente compartidos (al apagar el servicio)."""
+        with cls._lock:
+            try:
+                for productor in cls._productores.values():
+                    productor.close()
+                if cls._cliente:
+                    cls._cliente.close()
+            except Exception as e:
+                logging.error(f"Error cerrando despachador: {e}")
+            finally:
+                cls._productores = {}
+                cls._cliente = None
+
+    def _send_avro(self, topico: str, mensaje: Record):
+        self._productor(topico, mensaje.__class__).send(mensaje)
+
+    def _send_json(self, topico: str, payload: Dict[str, Any]):
+        self._productor(topico).send(json.dumps(payload).encode("utf-8"))
 
-    def _send_json(self, cliente: pulsar.Client, topico: str, payload: Dict[str, Any]):
-        productor = cliente.create_producer(topico)
-        productor.send(json.dumps(payload).encode("utf-8"))
+    def _send_json_async(self, topico: str, payload: Dict[str, Any]) -> Future:
+        """Publica sin bloquear; el Future se resuelve con el ack del broker."""
+        futuro: Future = Future()
+
+        def _ack(res, msg_id):
+            if res == pulsar.Result.Ok:
+                futuro.set_result(msg_id)
+            else:
+                futuro.set_exception(RuntimeError(f"Pulsar respondió {res} publicando en {topico}"))
+
+        try:
+            self._productor(topico).send_async(json.dumps(payload).encode("utf-8"), _ack)
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
 
     def publicar_mensaje(self, mensaje, topico: str):
-        cliente = None
         try:
-            cliente = pulsar.Client(self.broker_url)
             if isinstance(mensaje, Record):
-                self._send_avro(cliente, topico, mensaje)
+                self._send_avro(topico, mensaje)
             elif isinstance(mensaje, dict):
-                self._send_json(cliente, topico, mensaje)
+                self._send_json(topico, mensaje)
             else:
                 try:
-                    self._send_avro(cliente, topico, mensaje)
+                    self._send_avro(topico, mensaje)
                 except Exception:
-                    self._send_json(cliente, topico, {"payload": str(mensaje)})
+                    self._send_json(topico, {"payload": str(mensaje)})
             print(f"✅ Evento publicado en {topico}")
         except Exception as e:
             logging.error(f"Error publicando en {topico}: {e}")
             traceback.print_exc()
-        finally:
-            if cliente:
-                cliente.close()
 
     def publicar_evento(self, evento, topico: str):
         self.publicar_mensaje(evento, topico)
 
+    def actualizar_estado_saga(self, saga_id: str, nuevo_estado: str, mensaje: Optional[str] = None) -> None:
+        """Registra la transición y, si es terminal, libera el cupo de admisión de la saga en esta réplica."""
+        self.saga_logger.actualizar_estado_saga(saga_id, nuevo_estado, mensaje)
+        if nuevo_estado in _ESTADOS_TERMINALES:
+            controlador_admision.liberar(saga_id)
+
     # --------- SAGA: Lanzar campaña completa ----------
     def orquestar_saga_campania_completa(self, datos_campania: Dict[str, Any]) -> str:
         saga_id = datos_campania.get('saga_id') or str(uuid.uuid4())
@@ -66,7 +172,8 @@ class Despachador:
                 saga_id=saga_id,
                 tipo="lanzar_campania_completa",
                 campania_id=datos_campania.get('id'),
-                metadatos={"campania_nombre": datos_campania.get('nombre'), "entrada": datos_campania}
+                metadatos={"campania_nombre": datos_campania.get('nombre'), "entrada": datos_campania},
+                prioridad=datos_campania.get('prioridad')
             )
 
             # Paso 1: Afiliados
@@ -79,11 +186,11 @@ class Despachador:
             #     # Paso 4: Notificaciones
             #     self.preparar_notificaciones_campania(datos_campania, saga_id)
 
-            self.saga_logger.actualizar_estado_saga(saga_id, EstadoSaga.EN_PROGRESO, "Comando de afiliados enviado")
+            self.actualizar_estado_saga(saga_id, EstadoSaga.EN_PROGRESO, "Comando de afiliados enviado")
             print(f"✅ SAGA {saga_id} en progreso")
             return saga_id
         except Exception as e:
-            self.saga_logger.actualizar_estado_saga(saga_id, EstadoSaga.FALLIDA, f"Error: {e}")
+            self.actualizar_estado_saga(saga_id, EstadoSaga.FALLIDA, f"Error: {e}")
             logging.error(f"Error en saga {saga_id}: {e}")
             self.compensar_saga_campania(datos_campania, saga_id)
             raise
@@ -134,22 +241,13 @@ class Despachador:
             # ===============================================================
 
             # Publicar con AvroSchema de la clase envelope
-            import pulsar
-            cliente = pulsar.Client(self.broker_url)
-            try:
-                prod = cliente.create_producer(
-                    "comando-buscar-afiliados-elegibles",
-                    schema=AvroSchema(ComandoBuscarAfiliadosElegibles),
-                )
-                prod.send(env)
-            finally:
-                cliente.close()
+            self._productor("comando-buscar-afiliados-elegibles", ComandoBuscarAfiliadosElegibles).send(env)
 
-            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "enviado")
+            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "enviado", saga_id=saga_id)
 
         except Exception as e:
             if paso_id:
-                self.saga_logger.actualizar_estado_paso_por_id(paso_id, "fallido", str(e))
+                self.saga_logger.actualizar_estado_paso_por_id(paso_id, "fallido", str(e), saga_id=saga_id)
             raise
 
     def inicializar_tracking_conversiones(self, datos_campania: Dict[str, Any], saga_id: str):
@@ -177,9 +275,9 @@ class Despachador:
                 fecha_fin=datos_campania["fecha_fin"]
             )
             self.publicar_mensaje(comando, "comando-inicializar-tracking-campania")
-            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "enviado")
+            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "enviado", saga_id=saga_id)
         except Exception as e:
-            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "fallido", str(e))
+            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "fallido", str(e), saga_id=saga_id)
             raise
 
     def preparar_notificaciones_campania(self, datos_campania: Dict[str, Any], saga_id: str):
@@ -216,41 +314,114 @@ class Despachador:
                 }
             )
             self.publicar_mensaje(comando, "comando-preparar-notificaciones-campania")
-            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "enviado")
+            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "enviado", saga_id=saga_id)
         except Exception as e:
-            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "fallido", str(e))
+            self.saga_logger.actualizar_estado_paso_por_id(paso_id, "fallido", str(e), saga_id=saga_id)
             raise
 
     def compensar_saga_campania(self, datos_campania: Dict[str, Any], saga_id: str):
+        """
+        Publica las compensaciones en olas concurrentes (ver PLAN_COMPENSACION_CAMPANIA).
+        Un paso publicado se cierra con el ack del broker o, si `espera_respuesta`,
+        queda EJECUTANDO hasta la respuesta del servicio compensador
+        (`registrar_respuesta_compensacion`) o el vencimiento del plazo
+        (`vencer_compensaciones`). La ola siguiente sale cuando la anterior quedó
+        confirmada, y la saga solo pasa a COMPENSADA cuando confirmaron todas.
+        """
         try:
             print(f"⚠️ COMPENSANDO SAGA {saga_id}...")
-            self.saga_logger.actualizar_estado_saga(saga_id, EstadoSaga.COMPENSANDO, "Iniciando compensación")
+            self.actualizar_estado_saga(saga_id, EstadoSaga.COMPENSANDO, "Iniciando compensación")
+            self._continuar_compensacion(saga_id, datos_campania["id"])
+        except Exception as e:
+            self.actualizar_estado_saga(saga_id, EstadoSaga.FALLIDA, f"Error en compensación: {e}")
+            logging.error(f"Error compensando saga {saga_id}: {e}")
 
-            # Ejemplos de comandos de compensación (como JSON si no hay Avro definido)
-            p1 = self.saga_logger.registrar_paso_saga(
-                saga_id=saga_id,
-                nombre_paso="compensar_busqueda_afiliados",
-                servicio_destino="afiliados",
-                topico_pulsar="comando-cancelar-busqueda-afiliados",
-                datos_entrada={"campania_id": datos_campania["id"], "accion": "cancelar"}
+    def _continuar_compensacion(self, saga_id: str, campania_id: Optional[str]) -> None:
+        """Publica la primera ola pendiente, espera si hay pasos sin respuesta, o cierra la saga."""
+        pasos = {p["nombre_paso"]: p["estado"] for p in self.saga_logger.pasos_compensacion(saga_id)}
+        fallidos = [n for n, st in pasos.items() if st == EstadoPaso.FALLIDO]
+        if fallidos:
+            # las olas siguientes dependen de las anteriores: no se publican
+            self.actualizar_estado_saga(
+                saga_id, EstadoSaga.FALLIDA,
+                f"Compensación incompleta: {len(fallidos)} paso(s) sin confirmar"
             )
-            self.publicar_mensaje({"campania_id": datos_campania["id"], "accion": "cancelar"}, "comando-cancelar-busqueda-afiliados")
-            self.saga_logger.actualizar_estado_paso_por_id(p1, "enviado")
-
-            p2 = self.saga_logger.registrar_paso_saga(
-                saga_id=saga_id,
-                nombre_paso="compensar_comisiones",
-                servicio_destino="comisiones",
-                topico_pulsar="comando-desconfigurar-comisiones",
-                datos_entrada={"campania_id": datos_campania["id"], "accion": "desconfigurar"}
+            return
+
+        for ola in _olas_compensacion(PLAN_COMPENSACION_CAMPANIA):
+            estados = [pasos.get(p["nombre_paso"]) for p in ola]
+            if all(st == EstadoPaso.COMPENSADO for st in estados):
+                continue
+            if any(st is not None for st in estados):
+                return  # ola publicada, esperando respuestas
+            self._publicar_ola_compensacion(saga_id, campania_id, ola)
+            return
+
+        self.actualizar_estado_saga(saga_id, EstadoSaga.COMPENSADA, "Compensación completada")
+
+    def _publicar_ola_compensacion(self, saga_id: str, campania_id: Optional[str], ola: List[Dict[str, Any]]) -> None:
+        """
+        Los comandos de la ola salen a la vez. Con el ack se cierran (COMPENSADO) los
+        pasos que no esperan respuesta; los que el broker no aceptó quedan FALLIDO.
+        """
+        mensajes = [
+            {"campania_id": campania_id, "saga_id": saga_id, "accion": p["accion"]}
+            for p in ola
+        ]
+        paso_ids = self.saga_logger.registrar_pasos_compensacion(saga_id, [
+            {
+                "nombre_paso": p["nombre_paso"],
+                "servicio_destino": p["servicio_destino"],
+                "topico_pulsar": p["topico_pulsar"],
+                "datos_entrada": m,
+            }
+            for p, m in zip(ola, mensajes)
+        ])
+
+        futuros = [self._send_json_async(p["topico_pulsar"], m) for p, m in zip(ola, mensajes)]
+
+        cerrados: List[Tuple[str, bool, Optional[str]]] = []
+        for p, paso_id, futuro in zip(ola, paso_ids, futuros):
+            try:
+                futuro.result(timeout=self.timeout_ack_segundos)
+            except Exception as e:
+                cerrados.append((paso_id, False, str(e) or type(e).__name__))
+            else:
+                if not p.get("espera_respuesta", True):
+                    cerrados.append((paso_id, True, None))
+        if cerrados:
+            self.saga_logger.registrar_resultados_compensacion(cerrados, saga_id=saga_id)
+            self._continuar_compensacion(saga_id, campania_id)
+
+    def registrar_respuesta_compensacion(self, saga_id: str, nombre_paso: str, ok: bool,
+                                         error: Optional[str] = None) -> bool:
+        """
+        Cierra el paso de compensación `nombre_paso` con la respuesta del servicio y
+        avanza la compensación. Devuelve False si la saga no tiene ese paso en curso.
+        """
+        pasos = self.saga_logger.pasos_compensacion(saga_id)
+        paso = next((p for p in reversed(pasos)
+                     if p["nombre_paso"] == nombre_paso and p["estado"] == EstadoPaso.EJECUTANDO), None)
+        if paso is None:
+            return False
+        self.saga_logger.registrar_resultados_compensacion([(paso["id"], ok, error)], saga_id=saga_id)
+        self._continuar_compensacion(saga_id, paso["request_data"].get("campania_id"))
+        return True
+
+    def vencer_compensaciones(self) -> int:
+        """Marca FALLIDO los pasos de compensación sin respuesta tras `timeout_respuesta_segundos`."""
+        limite = datetime.utcnow() - timedelta(seconds=self.timeout_respuesta_segundos)
+        vencidos = self.saga_logger.compensaciones_sin_respuesta(limite)
+        for saga_id, paso_id in vencidos:
+            self.saga_logger.registrar_resultados_compensacion(
+                [(paso_id, False, "Sin respuesta del servicio compensador")], saga_id=saga_id
             )
-            self.publicar_mensaje({"campania_id": datos_campania["id"], "accion": "desconfigurar"}, "comando-desconfigurar-comisiones")
-            self.saga_logger.actualizar_estado_paso_por_id(p2, "enviado")
-
-            self.saga_logger.actualizar_estado_saga(saga_id, EstadoSaga.COMPENSADA, "Compensación completada")
-        except Exception as e:
-            self.saga_logger.actualizar_estado_saga(saga_id, EstadoSaga.FALLIDA, f"Error en compensación: {e}")
-            logging.error(f"Error compensando saga {saga_id}: {e}")
+        for saga_id in {sid for sid, _ in vencidos}:
+            try:
+                self._continuar_compensacion(saga_id, None)
+            except Exception as e:
+                logging.error(f"Error cerrando compensación vencida de saga {saga_id}: {e}")
+        return len(vencidos)
 
     # --------- Utilidades ---------
     def _calcular_comision_base(self, tipo_campania: str) -> float:
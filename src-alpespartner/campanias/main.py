@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 import asyncio
+import os
 from contextlib import asynccontextmanager
 from pydantic_settings import BaseSettings
 from typing import Any
@@ -43,6 +44,11 @@ from campanias.modulos.infraestructura.schema.v1.comandos import (
 # Consumidores y despachadores
 from campanias.consumidores import suscribirse_a_topico
 from campanias.despachadores import Despachador
+from campanias.sagas.admision import controlador_admision
+from campanias.sagas.saga_logger_v2 import SagaLoggerV2
+from campanias.modulos.infraestructura.proyecciones import motor_proyecciones_campanias
+from campanias.modulos.infraestructura.busqueda import indice_campanias
+from campanias.seedwork.infraestructura.uow import ambito_unidad_trabajo
 from campanias import utils
 
 # ==========================================
@@ -69,6 +75,48 @@ app_configs: dict[str, Any] = {
 # Lista global para manejar las tareas asíncronas
 tasks: list[asyncio.Task] = []
 
+async def _poner_al_dia_proyecciones():
+    try:
+        resultado = await asyncio.to_thread(motor_proyecciones_campanias().ponerse_al_dia)
+        print(f"📚 Proyecciones al día: {resultado['eventos']} eventos reproducidos")
+    except Exception as e:
+        print(f"⚠️ No se pudieron poner al día las proyecciones: {e}")
+
+async def _cargar_indice_busqueda():
+    try:
+        await asyncio.to_thread(indice_campanias.asegurar_carga)
+        print(f"🔎 Índice de búsqueda cargado: {indice_campanias.estadisticas()['documentos']} campanias")
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar el índice de búsqueda (se reintenta en la primera búsqueda): {e}")
+
+async def _vencer_compensaciones_sagas():
+    """Da por fallidas las compensaciones cuyo servicio no respondió a tiempo."""
+    despachador = None
+    while True:
+        await asyncio.sleep(float(os.getenv("SAGA_COMPENSACION_REVISION_SEGUNDOS", "30")))
+        try:
+            if despachador is None:
+                despachador = await asyncio.to_thread(Despachador)
+            vencidas = await asyncio.to_thread(despachador.vencer_compensaciones)
+            if vencidas:
+                print(f"⏰ {vencidas} compensación(es) sin respuesta marcadas como fallidas")
+        except Exception as e:
+            print(f"⚠️ Error revisando compensaciones vencidas: {e}")
+
+async def _reconciliar_admision_sagas():
+    """Libera el cupo de admisión de sagas que otra réplica llevó a estado terminal."""
+    logger = None
+
+    def terminadas(saga_ids):
+        nonlocal logger
+        if logger is None:
+            logger = SagaLoggerV2()
+        return logger.sagas_terminadas(saga_ids)
+
+    await controlador_admision.reconciliar(
+        terminadas, float(os.getenv("SAGAS_RECONCILIACION_SEGUNDOS", "5"))
+    )
+
 # ==========================================
 # GESTIÓN DEL CICLO DE VIDA DE LA APLICACIÓN
 # ==========================================
@@ -219,6 +267,28 @@ async def lifespan(app: FastAPI):
         )
     )
     
+    # ==========================================
+    # PLANIFICADOR DE ADMISIÓN DE SAGAS
+    # ==========================================
+
+    task_admision_sagas = asyncio.create_task(controlador_admision.ejecutar())
+
+    # La respuesta que cierra una saga puede llegar a otra réplica (suscripción Shared)
+    task_reconciliar_admision = asyncio.create_task(_reconciliar_admision_sagas())
+
+    # Compensaciones publicadas que nunca recibieron respuesta del servicio compensador
+    task_compensaciones_vencidas = asyncio.create_task(_vencer_compensaciones_sagas())
+
+    # ==========================================
+    # PROYECCIONES DE LECTURA (vistas de campanias)
+    # ==========================================
+
+    # Proyecta lo que quedó en el journal sin aplicar (caída previa o proyección nueva)
+    task_proyecciones = asyncio.create_task(_poner_al_dia_proyecciones())
+
+    # Índice de búsqueda en memoria: se carga al arrancar para que la primera búsqueda no espere
+    task_indice_busqueda = asyncio.create_task(_cargar_indice_busqueda())
+
     # Agregar todas las tareas a la lista global
     tasks.extend([
         task_eventos_campania_creada,
@@ -234,7 +304,12 @@ async def lifespan(app: FastAPI):
         task_eventos_conversiones,
         task_eventos_notificaciones,
         task_lanzar_campania,
-        task_eventos_saga_campania
+        task_eventos_saga_campania,
+        task_admision_sagas,
+        task_reconciliar_admision,
+        task_compensaciones_vencidas,
+        task_proyecciones,
+        task_indice_busqueda
     ])
 
     asyncio.create_task(suscribirse_eventos_saga())
@@ -250,6 +325,7 @@ async def lifespan(app: FastAPI):
     print("   - eventos-comision")
     print("   - eventos-conversion")
     print("   - eventos-notificacion")
+    print(f"🚦 Admisión de sagas: máx {controlador_admision.max_en_vuelo} en vuelo por réplica")
     
     # ==========================================
     # YIELD: La aplicación está lista
@@ -269,6 +345,9 @@ async def lifespan(app: FastAPI):
             await task
         except asyncio.CancelledError:
             pass
+
+    Despachador.cerrar()
+    motor_proyecciones_campanias().cerrar()
     
     print("✅ Microservicio de campanias cerrado correctamente")
 
@@ -278,6 +357,12 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(lifespan=lifespan, **app_configs)
 
+@app.middleware("http")
+async def unidad_de_trabajo_por_request(request, call_next):
+    """Cada request tiene su propia unidad de trabajo (ContextVar), heredada por el endpoint"""
+    with ambito_unidad_trabajo():
+        return await call_next(request)
+
 # ==========================================
 # REGISTRO DE ROUTERS
 # ==========================================
@@ -0,0 +1,202 @@
+from campanias.seedwork.aplicacion.comandos import Comando, ComandoHandler
+from campanias.seedwork.aplicacion.comandos import ejecutar_commando as comando
+from campanias.modulos.aplicacion.comandos.crear_campana import CrearCampana
+from campanias.modulos.dominio.entidades import Campaña
+from campanias.modulos.dominio.eventos import CampaniaCreada
+from campanias.modulos.dominio.objetos_valor import (
+    NombreCampaña, DescripcionCampaña, FechaInicio, FechaFin, CodigoCampana,
+    TipoCampana, CanalPublicidad, ObjetivoCampana, Presupuesto, Moneda, SegmentoAudiencia
+)
+from campanias.modulos.infraestructura.repositorios import RepositorioCampaniasSQLAlchemy
+from campanias.modulos.infraestructura.despachadores import Despachador, evento_campania_creada
+from campanias.modulos.aplicacion.handlers import invalidar_cache_campania
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOPICO_CAMPANIA_CREADA = "eventos-campania-creada"
+
+@dataclass
+class CrearCampanasLote(Comando):
+    """Comando para crear muchas campanias en una sola transacción"""
+    campanias: List[CrearCampana] = field(default_factory=list)
+    todo_o_nada: bool = False  # si alguna es inválida no se crea ninguna
+
+@dataclass
+class ResultadoCreacion:
+    indice: int
+    id: str
+    codigo_campana: Optional[str]
+    estado: str                      # CREADA | RECHAZADA | ERROR
+    errores: List[str] = field(default_factory=list)
+    evento_publicado: bool = False
+
+def _miembro(enum_cls, valor) -> Optional[Enum]:
+    texto = str(valor or "").strip().upper()
+    for miembro in enum_cls:
+        if texto in (miembro.name, miembro.value.upper()):
+            return miembro
+    return None
+
+def _fecha(valor: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(valor).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+class CrearCampanasLoteHandler(ComandoHandler):
+    """
+    Valida todas las campanias, inserta las válidas con un INSERT multi-fila en una
+    transacción y publica sus CampaniaCreada en un solo envío por lotes a Pulsar.
+    """
+
+    def __init__(self):
+        self._repositorio = RepositorioCampaniasSQLAlchemy()
+
+    def handle(self, comando: CrearCampanasLote) -> List[ResultadoCreacion]:
+        resultados: List[ResultadoCreacion] = []
+        validas: List[Tuple[ResultadoCreacion, Campaña]] = []
+        codigos_vistos = set()
+        admitidos = self._admitidos()
+
+        for indice, item in enumerate(comando.campanias):
+            resultado = ResultadoCreacion(indice=indice, id=item.id, codigo_campana=item.codigo_campana, estado="CREADA")
+            campania, errores = self._construir(item, admitidos)
+            if item.codigo_campana and item.codigo_campana in codigos_vistos:
+                errores.append(f"codigo_campana repetido en el lote: {item.codigo_campana}")
+            codigos_vistos.add(item.codigo_campana)
+            if errores:
+                resultado.estado, resultado.errores = "RECHAZADA", errores
+            else:
+                validas.append((resultado, campania))
+            resultados.append(resultado)
+
+        if not validas or (comando.todo_o_nada and len(validas) < len(resultados)):
+            for resultado, _ in validas:
+                resultado.estado = "RECHAZADA"
+                resultado.errores.append("lote rechazado: hay campanias inválidas (todo_o_nada)")
+            return resultados
+
+        # Una transacción, un INSERT multi-fila; si la BD lo rechaza, fila por fila
+        # para que solo queden en ERROR las campanias que realmente fallan
+        try:
+            self._repositorio.agregar_muchos([campania for _, campania in validas])
+        except Exception as e:
+            logger.warning(f"Lote de {len(validas)} campanias rechazado ({e}); reintentando fila por fila")
+            errores_fila = self._repositorio.agregar_uno_a_uno([campania for _, campania in validas])
+            guardadas = []
+            for (resultado, campania), error in zip(validas, errores_fila):
+                if error is None:
+                    guardadas.append((resultado, campania))
+                else:
+                    resultado.estado = "ERROR"
+                    resultado.errores.append(f"error de persistencia: {error}")
+            validas = guardadas
+            if not validas:
+                return resultados
+
+        invalidar_cache_campania()
+
+        # Después del commit: todos los CampaniaCreada en un solo envío por lotes
+        eventos = [evento for _, campania in validas for evento in campania.eventos if isinstance(evento, CampaniaCreada)]
+        try:
+            with Despachador() as despachador:
+                errores_publicacion = despachador.publicar_lote(
+                    [evento_campania_creada(evento) for evento in eventos], TOPICO_CAMPANIA_CREADA
+                )
+        except Exception as e:
+            logger.error(f"Error publicando lote de CampaniaCreada: {e}")
+            errores_publicacion = [str(e)] * len(eventos)
+        for (resultado, campania), error in zip(validas, errores_publicacion):
+            campania.limpiar_eventos()
+            resultado.evento_publicado = error is None
+            if error:
+                resultado.errores.append(f"evento no publicado: {error}")
+        return resultados
+
+    def _admitidos(self) -> Dict[str, frozenset]:
+        """Vocabulario de las columnas ENUM de la tabla, para rechazar por item lo que la BD no acepta"""
+        try:
+            return {
+                atributo: admitidos
+                for atributo in ("tipo", "canal_publicidad", "objetivo")
+                if (admitidos := self._repositorio.valores_admitidos(atributo)) is not None
+            }
+        except Exception as e:
+            # sin esquema a mano valida solo el dominio; el respaldo fila por fila aísla lo que falle
+            logger.warning(f"No se pudo leer el esquema de campanias: {e}")
+            return {}
+
+    @staticmethod
+    def _construir(item: CrearCampana, admitidos: Optional[Dict[str, frozenset]] = None) -> Tuple[Optional[Campaña], List[str]]:
+        """Valida el item (dominio y vocabulario de la BD) y arma la entidad (con su evento CampaniaCreada)"""
+        admitidos = admitidos or {}
+        errores: List[str] = []
+        if not (item.nombre or "").strip():
+            errores.append("nombre es obligatorio")
+        tipo = _miembro(TipoCampana, item.tipo_campana)
+        canal = _miembro(CanalPublicidad, item.canal_publicidad)
+        objetivo = _miembro(ObjetivoCampana, item.objetivo_campana)
+        for nombre, valor, miembro, enum_cls in (
+            ("tipo_campana", item.tipo_campana, tipo, TipoCampana),
+            ("canal_publicidad", item.canal_publicidad, canal, CanalPublicidad),
+            ("objetivo_campana", item.objetivo_campana, objetivo, ObjetivoCampana),
+        ):
+            if miembro is None:
+                errores.append(f"{nombre} inválido: {valor} (válidos: {', '.join(m.name for m in enum_cls)})")
+        for nombre, atributo, miembro in (
+            ("tipo_campana", "tipo", tipo),
+            ("canal_publicidad", "canal_publicidad", canal),
+            ("objetivo_campana", "objetivo", objetivo),
+        ):
+            vocabulario = admitidos.get(atributo)
+            if miembro is not None and vocabulario is not None and miembro.name not in vocabulario:
+                errores.append(f"{nombre} {miembro.name} no es admitido por la BD (admitidos: {', '.join(sorted(vocabulario))})")
+        inicio, fin = _fecha(item.fecha_inicio), _fecha(item.fecha_fin)
+        if inicio is None:
+            errores.append(f"fecha_inicio inválida: {item.fecha_inicio}")
+        if fin is None:
+            errores.append(f"fecha_fin inválida: {item.fecha_fin}")
+        if inicio and fin and fin < inicio:
+            errores.append("fecha_fin es anterior a fecha_inicio")
+        if (item.presupuesto or 0) < 0:
+            errores.append("presupuesto no puede ser negativo")
+        if errores:
+            return None, errores
+
+        campania = Campaña(
+            nombre=NombreCampaña(item.nombre),
+            descripcion=DescripcionCampaña(item.descripcion),
+            fecha_inicio=FechaInicio(inicio),
+            fecha_fin=FechaFin(fin),
+            presupuesto=Presupuesto(item.presupuesto),
+            moneda=Moneda(item.moneda),
+            codigo_campana=CodigoCampana(item.codigo_campana),
+            segmento_audiencia=SegmentoAudiencia(item.segmento_audiencia),
+        )
+        # El setter de `id` siempre genera uno nuevo; el id del comando se asigna directo
+        campania._id = item.id
+        campania.crear_campania({
+            "nombre": item.nombre,
+            "descripcion": item.descripcion,
+            "tipo": tipo,
+            "canal_publicidad": canal,
+            "objetivo": objetivo,
+            "fecha_inicio": inicio,
+            "fecha_fin": fin,
+            "presupuesto": item.presupuesto,
+            "moneda": item.moneda,
+            "codigo_campana": item.codigo_campana,
+            "segmento_audiencia": item.segmento_audiencia,
+        })
+        campania.fecha_actualizacion = campania.fecha_creacion
+        return campania, errores
+
+@comando.register(CrearCampanasLote)
+def ejecutar_comando_crear_campanas_lote(comando: CrearCampanasLote):
+    handler = CrearCampanasLoteHandler()
+    return handler.handle(comando)
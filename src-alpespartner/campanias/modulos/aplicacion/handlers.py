@@ -1,16 +1,23 @@
 from campanias.modulos.dominio.eventos import (
-    CampaniaCreada, CampaniaActivada, AfiliadoAgregadoACampania, CampaniaEliminada
+    CampaniaCreada, CampaniaActivada, AfiliadoAgregadoACampania, CampaniaEliminada,
+    CampaniaPausada, CampaniaActualizada
 )
 from campanias.seedwork.aplicacion.handlers import Handler
 from campanias.modulos.infraestructura.despachadores import Despachador
-from campanias.seedwork.aplicacion.queries import Query, QueryHandler, QueryResultado, ejecutar_query
-from campanias.modulos.aplicacion.dto import CampañaDTO
-from campanias.modulos.infraestructura.repositorios import RepositorioCampanias
+from campanias.seedwork.aplicacion.queries import Query, QueryHandler, QueryResultado, QueryResultadoPaginado, ejecutar_query
+from campanias.seedwork.aplicacion.cache import cache_queries
+from campanias.seedwork.infraestructura.bus import bus_eventos, Fase
+from campanias.modulos.aplicacion.mapeadores import mapeador_campania_dto
+from campanias.modulos.infraestructura.repositorios import RepositorioCampanias, RepositorioCampaniasSQLAlchemy, COLUMNAS_LISTADO
+from campanias.modulos.infraestructura.vistas import VistaCampaniasLista, VistaCampaniaDetalle
 from campanias.comandos import ComandoLanzarCampaniaCompleta, ComandoCancelarSaga
 from campanias.despachadores import Despachador as DespachadorSaga
+from campanias.sagas.admision import controlador_admision, SagaRechazada, Prioridad
+from campanias.modulos.dominio.objetos_valor import EstadoCampana
 from dataclasses import dataclass
 from typing import List, Optional
 import logging
+import os
 
 # ==========================================
 # HANDLERS DE EVENTOS DE DOMINIO (INTEGRACIÓN)
@@ -47,6 +54,9 @@ class HandlerCampaniaIntegracion(Handler):
 # CONSULTAS (QUERIES)
 # ==========================================
 
+# Las consultas de listas nunca leen la tabla completa: sin límite explícito, una página de este tamaño
+TAMANO_PAGINA_POR_DEFECTO = 50
+
 @dataclass
 class ObtenerCampaniaPorId(Query):
     """Query para obtener una campaña por su ID"""
@@ -57,6 +67,9 @@ class ObtenerTodasLasCampanias(Query):
     """Query para obtener todas las campanias"""
     estado: Optional[str] = None  # Filtro opcional por estado
     tipo: Optional[str] = None    # Filtro opcional por tipo
+    desplazamiento: Optional[int] = None  # Paginación por desplazamiento (con total); None = keyset
+    limite: int = TAMANO_PAGINA_POR_DEFECTO  # Paginación: tamaño de página
+    cursor: Optional[str] = None  # Paginación keyset: None = primera página
 
 @dataclass
 class ObtenerCampaniasPorAfiliado(Query):
@@ -67,6 +80,20 @@ class ObtenerCampaniasPorAfiliado(Query):
 class ObtenerCampaniasActivas(Query):
     """Query para obtener campanias en estado activo"""
     canal_publicidad: Optional[str] = None  # Filtro opcional por canal
+    limite: int = TAMANO_PAGINA_POR_DEFECTO  # Paginación keyset: tamaño de página
+    cursor: Optional[str] = None  # Paginación keyset: None = primera página
+
+@dataclass
+class ObtenerResumenCampania(Query):
+    """Query para obtener la campaña con sus contadores desde la vista de detalle"""
+    id_campania: str
+
+@dataclass
+class ObtenerListadoCampanias(Query):
+    """Query para listar campanias con contadores desde la vista de listado"""
+    estado: Optional[str] = None
+    desplazamiento: int = 0
+    limite: int = 50
 
 # ==========================================
 # QUERY HANDLERS
@@ -76,7 +103,7 @@ class ObtenerCampaniaPorIdHandler(QueryHandler):
     """Handler para obtener una campaña específica por ID"""
     
     def __init__(self):
-        self._repositorio: RepositorioCampanias = RepositorioCampanias()
+        self._repositorio: RepositorioCampanias = RepositorioCampaniasSQLAlchemy()
 
     def handle(self, query: ObtenerCampaniaPorId) -> QueryResultado:
         """Ejecuta la consulta y retorna la campaña o None"""
@@ -84,24 +111,7 @@ class ObtenerCampaniaPorIdHandler(QueryHandler):
         
         if campania:
             # Convertir entidad a DTO para la respuesta
-            campania_dto = CampañaDTO(
-                fecha_creacion=campania.fecha_creacion.isoformat(),
-                fecha_actualizacion=campania.fecha_actualizacion.isoformat(),
-                id=str(campania.id),
-                nombre=campania.nombre,
-                descripcion=campania.descripcion,
-                tipo=campania.tipo.value,
-                canal_publicidad=campania.canal_publicidad.value,
-                objetivo=campania.objetivo.value,
-                fecha_inicio=campania.fecha_inicio.isoformat(),
-                fecha_fin=campania.fecha_fin.isoformat(),
-                presupuesto=campania.presupuesto,
-                moneda=campania.moneda,
-                codigo_campana=campania.codigo_campana,
-                segmento_audiencia=campania.segmento_audiencia,
-                estado=campania.estado.value
-            )
-            return QueryResultado(resultado=campania_dto)
+            return QueryResultado(resultado=mapeador_campania_dto.mapear(campania))
         
         return QueryResultado(resultado=None)
 
@@ -109,104 +119,162 @@ class ObtenerTodasLasCampaniasHandler(QueryHandler):
     """Handler para obtener todas las campanias con filtros opcionales"""
     
     def __init__(self):
-        self._repositorio: RepositorioCampanias = RepositorioCampanias()
+        self._repositorio: RepositorioCampanias = RepositorioCampaniasSQLAlchemy()
 
     def handle(self, query: ObtenerTodasLasCampanias) -> QueryResultado:
-        """Ejecuta la consulta y retorna lista de campanias"""
-        campanias = self._repositorio.obtener_todos()
-        
-        # Aplicar filtros si están presentes
-        if query.estado:
-            campanias = [c for c in campanias if c.estado.value == query.estado]
-        
-        if query.tipo:
-            campanias = [c for c in campanias if c.tipo.value == query.tipo]
+        """Ejecuta la consulta y retorna la página de campanias (y el total filtrado)"""
+        # Filtros y paginación se resuelven en la consulta SQL: solo se leen las filas de la página
+        siguiente_cursor = None
+        if query.desplazamiento is None:
+            # keyset por defecto: la primera página ya devuelve el cursor de la siguiente
+            campanias, siguiente_cursor = self._repositorio.obtener_pagina_cursor(
+                cursor=query.cursor,
+                limite=query.limite,
+                estado=query.estado,
+                tipo=query.tipo,
+                columnas=COLUMNAS_LISTADO
+            )
+            total = -1  # en modo keyset no se cuenta
+        else:
+            campanias, total = self._repositorio.obtener_pagina(
+                estado=query.estado,
+                tipo=query.tipo,
+                desplazamiento=query.desplazamiento,
+                limite=query.limite,
+                columnas=COLUMNAS_LISTADO
+            )
         
         # Convertir entidades a DTOs
-        campanias_dto = []
-        for campania in campanias:
-            campania_dto = CampañaDTO(
-                fecha_creacion=campania.fecha_creacion.isoformat(),
-                fecha_actualizacion=campania.fecha_actualizacion.isoformat(),
-                id=str(campania.id),
-                nombre=campania.nombre,
-                descripcion=campania.descripcion,
-                tipo=campania.tipo.value,
-                canal_publicidad=campania.canal_publicidad.value,
-                objetivo=campania.objetivo.value,
-                fecha_inicio=campania.fecha_inicio.isoformat(),
-                fecha_fin=campania.fecha_fin.isoformat(),
-                presupuesto=campania.presupuesto,
-                moneda=campania.moneda,
-                codigo_campana=campania.codigo_campana,
-                segmento_audiencia=campania.segmento_audiencia,
-                estado=campania.estado.value
-            )
-            campanias_dto.append(campania_dto)
+        campanias_dto = mapeador_campania_dto.map_many(campanias)
         
-        return QueryResultado(resultado=campanias_dto)
+        return QueryResultadoPaginado(resultado=campanias_dto, total=total, siguiente_cursor=siguiente_cursor)
 
 class ObtenerCampaniasActivasHandler(QueryHandler):
     """Handler para obtener campanias activas"""
     
     def __init__(self):
-        self._repositorio: RepositorioCampanias = RepositorioCampanias()
+        self._repositorio: RepositorioCampanias = RepositorioCampaniasSQLAlchemy()
 
     def handle(self, query: ObtenerCampaniasActivas) -> QueryResultado:
-        """Ejecuta la consulta y retorna campanias activas"""
-        campanias = self._repositorio.obtener_todos()
-        
-        # Filtrar solo campanias activas
-        campanias_activas = [c for c in campanias if c.estado.value == "activa"]
-        
-        # Aplicar filtro adicional por canal si está presente
-        if query.canal_publicidad:
-            campanias_activas = [c for c in campanias_activas 
-                               if c.canal_publicidad.value == query.canal_publicidad]
+        """Ejecuta la consulta y retorna una página de campanias activas"""
+        # Estado y canal se filtran en el WHERE (índice idx_estado), paginado por keyset
+        campanias_activas, siguiente_cursor = self._repositorio.obtener_pagina_cursor(
+            cursor=query.cursor,
+            limite=query.limite,
+            estado=EstadoCampana.ACTIVA.name,
+            canal=query.canal_publicidad,
+            columnas=COLUMNAS_LISTADO
+        )
         
         # Convertir a DTOs
-        campanias_dto = []
-        for campania in campanias_activas:
-            campania_dto = CampañaDTO(
-                fecha_creacion=campania.fecha_creacion.isoformat(),
-                fecha_actualizacion=campania.fecha_actualizacion.isoformat(),
-                id=str(campania.id),
-                nombre=campania.nombre,
-                descripcion=campania.descripcion,
-                tipo=campania.tipo.value,
-                canal_publicidad=campania.canal_publicidad.value,
-                objetivo=campania.objetivo.value,
-                fecha_inicio=campania.fecha_inicio.isoformat(),
-                fecha_fin=campania.fecha_fin.isoformat(),
-                presupuesto=campania.presupuesto,
-                moneda=campania.moneda,
-                codigo_campana=campania.codigo_campana,
-                segmento_audiencia=campania.segmento_audiencia,
-                estado=campania.estado.value
-            )
-            campanias_dto.append(campania_dto)
+        campanias_dto = mapeador_campania_dto.map_many(campanias_activas)
         
-        return QueryResultado(resultado=campanias_dto)
+        return QueryResultadoPaginado(resultado=campanias_dto, total=-1, siguiente_cursor=siguiente_cursor)
+
+class ObtenerResumenCampaniaHandler(QueryHandler):
+    """Handler del detalle pre-agregado: una fila de `campanias_vista_detalle`"""
+
+    def __init__(self):
+        self._vista = VistaCampaniaDetalle()
+
+    def handle(self, query: ObtenerResumenCampania) -> QueryResultado:
+        return QueryResultado(resultado=self._vista.obtener(query.id_campania))
+
+class ObtenerListadoCampaniasHandler(QueryHandler):
+    """Handler del listado pre-agregado: filas de `campanias_vista_lista`"""
+
+    def __init__(self):
+        self._vista = VistaCampaniasLista()
+
+    def handle(self, query: ObtenerListadoCampanias) -> QueryResultado:
+        filas = self._vista.obtener_por(
+            estado=query.estado.upper() if query.estado else None,
+            limite=query.limite,
+            desplazamiento=query.desplazamiento,
+            orden="fecha_creacion DESC, id DESC"
+        )
+        return QueryResultado(resultado=filas)
+
+# ==========================================
+# INVALIDACIÓN DE LA CACHE DE QUERIES
+# ==========================================
+
+ETIQUETA_LISTAS = "campanias:listas"
+
+def _etiqueta_campania(id_campania) -> str:
+    return f"campania:{id_campania}"
+
+def invalidar_cache_campania(id_campania: Optional[str] = None):
+    """Descarta la campaña y todos los listados (cualquier cambio puede moverla entre filtros)"""
+    etiquetas = [ETIQUETA_LISTAS]
+    if id_campania:
+        etiquetas.append(_etiqueta_campania(id_campania))
+    cache_queries.invalidar(*etiquetas)
+
+class HandlerCacheCampanias(Handler):
+    """Invalida la cache de queries cuando una campaña cambia"""
+
+    @staticmethod
+    def handle_cambio_campania(evento=None):
+        invalidar_cache_campania(getattr(evento, "id_campania", None))
+
+# Se invalida con la señal de dominio (antes del commit) y otra vez con la de
+# integración (después del commit): una lectura concurrente que cacheó el estado
+# previo al commit no sobrevive a la segunda.
+for _evento in (CampaniaCreada, CampaniaActivada, CampaniaPausada, CampaniaActualizada, CampaniaEliminada):
+    for _fase in (Fase.DOMINIO, Fase.INTEGRACION):
+        bus_eventos.suscribir(_evento, HandlerCacheCampanias.handle_cambio_campania, _fase)
 
 # ==========================================
 # REGISTRO DE QUERY HANDLERS
 # ==========================================
 
+# Las vistas de proyección (resumen/listado) ya son lecturas de una fila y se
+# actualizan de forma asíncrona, así que no pasan por la cache.
+#
+# La invalidación solo alcanza a esta réplica: con varias réplicas, el TTL es lo que
+# tarda como máximo en verse un cambio hecho en otra. Por eso es de segundos.
+
 @ejecutar_query.register(ObtenerCampaniaPorId)
+@cache_queries.cachear(
+    ttl_segundos=float(os.getenv("CAMPANIAS_CACHE_TTL_CAMPANIA", "5")),
+    max_entradas=int(os.getenv("CAMPANIAS_CACHE_MAX_CAMPANIAS", "5000")),
+    etiquetas=lambda query: [_etiqueta_campania(query.id_campania)]
+)
 def ejecutar_query_obtener_campania_por_id(query: ObtenerCampaniaPorId):
     handler = ObtenerCampaniaPorIdHandler()
     return handler.handle(query)
 
 @ejecutar_query.register(ObtenerTodasLasCampanias)
+@cache_queries.cachear(
+    ttl_segundos=float(os.getenv("CAMPANIAS_CACHE_TTL_LISTAS", "5")),
+    max_entradas=int(os.getenv("CAMPANIAS_CACHE_MAX_LISTAS", "500")),
+    etiquetas=lambda query: [ETIQUETA_LISTAS]
+)
 def ejecutar_query_obtener_todas_campanias(query: ObtenerTodasLasCampanias):
     handler = ObtenerTodasLasCampaniasHandler()
     return handler.handle(query)
 
 @ejecutar_query.register(ObtenerCampaniasActivas)
+@cache_queries.cachear(
+    ttl_segundos=float(os.getenv("CAMPANIAS_CACHE_TTL_LISTAS", "5")),
+    max_entradas=int(os.getenv("CAMPANIAS_CACHE_MAX_LISTAS", "500")),
+    etiquetas=lambda query: [ETIQUETA_LISTAS]
+)
 def ejecutar_query_obtener_campanias_activas(query: ObtenerCampaniasActivas):
     handler = ObtenerCampaniasActivasHandler()
     return handler.handle(query)
 
+@ejecutar_query.register(ObtenerResumenCampania)
+def ejecutar_query_obtener_resumen_campania(query: ObtenerResumenCampania):
+    handler = ObtenerResumenCampaniaHandler()
+    return handler.handle(query)
+
+@ejecutar_query.register(ObtenerListadoCampanias)
+def ejecutar_query_obtener_listado_campanias(query: ObtenerListadoCampanias):
+    handler = ObtenerListadoCampaniasHandler()
+    return handler.handle(query)
+
 # ==========================================
 # HANDLERS DE COMANDOS DESDE BFF (SAGAS)
 # ==========================================
@@ -237,21 +305,34 @@ class HandlerComandosBFF(Handler):
                 'fecha_fin': comando.data.fecha_fin,
                 'presupuesto': comando.data.presupuesto,
                 'moneda': comando.data.moneda,
+                'prioridad': Prioridad.normalizar(getattr(comando.data, 'prioridad', None)).value,
                 'usuario_solicitante': ""
             }
             
-            # Iniciar saga usando el despachador existente
+            # La saga no arranca aquí: se encola por prioridad y el controlador de
+            # admisión la inicia cuando hay cupo (lanza SagaRechazada si la cola está llena).
+            # El futuro se resuelve cuando la saga arrancó: el consumidor confirma el
+            # mensaje recién entonces.
             despachador_saga = DespachadorSaga()
-            saga_id = despachador_saga.orquestar_saga_campania_completa(datos_campania)
+            iniciada = controlador_admision.encolar(
+                comando.id,
+                datos_campania['prioridad'],
+                lambda: despachador_saga.orquestar_saga_campania_completa(datos_campania),
+            )
             
-            print(f"✅ SAGA INICIADA: {saga_id} para comando BFF {comando.id}")
-            return saga_id
+            if iniciada is not None:
+                print(f"📥 SAGA ENCOLADA: {comando.id} ({datos_campania['prioridad']}) para comando BFF {comando.id}")
+            else:
+                print(f"↩️ SAGA DUPLICADA IGNORADA: {comando.id} ya estaba encolada o en curso")
+            return iniciada
             
+        except SagaRechazada as e:
+            logging.warning(f"Saga {comando.id} rechazada por admisión: {e.motivo}")
+            raise
         except Exception as e:
             error_msg = f"Error procesando comando BFF lanzar campaña: {str(e)}"
             logging.error(error_msg)
             raise e
-            print(f"❌ ERROR EN COMANDO BFF: {error_msg}")
 
     @staticmethod
     def handle_cancelar_saga(comando: ComandoCancelarSaga):
@@ -261,6 +342,11 @@ class HandlerComandosBFF(Handler):
         try:
             print(f"⚠️ COMANDO BFF RECIBIDO: Cancelar saga - {comando.data.saga_id}")
             
+            # Si todavía espera cupo basta con sacarla de la cola de admisión
+            if controlador_admision.cancelar(comando.data.saga_id):
+                print(f"✅ CANCELACIÓN PROCESADA: Saga {comando.data.saga_id} retirada de la cola")
+                return
+            
             # TODO: Implementar lógica de cancelación de saga
             # Esto requeriría buscar la saga y ejecutar compensación
             
@@ -1,23 +1,19 @@
 from campanias.seedwork.aplicacion.dto import Mapeador as AppMap
 from campanias.seedwork.dominio.repositorios import Mapeador as RepMap
+from campanias.seedwork.aplicacion.mapeadores import compilar_mapeador
 from campanias.modulos.dominio.entidades import Campaña, CampañaProducto, campaniaservicio, campaniasegmento
 from .dto import CampañaDTO, CampañaProductoDTO, campaniaservicioDTO, campaniasegmentoDTO
 from datetime import datetime
 
+# Entidad Campaña → CampañaDTO de respuesta, generado una vez para el par
+mapeador_campania_dto = compilar_mapeador(Campaña, CampañaDTO)
+
 class MapeadorCampañaDTOApp(AppMap):
     def entidad_a_dto(self, entidad: Campaña) -> CampañaDTO:
-        return CampañaDTO(
-            id=entidad.id,
-            nombre=entidad.nombre.nombre,
-            descripcion=entidad.descripcion.descripcion,
-            estado=entidad.estado.value,
-            tipo=entidad.tipo.value,
-            canal_publicidad=entidad.canal_publicidad.value,
-            objetivo=entidad.objetivo.value,
-            fecha_inicio=entidad.fecha_inicio.fecha_inicio,
-            fecha_fin=entidad.fecha_fin.fecha_fin,
-            fecha_creacion=entidad.fecha_creacion.fecha_creacion
-        )
+        return mapeador_campania_dto.mapear(entidad)
+
+    def entidades_a_dtos(self, entidades) -> list:
+        return mapeador_campania_dto.map_many(entidades)
 
     def dto_a_entidad(self, dto: CampañaDTO) -> Campaña:
         raise NotImplementedError('No es necesario implementar este método para el mapeador de aplicación')
@@ -1,6 +1,9 @@
 from campanias.seedwork.aplicacion.queries import Query, QueryHandler, QueryResultado
 from campanias.seedwork.aplicacion.queries import ejecutar_query as query
+from campanias.modulos.infraestructura.busqueda import indice_campanias
+from campanias.modulos.infraestructura.vistas import VistaCampaniaMetricas
 from dataclasses import dataclass
+from datetime import date, datetime
 from typing import Optional, List, Dict
 import uuid
 
@@ -52,6 +55,9 @@ class BuscarCampanasPorCriterios(Query):
     limite: Optional[int] = 10
     offset: Optional[int] = 0
 
+def _fecha(valor: Optional[str]) -> Optional[date]:
+    return datetime.fromisoformat(valor.replace("Z", "+00:00")).date() if valor else None
+
 class ObtenerCampanaHandler(QueryHandler):
     def handle(self, query: ObtenerCampana) -> QueryResultado:
         """Obtiene una campaña específica con todos sus detalles"""
@@ -131,29 +137,43 @@ class ObtenerCampanasActivasHandler(QueryHandler):
             raise e
 
 class ObtenerMetricasCampanaHandler(QueryHandler):
+    def __init__(self):
+        self._vista = VistaCampaniaMetricas()
+
     def handle(self, query: ObtenerMetricasCampana) -> QueryResultado:
-        """Obtiene métricas de rendimiento de una campaña"""
+        """Obtiene métricas de rendimiento de una campaña (materializadas desde conversiones y comisiones)"""
         try:
-            # TODO: Calcular métricas de conversiones
-            # TODO: Calcular ROI y performance
-            # TODO: Obtener estadísticas de afiliados
-            # TODO: Incluir datos de comisiones
+            if query.fecha_desde or query.fecha_hasta:
+                # rango: suma de las filas diarias (incluye lo pagado en el rango)
+                fila = self._vista.obtener_rango(
+                    query.id_campana, _fecha(query.fecha_desde), _fecha(query.fecha_hasta)
+                )
+            else:
+                # sin rango: una sola fila de totales
+                fila = self._vista.obtener(query.id_campana) or {}
+            
+            conversiones = int(fila.get("conversiones_total") or 0)
+            ingresos = float(fila.get("ingresos_generados") or 0.0)
+            comisiones = float(fila.get("comisiones_generadas") or 0.0)
+            pagadas = float(fila.get("comisiones_pagadas") or 0.0)
             
             resultado = {
                 "id_campana": query.id_campana,
                 "metricas": {
-                    "total_conversiones": 0,
-                    "monto_total_conversiones": 0.0,
-                    "total_afiliados_activos": 0,
-                    "comisiones_pagadas": 0.0,
-                    "comisiones_pendientes": 0.0,
-                    "roi": 0.0,
-                    "costo_por_conversion": 0.0
+                    "total_conversiones": conversiones,
+                    "monto_total_conversiones": ingresos,
+                    "total_afiliados_activos": int(fila.get("afiliados_unicos") or 0),
+                    "comisiones_generadas": comisiones,
+                    "comisiones_pagadas": pagadas,
+                    "comisiones_pendientes": round(comisiones - pagadas, 2),
+                    "roi": round((ingresos - comisiones) / comisiones, 4) if comisiones else 0.0,
+                    "costo_por_conversion": round(comisiones / conversiones, 2) if conversiones else 0.0
                 },
                 "periodo": {
                     "fecha_desde": query.fecha_desde,
                     "fecha_hasta": query.fecha_hasta
-                }
+                },
+                "actualizado": fila.get("actualizado")
             }
             
             return QueryResultado(resultado=resultado)
@@ -163,22 +183,27 @@ class ObtenerMetricasCampanaHandler(QueryHandler):
 
 class BuscarCampanasPorCriteriosHandler(QueryHandler):
     def handle(self, query: BuscarCampanasPorCriterios) -> QueryResultado:
-        """Búsqueda avanzada de campanias por múltiples criterios"""
+        """Búsqueda avanzada de campanias por múltiples criterios (índice en memoria)"""
         try:
-            # TODO: Implementar búsqueda por texto en nombre/descripción
-            # TODO: Filtrar por rango de presupuesto
-            # TODO: Filtrar por canal y segmento
-            # TODO: Aplicar ordenamiento y paginación
+            campanias, total = indice_campanias.buscar(
+                texto=query.texto_busqueda,
+                presupuesto_minimo=query.presupuesto_minimo,
+                presupuesto_maximo=query.presupuesto_maximo,
+                canal=query.canal_marketing,
+                segmento=query.segmento_audiencia,
+                limite=query.limite or 10,
+                desplazamiento=query.offset or 0
+            )
             
             resultado = {
-                "campangas": [],
+                "campangas": campanias,
                 "criterios_busqueda": {
                     "texto": query.texto_busqueda,
                     "presupuesto_rango": [query.presupuesto_minimo, query.presupuesto_maximo],
                     "canal": query.canal_marketing,
                     "segmento": query.segmento_audiencia
                 },
-                "total_encontrados": 0,
+                "total_encontrados": total,
                 "limite": query.limite,
                 "offset": query.offset
             }
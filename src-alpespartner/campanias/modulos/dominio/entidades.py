@@ -14,7 +14,7 @@ from .eventos import (
     AfiliadoRemovidoDeCampania, CampaniaProductoAsignada, CampaniaServicioAsignada
 )
 
-@dataclass
+@dataclass(slots=True)
 class Campaña(AgregacionRaiz):
     nombre: NombreCampaña = field(default_factory=NombreCampaña)
     descripcion: DescripcionCampaña = field(default_factory=DescripcionCampaña)
@@ -171,7 +171,7 @@ class Campaña(AgregacionRaiz):
             razon_remocion=razon
         ))
 
-@dataclass
+@dataclass(slots=True)
 class CampañaProducto(AgregacionRaiz):
     campania_id: str = None
     producto_id: str = None
@@ -197,7 +197,7 @@ class CampañaProducto(AgregacionRaiz):
             activo=True
         ))
 
-@dataclass
+@dataclass(slots=True)
 class campaniaservicio(AgregacionRaiz):
     campania_id: str = None
     servicio_id: str = None
@@ -223,7 +223,7 @@ class campaniaservicio(AgregacionRaiz):
             activo=True
         ))
 
-@dataclass
+@dataclass(slots=True)
 class campaniasegmento(Campaña, AgregacionRaiz):
     segmento_id: str = None
     fecha_asignacion: datetime = field(default_factory=datetime.now)
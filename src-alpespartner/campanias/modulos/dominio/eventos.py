@@ -7,9 +7,9 @@ from .objetos_valor import EstadoCampana, TipoCampana, CanalPublicidad, Objetivo
 # Clase base para eventos de dominio de campaña
 class EventoDominioCampania(EventoDominio):
     """Clase base para todos los eventos de dominio relacionados con campanias"""
-    pass
+    __slots__ = ()
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaCreada(EventoDominioCampania):
     id_campania: str = ""
     nombre: str = ""
@@ -27,14 +27,14 @@ class CampaniaCreada(EventoDominioCampania):
     segmento_audiencia: str = ""
     activo: bool = True
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaActivada(EventoDominioCampania):
     id_campania: str = ""
     fecha_activacion: datetime = None
     estado_anterior: str = ""
     estado_nuevo: str = ""  # EstadoCampana.ACTIVA
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaPausada(EventoDominio):
     id_campania: str = ""
     fecha_pausa: datetime = None
@@ -42,14 +42,14 @@ class CampaniaPausada(EventoDominio):
     estado_anterior: str = ""
     estado_nuevo: str = ""  # EstadoCampana.PAUSADA
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaConfirmada(EventoDominio):
     id_campania: str = ""
     fecha_confirmacion: datetime = None
     confirmada_por: str = ""
     detalles_confirmacion: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaActualizada(EventoDominio):
     id_campania: str = ""
     nombre: str = ""
@@ -60,7 +60,7 @@ class CampaniaActualizada(EventoDominio):
     presupuesto: float = 0.0
     campos_modificados: list[str] = None  # Lista de campos que cambiaron
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaEliminada(EventoDominio):
     id_campania: str = ""
     nombre: str = ""
@@ -69,7 +69,7 @@ class CampaniaEliminada(EventoDominio):
     razon_eliminacion: str = ""
     estado_final: str = ""  # EstadoCampana.CANCELADA
 
-@dataclass
+@dataclass(slots=True)
 class AfiliadoAgregadoACampania(EventoDominio):
     id_campania: str = ""
     id_afiliado: str = ""
@@ -77,14 +77,14 @@ class AfiliadoAgregadoACampania(EventoDominio):
     configuracion_afiliado: dict = None
     comision_aplicable: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class AfiliadoRemovidoDeCampania(EventoDominio):
     id_campania: str = ""
     id_afiliado: str = ""
     fecha_remocion: datetime = None
     razon_remocion: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaProductoAsignada(EventoDominio):
     id_campania: str = ""
     id_producto: str = ""
@@ -93,7 +93,7 @@ class CampaniaProductoAsignada(EventoDominio):
     fecha_creacion: datetime = None
     activo: bool = True
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaServicioAsignada(EventoDominio):
     id_campania: str = ""
     id_servicio: str = ""
@@ -102,7 +102,7 @@ class CampaniaServicioAsignada(EventoDominio):
     fecha_creacion: datetime = None
     activo: bool = True
 
-@dataclass
+@dataclass(slots=True)
 class CampaniaFinalizadaAutomaticamente(EventoDominio):
     id_campania: str = ""
     fecha_finalizacion: datetime = None
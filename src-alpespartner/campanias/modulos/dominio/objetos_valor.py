@@ -1,10 +1,10 @@
 
-from campanias.seedwork.dominio.objetos_valor import ObjetoValor
+from campanias.seedwork.dominio.objetos_valor import ObjetoValor, Internado
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Locacion(ObjetoValor):
     latitud: float
     longitud: float
@@ -39,51 +39,51 @@ class ObjetivoCampana(str, Enum):
     VENTAS = "Ventas"
     ENGAGEMENT = "Engagement"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NombreCampaña(ObjetoValor):
     nombre: str
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DescripcionCampaña(ObjetoValor):
     descripcion: str
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FechaInicio(ObjetoValor):
     fecha_inicio: datetime   
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FechaFin(ObjetoValor):
     fecha_fin: datetime
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FechaCreacion(ObjetoValor):
     fecha_creacion: datetime 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FechaModificacion(ObjetoValor):
     fecha_modificacion: datetime
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FechaEliminacion(ObjetoValor):
     fecha_eliminacion: datetime  
 
-@dataclass(frozen=True)
-class Activo(ObjetoValor):
+@dataclass(frozen=True, slots=True)
+class Activo(Internado, ObjetoValor):
     activo: bool    
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Presupuesto(ObjetoValor):
     presupuesto: float
 
-@dataclass(frozen=True)
-class Moneda(ObjetoValor):
+@dataclass(frozen=True, slots=True)
+class Moneda(Internado, ObjetoValor):
     moneda: str
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CodigoCampana(ObjetoValor):
     codigo_campana: str
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SegmentoAudiencia(ObjetoValor):
     segmento_audiencia: str
     
\ No newline at end of file
@@ -0,0 +1,457 @@
+"""
+Índice de búsqueda de campanias en memoria (para `BuscarCampanasPorCriterios`).
+
+- Texto: índice invertido sobre nombre + descripción. Tokenización en español:
+  minúsculas, sin acentos (se pliegan también ñ→n y ü→u), sin stopwords y con un
+  recorte simple de plurales. Cada término apunta a su posting list.
+- Facetas: canal, segmento y estado.
+- Presupuesto: arreglo ordenado (bisect) para rangos.
+
+Las posting lists y las facetas son bitmaps con un bit por documento: se mantienen
+como `bytearray` (encender/apagar un bit es O(1)) y al consultar se convierten a `int`,
+así que combinar criterios es un AND de enteros. Eliminar una campaña deja libre su
+número de documento; cuando los libres pasan el umbral se compacta (se renumeran los
+documentos vivos y se reconstruyen los bitmaps), para que ni `_docs` ni los bitmaps
+crezcan con las campanias borradas. El índice se carga perezosamente desde
+el repositorio en la primera búsqueda y se mantiene al día con los eventos de
+campaña: los de dominio (bus de la UoW, después del commit) y los de integración
+(consumidor de Pulsar), ambos normalizados con `a_evento_proyectable`.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from campanias.seedwork.infraestructura.bus import bus_eventos, Fase
+from campanias.seedwork.infraestructura.proyecciones import EventoProyectable
+from campanias.modulos.dominio.eventos import (
+    CampaniaCreada, CampaniaActivada, CampaniaPausada, CampaniaActualizada, CampaniaEliminada
+)
+from campanias.modulos.dominio.objetos_valor import CanalPublicidad, EstadoCampana
+from campanias.modulos.infraestructura.proyecciones import TipoEventoProyeccion, a_evento_proyectable
+
+logger = logging.getLogger(__name__)
+
+_STOPWORDS = frozenset("""
+    a al ante con contra de del desde e el en entre es esta este hacia la las lo los
+    o para pero por que se sin sobre su sus u un una unas unos y
+""".split())
+_PALABRA = re.compile(r"[a-z0-9]+")
+
+
+# =====================================================================
+# Normalización
+# =====================================================================
+
+def plegar(texto: Optional[str]) -> str:
+    """Minúsculas y sin diacríticos: 'Campaña Económica' → 'campana economica'"""
+    if not texto:
+        return ""
+    texto = str(texto)
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def _raiz(token: str) -> str:
+    """Plural → singular aproximado: 'promociones' → 'promocion', 'tiendas' → 'tienda'"""
+    if len(token) > 4 and token.endswith("es") and token[-3] in "lnrdz":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    return [_raiz(t) for t in _PALABRA.findall(plegar(texto)) if t not in _STOPWORDS]
+
+
+def _faceta_enum(enum_cls, valor) -> Optional[str]:
+    """Valor de un enum (nombre, valor o miembro) → nombre del miembro"""
+    if valor is None or valor == "":
+        return None
+    return _nombre_miembro(enum_cls, str(getattr(valor, "value", valor)))
+
+
+@lru_cache(maxsize=1024)
+def _nombre_miembro(enum_cls, texto: str) -> str:
+    for miembro in enum_cls:
+        if texto.upper() in (miembro.name, miembro.value.upper()):
+            return miembro.name
+    return plegar(texto).upper()
+
+
+def _faceta_estado(valor) -> Optional[str]:
+    # en BD el borrador se llama CREADA
+    faceta = _faceta_enum(EstadoCampana, valor)
+    return EstadoCampana.BORRADOR.name if faceta == "CREADA" else faceta
+
+
+def _faceta_texto(valor) -> Optional[str]:
+    return " ".join(plegar(valor).split()) or None
+
+
+def _bits(bitmap: int, desde: int = 0, cuantos: Optional[int] = None) -> List[int]:
+    """Posiciones de los bits encendidos, en orden, saltando las `desde` primeras"""
+    binario = bin(bitmap)[:1:-1]  # binario[i] es el bit i
+    posiciones: List[int] = []
+    i = binario.find("1")
+    saltados = 0
+    while i != -1 and (cuantos is None or len(posiciones) < cuantos):
+        if saltados < desde:
+            saltados += 1
+        else:
+            posiciones.append(i)
+        i = binario.find("1", i + 1)
+    return posiciones
+
+
+def _encender(bitmaps: Dict[str, bytearray], clave: str, n: int):
+    bitmap = bitmaps.get(clave)
+    if bitmap is None:
+        bitmap = bitmaps[clave] = bytearray((n >> 3) + 1)
+    elif len(bitmap) <= n >> 3:
+        # crece al doble para que agregar documentos sea O(1) amortizado
+        bitmap.extend(bytes(max((n >> 3) + 1 - len(bitmap), len(bitmap))))
+    bitmap[n >> 3] |= 1 << (n & 7)
+
+
+def _apagar(bitmaps: Dict[str, bytearray], clave: str, n: int):
+    bitmap = bitmaps.get(clave)
+    if bitmap is not None and len(bitmap) > n >> 3:
+        bitmap[n >> 3] &= ~(1 << (n & 7)) & 0xFF
+
+
+def _entero(bitmap: Optional[bytearray]) -> int:
+    return int.from_bytes(bitmap, "little") if bitmap else 0
+
+
+def _bitmap_de(posiciones: Iterable[int], tamano: int) -> int:
+    bytes_ = bytearray((tamano >> 3) + 1)
+    for p in posiciones:
+        bytes_[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(bytes_, "little")
+
+
+# =====================================================================
+# Índice
+# =====================================================================
+
+class _Documento:
+    __slots__ = ("id", "nombre", "descripcion", "estado", "canal", "segmento", "presupuesto", "moneda", "terminos")
+
+    def __init__(self, id: str):
+        self.id = id
+        self.nombre = self.descripcion = self.estado = self.canal = self.segmento = self.moneda = None
+        self.presupuesto: Optional[float] = None
+        self.terminos: frozenset = frozenset()
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "nombre": self.nombre, "descripcion": self.descripcion,
+            "estado": self.estado, "canal_publicidad": self.canal, "segmento_audiencia": self.segmento,
+            "presupuesto": self.presupuesto, "moneda": self.moneda,
+        }
+
+
+class IndiceCampanias:
+    """Índice invertido + facetas + rango de presupuesto sobre las campanias"""
+
+    def __init__(self, tamano_carga: int = 5000, umbral_compactacion: int = 1024):
+        self.tamano_carga = tamano_carga
+        # compacta con al menos este número de documentos libres (y al menos 1/4 de `_docs`)
+        self.umbral_compactacion = umbral_compactacion
+        self._lock = threading.RLock()
+        self._lock_carga = threading.Lock()
+        self._cargado = False
+        self._cargando = False
+        # ids tocados por eventos durante la carga: la fila leída de BD puede ser más vieja
+        self._tocados_en_carga: Set[str] = set()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._docs: List[Optional[_Documento]] = []   # número de documento → documento
+        self._numeros: Dict[str, int] = {}             # id de campaña → número de documento
+        self._vivos: Dict[str, bytearray] = {}         # un único bitmap, bajo la clave ""
+        self._postings: Dict[str, bytearray] = {}
+        self._facetas: Dict[str, Dict[str, bytearray]] = {"canal": {}, "segmento": {}, "estado": {}}
+        self._presupuestos: List[float] = []
+        self._docs_presupuesto: List[int] = []
+        self._presupuestos_desordenados = False   # durante la carga se agrega al final y se ordena al terminar
+        self._libres = 0                           # números de documento de campanias eliminadas
+
+    # ------- consulta --------
+    def buscar(
+        self,
+        texto: Optional[str] = None,
+        presupuesto_minimo: Optional[float] = None,
+        presupuesto_maximo: Optional[float] = None,
+        canal: Optional[str] = None,
+        segmento: Optional[str] = None,
+        estado: Optional[str] = None,
+        limite: int = 10,
+        desplazamiento: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """(página de campanias, total encontradas); todos los criterios se combinan con AND"""
+        self.asegurar_carga()
+        with self._lock:
+            candidatos = _entero(self._vivos.get(""))
+            for faceta, valor in (("canal", _faceta_enum(CanalPublicidad, canal)),
+                                  ("segmento", _faceta_texto(segmento)),
+                                  ("estado", _faceta_estado(estado))):
+                if valor is not None and candidatos:
+                    candidatos &= _entero(self._facetas[faceta].get(valor))
+            # primero los términos menos frecuentes: el AND se vacía antes
+            postings = [_entero(self._postings.get(t)) for t in set(tokenizar(texto))]
+            for posting in sorted(postings, key=int.bit_count):
+                if not candidatos:
+                    break
+                candidatos &= posting
+            if candidatos and (presupuesto_minimo is not None or presupuesto_maximo is not None):
+                candidatos = self._filtrar_presupuesto(candidatos, presupuesto_minimo, presupuesto_maximo)
+            total = candidatos.bit_count()
+            pagina = [self._docs[n].como_dict() for n in _bits(candidatos, desplazamiento, limite)]
+        return pagina, total
+
+    def _filtrar_presupuesto(self, candidatos: int, minimo: Optional[float], maximo: Optional[float]) -> int:
+        desde = 0 if minimo is None else bisect_left(self._presupuestos, minimo)
+        hasta = len(self._presupuestos) if maximo is None else bisect_right(self._presupuestos, maximo)
+        if hasta <= desde:
+            return 0
+        if candidatos.bit_count() < hasta - desde:
+            # pocos candidatos: se revisa cada uno en vez de armar el bitmap del rango
+            minimo = float("-inf") if minimo is None else minimo
+            maximo = float("inf") if maximo is None else maximo
+            dentro = (n for n in _bits(candidatos)
+                      if self._docs[n].presupuesto is not None and minimo <= self._docs[n].presupuesto <= maximo)
+            return _bitmap_de(dentro, len(self._docs))
+        return candidatos & _bitmap_de(self._docs_presupuesto[desde:hasta], len(self._docs))
+
+    # ------- escritura --------
+    def indexar(self, id_campania: str, **campos):
+        """Crea o actualiza el documento; los campos vacíos no cambian"""
+        with self._lock:
+            if self._cargando:
+                self._tocados_en_carga.add(id_campania)
+            self._indexar(id_campania, campos)
+
+    def _indexar(self, id_campania: str, campos: Dict[str, Any]):
+        numero = self._numeros.get(id_campania)
+        if numero is None:
+            numero = self._numeros[id_campania] = len(self._docs)
+            self._docs.append(_Documento(id_campania))
+            _encender(self._vivos, "", numero)
+        doc = self._docs[numero]
+        # los eventos parciales traen "" o None en lo que no cambia
+        campos = {k: v for k, v in campos.items() if v is not None and v != ""}
+
+        if "nombre" in campos or "descripcion" in campos:
+            doc.nombre = campos.get("nombre", doc.nombre)
+            doc.descripcion = campos.get("descripcion", doc.descripcion)
+            terminos = frozenset(tokenizar(doc.nombre) + tokenizar(doc.descripcion))
+            for termino in doc.terminos - terminos:
+                _apagar(self._postings, termino, numero)
+            for termino in terminos - doc.terminos:
+                _encender(self._postings, termino, numero)
+            doc.terminos = terminos
+
+        for faceta, atributo, valor in (
+            ("canal", "canal", _faceta_enum(CanalPublicidad, campos.get("canal_publicidad"))),
+            ("segmento", "segmento", _faceta_texto(campos.get("segmento_audiencia"))),
+            ("estado", "estado", _faceta_estado(campos.get("estado"))),
+        ):
+            anterior = getattr(doc, atributo)
+            if valor is None or valor == anterior:
+                continue
+            if anterior is not None:
+                _apagar(self._facetas[faceta], anterior, numero)
+            _encender(self._facetas[faceta], valor, numero)
+            setattr(doc, atributo, valor)
+
+        if campos.get("moneda"):
+            doc.moneda = campos["moneda"]
+        presupuesto = campos.get("presupuesto")
+        if presupuesto is not None and float(presupuesto) != doc.presupuesto:
+            self._quitar_presupuesto(doc, numero)
+            doc.presupuesto = float(presupuesto)
+            if self._presupuestos_desordenados:
+                self._presupuestos.append(doc.presupuesto)
+                self._docs_presupuesto.append(numero)
+            else:
+                i = bisect_right(self._presupuestos, doc.presupuesto)
+                self._presupuestos.insert(i, doc.presupuesto)
+                self._docs_presupuesto.insert(i, numero)
+
+    def eliminar(self, id_campania: str):
+        with self._lock:
+            if self._cargando:
+                self._tocados_en_carga.add(id_campania)
+            numero = self._numeros.pop(id_campania, None)
+            if numero is None:
+                return
+            doc = self._docs[numero]
+            for termino in doc.terminos:
+                _apagar(self._postings, termino, numero)
+            for faceta, valor in (("canal", doc.canal), ("segmento", doc.segmento), ("estado", doc.estado)):
+                if valor is not None:
+                    _apagar(self._facetas[faceta], valor, numero)
+            self._quitar_presupuesto(doc, numero)
+            _apagar(self._vivos, "", numero)
+            self._docs[numero] = None
+            self._libres += 1
+            if not self._cargando and self._libres >= max(self.umbral_compactacion, len(self._docs) // 4):
+                self._compactar()
+
+    def _compactar(self):
+        """Renumera los documentos vivos en orden y reconstruye bitmaps y presupuestos sin los libres"""
+        nuevos: List[int] = [-1] * len(self._docs)
+        docs = [doc for doc in self._docs if doc is not None]
+        for numero, doc in enumerate(docs):
+            nuevos[self._numeros[doc.id]] = numero
+        vivos: Dict[str, bytearray] = {}
+        postings: Dict[str, bytearray] = {}
+        facetas: Dict[str, Dict[str, bytearray]] = {"canal": {}, "segmento": {}, "estado": {}}
+        # de atrás hacia adelante: cada bitmap se reserva una sola vez con su tamaño final
+        for numero in range(len(docs) - 1, -1, -1):
+            doc = docs[numero]
+            _encender(vivos, "", numero)
+            for termino in doc.terminos:
+                _encender(postings, termino, numero)
+            for faceta, valor in (("canal", doc.canal), ("segmento", doc.segmento), ("estado", doc.estado)):
+                if valor is not None:
+                    _encender(facetas[faceta], valor, numero)
+        self._docs = docs
+        self._numeros = {doc.id: numero for numero, doc in enumerate(docs)}
+        self._vivos, self._postings, self._facetas = vivos, postings, facetas
+        self._docs_presupuesto = [nuevos[n] for n in self._docs_presupuesto]
+        logger.debug(f"Índice de búsqueda compactado: {self._libres} documentos libres liberados")
+        self._libres = 0
+
+    def _quitar_presupuesto(self, doc: _Documento, numero: int):
+        if doc.presupuesto is None:
+            return
+        if self._presupuestos_desordenados:
+            i = self._docs_presupuesto.index(numero)
+            del self._presupuestos[i]
+            del self._docs_presupuesto[i]
+            return
+        desde = bisect_left(self._presupuestos, doc.presupuesto)
+        hasta = bisect_right(self._presupuestos, doc.presupuesto)
+        i = self._docs_presupuesto.index(numero, desde, hasta)
+        del self._presupuestos[i]
+        del self._docs_presupuesto[i]
+
+    # ------- sincronización --------
+    def aplicar(self, evento: Optional[EventoProyectable]):
+        """Aplica un evento de campaña normalizado; los demás se ignoran"""
+        if evento is None or not evento.agregado_id:
+            return
+        tipo, datos = evento.tipo, evento.datos
+        if tipo == TipoEventoProyeccion.CAMPANIA_CREADA:
+            self.indexar(evento.agregado_id, **{**datos, "estado": datos.get("estado") or EstadoCampana.BORRADOR.name})
+        elif tipo == TipoEventoProyeccion.CAMPANIA_ACTUALIZADA:
+            self.indexar(evento.agregado_id, **datos)
+        elif tipo == TipoEventoProyeccion.CAMPANIA_ACTIVADA:
+            self.indexar(evento.agregado_id, estado=EstadoCampana.ACTIVA.name)
+        elif tipo == TipoEventoProyeccion.CAMPANIA_PAUSADA:
+            self.indexar(evento.agregado_id, estado=EstadoCampana.PAUSADA.name)
+        elif tipo == TipoEventoProyeccion.CAMPANIA_ELIMINADA:
+            self.eliminar(evento.agregado_id)
+
+    def asegurar_carga(self, repositorio=None):
+        if not self._cargado:
+            with self._lock_carga:
+                if not self._cargado:
+                    self.cargar(repositorio)
+
+    def cargar(self, repositorio=None):
+        """Lee todas las campanias por páginas keyset; lo que llegó por eventos mientras tanto manda"""
+        from campanias.modulos.infraestructura.repositorios import RepositorioCampaniasSQLAlchemy, COLUMNAS_LISTADO
+        repositorio = repositorio or RepositorioCampaniasSQLAlchemy()
+        with self._lock:
+            self._reiniciar()
+            self._cargando, self._tocados_en_carga = True, set()
+            self._presupuestos_desordenados = True
+        try:
+            cursor, total = None, 0
+            while True:
+                campanias, cursor = repositorio.obtener_pagina_cursor(
+                    cursor=cursor, limite=self.tamano_carga, columnas=COLUMNAS_LISTADO
+                )
+                with self._lock:
+                    for campania in campanias:
+                        id_campania = str(campania.id)
+                        campos = _campos_de_entidad(campania)
+                        if id_campania in self._tocados_en_carga:
+                            numero = self._numeros.get(id_campania)
+                            if numero is None:
+                                continue  # eliminada durante la carga
+                            # los eventos parciales (p. ej. pausada) no traen el resto de la fila
+                            doc = self._docs[numero]
+                            campos = {campo: valor for campo, valor in campos.items()
+                                      if getattr(doc, _ATRIBUTO_DOCUMENTO.get(campo, campo)) is None}
+                        self._indexar(id_campania, campos)
+                total += len(campanias)
+                if cursor is None:
+                    break
+            self._cargado = True
+            logger.info(f"Índice de búsqueda de campanias cargado: {total} campanias")
+        finally:
+            with self._lock:
+                orden = sorted(zip(self._presupuestos, self._docs_presupuesto))
+                self._presupuestos = [p for p, _ in orden]
+                self._docs_presupuesto = [n for _, n in orden]
+                self._presupuestos_desordenados = False
+                self._cargando, self._tocados_en_carga = False, set()
+                if self._libres >= max(self.umbral_compactacion, len(self._docs) // 4):
+                    self._compactar()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cargado": self._cargado,
+                "documentos": len(self._numeros),
+                "libres": self._libres,
+                "terminos": len(self._postings),
+                "facetas": {nombre: len(valores) for nombre, valores in self._facetas.items()},
+            }
+
+
+# campo de la fila / evento → atributo de _Documento
+_ATRIBUTO_DOCUMENTO = {"canal_publicidad": "canal", "segmento_audiencia": "segmento"}
+
+
+def _campos_de_entidad(campania) -> Dict[str, Any]:
+    def primitivo(valor, atributo):
+        valor = getattr(valor, atributo, valor)
+        return getattr(valor, "value", valor)
+    return {
+        "nombre": primitivo(campania.nombre, "nombre"),
+        "descripcion": primitivo(campania.descripcion, "descripcion"),
+        "estado": primitivo(campania.estado, "estado"),
+        "canal_publicidad": primitivo(campania.canal_publicidad, "canal_publicidad"),
+        "segmento_audiencia": primitivo(campania.segmento_audiencia, "segmento_audiencia"),
+        "presupuesto": primitivo(campania.presupuesto, "presupuesto"),
+        "moneda": primitivo(campania.moneda, "moneda"),
+    }
+
+
+indice_campanias = IndiceCampanias()
+
+
+def _sincronizar_indice(evento=None):
+    try:
+        indice_campanias.aplicar(a_evento_proyectable(evento))
+    except Exception as e:
+        logger.error(f"Error actualizando el índice de búsqueda: {e}")
+
+
+# Después del commit: el índice nunca refleja una escritura que se deshizo
+for _evento in (CampaniaCreada, CampaniaActivada, CampaniaPausada, CampaniaActualizada, CampaniaEliminada):
+    bus_eventos.suscribir(_evento, _sincronizar_indice, Fase.INTEGRACION)
@@ -1,9 +1,13 @@
 import pulsar
 import logging
+import threading
+from datetime import datetime
 from pulsar.schema import AvroSchema
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence
 
 from campanias.seedwork.infraestructura import utils
+from campanias.modulos.dominio.eventos import CampaniaCreada
+from campanias.modulos.infraestructura.schema.v1.eventos import EventoCampaniaCreada, CampaniaCreadaPayload
 
 from campanias.modulos.infraestructura.schema.v1.comandos import (
     ComandoBuscarAfiliadosElegibles,
@@ -42,7 +46,9 @@ class Despachador:
                     send_timeout_millis=10000,
                     batching_enabled=True,
                     batching_max_messages=100,
-                    batching_max_publish_delay_millis=1000
+                    batching_max_publish_delay_millis=1000,
+                    # publicaciones en lote: esperar lugar en la cola en vez de fallar
+                    block_if_queue_full=True
                 )
                 logger.info(f"Productor creado para tópico: {topico}")
             except Exception as e:
@@ -62,6 +68,42 @@ class Despachador:
             logger.error(f"Error publicando mensaje en {topico}: {e}")
             raise
 
+    def publicar_lote(self, mensajes: Sequence[Any], topico: str, timeout_segundos: float = 30.0) -> List[Optional[str]]:
+        """
+        Publica todos los mensajes con send_async (el productor los agrupa en batches),
+        hace flush y espera los acks. Devuelve un error por mensaje (None = publicado).
+        """
+        if not mensajes:
+            return []
+        errores: List[Optional[str]] = ["sin confirmación del broker"] * len(mensajes)
+        pendientes = [len(mensajes)]
+        lock = threading.Lock()
+        listo = threading.Event()
+
+        def _ack(indice, res, _msg_id):
+            errores[indice] = None if res == pulsar.Result.Ok else f"Pulsar respondió {res}"
+            with lock:
+                pendientes[0] -= 1
+                if pendientes[0] == 0:
+                    listo.set()
+
+        productor = self._obtener_productor(topico, mensajes[0].__class__)
+        for indice, mensaje in enumerate(mensajes):
+            try:
+                productor.send_async(mensaje, lambda res, msg_id, i=indice: _ack(i, res, msg_id))
+            except Exception as e:
+                errores[indice] = str(e)
+                with lock:
+                    pendientes[0] -= 1
+        with lock:
+            if pendientes[0] == 0:
+                listo.set()
+        productor.flush()
+        if not listo.wait(timeout_segundos):
+            logger.error(f"Timeout esperando acks de {topico}: {pendientes[0]} pendientes")
+        logger.info(f"Lote de {len(mensajes)} mensajes publicado en {topico}")
+        return errores
+
     async def publicar_evento(self, evento: Any, topico: str):
         logger.info(f"Publicando evento {type(evento).__name__} en {topico}")
         await self.publicar_mensaje(evento, topico)
@@ -90,5 +132,40 @@ class Despachador:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.cerrar()
-    
-    
\ No newline at end of file
+
+
+def _millis(fecha) -> Optional[int]:
+    if fecha is None:
+        return None
+    if isinstance(fecha, str):
+        fecha = datetime.fromisoformat(fecha.replace("Z", "+00:00")).replace(tzinfo=None)
+    return int(utils.unix_time_millis(fecha))
+
+
+def evento_campania_creada(evento: CampaniaCreada) -> EventoCampaniaCreada:
+    """Evento de dominio CampaniaCreada → evento de integración (Avro)"""
+    return EventoCampaniaCreada(
+        id=str(evento.id),
+        time=utils.time_millis(),
+        specversion="v1",
+        type="CampaniaCreada",
+        datacontenttype="AVRO",
+        service_name="campanias.alpespartner",
+        data=CampaniaCreadaPayload(
+            id_campania=evento.id_campania,
+            nombre=evento.nombre,
+            descripcion=evento.descripcion,
+            estado=evento.estado,
+            tipo=evento.tipo,
+            canal_publicidad=evento.canal_publicidad,
+            objetivo=evento.objetivo,
+            fecha_inicio=_millis(evento.fecha_inicio),
+            fecha_fin=_millis(evento.fecha_fin),
+            fecha_creacion=_millis(evento.fecha_creacion),
+            presupuesto=evento.presupuesto,
+            moneda=evento.moneda,
+            codigo_campania=evento.codigo_campana,
+            segmento_audiencia=evento.segmento_audiencia,
+            activo=evento.activo
+        )
+    )
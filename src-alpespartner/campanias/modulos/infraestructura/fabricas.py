@@ -9,8 +9,8 @@ class FabricaRepositorios(Fabrica):
     
     def crear_objeto(self, obj: type, mapeador: any = None) -> Repositorio:
         if obj == 'RepositorioCampanias':
-            from campanias.modulos.infraestructura.repositorios import RepositorioCampanias
-            return RepositorioCampanias()
+            from campanias.modulos.infraestructura.repositorios import RepositorioCampaniasSQLAlchemy
+            return RepositorioCampaniasSQLAlchemy()
         elif obj == 'RepositorioEventosCampanias':
             from campanias.modulos.infraestructura.repositorios import RepositorioEventosCampanias  
             return RepositorioEventosCampanias()
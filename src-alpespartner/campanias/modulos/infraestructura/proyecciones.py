@@ -0,0 +1,517 @@
+"""
+Proyecciones de lectura de campanias.
+
+Los eventos de campanias (propios por Pulsar o de dominio) y los de conversiones y
+comisiones se normalizan con `a_evento_proyectable` y alimentan al motor de
+proyecciones, que mantiene tres tablas desnormalizadas:
+
+- `campanias_vista_lista`: columnas del listado + contadores principales.
+- `campanias_vista_detalle`: la campaña completa + todos los contadores; el detalle
+  se responde con una sola fila, sin consultar afiliados/conversiones/comisiones.
+- `campanias_vista_conteos`: solo contadores por campaña.
+
+Además materializa las métricas de rendimiento (`campanias_metricas` por día y
+`campanias_metricas_totales` por campaña) a partir de conversiones y comisiones.
+
+Los contadores se escriben como incrementos (`c = c + VALUES(c)`); el journal
+descarta los eventos repetidos, así una reentrega del broker no los duplica.
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from datetime import date, datetime
+from functools import singledispatch
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+
+from campanias.seedwork.infraestructura.proyecciones import (
+    EventoProyectable, MotorProyecciones, ProyeccionLectura, motor_para
+)
+from campanias.modulos.dominio.eventos import (
+    CampaniaCreada, CampaniaActivada, CampaniaPausada, CampaniaActualizada,
+    CampaniaEliminada, AfiliadoAgregadoACampania
+)
+from campanias.modulos.dominio.objetos_valor import EstadoCampana
+from campanias.modulos.infraestructura.schema.v1.eventos import (
+    EventoCampaniaCreada, EventoCampaniaActivada, EventoAfiliadoAgregado
+)
+from campanias.eventos import EventoComision, EventoConversion
+
+
+class TipoEventoProyeccion:
+    CAMPANIA_CREADA      = "CampaniaCreada"
+    CAMPANIA_ACTIVADA    = "CampaniaActivada"
+    CAMPANIA_PAUSADA     = "CampaniaPausada"
+    CAMPANIA_ACTUALIZADA = "CampaniaActualizada"
+    CAMPANIA_ELIMINADA   = "CampaniaEliminada"
+    AFILIADO_AGREGADO    = "AfiliadoAgregadoACampania"
+    CONVERSION_REGISTRADA = "ConversionRegistrada"
+    COMISION_CALCULADA   = "ComisionCalculada"
+    COMISION_PAGADA      = "ComisionPagada"
+
+
+TIPOS_EVENTO = frozenset(v for k, v in vars(TipoEventoProyeccion).items() if k.isupper())
+
+TABLA_JOURNAL = "campanias_eventos"
+
+_CAMPOS_CREACION = (
+    "nombre", "descripcion", "tipo", "canal_publicidad", "objetivo", "fecha_inicio", "fecha_fin",
+    "fecha_creacion", "presupuesto", "moneda", "codigo_campana", "segmento_audiencia",
+)
+_CAMPOS_ACTUALIZACION = ("nombre", "descripcion", "fecha_inicio", "fecha_fin", "presupuesto")
+
+
+# =====================================================================
+# Normalización de eventos
+# =====================================================================
+
+def _desde_millis(valor) -> Optional[datetime]:
+    return datetime.utcfromtimestamp(valor / 1000) if valor else None
+
+
+def _texto(valor) -> Optional[str]:
+    return getattr(valor, "value", valor) if valor is not None else None
+
+
+def _estado(valor) -> Optional[str]:
+    """Estado en el vocabulario de la vista (nombre del enum: ACTIVA, PAUSADA, ...)"""
+    if not valor:
+        return None
+    valor = str(_texto(valor))
+    for estado in EstadoCampana:
+        if valor in (estado.name, estado.value):
+            return estado.name
+    return valor.upper()
+
+
+@singledispatch
+def a_evento_proyectable(evento, evento_id: Optional[str] = None) -> Optional[EventoProyectable]:
+    """Evento de dominio o de integración → EventoProyectable (None si no alimenta proyecciones)"""
+    return None
+
+
+@a_evento_proyectable.register
+def _(evento: CampaniaCreada, evento_id: Optional[str] = None):
+    datos = {campo: _texto(getattr(evento, campo, None)) for campo in _CAMPOS_CREACION}
+    datos["estado"] = _estado(evento.estado)
+    return EventoProyectable(evento_id or str(evento.id), TipoEventoProyeccion.CAMPANIA_CREADA,
+                             evento.id_campania, datos, evento.fecha_evento)
+
+
+@a_evento_proyectable.register
+def _(evento: CampaniaActivada, evento_id: Optional[str] = None):
+    return EventoProyectable(evento_id or str(evento.id), TipoEventoProyeccion.CAMPANIA_ACTIVADA,
+                             evento.id_campania, {"fecha_activacion": evento.fecha_activacion},
+                             evento.fecha_evento)
+
+
+@a_evento_proyectable.register
+def _(evento: CampaniaPausada, evento_id: Optional[str] = None):
+    return EventoProyectable(evento_id or str(evento.id), TipoEventoProyeccion.CAMPANIA_PAUSADA,
+                             evento.id_campania, {}, evento.fecha_evento)
+
+
+@a_evento_proyectable.register
+def _(evento: CampaniaActualizada, evento_id: Optional[str] = None):
+    datos = {campo: getattr(evento, campo, None) for campo in _CAMPOS_ACTUALIZACION}
+    return EventoProyectable(evento_id or str(evento.id), TipoEventoProyeccion.CAMPANIA_ACTUALIZADA,
+                             evento.id_campania, datos, evento.fecha_evento)
+
+
+@a_evento_proyectable.register
+def _(evento: CampaniaEliminada, evento_id: Optional[str] = None):
+    return EventoProyectable(evento_id or str(evento.id), TipoEventoProyeccion.CAMPANIA_ELIMINADA,
+                             evento.id_campania, {"estado": _estado(evento.estado_final) or "CANCELADA"},
+                             evento.fecha_evento)
+
+
+@a_evento_proyectable.register
+def _(evento: AfiliadoAgregadoACampania, evento_id: Optional[str] = None):
+    return EventoProyectable(evento_id or str(evento.id), TipoEventoProyeccion.AFILIADO_AGREGADO,
+                             evento.id_campania, {"id_afiliado": evento.id_afiliado}, evento.fecha_evento)
+
+
+# Eventos de integración (Pulsar). Su `id` por defecto se fija al importar el esquema,
+# así que el consumidor pasa el id del mensaje como `evento_id`.
+
+@a_evento_proyectable.register
+def _(evento: EventoCampaniaCreada, evento_id: Optional[str] = None):
+    data = evento.data
+    if data is None or not data.id_campania:
+        return None
+    datos = {
+        "nombre": data.nombre, "descripcion": data.descripcion, "tipo": data.tipo,
+        "canal_publicidad": data.canal_publicidad, "objetivo": data.objetivo,
+        "fecha_inicio": _desde_millis(data.fecha_inicio), "fecha_fin": _desde_millis(data.fecha_fin),
+        "fecha_creacion": _desde_millis(data.fecha_creacion), "presupuesto": data.presupuesto,
+        "moneda": data.moneda, "codigo_campana": data.codigo_campania,
+        "segmento_audiencia": data.segmento_audiencia, "estado": _estado(data.estado),
+    }
+    return EventoProyectable(evento_id or evento.id, TipoEventoProyeccion.CAMPANIA_CREADA,
+                             data.id_campania, datos, _desde_millis(evento.time) or datetime.utcnow())
+
+
+@a_evento_proyectable.register
+def _(evento: EventoCampaniaActivada, evento_id: Optional[str] = None):
+    data = evento.data
+    if data is None or not data.id_campania:
+        return None
+    return EventoProyectable(evento_id or evento.id, TipoEventoProyeccion.CAMPANIA_ACTIVADA,
+                             data.id_campania, {"fecha_activacion": _desde_millis(data.fecha_activacion)},
+                             _desde_millis(evento.time) or datetime.utcnow())
+
+
+@a_evento_proyectable.register
+def _(evento: EventoAfiliadoAgregado, evento_id: Optional[str] = None):
+    data = evento.data
+    if data is None or not data.id_campania:
+        return None
+    return EventoProyectable(evento_id or evento.id, TipoEventoProyeccion.AFILIADO_AGREGADO,
+                             data.id_campania, {"id_afiliado": data.id_afiliado},
+                             _desde_millis(evento.time) or datetime.utcnow())
+
+
+@a_evento_proyectable.register
+def _(evento: EventoConversion, evento_id: Optional[str] = None):
+    conversion = evento.conversion_registrada
+    if conversion is None or not conversion.campania_id:
+        return None
+    return EventoProyectable(evento_id or conversion.conversion_id or evento.id,
+                             TipoEventoProyeccion.CONVERSION_REGISTRADA, conversion.campania_id,
+                             {"conversion_id": conversion.conversion_id, "valor": conversion.valor_conversion or 0.0,
+                              "afiliado_id": conversion.afiliado_id, "fecha": conversion.fecha_conversion},
+                             _desde_millis(evento.time) or datetime.utcnow())
+
+
+@a_evento_proyectable.register
+def _(evento: EventoComision, evento_id: Optional[str] = None):
+    comision = evento.comision_calculada
+    if comision is not None and comision.campania_id:
+        return EventoProyectable(evento_id or comision.comision_id or evento.id,
+                                 TipoEventoProyeccion.COMISION_CALCULADA, comision.campania_id,
+                                 {"comision_id": comision.comision_id, "monto": comision.monto_comision or 0.0,
+                                  "afiliado_id": comision.afiliado_id, "fecha": comision.fecha_calculo},
+                                 _desde_millis(evento.time) or datetime.utcnow())
+    pago = evento.comision_pagada
+    if pago is not None and pago.campania_id:
+        return EventoProyectable(evento_id or pago.comision_id or evento.id,
+                                 TipoEventoProyeccion.COMISION_PAGADA, pago.campania_id,
+                                 {"comision_id": pago.comision_id, "monto": pago.monto_pagado or 0.0,
+                                  "afiliado_id": pago.afiliado_id, "fecha": pago.fecha_pago},
+                                 _desde_millis(evento.time) or datetime.utcnow())
+    return None
+
+
+# =====================================================================
+# Proyecciones
+# =====================================================================
+
+def _efecto(evento: EventoProyectable) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """(columnas que el evento fija, contadores que incrementa) sobre la fila de la campaña"""
+    datos, tipo = evento.datos, evento.tipo
+    cambios: Dict[str, Any] = {}
+    deltas: Dict[str, float] = {}
+    if tipo == TipoEventoProyeccion.CAMPANIA_CREADA:
+        cambios = {campo: datos.get(campo) for campo in _CAMPOS_CREACION}
+        cambios["estado"] = datos.get("estado") or EstadoCampana.BORRADOR.name
+    elif tipo == TipoEventoProyeccion.CAMPANIA_ACTIVADA:
+        cambios = {"estado": EstadoCampana.ACTIVA.name, "fecha_activacion": datos.get("fecha_activacion") or evento.fecha}
+    elif tipo == TipoEventoProyeccion.CAMPANIA_PAUSADA:
+        cambios = {"estado": EstadoCampana.PAUSADA.name}
+    elif tipo == TipoEventoProyeccion.CAMPANIA_ACTUALIZADA:
+        cambios = {campo: datos.get(campo) for campo in _CAMPOS_ACTUALIZACION}
+    elif tipo == TipoEventoProyeccion.CAMPANIA_ELIMINADA:
+        cambios = {"estado": datos.get("estado")}
+    elif tipo == TipoEventoProyeccion.AFILIADO_AGREGADO:
+        deltas = {"afiliados": 1}
+    elif tipo == TipoEventoProyeccion.CONVERSION_REGISTRADA:
+        deltas = {"conversiones": 1, "ingresos": float(datos.get("valor") or 0.0)}
+    elif tipo == TipoEventoProyeccion.COMISION_CALCULADA:
+        deltas = {"comisiones": 1, "monto_comisiones": float(datos.get("monto") or 0.0)}
+    # los eventos parciales no borran lo que ya tiene la fila
+    cambios = {k: v for k, v in cambios.items() if v is not None and v != ""}
+    cambios["actualizado"] = evento.fecha
+    return cambios, deltas
+
+
+class ProyeccionCampania(ProyeccionLectura):
+    """
+    Una fila por campaña. Acumula por campaña las columnas fijadas y los incrementos de
+    contadores del lote, y los escribe con un upsert por conjunto de columnas.
+    """
+
+    tabla: str = ""
+    columnas: Tuple[str, ...] = ()
+    contadores: Tuple[str, ...] = ()
+    tipos_evento = TIPOS_EVENTO
+
+    def __init__(self) -> None:
+        self._filas: Dict[str, Dict[str, Any]] = {}
+        self._deltas: Dict[str, Dict[str, float]] = {}
+
+    def aplicar(self, evento: EventoProyectable) -> None:
+        cambios, deltas = _efecto(evento)
+        fila = self._filas.setdefault(evento.agregado_id, {})
+        fila.update((k, v) for k, v in cambios.items() if k in self.columnas or k == "actualizado")
+        acumulado = self._deltas.setdefault(evento.agregado_id, {})
+        for contador, valor in deltas.items():
+            if contador in self.contadores:
+                acumulado[contador] = acumulado.get(contador, 0) + valor
+
+    def escribir(self, conn) -> int:
+        filas, deltas = self._filas, self._deltas
+        self.descartar()
+        # agrupa por conjunto de columnas para poder usar executemany
+        grupos: Dict[Tuple[tuple, tuple], List[Dict[str, Any]]] = {}
+        for campania_id, fila in filas.items():
+            incrementos = deltas.get(campania_id, {})
+            clave = (tuple(sorted(fila)), tuple(sorted(incrementos)))
+            grupos.setdefault(clave, []).append({"id": campania_id, **fila, **incrementos})
+        for (cols, incs), lote in grupos.items():
+            todas = ("id",) + cols + incs
+            actualizar = [f"{c}=VALUES({c})" for c in cols] + [f"{c}={c}+VALUES({c})" for c in incs]
+            conn.execute(text(
+                f"INSERT INTO {self.tabla} ({', '.join(todas)}) VALUES ({', '.join(':' + c for c in todas)}) "
+                f"ON DUPLICATE KEY UPDATE {', '.join(actualizar)}"
+            ), lote)
+        return len(filas)
+
+    def descartar(self) -> None:
+        self._filas, self._deltas = {}, {}
+
+    def reiniciar(self, conn) -> None:
+        conn.execute(text(f"DELETE FROM {self.tabla}"))
+
+
+class ProyeccionCampaniasLista(ProyeccionCampania):
+    nombre = "campanias_vista_lista"
+    tabla = "campanias_vista_lista"
+    columnas = ("nombre", "estado", "tipo", "canal_publicidad", "presupuesto", "moneda",
+                "fecha_inicio", "fecha_fin", "fecha_creacion")
+    contadores = ("afiliados", "conversiones", "ingresos")
+
+
+class ProyeccionCampaniaDetalle(ProyeccionCampania):
+    nombre = "campanias_vista_detalle"
+    tabla = "campanias_vista_detalle"
+    columnas = ("estado", "fecha_activacion") + _CAMPOS_CREACION
+    contadores = ("afiliados", "conversiones", "ingresos", "comisiones", "monto_comisiones")
+
+
+class ProyeccionCampaniaConteos(ProyeccionCampania):
+    nombre = "campanias_vista_conteos"
+    tabla = "campanias_vista_conteos"
+    columnas = ()
+    contadores = ("afiliados", "conversiones", "ingresos", "comisiones", "monto_comisiones")
+
+
+def _dia(valor, por_defecto: datetime) -> date:
+    """Día al que se imputa el hecho (fecha del payload; si no se puede leer, la del evento)"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    if valor:
+        try:
+            return datetime.fromisoformat(str(valor).replace("Z", "+00:00")).date()
+        except ValueError:
+            pass
+    return (por_defecto or datetime.utcnow()).date()
+
+
+class ProyeccionCampaniaMetricas(ProyeccionLectura):
+    """
+    Métricas de rendimiento por campaña, a partir de conversiones y comisiones:
+
+    - `campanias_metricas`: una fila por (campaña, día) con conversiones, ingresos,
+      monto de comisiones y lo pagado. Tiene FK a `campanias`.
+    - `campanias_metricas_totales`: una fila por campaña con los acumulados, el número
+      de comisiones, lo pagado y los afiliados únicos; es la que se lee sin rango de fechas.
+    - `campanias_metricas_afiliados`: pares (campaña, día, afiliado) vistos, para contar
+      afiliados únicos (en total o en un rango) sin guardar cada evento.
+
+    Entre flushes los incrementos se acumulan en memoria por campaña y por día.
+
+    Los hechos de una campaña que aún no está en `campanias` no se escriben en ninguna
+    de las tres tablas (así diarias y totales no divergen): la campaña queda en
+    `campanias_metricas_pendientes` y, cuando ya existe, sus hechos se vuelven a leer
+    del journal hasta la posición del lote actual y se escriben completos.
+    """
+
+    nombre = "campanias_metricas"
+    tabla = "campanias_metricas"
+    tabla_totales = "campanias_metricas_totales"
+    tabla_afiliados = "campanias_metricas_afiliados"
+    tabla_pendientes = "campanias_metricas_pendientes"
+    tabla_journal = TABLA_JOURNAL
+    tipos_hecho = frozenset({
+        TipoEventoProyeccion.CONVERSION_REGISTRADA,
+        TipoEventoProyeccion.COMISION_CALCULADA,
+        TipoEventoProyeccion.COMISION_PAGADA,
+    })
+    # CAMPANIA_CREADA no suma nada: solo hace que el flush revise las campanias pendientes
+    tipos_evento = tipos_hecho | {TipoEventoProyeccion.CAMPANIA_CREADA}
+    diarias = ("conversiones_total", "ingresos_generados", "comisiones_generadas", "comisiones_pagadas")
+    totales = ("conversiones_total", "ingresos_generados", "comisiones_total", "comisiones_generadas", "comisiones_pagadas")
+
+    def __init__(self) -> None:
+        self.descartar()
+
+    def aplicar(self, evento: EventoProyectable) -> None:
+        if evento.posicion and evento.posicion > (self._hasta or 0):
+            self._hasta = evento.posicion
+        datos, tipo = evento.datos, evento.tipo
+        if tipo == TipoEventoProyeccion.CONVERSION_REGISTRADA:
+            deltas = {"conversiones_total": 1, "ingresos_generados": float(datos.get("valor") or 0.0)}
+        elif tipo == TipoEventoProyeccion.COMISION_CALCULADA:
+            deltas = {"comisiones_total": 1, "comisiones_generadas": float(datos.get("monto") or 0.0)}
+        elif tipo == TipoEventoProyeccion.COMISION_PAGADA:
+            deltas = {"comisiones_pagadas": float(datos.get("monto") or 0.0)}
+        else:
+            return
+        campania_id = evento.agregado_id
+        dia = _dia(datos.get("fecha"), evento.fecha)
+
+        diaria = self._diarias.setdefault((campania_id, dia), {})
+        total = self._totales.setdefault(campania_id, {})
+        for columna, valor in deltas.items():
+            if columna in self.diarias:
+                diaria[columna] = diaria.get(columna, 0) + valor
+            total[columna] = total.get(columna, 0) + valor
+        if datos.get("afiliado_id") and tipo != TipoEventoProyeccion.COMISION_PAGADA:
+            self._afiliados.add((campania_id, dia, datos["afiliado_id"]))
+        self._actualizado = max(self._actualizado or evento.fecha, evento.fecha)
+
+    def escribir(self, conn) -> int:
+        self._apartar_sin_campania(conn)
+        self._recuperar_pendientes(conn)
+        diarias, totales, afiliados, actualizado = self._diarias, self._totales, self._afiliados, self._actualizado
+        self.descartar()
+        if not totales:
+            return 0
+
+        columnas = ", ".join(self.diarias)
+        incrementos = ", ".join(f"{c} = {c} + VALUES({c})" for c in self.diarias)
+        conn.execute(text(
+            f"INSERT INTO {self.tabla} (id, campania_id, fecha, {columnas}) "
+            f"VALUES (:id, :campania_id, :fecha, {', '.join(':' + c for c in self.diarias)}) "
+            f"ON DUPLICATE KEY UPDATE {incrementos}"
+        ), [
+            {"id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{campania_id}:{dia}")), "campania_id": campania_id,
+             "fecha": dia, **{c: fila.get(c, 0) for c in self.diarias}}
+            for (campania_id, dia), fila in diarias.items()
+        ])
+
+        columnas = ", ".join(self.totales)
+        conn.execute(text(
+            f"INSERT INTO {self.tabla_totales} (campania_id, {columnas}, actualizado) "
+            f"VALUES (:campania_id, {', '.join(':' + c for c in self.totales)}, :actualizado) "
+            f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = {c} + VALUES({c})' for c in self.totales)}, "
+            f"actualizado = VALUES(actualizado)"
+        ), [
+            {"campania_id": campania_id, "actualizado": actualizado, **{c: fila.get(c, 0) for c in self.totales}}
+            for campania_id, fila in totales.items()
+        ])
+
+        if afiliados:
+            conn.execute(text(
+                f"INSERT IGNORE INTO {self.tabla_afiliados} (campania_id, fecha, afiliado_id) "
+                f"VALUES (:campania_id, :fecha, :afiliado_id)"
+            ), [{"campania_id": c, "fecha": d, "afiliado_id": a} for c, d, a in afiliados])
+            # recuento solo de las campanias con afiliados nuevos en el lote
+            conn.execute(text(
+                f"UPDATE {self.tabla_totales} SET afiliados_unicos = ("
+                f"SELECT COUNT(DISTINCT afiliado_id) FROM {self.tabla_afiliados} WHERE campania_id = :campania_id"
+                f") WHERE campania_id = :campania_id"
+            ), [{"campania_id": c} for c in {c for c, _, _ in afiliados}])
+        return len(totales) + len(diarias)
+
+    def _apartar_sin_campania(self, conn) -> None:
+        """Deja pendientes las campanias del lote que no están en `campanias` y quita sus hechos."""
+        if not self._totales:
+            return
+        existentes = {
+            fila[0] for fila in conn.execute(
+                text("SELECT id FROM campanias WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(self._totales)}
+            )
+        }
+        faltantes = set(self._totales) - existentes
+        if not faltantes:
+            return
+        # sus hechos ya están en el journal; se releen de ahí cuando la campaña exista
+        conn.execute(text(f"INSERT IGNORE INTO {self.tabla_pendientes} (campania_id) VALUES (:campania_id)"),
+                     [{"campania_id": c} for c in faltantes])
+        self._quitar(faltantes)
+
+    def _recuperar_pendientes(self, conn) -> None:
+        """Reemplaza los hechos de las campanias pendientes que ya existen por los del journal."""
+        listas = [fila[0] for fila in conn.execute(text(
+            f"SELECT p.campania_id FROM {self.tabla_pendientes} p JOIN campanias c ON c.id = p.campania_id"
+        ))]
+        if not listas:
+            return
+        # lo del lote actual también está en el journal (misma transacción): se descarta de memoria
+        # y se relee; el tope de posición evita adelantar eventos de un replay en curso
+        self._quitar(set(listas))
+        tope = "AND posicion <= :hasta" if self._hasta else ""
+        filas = conn.execute(
+            text(f"SELECT posicion, evento_id, tipo, agregado_id, datos, fecha FROM {self.tabla_journal} "
+                 f"WHERE agregado_id IN :ids AND tipo IN :tipos {tope} ORDER BY posicion")
+            .bindparams(bindparam("ids", expanding=True), bindparam("tipos", expanding=True)),
+            {"ids": listas, "tipos": sorted(self.tipos_hecho), "hasta": self._hasta}
+        ).mappings()
+        for fila in filas:
+            self.aplicar(EventoProyectable(
+                id=fila["evento_id"], tipo=fila["tipo"], agregado_id=fila["agregado_id"],
+                datos=json.loads(fila["datos"] or "{}"), fecha=fila["fecha"], posicion=fila["posicion"]
+            ))
+        conn.execute(
+            text(f"DELETE FROM {self.tabla_pendientes} WHERE campania_id IN :ids")
+            .bindparams(bindparam("ids", expanding=True)),
+            {"ids": listas}
+        )
+
+    def _quitar(self, campanias: set) -> None:
+        for campania_id in campanias:
+            self._totales.pop(campania_id, None)
+        self._diarias = {k: v for k, v in self._diarias.items() if k[0] not in campanias}
+        self._afiliados = {a for a in self._afiliados if a[0] not in campanias}
+
+    def descartar(self) -> None:
+        self._diarias: Dict[Tuple[str, date], Dict[str, float]] = {}
+        self._totales: Dict[str, Dict[str, float]] = {}
+        self._afiliados: set = set()
+        self._actualizado: Optional[datetime] = None
+        self._hasta: Optional[int] = None
+
+    def reiniciar(self, conn) -> None:
+        for tabla in (self.tabla, self.tabla_totales, self.tabla_afiliados, self.tabla_pendientes):
+            conn.execute(text(f"DELETE FROM {tabla}"))
+
+
+def motor_proyecciones_campanias(engine=None) -> MotorProyecciones:
+    """Motor de proyecciones de campanias (uno por BD, con su hilo de flush)"""
+    if engine is None:
+        from campanias.config.db import engine
+    return motor_para(str(engine.url), lambda: MotorProyecciones(
+        engine,
+        [ProyeccionCampaniasLista(), ProyeccionCampaniaDetalle(), ProyeccionCampaniaConteos(),
+         ProyeccionCampaniaMetricas()],
+        tabla_journal=TABLA_JOURNAL,
+        tamano_lote=int(os.getenv("CAMPANIAS_PROYECCIONES_LOTE", "200")),
+        intervalo_segundos=float(os.getenv("CAMPANIAS_PROYECCIONES_INTERVALO", "1.0")),
+        max_pendientes=int(os.getenv("CAMPANIAS_PROYECCIONES_MAX_PENDIENTES", "10000")),
+        max_intentos=int(os.getenv("CAMPANIAS_PROYECCIONES_MAX_INTENTOS", "5")),
+    ))
+
+
+if __name__ == "__main__":
+    # python -m campanias.modulos.infraestructura.proyecciones [proyeccion ...]  → reconstruye desde el journal
+    import sys
+
+    resultado = motor_proyecciones_campanias().reconstruir(sys.argv[1:] or None)
+    print(f"✅ Proyecciones reconstruidas: {resultado}")
@@ -1,8 +1,23 @@
 from abc import ABC
 from campanias.seedwork.dominio.repositorios import Repositorio
+from campanias.seedwork.infraestructura.uow import conexion_actual
 from campanias.modulos.dominio.entidades import Campaña
 from campanias.modulos.dominio.eventos import EventoDominioCampania
-from typing import List, Optional
+from campanias.modulos.dominio.objetos_valor import (
+    NombreCampaña, DescripcionCampaña, FechaInicio, FechaFin, CodigoCampana,
+    EstadoCampana, TipoCampana, CanalPublicidad, ObjetivoCampana,
+    Presupuesto, Moneda, SegmentoAudiencia
+)
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+import base64
+import json
+import re
+import threading
 
 class RepositorioCampanias(Repositorio, ABC):
     """Repositorio para gestionar campanias"""
@@ -15,6 +30,25 @@ class RepositorioCampanias(Repositorio, ABC):
         """Obtiene todas las campanias"""
         raise NotImplementedError()
     
+    def obtener_pagina(
+        self,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        desplazamiento: int = 0,
+        limite: Optional[int] = None
+    ) -> Tuple[List[Campaña], int]:
+        """
+        Obtiene una página de campanias filtradas y el total que cumple el filtro.
+        Las implementaciones con BD deben resolverlo en la consulta (WHERE + LIMIT/OFFSET + COUNT).
+        """
+        campanias = self.obtener_todos()
+        if estado:
+            campanias = [c for c in campanias if c.estado.value == estado]
+        if tipo:
+            campanias = [c for c in campanias if c.tipo.value == tipo]
+        fin = None if limite is None else desplazamiento + limite
+        return campanias[desplazamiento:fin], len(campanias)
+    
     def agregar(self, campania: Campaña):
         """Agrega una nueva campaña"""
         raise NotImplementedError()
@@ -27,6 +61,401 @@ class RepositorioCampanias(Repositorio, ABC):
         """Elimina una campaña por su ID"""
         raise NotImplementedError()
 
+# ==========================================
+# IMPLEMENTACIÓN SQLALCHEMY (tabla `campanias`)
+# ==========================================
+
+# atributo de la entidad → columnas candidatas (el esquema varía entre init-*.sql)
+_CANDIDATAS = {
+    "id": ("id",),
+    "nombre": ("nombre",),
+    "descripcion": ("descripcion",),
+    "estado": ("estado",),
+    "tipo": ("tipo_campania", "tipo_campana", "tipo"),
+    "canal_publicidad": ("canal_publicidad",),
+    "objetivo": ("objetivo", "objetivo_campana"),
+    "fecha_inicio": ("fecha_inicio",),
+    "fecha_fin": ("fecha_fin",),
+    "presupuesto": ("presupuesto",),
+    "moneda": ("moneda",),
+    "codigo_campana": ("codigo_campana",),
+    "segmento_audiencia": ("segmento_audiencia",),
+    "fecha_creacion": ("fecha_creacion",),
+    "fecha_actualizacion": ("fecha_actualizacion",),
+}
+
+# Proyección para listados: lo que necesita CampañaDTO (nunca SELECT *)
+COLUMNAS_LISTADO = (
+    "id", "nombre", "descripcion", "estado", "tipo", "canal_publicidad", "objetivo",
+    "fecha_inicio", "fecha_fin", "presupuesto", "moneda", "codigo_campana",
+    "segmento_audiencia", "fecha_creacion", "fecha_actualizacion",
+)
+
+# El ENUM de la tabla usa CREADA donde el dominio dice BORRADOR
+_ESTADO_A_BD = {"BORRADOR": "CREADA"}
+_ESTADO_DE_BD = {v: k for k, v in _ESTADO_A_BD.items()}
+
+# Atributos que la tabla debe poder guardar: si la columna falta, escribir o filtrar
+# por ellos es un error de esquema (migraciones/campanias/001_columnas_dominio.sql),
+# no un dato que se pueda descartar en silencio. Las fechas de auditoría son opcionales.
+_OBLIGATORIAS = frozenset(_CANDIDATAS) - {"fecha_creacion", "fecha_actualizacion"}
+
+_esquemas: Dict[str, Dict[str, Optional[str]]] = {}
+_vocabularios: Dict[str, Dict[str, frozenset]] = {}
+_esquemas_lock = threading.Lock()
+
+_VALOR_ENUM = re.compile(r"'((?:[^']|'')*)'")
+
+
+class ErrorEsquemaCampanias(RuntimeError):
+    """La tabla `campanias` no tiene la columna que necesita la operación"""
+
+    def __init__(self, atributo: str, operacion: str):
+        self.atributo = atributo
+        super().__init__(
+            f"La tabla `campanias` no tiene columna para `{atributo}` ({operacion}); "
+            f"aplicar migraciones/campanias/001_columnas_dominio.sql"
+        )
+
+
+def _detectar_esquema(engine: Engine) -> None:
+    """Columnas reales de `campanias` por atributo y valores de sus ENUM; una vez por engine."""
+    clave = str(engine.url)
+    with _esquemas_lock:
+        if clave in _esquemas:
+            return
+        with engine.connect() as conn:
+            filas = conn.execute(text("""
+                SELECT COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'campanias'
+            """)).fetchall()
+        tipos = {f[0]: str(f[1]) for f in filas}
+        if "id" not in tipos:
+            raise RuntimeError("No existe la tabla `campanias` en la BD actual.")
+        columnas = {
+            atributo: next((c for c in candidatas if c in tipos), None)
+            for atributo, candidatas in _CANDIDATAS.items()
+        }
+        _vocabularios[clave] = {
+            atributo: frozenset(v.replace("''", "'") for v in _VALOR_ENUM.findall(tipos[col]))
+            for atributo, col in columnas.items()
+            if col and tipos[col].lower().startswith("enum(")
+        }
+        _esquemas[clave] = columnas
+
+
+def _columnas_para(engine: Engine) -> Dict[str, Optional[str]]:
+    """Columnas reales de `campanias` por atributo (None si la tabla no la tiene)"""
+    _detectar_esquema(engine)
+    return _esquemas[str(engine.url)]
+
+
+def _vocabularios_para(engine: Engine) -> Dict[str, frozenset]:
+    """Valores admitidos por las columnas ENUM de `campanias`, por atributo"""
+    _detectar_esquema(engine)
+    return _vocabularios[str(engine.url)]
+
+
+def _enum_o_texto(enum_cls, valor: Any) -> Any:
+    """Miembro del enum por nombre o valor (sin distinguir mayúsculas); si no calza, el texto tal cual."""
+    if valor is None or isinstance(valor, enum_cls):
+        return valor
+    texto = str(valor)
+    for miembro in enum_cls:
+        if texto.upper() in (miembro.name, miembro.value.upper()):
+            return miembro
+    return texto
+
+
+def _plano(valor: Any, atributo: str) -> Any:
+    """Valor primitivo de un objeto valor / enum / primitivo"""
+    if isinstance(valor, Enum):
+        return valor.name
+    return getattr(valor, atributo, valor)
+
+
+def _estado_a_bd(estado: Any) -> str:
+    nombre = _plano(_enum_o_texto(EstadoCampana, estado), "estado")
+    nombre = str(nombre).upper()
+    return _ESTADO_A_BD.get(nombre, nombre)
+
+
+class RepositorioCampaniasSQLAlchemy(RepositorioCampanias):
+    """
+    Campanias sobre la tabla `campanias` (MySQL):
+    - filtros estado/tipo/canal en el WHERE (índices idx_estado/idx_tipo/idx_canal);
+      filtrar o escribir un atributo sin columna lanza ErrorEsquemaCampanias,
+    - paginación por desplazamiento (LIMIT/OFFSET + COUNT) o keyset sobre (fecha_creacion, id),
+    - proyección: solo se leen las columnas pedidas,
+    - `agregar_muchos`: un INSERT multi-fila con upsert (y `agregar_uno_a_uno`
+      como respaldo por fila cuando la BD rechaza el lote).
+    """
+
+    def __init__(self, engine: Optional[Engine] = None):
+        if engine is None:
+            from campanias.config.db import engine
+        self.engine = engine
+        self._c: Optional[Dict[str, Optional[str]]] = None
+
+    @property
+    def columnas(self) -> Dict[str, Optional[str]]:
+        if self._c is None:
+            self._c = _columnas_para(self.engine)
+        return self._c
+
+    def valores_admitidos(self, atributo: str) -> Optional[frozenset]:
+        """Valores que acepta la columna ENUM del atributo (None si no es ENUM: acepta cualquiera)"""
+        return _vocabularios_para(self.engine).get(atributo)
+
+    # ------- lectura --------
+    def obtener_por_id(self, id: str) -> Optional[Campaña]:
+        sql = f"SELECT {self._select(None)} FROM campanias WHERE {self.columnas['id']} = :id"
+        with self.engine.connect() as conn:
+            fila = conn.execute(text(sql), {"id": str(id)}).mappings().first()
+        return self._a_entidad(fila) if fila else None
+
+    def obtener_todos(self) -> List[Campaña]:
+        campanias, _ = self.obtener_pagina()
+        return campanias
+
+    def obtener_pagina(
+        self,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        desplazamiento: int = 0,
+        limite: Optional[int] = None,
+        canal: Optional[str] = None,
+        columnas: Optional[Sequence[str]] = None,
+        contar: bool = True
+    ) -> Tuple[List[Campaña], int]:
+        """
+        Página por desplazamiento; el total sale de un COUNT(*) con el mismo WHERE
+        (se omite si la página ya lo deja claro o con contar=False → -1).
+        Con `columnas` las entidades quedan parciales: son de solo lectura.
+        """
+        where, params = self._filtros(estado, tipo, canal)
+        sql = f"SELECT {self._select(columnas)} FROM campanias {where} ORDER BY {self._orden()}"
+        if limite is not None:
+            sql += " LIMIT :lim OFFSET :off"
+            params.update(lim=limite, off=desplazamiento)
+        elif desplazamiento:
+            sql += " LIMIT 18446744073709551615 OFFSET :off"
+            params["off"] = desplazamiento
+        with self.engine.connect() as conn:
+            filas = conn.execute(text(sql), params).mappings().all()
+            campanias = [self._a_entidad(f) for f in filas]
+            if not contar:
+                return campanias, -1
+            if limite is None or (len(filas) < limite and (filas or not desplazamiento)):
+                # página incompleta: el total se deduce sin volver a la BD
+                total = desplazamiento + len(filas)
+            else:
+                total = conn.execute(text(f"SELECT COUNT(*) FROM campanias {where}"), params).scalar_one()
+        return campanias, int(total)
+
+    def obtener_pagina_cursor(
+        self,
+        cursor: Optional[str] = None,
+        limite: int = 50,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        canal: Optional[str] = None,
+        columnas: Optional[Sequence[str]] = None
+    ) -> Tuple[List[Campaña], Optional[str]]:
+        """
+        Página keyset (más recientes primero) sobre (fecha_creacion, id): cada página es
+        un range scan acotado, sin OFFSET ni COUNT. Devuelve (campanias, siguiente_cursor).
+        """
+        fc, pk = self.columnas["fecha_creacion"], self.columnas["id"]
+        if not fc:
+            raise RuntimeError("La tabla `campanias` no tiene fecha_creacion; no se puede paginar por cursor.")
+        where, params = self._filtros(estado, tipo, canal)
+        if cursor:
+            params["cfc"], params["cpk"] = self._decodificar_cursor(cursor)
+            condicion = f"({fc} < :cfc OR ({fc} = :cfc AND {pk} < :cpk))"
+            where = f"{where} AND {condicion}" if where else f"WHERE {condicion}"
+        params["lim"] = limite + 1
+        sql = f"SELECT {self._select(columnas)} FROM campanias {where} ORDER BY {self._orden()} LIMIT :lim"
+        with self.engine.connect() as conn:
+            filas = conn.execute(text(sql), params).mappings().all()
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            siguiente = self._codificar_cursor(filas[-1]["fecha_creacion"], filas[-1]["id"])
+        return [self._a_entidad(f) for f in filas], siguiente
+
+    # ------- escritura --------
+    def agregar(self, campania: Campaña):
+        self.agregar_muchos([campania])
+
+    def agregar_muchos(self, campanias: Sequence[Campaña]) -> int:
+        """
+        Inserta (o actualiza si el id ya existe) todas las campanias con un único
+        INSERT multi-fila; devuelve las filas afectadas.
+        """
+        if not campanias:
+            return 0
+        filas = [self._a_fila(c) for c in campanias]
+        cols = list(filas[0].keys())
+        pk = self.columnas["id"]
+        actualizar = ", ".join(f"{c} = VALUES({c})" for c in cols if c != pk)
+        sql = (
+            f"INSERT INTO campanias ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)})"
+            + (f" ON DUPLICATE KEY UPDATE {actualizar}" if actualizar else "")
+        )
+        with self._transaccion() as conn:
+            # executemany de un INSERT ... VALUES: PyMySQL lo reescribe como un solo INSERT multi-fila
+            return conn.execute(text(sql), filas).rowcount
+
+    def agregar_uno_a_uno(self, campanias: Sequence[Campaña]) -> List[Optional[str]]:
+        """
+        Camino lento de `agregar_muchos`: cada campaña en su propio SAVEPOINT, para que
+        una fila que la BD rechaza no arrastre a las demás. Devuelve el error de cada
+        campaña (None si quedó guardada), en el mismo orden.
+        """
+        errores: List[Optional[str]] = []
+        with self._transaccion() as conn:
+            for campania in campanias:
+                try:
+                    fila = self._a_fila(campania)
+                    cols = list(fila)
+                    actualizar = ", ".join(f"{c} = VALUES({c})" for c in cols if c != self.columnas["id"])
+                    sql = (
+                        f"INSERT INTO campanias ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)})"
+                        + (f" ON DUPLICATE KEY UPDATE {actualizar}" if actualizar else "")
+                    )
+                    with conn.begin_nested():
+                        conn.execute(text(sql), fila)
+                    errores.append(None)
+                except Exception as e:
+                    errores.append(str(e) or type(e).__name__)
+        return errores
+
+    def actualizar(self, campania: Campaña):
+        fila = self._a_fila(campania)
+        pk = self.columnas["id"]
+        sets = ", ".join(f"{c} = :{c}" for c in fila if c != pk)
+        with self._transaccion() as conn:
+            conn.execute(text(f"UPDATE campanias SET {sets} WHERE {pk} = :{pk}"), fila)
+
+    def eliminar(self, id: str):
+        with self._transaccion() as conn:
+            conn.execute(text(f"DELETE FROM campanias WHERE {self.columnas['id']} = :id"), {"id": str(id)})
+
+    # ------- helpers --------
+    @contextmanager
+    def _transaccion(self):
+        """La transacción de la unidad de trabajo en curso o, si no hay, una propia"""
+        conn = conexion_actual(self.engine)
+        if conn is not None:
+            yield conn
+            return
+        with self.engine.begin() as conn:
+            yield conn
+
+    def _select(self, columnas: Optional[Sequence[str]]) -> str:
+        atributos = set(columnas or COLUMNAS_LISTADO) | {"id", "fecha_creacion"}
+        return ", ".join(
+            f"{col} AS {atributo}" for atributo, col in self.columnas.items()
+            if col and atributo in atributos
+        )
+
+    def _orden(self) -> str:
+        fc, pk = self.columnas["fecha_creacion"], self.columnas["id"]
+        return f"{fc} DESC, {pk} DESC" if fc else f"{pk} DESC"
+
+    def _filtros(self, estado: Optional[str], tipo: Optional[str], canal: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        condiciones: List[str] = []
+        params: Dict[str, Any] = {}
+        for atributo, valor, a_bd in (
+            ("estado", estado, _estado_a_bd),
+            ("tipo", tipo, lambda v: str(_plano(_enum_o_texto(TipoCampana, v), "tipo")).upper()),
+            ("canal_publicidad", canal, lambda v: _plano(_enum_o_texto(CanalPublicidad, v), "canal_publicidad")),
+        ):
+            if not valor:
+                continue
+            col = self.columnas[atributo]
+            if not col:
+                # la tabla no guarda el atributo: responder [] ocultaría el problema
+                raise ErrorEsquemaCampanias(atributo, "filtro")
+            condiciones.append(f"{col} = :{atributo}")
+            params[atributo] = a_bd(valor)
+        return (f"WHERE {' AND '.join(condiciones)}" if condiciones else ""), params
+
+    @staticmethod
+    def _a_entidad(fila) -> Campaña:
+        f = dict(fila)
+        estado = f.get("estado")
+        if isinstance(estado, str):
+            estado = _ESTADO_DE_BD.get(estado.upper(), estado)
+        campania = Campaña(
+            nombre=NombreCampaña(f.get("nombre")),
+            descripcion=DescripcionCampaña(f.get("descripcion")),
+            estado=_enum_o_texto(EstadoCampana, estado) or EstadoCampana.BORRADOR,
+            tipo=_enum_o_texto(TipoCampana, f.get("tipo")),
+            canal_publicidad=_enum_o_texto(CanalPublicidad, f.get("canal_publicidad")),
+            objetivo=_enum_o_texto(ObjetivoCampana, f.get("objetivo")),
+            fecha_inicio=FechaInicio(f.get("fecha_inicio")),
+            fecha_fin=FechaFin(f.get("fecha_fin")),
+            presupuesto=Presupuesto(float(f["presupuesto"]) if f.get("presupuesto") is not None else 0.0),
+            moneda=Moneda(f.get("moneda") or "USD"),
+            codigo_campana=CodigoCampana(f.get("codigo_campana")),
+            segmento_audiencia=SegmentoAudiencia(f.get("segmento_audiencia")),
+        )
+        # El setter de `id` siempre genera uno nuevo; la identidad persistida se asigna directo
+        campania._id = f["id"]
+        for atributo in ("fecha_creacion", "fecha_actualizacion"):
+            if f.get(atributo) is not None:
+                setattr(campania, atributo, f[atributo])
+        return campania
+
+    def _a_fila(self, campania: Campaña) -> Dict[str, Any]:
+        valores = {
+            "id": str(campania.id),
+            "nombre": _plano(campania.nombre, "nombre"),
+            "descripcion": _plano(campania.descripcion, "descripcion"),
+            "estado": _estado_a_bd(campania.estado) if campania.estado else None,
+            "tipo": _plano(_enum_o_texto(TipoCampana, campania.tipo), "tipo"),
+            "canal_publicidad": _plano(_enum_o_texto(CanalPublicidad, campania.canal_publicidad), "canal_publicidad"),
+            "objetivo": _plano(_enum_o_texto(ObjetivoCampana, campania.objetivo), "objetivo"),
+            "fecha_inicio": _plano(campania.fecha_inicio, "fecha_inicio"),
+            "fecha_fin": _plano(campania.fecha_fin, "fecha_fin"),
+            "presupuesto": _plano(campania.presupuesto, "presupuesto"),
+            "moneda": _plano(campania.moneda, "moneda"),
+            "codigo_campana": _plano(campania.codigo_campana, "codigo_campana"),
+            "segmento_audiencia": _plano(campania.segmento_audiencia, "segmento_audiencia"),
+            "fecha_creacion": campania.fecha_creacion,
+            "fecha_actualizacion": campania.fecha_actualizacion,
+        }
+        fila: Dict[str, Any] = {}
+        for atributo, valor in valores.items():
+            col = self.columnas[atributo]
+            if not col:
+                if valor is not None and atributo in _OBLIGATORIAS:
+                    raise ErrorEsquemaCampanias(atributo, "escritura")
+                continue
+            admitidos = self.valores_admitidos(atributo)
+            if valor is not None and admitidos is not None and valor not in admitidos:
+                raise ValueError(
+                    f"{atributo} {valor} no es admitido por campanias.{col} (admitidos: {', '.join(sorted(admitidos))})"
+                )
+            fila[col] = valor
+        return fila
+
+    @staticmethod
+    def _codificar_cursor(fc: datetime, pk: str) -> str:
+        crudo = json.dumps([fc.isoformat(), pk], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decodificar_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            fc, pk = json.loads(crudo)
+            return datetime.fromisoformat(fc), str(pk)
+        except Exception:
+            raise ValueError("cursor inválido")
+
 class RepositorioEventosCampanias(Repositorio, ABC):
     """Repositorio para gestionar eventos de dominio de campanias"""
     
@@ -75,6 +75,7 @@ class LanzarCampaniaCompletaPayload(Record):
     presupuesto = Double()
     moneda = String()
     segmento_audiencia = String()
+    prioridad = String()  # BAJA | MEDIA | ALTA | CRITICA (admisión de sagas)
 
 class ComandoLanzarCampaniaCompleta(Mensaje):
     id = String(default=str(uuid.uuid4()))
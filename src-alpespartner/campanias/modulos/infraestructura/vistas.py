@@ -0,0 +1,55 @@
+from datetime import date
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from campanias.seedwork.infraestructura.vistas import VistaTabla
+from campanias.modulos.infraestructura.proyecciones import (
+    ProyeccionCampaniasLista, ProyeccionCampaniaDetalle, ProyeccionCampaniaConteos, ProyeccionCampaniaMetricas
+)
+
+
+class VistaCampaniasLista(VistaTabla):
+    """Listado de campanias con sus contadores principales (`campanias_vista_lista`)"""
+    tabla = ProyeccionCampaniasLista.tabla
+    columnas = ProyeccionCampaniasLista.columnas + ProyeccionCampaniasLista.contadores + ("actualizado",)
+
+
+class VistaCampaniaDetalle(VistaTabla):
+    """Campaña completa con todos sus contadores en una sola fila (`campanias_vista_detalle`)"""
+    tabla = ProyeccionCampaniaDetalle.tabla
+    columnas = ProyeccionCampaniaDetalle.columnas + ProyeccionCampaniaDetalle.contadores + ("actualizado",)
+
+
+class VistaCampaniaConteos(VistaTabla):
+    """Contadores por campaña (`campanias_vista_conteos`)"""
+    tabla = ProyeccionCampaniaConteos.tabla
+    columnas = ProyeccionCampaniaConteos.contadores + ("actualizado",)
+
+
+class VistaCampaniaMetricas(VistaTabla):
+    """Métricas acumuladas por campaña (`campanias_metricas_totales`); por rango de días desde `campanias_metricas`"""
+    tabla = ProyeccionCampaniaMetricas.tabla_totales
+    pk = "campania_id"
+    columnas = ProyeccionCampaniaMetricas.totales + ("afiliados_unicos", "actualizado")
+
+    def obtener_rango(self, campania_id: str, desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, Any]:
+        """Suma de las filas diarias del rango (range scan sobre `unique_campania_fecha`) y afiliados únicos"""
+        condiciones, params = ["campania_id = :campania_id"], {"campania_id": campania_id}
+        if desde is not None:
+            condiciones.append("fecha >= :desde")
+            params["desde"] = desde
+        if hasta is not None:
+            condiciones.append("fecha <= :hasta")
+            params["hasta"] = hasta
+        where = " AND ".join(condiciones)
+        sumas = ", ".join(f"COALESCE(SUM({c}), 0) AS {c}" for c in ProyeccionCampaniaMetricas.diarias)
+        with self.engine.connect() as conn:
+            fila = dict(conn.execute(text(
+                f"SELECT {sumas}, MAX(fecha_actualizacion) AS actualizado "
+                f"FROM {ProyeccionCampaniaMetricas.tabla} WHERE {where}"
+            ), params).mappings().first() or {})
+            fila["afiliados_unicos"] = conn.execute(text(
+                f"SELECT COUNT(DISTINCT afiliado_id) FROM {ProyeccionCampaniaMetricas.tabla_afiliados} WHERE {where}"
+            ), params).scalar_one()
+        return fila
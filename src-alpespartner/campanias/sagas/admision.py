@@ -0,0 +1,272 @@
+# campanias/sagas/admision.py
+"""
+Control de admisión de sagas por prioridad.
+
+- Una cola acotada por prioridad (BAJA..CRITICA, igual que `sagas.prioridad`).
+- Planificación weighted round-robin "suave" entre colas no vacías.
+- Límite de sagas en vuelo POR RÉPLICA: un cupo se ocupa al iniciar la saga y se
+  libera cuando llega a cualquier estado terminal (completada, fallida, cancelada
+  o compensada) o vence su lease, por si nunca llega el evento. El conteo vive en
+  memoria de cada proceso: con N réplicas el tope efectivo es N × SAGAS_MAX_EN_VUELO,
+  así que se dimensiona como límite global / réplicas.
+- La respuesta que cierra una saga la recibe cualquier réplica (suscripción
+  Shared), no necesariamente la que la arrancó: `reconciliar` consulta
+  periódicamente el estado de las sagas en vuelo y libera las ya terminadas, sin
+  esperar al lease.
+- `encolar` devuelve un futuro que se resuelve cuando la saga efectivamente
+  arrancó: el consumidor confirma (ack) el comando recién entonces, así un
+  reinicio con sagas en cola no las pierde (Pulsar reentrega lo no confirmado).
+- Parte del cupo se reserva para ALTA/CRITICA, para que una importación masiva
+  de baja prioridad no deje sin lugar a los lanzamientos críticos.
+- Si la cola de una prioridad está llena se rechaza de inmediato (SagaRechazada → 429).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+class Prioridad(str, Enum):
+    BAJA = "BAJA"
+    MEDIA = "MEDIA"
+    ALTA = "ALTA"
+    CRITICA = "CRITICA"
+
+    @classmethod
+    def normalizar(cls, valor: Any) -> "Prioridad":
+        if isinstance(valor, Prioridad):
+            return valor
+        try:
+            return cls(str(valor or "").strip().upper())
+        except ValueError:
+            return cls.MEDIA
+
+
+PESOS_DEFAULT: Dict[Prioridad, int] = {
+    Prioridad.CRITICA: 8,
+    Prioridad.ALTA: 4,
+    Prioridad.MEDIA: 2,
+    Prioridad.BAJA: 1,
+}
+
+_PRIORIDADES_CON_RESERVA = {Prioridad.ALTA, Prioridad.CRITICA}
+
+
+class SagaRechazada(Exception):
+    """La saga no se admite ahora (cola llena); el cliente debe reintentar más tarde."""
+
+    def __init__(self, prioridad: Prioridad, motivo: str, reintentar_en_segundos: int = 1):
+        self.prioridad = prioridad
+        self.motivo = motivo
+        self.reintentar_en_segundos = reintentar_en_segundos
+        super().__init__(motivo)
+
+
+@dataclass
+class _SagaEnCola:
+    saga_id: str
+    prioridad: Prioridad
+    trabajo: Callable[[], Any]
+    iniciada: asyncio.Future
+    encolada_en: float = field(default_factory=time.monotonic)
+
+
+class ControladorAdmision:
+
+    def __init__(
+        self,
+        max_en_vuelo: int = 50,
+        capacidad_por_prioridad: int = 200,
+        reserva_alta_prioridad: int = 5,
+        ttl_en_vuelo_segundos: float = 300.0,
+        pesos: Optional[Dict[Prioridad, int]] = None,
+    ) -> None:
+        self.max_en_vuelo = max(1, max_en_vuelo)
+        self.capacidad_por_prioridad = max(1, capacidad_por_prioridad)
+        self.reserva_alta_prioridad = min(max(0, reserva_alta_prioridad), self.max_en_vuelo - 1)
+        self.ttl_en_vuelo_segundos = ttl_en_vuelo_segundos
+        self.pesos = dict(pesos or PESOS_DEFAULT)
+
+        self._colas: Dict[Prioridad, Deque[_SagaEnCola]] = {p: deque() for p in Prioridad}
+        self._credito: Dict[Prioridad, int] = {p: 0 for p in Prioridad}
+        self._encoladas: set = set()
+        self._en_vuelo: Dict[str, float] = {}  # saga_id -> vencimiento del lease (monotonic)
+        self._senal: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.rechazadas = 0
+        self.iniciadas = 0
+
+    # ------- admisión --------
+    def puede_admitir(self, prioridad: Any) -> bool:
+        p = Prioridad.normalizar(prioridad)
+        return len(self._colas[p]) < self.capacidad_por_prioridad
+
+    def encolar(self, saga_id: str, prioridad: Any, trabajo: Callable[[], Any]) -> Optional[asyncio.Future]:
+        """
+        Encola el arranque de la saga y devuelve un futuro que se resuelve con el
+        saga_id cuando `trabajo` terminó (o con su excepción si falló). Devuelve None
+        si ya estaba encolada o en vuelo (comando redelivered/duplicado). Lanza
+        SagaRechazada si la cola está llena.
+        """
+        p = Prioridad.normalizar(prioridad)
+        if saga_id in self._encoladas or saga_id in self._en_vuelo:
+            return None
+        if not self.puede_admitir(p):
+            self.rechazadas += 1
+            raise SagaRechazada(p, f"Cola de sagas {p.value} llena ({self.capacidad_por_prioridad})")
+        iniciada = asyncio.get_running_loop().create_future()
+        self._colas[p].append(_SagaEnCola(saga_id, p, trabajo, iniciada))
+        self._encoladas.add(saga_id)
+        self._despertar()
+        return iniciada
+
+    def cancelar(self, saga_id: str) -> bool:
+        """Quita de la cola una saga que todavía no arrancó (su futuro se resuelve con None)."""
+        if saga_id not in self._encoladas:
+            return False
+        for cola in self._colas.values():
+            for item in cola:
+                if item.saga_id == saga_id:
+                    cola.remove(item)
+                    self._encoladas.discard(saga_id)
+                    if not item.iniciada.done():
+                        item.iniciada.set_result(None)
+                    return True
+        return False
+
+    def liberar(self, saga_id: str) -> None:
+        """Libera el cupo de una saga que llegó a estado terminal (seguro desde cualquier hilo)."""
+        if self._en_vuelo.pop(saga_id, None) is not None:
+            self._despertar()
+
+    # ------- planificación --------
+    def _limite_para(self, prioridad: Prioridad) -> int:
+        if prioridad in _PRIORIDADES_CON_RESERVA:
+            return self.max_en_vuelo
+        return self.max_en_vuelo - self.reserva_alta_prioridad
+
+    def _purgar_vencidas(self) -> None:
+        ahora = time.monotonic()
+        # copia: `liberar` puede llegar desde otro hilo mientras se recorre
+        vencidas = [sid for sid, vence in list(self._en_vuelo.items()) if vence <= ahora]
+        for sid in vencidas:
+            if self._en_vuelo.pop(sid, None) is not None:
+                log.warning("Lease de saga %s vencido sin estado terminal; se libera su cupo", sid)
+
+    def _siguiente(self) -> Optional[_SagaEnCola]:
+        """Smooth weighted round-robin sobre las colas elegibles (no vacías y con cupo)."""
+        en_vuelo = len(self._en_vuelo)
+        elegibles = [
+            p for p in Prioridad
+            if self._colas[p] and en_vuelo < self._limite_para(p)
+        ]
+        if not elegibles:
+            return None
+        total = 0
+        elegida = None
+        for p in elegibles:
+            self._credito[p] += self.pesos.get(p, 1)
+            total += self.pesos.get(p, 1)
+            if elegida is None or self._credito[p] > self._credito[elegida]:
+                elegida = p
+        self._credito[elegida] -= total
+        item = self._colas[elegida].popleft()
+        self._encoladas.discard(item.saga_id)
+        return item
+
+    def _despertar(self) -> None:
+        if self._senal is None:
+            return
+        try:
+            en_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            en_loop = False
+        if en_loop:
+            self._senal.set()
+        else:
+            # p. ej. el SagaLogger cerrando la saga desde el hilo del despachador
+            self._loop.call_soon_threadsafe(self._senal.set)
+
+    async def ejecutar(self) -> None:
+        """Bucle del planificador; se lanza como tarea en el lifespan del servicio."""
+        self._loop = asyncio.get_running_loop()
+        self._senal = asyncio.Event()
+        while True:
+            self._purgar_vencidas()
+            item = self._siguiente()
+            if item is None:
+                self._senal.clear()
+                try:
+                    # despierta por encolar/liberar, o periódicamente para purgar leases
+                    await asyncio.wait_for(self._senal.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._en_vuelo[item.saga_id] = time.monotonic() + self.ttl_en_vuelo_segundos
+            self.iniciadas += 1
+            asyncio.create_task(self._iniciar(item))
+
+    async def _iniciar(self, item: _SagaEnCola) -> None:
+        espera_ms = (time.monotonic() - item.encolada_en) * 1000
+        log.info("Iniciando saga %s (%s) tras %.1f ms en cola", item.saga_id, item.prioridad.value, espera_ms)
+        try:
+            # el despachador es bloqueante (BD + Pulsar): fuera del event loop
+            await asyncio.to_thread(item.trabajo)
+        except Exception as e:
+            log.error("Error iniciando saga %s: %s", item.saga_id, e)
+            self.liberar(item.saga_id)
+            if not item.iniciada.done():
+                item.iniciada.set_exception(e)
+        else:
+            if not item.iniciada.done():
+                item.iniciada.set_result(item.saga_id)
+
+    async def reconciliar(
+        self, terminadas: Callable[[List[str]], Iterable[str]], intervalo_segundos: float = 5.0
+    ) -> None:
+        """
+        Libera los cupos de sagas que terminaron en otra réplica. `terminadas` recibe
+        los saga_id en vuelo de este proceso y devuelve los que ya están en estado
+        terminal; es bloqueante (BD), corre en un thread.
+        """
+        while True:
+            await asyncio.sleep(intervalo_segundos)
+            ids = list(self._en_vuelo)
+            if not ids:
+                continue
+            try:
+                cerradas = await asyncio.to_thread(terminadas, ids)
+            except Exception as e:
+                log.warning("No se pudo reconciliar el cupo de sagas: %s", e)
+                continue
+            for sid in cerradas:
+                self.liberar(sid)
+
+    # ------- observabilidad --------
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "en_vuelo": len(self._en_vuelo),
+            "max_en_vuelo": self.max_en_vuelo,
+            "reserva_alta_prioridad": self.reserva_alta_prioridad,
+            "capacidad_por_prioridad": self.capacidad_por_prioridad,
+            "colas": {p.value: len(self._colas[p]) for p in Prioridad},
+            "iniciadas": self.iniciadas,
+            "rechazadas": self.rechazadas,
+        }
+
+
+controlador_admision = ControladorAdmision(
+    max_en_vuelo=int(os.getenv("SAGAS_MAX_EN_VUELO", "50")),
+    capacidad_por_prioridad=int(os.getenv("SAGAS_CAPACIDAD_COLA", "200")),
+    reserva_alta_prioridad=int(os.getenv("SAGAS_RESERVA_ALTA_PRIORIDAD", "5")),
+    ttl_en_vuelo_segundos=float(os.getenv("SAGAS_TTL_EN_VUELO", "300")),
+)
@@ -0,0 +1,329 @@
+# campanias/sagas/journal.py
+"""
+Journal append-only de sagas (tabla `saga_eventos`) y motor de replay.
+
+- SagaLoggerV2 registra cada transición de saga/paso con `JournalSagas.registrar()`;
+  las filas se acumulan en memoria y se escriben en lote (executemany) cada
+  `tamano_lote` eventos o cada `intervalo_segundos`, lo que ocurra primero.
+- Los ids son ordenables por tiempo, así que el orden de PK es el orden del journal.
+- `ReproductorJournal` recorre el journal en orden de PK con un cursor del lado
+  del servidor (stream_results) y aplica cada evento a una o más proyecciones.
+  `ProyeccionEstadoSagas` reconstruye `sagas`/`saga_pasos` a partir de él.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from campanias.seedwork.infraestructura.ids import nuevo_id_ordenable
+
+log = logging.getLogger(__name__)
+
+
+class TipoEventoSaga:
+    SAGA_INICIADA           = "SAGA_INICIADA"
+    PASO_INICIADO           = "PASO_INICIADO"
+    PASO_COMPLETADO         = "PASO_COMPLETADO"
+    PASO_FALLIDO            = "PASO_FALLIDO"
+    COMPENSACION_INICIADA   = "COMPENSACION_INICIADA"
+    COMPENSACION_COMPLETADA = "COMPENSACION_COMPLETADA"
+    SAGA_COMPLETADA         = "SAGA_COMPLETADA"
+    SAGA_FALLIDA            = "SAGA_FALLIDA"
+    SAGA_CANCELADA          = "SAGA_CANCELADA"
+    SAGA_ACTUALIZADA        = "SAGA_ACTUALIZADA"
+
+
+# =====================================================================
+# Escritura por lotes
+# =====================================================================
+
+class JournalSagas:
+
+    def __init__(self, engine: Engine, tamano_lote: int = 200, intervalo_segundos: float = 0.5) -> None:
+        self.engine = engine
+        self.tamano_lote = max(1, tamano_lote)
+        self.intervalo_segundos = intervalo_segundos
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="journal-sagas", daemon=True)
+        self._hilo.start()
+
+    def registrar(self, saga_id: str, tipo_evento: str, paso_id: Optional[str] = None,
+                  detalle: Optional[str] = None, datos: Optional[Dict[str, Any]] = None) -> None:
+        fila = {
+            "id": nuevo_id_ordenable(),
+            "saga_id": saga_id,
+            "paso_id": paso_id,
+            "tipo_evento": tipo_evento,
+            "detalle": detalle,
+            # compacto: sin espacios ni claves nulas
+            "datos_evento": json.dumps({k: v for k, v in (datos or {}).items() if v is not None},
+                                       ensure_ascii=False, separators=(",", ":"), default=str),
+            "timestamp_evento": datetime.utcnow(),
+        }
+        with self._lock:
+            self._buffer.append(fila)
+            lleno = len(self._buffer) >= self.tamano_lote
+        if lleno:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                lote, self._buffer = self._buffer, []
+            if not lote:
+                return 0
+            sql = """
+                INSERT IGNORE INTO saga_eventos
+                    (id, saga_id, paso_id, tipo_evento, detalle, datos_evento, timestamp_evento)
+                VALUES
+                    (:id, :saga_id, :paso_id, :tipo_evento, :detalle, :datos_evento, :timestamp_evento)
+            """
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text(sql), lote)
+            except Exception as e:
+                # el journal no debe tumbar la saga: se reintenta en el próximo flush
+                log.error("No se pudo escribir lote de %d eventos de saga: %s", len(lote), e)
+                with self._lock:
+                    self._buffer[:0] = lote
+                    # acotado por si la BD queda caída mucho tiempo
+                    exceso = len(self._buffer) - self.tamano_lote * 50
+                    if exceso > 0:
+                        log.error("Journal de sagas saturado: se descartan %d eventos", exceso)
+                        del self._buffer[:exceso]
+                return 0
+            return len(lote)
+
+    def _bucle(self) -> None:
+        while not self._detener.wait(self.intervalo_segundos):
+            self.flush()
+
+    def cerrar(self) -> None:
+        self._detener.set()
+        self.flush()
+
+
+_journals: Dict[str, JournalSagas] = {}
+_journals_lock = threading.Lock()
+
+
+def journal_para(engine: Engine) -> JournalSagas:
+    """Un journal (y un hilo de flush) por BD, compartido entre instancias de SagaLoggerV2."""
+    clave = str(engine.url)
+    with _journals_lock:
+        j = _journals.get(clave)
+        if j is None:
+            j = JournalSagas(
+                engine,
+                tamano_lote=int(os.getenv("SAGAS_JOURNAL_LOTE", "200")),
+                intervalo_segundos=float(os.getenv("SAGAS_JOURNAL_INTERVALO", "0.5")),
+            )
+            _journals[clave] = j
+            atexit.register(j.cerrar)
+        return j
+
+
+# =====================================================================
+# Replay
+# =====================================================================
+
+class ProyeccionJournal:
+    """Interfaz mínima de una proyección alimentada por el journal."""
+
+    def aplicar(self, evento: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def finalizar(self) -> None:
+        ...
+
+
+class ReproductorJournal:
+
+    def __init__(self, engine: Engine, tamano_lote: int = 1000) -> None:
+        self.engine = engine
+        self.tamano_lote = tamano_lote
+
+    def eventos(self, desde_id: Optional[str] = None, saga_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Recorre `saga_eventos` en orden de PK sin cargarlo entero en memoria."""
+        filtros, params = [], {}
+        if desde_id:
+            filtros.append("id > :desde")
+            params["desde"] = desde_id
+        if saga_id:
+            filtros.append("saga_id = :sid")
+            params["sid"] = saga_id
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        sql = f"""
+            SELECT id, saga_id, paso_id, tipo_evento, detalle, datos_evento, timestamp_evento
+            FROM saga_eventos {where}
+            ORDER BY id
+        """
+        with self.engine.connect() as conn:
+            res = conn.execution_options(stream_results=True, max_row_buffer=self.tamano_lote) \
+                      .execute(text(sql), params).mappings()
+            for lote in res.partitions(self.tamano_lote):
+                for fila in lote:
+                    evt = dict(fila)
+                    try:
+                        evt["datos_evento"] = json.loads(evt["datos_evento"] or "{}")
+                    except Exception:
+                        evt["datos_evento"] = {}
+                    yield evt
+
+    def reproducir(self, *proyecciones: ProyeccionJournal, desde_id: Optional[str] = None,
+                   saga_id: Optional[str] = None) -> Dict[str, Any]:
+        n, ultimo = 0, desde_id
+        inicio = time.monotonic()
+        for evt in self.eventos(desde_id=desde_id, saga_id=saga_id):
+            for p in proyecciones:
+                p.aplicar(evt)
+            n += 1
+            ultimo = evt["id"]
+        for p in proyecciones:
+            p.finalizar()
+        duracion = time.monotonic() - inicio
+        log.info("Replay de journal: %d eventos en %.2fs (último id %s)", n, duracion, ultimo)
+        return {"eventos": n, "ultimo_id": ultimo, "duracion_s": round(duracion, 3)}
+
+
+_EVENTOS_TERMINALES = {
+    TipoEventoSaga.SAGA_COMPLETADA,
+    TipoEventoSaga.SAGA_FALLIDA,
+    TipoEventoSaga.SAGA_CANCELADA,
+    TipoEventoSaga.COMPENSACION_COMPLETADA,
+}
+
+
+class ProyeccionEstadoSagas(ProyeccionJournal):
+    """
+    Reconstruye `sagas` y `saga_pasos` desde el journal. Acumula el último estado por
+    saga/paso y lo escribe en lotes: upsert si el lote vio el evento de inicio (trae las
+    columnas obligatorias), UPDATE por PK si solo trae cambios de estado. Los eventos
+    traen el contexto de la saga y request/response de cada paso completos, así que
+    las filas quedan iguales a las que escribió el logger; cada escritura sube
+    `sagas.version` para invalidar los ETags servidos antes del replay.
+    Recibe el SagaLoggerV2 para reutilizar su mapa de columnas.
+    """
+
+    def __init__(self, saga_logger, tamano_lote: int = 500) -> None:
+        self.engine: Engine = saga_logger.engine
+        self.saga_logger = saga_logger
+        self.cs = saga_logger.c_sagas
+        self.cp = saga_logger.c_pasos
+        self.tiene_pasos = saga_logger.tiene_pasos
+        self.tamano_lote = tamano_lote
+        self._sagas: Dict[str, Dict[str, Any]] = {}
+        self._pasos: Dict[str, Dict[str, Any]] = {}
+        self._sagas_completas: set = set()
+        self._pasos_completos: set = set()
+
+    def aplicar(self, evento: Dict[str, Any]) -> None:
+        datos = evento["datos_evento"]
+        ts = evento["timestamp_evento"]
+        if evento["paso_id"]:
+            self._aplicar_paso(evento["paso_id"], evento["saga_id"], evento["tipo_evento"], datos, ts)
+        else:
+            self._aplicar_saga(evento["saga_id"], evento["tipo_evento"], datos, ts)
+        if len(self._sagas) + len(self._pasos) >= self.tamano_lote:
+            self._escribir()
+
+    def _aplicar_saga(self, sid: str, tipo: str, datos: Dict[str, Any], ts) -> None:
+        fila = self._sagas.setdefault(sid, {self.cs["pk"]: sid})
+        if tipo == TipoEventoSaga.SAGA_INICIADA:
+            self._sagas_completas.add(sid)
+            for clave, col in (("tipo", "tipo"), ("nombre", "nombre"), ("prioridad", "prioridad")):
+                if self.cs.get(col) and datos.get(clave):
+                    fila[self.cs[col]] = datos[clave]
+            if self.cs["fi"]:
+                fila[self.cs["fi"]] = ts
+        if self.cs["estado"] and datos.get("estado"):
+            fila[self.cs["estado"]] = datos["estado"]
+        if self.cs["contexto"] and datos.get("contexto") is not None:
+            fila[self.cs["contexto"]] = json.dumps(datos["contexto"], ensure_ascii=False)
+        if tipo in _EVENTOS_TERMINALES and self.cs["ff"]:
+            fila[self.cs["ff"]] = ts
+
+    def _aplicar_paso(self, pid: str, sid: str, tipo: str, datos: Dict[str, Any], ts) -> None:
+        if not (self.tiene_pasos and self.cp["id"]):
+            return
+        fila = self._pasos.setdefault(pid, {self.cp["id"]: pid})
+        if tipo == TipoEventoSaga.PASO_INICIADO and datos.get("paso_numero") is not None:
+            self._pasos_completos.add(pid)
+            if self.cp["saga_id"]:
+                fila[self.cp["saga_id"]] = sid
+            for clave in ("paso_numero", "nombre_paso", "servicio", "comando", "tipo_operacion"):
+                if self.cp.get(clave) and datos.get(clave) is not None:
+                    fila[self.cp[clave]] = datos[clave]
+            if self.cp["fi"]:
+                fila[self.cp["fi"]] = ts
+            if self.cp["req"] and "request_data" in datos:
+                fila[self.cp["req"]] = json.dumps(datos["request_data"], ensure_ascii=False)
+        if self.cp["estado"] and datos.get("estado"):
+            fila[self.cp["estado"]] = datos["estado"]
+        if self.cp["res"] and datos.get("response_data") is not None:
+            fila[self.cp["res"]] = json.dumps(datos["response_data"], ensure_ascii=False)
+        if tipo in (TipoEventoSaga.PASO_COMPLETADO, TipoEventoSaga.PASO_FALLIDO,
+                    TipoEventoSaga.COMPENSACION_COMPLETADA) and self.cp["ff"]:
+            fila[self.cp["ff"]] = ts
+        if self.cp["comp_ok"] and "compensacion_completada" in datos:
+            fila[self.cp["comp_ok"]] = bool(datos["compensacion_completada"])
+        if self.cp["err"] and datos.get("error"):
+            fila[self.cp["err"]] = datos["error"]
+
+    def _escribir(self) -> None:
+        with self.engine.begin() as conn:
+            self._escribir_tabla(conn, "sagas", self.cs["pk"], self._sagas, self._sagas_completas,
+                                 version=self.cs["version"])
+            self._escribir_tabla(conn, "saga_pasos", self.cp["id"], self._pasos, self._pasos_completos)
+            if self._pasos:
+                self.saga_logger._subir_version_por_pasos(conn, list(self._pasos))
+        self._sagas, self._pasos = {}, {}
+        self._sagas_completas, self._pasos_completos = set(), set()
+
+    @staticmethod
+    def _escribir_tabla(conn, tabla: str, pk: str, filas: Dict[str, Dict[str, Any]], completas: set,
+                        version: Optional[str] = None) -> None:
+        # agrupa por conjunto de columnas para poder usar executemany
+        grupos: Dict[tuple, List[Dict[str, Any]]] = {}
+        for clave, fila in filas.items():
+            grupos.setdefault((clave in completas, tuple(sorted(fila))), []).append(fila)
+        for (completa, cols), lote in grupos.items():
+            resto = [c for c in cols if c != pk]
+            if not resto:
+                continue
+            asignaciones = [f"{c}=VALUES({c})" if completa else f"{c}=:{c}" for c in resto]
+            if version:
+                asignaciones.append(f"{version}=COALESCE({version},0)+1")
+            if completa:
+                sql = (
+                    f"INSERT INTO {tabla} ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)}) "
+                    f"ON DUPLICATE KEY UPDATE {', '.join(asignaciones)}"
+                )
+            else:
+                sql = f"UPDATE {tabla} SET {', '.join(asignaciones)} WHERE {pk}=:{pk}"
+            conn.execute(text(sql), lote)
+
+    def finalizar(self) -> None:
+        if self._sagas or self._pasos:
+            self._escribir()
+
+
+if __name__ == "__main__":
+    # python -m campanias.sagas.journal [desde_id]  → reconstruye sagas/saga_pasos
+    import sys
+    from campanias.sagas.saga_logger_v2 import SagaLoggerV2
+
+    resultado = SagaLoggerV2().reconstruir_desde_journal(desde_id=sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"✅ Replay completado: {resultado}")
@@ -0,0 +1,231 @@
+# campanias/sagas/latencias.py
+"""
+Histogramas de latencia de sagas y pasos (estilo HDR, buckets fijos).
+
+- Una clave por (tipo_saga, nombre_paso, servicio); la saga completa usa "*" en
+  nombre_paso/servicio.
+- Buckets log-lineales en milisegundos: exactos hasta 31 ms y luego 16 sub-buckets
+  por potencia de 2 (error relativo ≤ 1/16), así registrar es O(1) y el
+  histograma es un dict disperso {indice: conteo}.
+- Los deltas se fusionan periódicamente en `saga_latencias`, de modo que los
+  percentiles reflejan todas las instancias del servicio.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+_SUBBUCKETS = 16
+_LINEAL = 2 * _SUBBUCKETS          # 0..31 ms, un bucket por ms
+_MAX_INDICE = 511                  # ~ 2^32 ms; lo que exceda cae en el último bucket
+
+PASO_SAGA = "*"                    # nombre_paso/servicio para la duración total de la saga
+
+Clave = Tuple[str, str, str]
+
+
+def _indice(ms: float) -> int:
+    v = max(0, int(ms))
+    if v < _LINEAL:
+        return v
+    e = v.bit_length() - 5
+    return min(_MAX_INDICE, _LINEAL + (e - 1) * _SUBBUCKETS + ((v >> e) - _SUBBUCKETS))
+
+
+def _rango(indice: int) -> Tuple[int, int]:
+    if indice < _LINEAL:
+        return indice, indice
+    e = (indice - _LINEAL) // _SUBBUCKETS + 1
+    m = (indice - _LINEAL) % _SUBBUCKETS + _SUBBUCKETS
+    return m << e, ((m + 1) << e) - 1
+
+
+class HistogramaLatencia:
+
+    __slots__ = ("buckets", "total", "suma_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.total = 0
+        self.suma_ms = 0
+        self.max_ms = 0
+
+    def registrar(self, ms: float) -> None:
+        i = _indice(ms)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+        self.total += 1
+        self.suma_ms += int(ms)
+        self.max_ms = max(self.max_ms, int(ms))
+
+    def fusionar(self, otro: "HistogramaLatencia") -> None:
+        for i, n in otro.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.total += otro.total
+        self.suma_ms += otro.suma_ms
+        self.max_ms = max(self.max_ms, otro.max_ms)
+
+    def percentil(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        objetivo = q * self.total
+        acumulado = 0
+        for i in sorted(self.buckets):
+            acumulado += self.buckets[i]
+            if acumulado >= objetivo:
+                bajo, alto = _rango(i)
+                return float(min((bajo + alto) / 2, self.max_ms))
+        return float(self.max_ms)
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            "muestras": self.total,
+            "p50_ms": self.percentil(0.50),
+            "p95_ms": self.percentil(0.95),
+            "p99_ms": self.percentil(0.99),
+            "max_ms": self.max_ms,
+            "promedio_ms": round(self.suma_ms / self.total, 1) if self.total else None,
+        }
+
+    # JSON con claves str (MySQL JSON no admite claves numéricas)
+    def buckets_json(self) -> str:
+        return json.dumps({str(i): n for i, n in self.buckets.items()}, separators=(",", ":"))
+
+    @classmethod
+    def desde_fila(cls, buckets: Any, total: int, suma_ms: int, max_ms: int) -> "HistogramaLatencia":
+        h = cls()
+        if isinstance(buckets, (str, bytes)):
+            buckets = json.loads(buckets or "{}")
+        h.buckets = {int(i): int(n) for i, n in (buckets or {}).items()}
+        h.total, h.suma_ms, h.max_ms = int(total or 0), int(suma_ms or 0), int(max_ms or 0)
+        return h
+
+
+class RegistroLatencias:
+
+    def __init__(self, engine: Engine, intervalo_segundos: float = 10.0) -> None:
+        self.engine = engine
+        self.intervalo_segundos = intervalo_segundos
+        self._deltas: Dict[Clave, HistogramaLatencia] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="latencias-sagas", daemon=True)
+        self._hilo.start()
+
+    def registrar(self, tipo_saga: str, nombre_paso: str, servicio: str, duracion_ms: float) -> None:
+        clave = (tipo_saga or "desconocido", nombre_paso or PASO_SAGA, servicio or PASO_SAGA)
+        with self._lock:
+            h = self._deltas.get(clave)
+            if h is None:
+                h = self._deltas[clave] = HistogramaLatencia()
+            h.registrar(duracion_ms)
+
+    # ------- persistencia --------
+    def flush(self) -> int:
+        """Fusiona los deltas en `saga_latencias` (lectura FOR UPDATE + upsert, una transacción)."""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._deltas = self._deltas, {}
+            if not deltas:
+                return 0
+            try:
+                with self.engine.begin() as conn:
+                    actuales = self._leer(conn, list(deltas), bloquear=True)
+                    params = []
+                    for clave, delta in deltas.items():
+                        h = actuales.get(clave) or HistogramaLatencia()
+                        h.fusionar(delta)
+                        params.append({
+                            "tipo": clave[0], "paso": clave[1], "servicio": clave[2],
+                            "total": h.total, "suma": h.suma_ms, "max": h.max_ms,
+                            "buckets": h.buckets_json(),
+                        })
+                    conn.execute(text("""
+                        INSERT INTO saga_latencias (tipo_saga, nombre_paso, servicio, total, suma_ms, max_ms, buckets)
+                        VALUES (:tipo, :paso, :servicio, :total, :suma, :max, :buckets)
+                        ON DUPLICATE KEY UPDATE
+                            total=VALUES(total), suma_ms=VALUES(suma_ms),
+                            max_ms=VALUES(max_ms), buckets=VALUES(buckets)
+                    """), params)
+            except Exception as e:
+                log.error("No se pudieron persistir latencias de sagas (%d claves): %s", len(deltas), e)
+                with self._lock:
+                    for clave, delta in deltas.items():
+                        self._deltas.setdefault(clave, HistogramaLatencia()).fusionar(delta)
+                return 0
+            return len(deltas)
+
+    @staticmethod
+    def _leer(conn, claves: Optional[List[Clave]] = None, tipo_saga: Optional[str] = None,
+              servicio: Optional[str] = None, bloquear: bool = False) -> Dict[Clave, HistogramaLatencia]:
+        filtros, params = [], {}
+        if claves:
+            tuplas = []
+            for i, (t, p, s) in enumerate(claves):
+                tuplas.append(f"(:t{i}, :p{i}, :s{i})")
+                params.update({f"t{i}": t, f"p{i}": p, f"s{i}": s})
+            filtros.append(f"(tipo_saga, nombre_paso, servicio) IN ({', '.join(tuplas)})")
+        if tipo_saga:
+            filtros.append("tipo_saga = :tipo")
+            params["tipo"] = tipo_saga
+        if servicio:
+            filtros.append("servicio = :servicio")
+            params["servicio"] = servicio
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        sql = f"""
+            SELECT tipo_saga, nombre_paso, servicio, total, suma_ms, max_ms, buckets
+            FROM saga_latencias {where} {'FOR UPDATE' if bloquear else ''}
+        """
+        return {
+            (f["tipo_saga"], f["nombre_paso"], f["servicio"]):
+                HistogramaLatencia.desde_fila(f["buckets"], f["total"], f["suma_ms"], f["max_ms"])
+            for f in conn.execute(text(sql), params).mappings()
+        }
+
+    def _bucle(self) -> None:
+        while not self._detener.wait(self.intervalo_segundos):
+            self.flush()
+
+    def cerrar(self) -> None:
+        self._detener.set()
+        self.flush()
+
+    # ------- lectura --------
+    def percentiles(self, tipo_saga: Optional[str] = None, servicio: Optional[str] = None) -> List[Dict[str, Any]]:
+        """p50/p95/p99 por clave, ordenado por p95 descendente (el servicio que más pesa primero)."""
+        self.flush()
+        with self.engine.begin() as conn:
+            hists = self._leer(conn, tipo_saga=tipo_saga, servicio=servicio)
+        filas = [
+            {"tipo_saga": t, "nombre_paso": p, "servicio": s, **h.resumen()}
+            for (t, p, s), h in hists.items()
+        ]
+        filas.sort(key=lambda f: f["p95_ms"] or 0, reverse=True)
+        return filas
+
+
+_registros: Dict[str, RegistroLatencias] = {}
+_registros_lock = threading.Lock()
+
+
+def registro_para(engine: Engine) -> RegistroLatencias:
+    """Un registro por BD, compartido entre instancias de SagaLoggerV2."""
+    clave = str(engine.url)
+    with _registros_lock:
+        r = _registros.get(clave)
+        if r is None:
+            r = RegistroLatencias(
+                engine, intervalo_segundos=float(os.getenv("SAGAS_LATENCIAS_INTERVALO", "10"))
+            )
+            _registros[clave] = r
+            atexit.register(r.cerrar)
+        return r
@@ -0,0 +1,191 @@
+# campanias/sagas/metricas.py
+"""
+Rollups diarios de `saga_metricas` mantenidos de forma incremental.
+
+SagaLoggerV2 avisa al agregador cuando una saga se inicia o llega a un estado
+terminal; el agregador acumula deltas en memoria por (tipo_saga, fecha) y los
+aplica en lote con INSERT ... ON DUPLICATE KEY UPDATE. El promedio de duración
+se mantiene como suma corrida (promedio anterior * terminadas + delta), así que
+cada actualización es O(1) y nunca se escanea `sagas`.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Delta:
+    iniciadas: int = 0
+    completadas: int = 0
+    fallidas: int = 0
+    compensadas: int = 0
+    # suma de duraciones (s) de las completadas + fallidas del delta
+    suma_duracion: float = 0.0
+
+
+# El orden de las asignaciones importa: MySQL evalúa ON DUPLICATE KEY UPDATE de
+# izquierda a derecha, así que el promedio se calcula con los totales anteriores
+# y la tasa de éxito con los nuevos.
+_SQL_UPSERT = """
+    INSERT INTO saga_metricas
+        (id, tipo_saga, fecha, total_iniciadas, total_completadas, total_fallidas,
+         total_compensadas, tiempo_promedio_ejecucion, tasa_exito)
+    VALUES
+        (:id, :tipo, :fecha, :ini, :comp, :fall, :compens,
+         IF(:comp + :fall > 0, :suma / (:comp + :fall), 0),
+         IF(:comp + :fall > 0, :comp / (:comp + :fall), 0))
+    ON DUPLICATE KEY UPDATE
+        tiempo_promedio_ejecucion = IF(
+            total_completadas + total_fallidas + :comp + :fall > 0,
+            (tiempo_promedio_ejecucion * (total_completadas + total_fallidas) + :suma)
+                / (total_completadas + total_fallidas + :comp + :fall),
+            tiempo_promedio_ejecucion),
+        total_iniciadas   = total_iniciadas + :ini,
+        total_completadas = total_completadas + :comp,
+        total_fallidas    = total_fallidas + :fall,
+        total_compensadas = total_compensadas + :compens,
+        tasa_exito = IF(
+            total_completadas + total_fallidas > 0,
+            total_completadas / (total_completadas + total_fallidas),
+            0)
+"""
+
+
+class AgregadorMetricasSagas:
+
+    def __init__(self, engine: Engine, intervalo_segundos: float = 5.0) -> None:
+        self.engine = engine
+        self.intervalo_segundos = intervalo_segundos
+        self._deltas: Dict[Tuple[str, date], _Delta] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="metricas-sagas", daemon=True)
+        self._hilo.start()
+
+    # ------- entradas (desde SagaLoggerV2) --------
+    def saga_iniciada(self, tipo_saga: str, fecha: date) -> None:
+        with self._lock:
+            self._deltas.setdefault((tipo_saga, fecha), _Delta()).iniciadas += 1
+
+    def saga_terminada(self, tipo_saga: str, fecha: date, estado: str, duracion_s: Optional[float]) -> None:
+        with self._lock:
+            d = self._deltas.setdefault((tipo_saga, fecha), _Delta())
+            if estado == "COMPLETADA":
+                d.completadas += 1
+            elif estado == "FALLIDA":
+                d.fallidas += 1
+            elif estado == "COMPENSADA":
+                d.compensadas += 1
+                return
+            else:
+                return
+            d.suma_duracion += max(0.0, duracion_s or 0.0)
+
+    # ------- persistencia --------
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                # intercambio atómico: lo que se registre durante el upsert va al dict
+                # nuevo y sale en el próximo flush, ni perdido ni contado dos veces
+                deltas, self._deltas = self._deltas, {}
+            if not deltas:
+                return 0
+            params = [
+                {
+                    "id": str(uuid.uuid4()), "tipo": tipo, "fecha": fecha,
+                    "ini": d.iniciadas, "comp": d.completadas, "fall": d.fallidas,
+                    "compens": d.compensadas, "suma": d.suma_duracion,
+                }
+                for (tipo, fecha), d in deltas.items()
+            ]
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text(_SQL_UPSERT), params)
+            except Exception as e:
+                log.error("No se pudieron actualizar saga_metricas (%d filas): %s", len(params), e)
+                self._reincorporar(deltas)
+                return 0
+            return len(params)
+
+    def _reincorporar(self, deltas: Dict[Tuple[str, date], _Delta]) -> None:
+        with self._lock:
+            for clave, d in deltas.items():
+                act = self._deltas.setdefault(clave, _Delta())
+                act.iniciadas += d.iniciadas
+                act.completadas += d.completadas
+                act.fallidas += d.fallidas
+                act.compensadas += d.compensadas
+                act.suma_duracion += d.suma_duracion
+
+    def _bucle(self) -> None:
+        while not self._detener.wait(self.intervalo_segundos):
+            self.flush()
+
+    def cerrar(self) -> None:
+        self._detener.set()
+        self.flush()
+
+    # ------- lectura --------
+    def consultar(self, tipo_saga: Optional[str] = None, desde: Optional[date] = None,
+                  hasta: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Lee los rollups (índices idx_tipo/idx_fecha); por defecto, el día de hoy (UTC,
+        como las fechas con que se acumulan). No hace flush: una lectura no escribe, y lo
+        leído puede ir hasta `intervalo_segundos` detrás de los deltas en memoria.
+        """
+        desde = desde or datetime.utcnow().date()
+        hasta = hasta or desde
+        filtros = ["fecha BETWEEN :desde AND :hasta"]
+        params: Dict[str, Any] = {"desde": desde, "hasta": hasta}
+        if tipo_saga:
+            filtros.append("tipo_saga = :tipo")
+            params["tipo"] = tipo_saga
+        sql = f"""
+            SELECT tipo_saga, fecha, total_iniciadas, total_completadas, total_fallidas,
+                   total_compensadas, tiempo_promedio_ejecucion, tasa_exito
+            FROM saga_metricas
+            WHERE {' AND '.join(filtros)}
+            ORDER BY fecha, tipo_saga
+        """
+        with self.engine.begin() as conn:
+            filas = conn.execute(text(sql), params).mappings().all()
+        return [
+            {
+                **dict(f),
+                "fecha": f["fecha"].isoformat(),
+                "tiempo_promedio_ejecucion": float(f["tiempo_promedio_ejecucion"] or 0),
+                "tasa_exito": float(f["tasa_exito"] or 0),
+            }
+            for f in filas
+        ]
+
+
+_agregadores: Dict[str, AgregadorMetricasSagas] = {}
+_agregadores_lock = threading.Lock()
+
+
+def agregador_para(engine: Engine) -> AgregadorMetricasSagas:
+    """Un agregador por BD, compartido entre instancias de SagaLoggerV2."""
+    clave = str(engine.url)
+    with _agregadores_lock:
+        a = _agregadores.get(clave)
+        if a is None:
+            a = AgregadorMetricasSagas(
+                engine, intervalo_segundos=float(os.getenv("SAGAS_METRICAS_INTERVALO", "5"))
+            )
+            _agregadores[clave] = a
+            atexit.register(a.cerrar)
+        return a
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 import os
 import json
+import base64
+import hashlib
 import uuid
 import logging
 from datetime import datetime
@@ -11,6 +13,12 @@ from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 
+from campanias.sagas.metricas import AgregadorMetricasSagas, agregador_para
+from campanias.sagas.latencias import RegistroLatencias, registro_para, PASO_SAGA
+from campanias.sagas.journal import (
+    JournalSagas, TipoEventoSaga, journal_para, ReproductorJournal, ProyeccionEstadoSagas
+)
+
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
@@ -55,6 +63,16 @@ _TERMINALES = {
     EstadoSaga.COMPENSADA,
 }
 
+# transiciones de saga que quedan en el journal (EN_PROGRESO/INICIADA ya las cubre SAGA_INICIADA)
+_EVENTO_POR_ESTADO_SAGA = {
+    EstadoSaga.COMPLETADA:  TipoEventoSaga.SAGA_COMPLETADA,
+    EstadoSaga.FALLIDA:     TipoEventoSaga.SAGA_FALLIDA,
+    EstadoSaga.CANCELADA:   TipoEventoSaga.SAGA_CANCELADA,
+    EstadoSaga.COMPENSANDO: TipoEventoSaga.COMPENSACION_INICIADA,
+    EstadoSaga.COMPENSADA:  TipoEventoSaga.COMPENSACION_COMPLETADA,
+}
+# cualquier otra escritura de la saga (EN_PROGRESO con mensaje, contexto) también se registra
+
 def _now_utc() -> datetime:
     return datetime.utcnow()
 
@@ -105,10 +123,14 @@ class SagaLoggerV2:
             "pk": self.pk_saga,
             "estado": "estado" if "estado" in sc else None,
             "nombre": "nombre_saga" if "nombre_saga" in sc else ("nombre" if "nombre" in sc else None),
+            "tipo": "tipo_saga" if "tipo_saga" in sc else None,
             "contexto": "contexto" if "contexto" in sc else ("datos" if "datos" in sc else None),
             "error": "error_mensaje" if "error_mensaje" in sc else None,
             "fi": "fecha_inicio" if "fecha_inicio" in sc else None,
             "ff": "fecha_fin" if "fecha_fin" in sc else None,
+            "prioridad": "prioridad" if "prioridad" in sc else None,
+            # contador que sube con cada cambio de la saga o de sus pasos (ETag fuerte)
+            "version": "version" if "version" in sc else None,
         }
         self.sagas_cols = sc
 
@@ -129,27 +151,94 @@ class SagaLoggerV2:
             "err": "error_mensaje" if "error_mensaje" in pc else None,
             "fi": "fecha_inicio" if "fecha_inicio" in pc else None,
             "ff": "fecha_fin" if "fecha_fin" in pc else None,
+            "comp_ok": "compensacion_completada" if "compensacion_completada" in pc else None,
         }
         self.pasos_cols = pc
 
+        # saga_eventos (opcional): journal append-only escrito en lotes
+        self.journal: Optional[JournalSagas] = journal_para(self.engine) if self._cols("saga_eventos") else None
+        # saga_metricas (opcional): rollups diarios incrementales
+        self.metricas: Optional[AgregadorMetricasSagas] = agregador_para(self.engine) if self._cols("saga_metricas") else None
+        # saga_latencias (opcional): histogramas de duración por saga/paso/servicio
+        self.latencias: Optional[RegistroLatencias] = registro_para(self.engine) if self._cols("saga_latencias") else None
+
         log.info("SagaLoggerV2 listo. sagas.pk=%s, pasos=%s", self.pk_saga, "sí" if self.tiene_pasos else "no")
 
     # ------- helpers --------
-    def _insert_ignore(self, table: str, cols_vals: Dict[str, Any]) -> None:
+    def _insert_ignore(self, table: str, cols_vals: Dict[str, Any]) -> int:
         cols = list(cols_vals.keys())
         placeholders = [f":{c}" for c in cols]
         sql = f"INSERT IGNORE INTO {table} ({', '.join(cols)}) VALUES ({', '.join(placeholders)})"
         with self.engine.begin() as conn:
-            conn.execute(text(sql), cols_vals)
+            n = conn.execute(text(sql), cols_vals).rowcount
+            if table == "saga_pasos" and n:
+                self._subir_version(conn, [cols_vals.get(self.c_pasos["saga_id"])])
+            return n
+
+    def _insert_ignore_many(self, table: str, filas: List[Dict[str, Any]]) -> None:
+        """Igual que _insert_ignore pero con executemany (todas las filas con las mismas columnas)."""
+        if not filas:
+            return
+        cols = list(filas[0].keys())
+        placeholders = [f":{c}" for c in cols]
+        sql = f"INSERT IGNORE INTO {table} ({', '.join(cols)}) VALUES ({', '.join(placeholders)})"
+        with self.engine.begin() as conn:
+            conn.execute(text(sql), filas)
+            if table == "saga_pasos":
+                self._subir_version(conn, [f.get(self.c_pasos["saga_id"]) for f in filas])
 
     def _update_by_pk(self, table: str, pk_col: str, pk_val: Any, updates: Dict[str, Any]) -> None:
         if not updates:
             return
         set_sql = ", ".join([f"{k}=:{k}" for k in updates.keys()])
+        if table == "sagas" and self.c_sagas["version"]:
+            v = self.c_sagas["version"]
+            set_sql += f", {v}=COALESCE({v},0)+1"
         params = dict(updates); params["__pk"] = pk_val
         sql = f"UPDATE {table} SET {set_sql} WHERE {pk_col}=:__pk"
         with self.engine.begin() as conn:
             conn.execute(text(sql), params)
+            if table == "saga_pasos":
+                self._subir_version_por_pasos(conn, [pk_val])
+
+    # ------- versión (ETag) --------
+    def _subir_version(self, conn, saga_ids: List[Optional[str]]) -> None:
+        """Sube `sagas.version` en la misma transacción que escribió pasos de esas sagas."""
+        v = self.c_sagas["version"]
+        ids = sorted({s for s in saga_ids if s})
+        if not v or not ids:
+            return
+        params = {f"s{i}": sid for i, sid in enumerate(ids)}
+        conn.execute(text(
+            f"UPDATE sagas SET {v}=COALESCE({v},0)+1 "
+            f"WHERE {self.c_sagas['pk']} IN ({', '.join(':' + k for k in params)})"
+        ), params)
+
+    def _subir_version_por_pasos(self, conn, paso_ids: List[str]) -> None:
+        """Como _subir_version cuando solo se conocen los ids de paso."""
+        v = self.c_sagas["version"]
+        if not v or not paso_ids or not (self.c_pasos["id"] and self.c_pasos["saga_id"]):
+            return
+        params = {f"p{i}": pid for i, pid in enumerate(paso_ids)}
+        conn.execute(text(f"""
+            UPDATE sagas SET {v}=COALESCE({v},0)+1
+            WHERE {self.c_sagas['pk']} IN (
+                SELECT {self.c_pasos['saga_id']} FROM saga_pasos
+                WHERE {self.c_pasos['id']} IN ({', '.join(':' + k for k in params)})
+            )
+        """), params)
+
+    def _journal(self, saga_id: Optional[str], tipo_evento: str, paso_id: Optional[str] = None,
+                 detalle: Optional[str] = None, **datos: Any) -> None:
+        if self.journal is not None and saga_id:
+            self.journal.registrar(saga_id, tipo_evento, paso_id, detalle, datos)
+
+    def _journal_paso_iniciado(self, saga_id: str, pid: str, n: int, paso: str, servicio: str,
+                               topico_pulsar: Optional[str], tipo_operacion: str, estado: str,
+                               datos_entrada: Optional[Dict[str, Any]] = None) -> None:
+        self._journal(saga_id, TipoEventoSaga.PASO_INICIADO, pid, None,
+                      paso_numero=n, nombre_paso=paso, servicio=servicio, comando=topico_pulsar,
+                      tipo_operacion=tipo_operacion, estado=estado, request_data=datos_entrada or {})
 
     def _next_paso_num(self, saga_id: str) -> int:
         if not (self.tiene_pasos and self.c_pasos["paso_numero"] and self.c_pasos["saga_id"]):
@@ -174,7 +263,8 @@ class SagaLoggerV2:
 
     # ------- API (sagas) --------
     def iniciar_saga(self, saga_id: str, tipo: str, campania_id: Optional[str] = None,
-                     metadatos: Optional[Dict[str, Any]] = None, nombre: Optional[str] = None) -> None:
+                     metadatos: Optional[Dict[str, Any]] = None, nombre: Optional[str] = None,
+                     prioridad: Optional[str] = None) -> None:
         """Crea la saga si no existe y la deja EN_PROGRESO, guardando contexto/metadata."""
         ctx = {"tipo": tipo, "campania_id": campania_id}
         if metadatos: ctx["metadatos"] = metadatos
@@ -182,20 +272,80 @@ class SagaLoggerV2:
         # build insert
         data = { self.c_sagas["pk"]: saga_id }
         if self.c_sagas["nombre"]:  data[self.c_sagas["nombre"]]  = nombre or tipo
+        if self.c_sagas["tipo"]:    data[self.c_sagas["tipo"]]    = tipo
         if self.c_sagas["estado"]:  data[self.c_sagas["estado"]]  = EstadoSaga.EN_PROGRESO
         if self.c_sagas["fi"]:      data[self.c_sagas["fi"]]      = _now_utc()
         if self.c_sagas["contexto"]:data[self.c_sagas["contexto"]] = json.dumps(ctx, ensure_ascii=False)
+        if prioridad and self.c_sagas["prioridad"]: data[self.c_sagas["prioridad"]] = prioridad
+
+        if self._insert_ignore("sagas", data):
+            if self.metricas is not None:
+                self.metricas.saga_iniciada(tipo, _now_utc().date())
+            self._journal(saga_id, TipoEventoSaga.SAGA_INICIADA, None, None,
+                          estado=EstadoSaga.EN_PROGRESO, tipo=tipo, nombre=nombre or tipo,
+                          prioridad=prioridad, campania_id=campania_id, contexto=ctx)
+
+    def _snapshot_para_metricas(self, saga_id: str) -> Optional[Dict[str, Any]]:
+        """estado/tipo/fechas previos a una transición terminal (una lectura por PK)."""
+        cols = {k: self.c_sagas[k] for k in ("estado", "tipo", "fi", "ff") if self.c_sagas.get(k)}
+        if "estado" not in cols:
+            return None
+        sql = f"SELECT {', '.join(f'{c} AS {k}' for k, c in cols.items())} FROM sagas WHERE {self.c_sagas['pk']}=:pk"
+        with self.engine.begin() as conn:
+            row = conn.execute(text(sql), {"pk": saga_id}).mappings().first()
+        return dict(row) if row else None
+
+    def _alimentar_metricas(self, previo: Dict[str, Any], nuevo_estado: str) -> None:
+        # COMPLETADA/FALLIDA cuentan una sola vez (primera llegada a terminal, fecha_fin aún nula);
+        # COMPENSADA se cuenta aparte, una vez.
+        if nuevo_estado == EstadoSaga.COMPENSADA:
+            cuenta = previo.get("estado") != EstadoSaga.COMPENSADA
+        elif "ff" in previo:
+            cuenta = previo.get("ff") is None
+        else:
+            cuenta = previo.get("estado") not in _TERMINALES
+        if not cuenta:
+            return
+        ahora = _now_utc()
+        fi = previo.get("fi") if isinstance(previo.get("fi"), datetime) else None
+        duracion = (ahora - fi).total_seconds() if fi else None
+        tipo = previo.get("tipo") or "desconocido"
+        if self.metricas is not None:
+            self.metricas.saga_terminada(tipo, (fi or ahora).date(), nuevo_estado, duracion)
+        if self.latencias is not None and duracion is not None and nuevo_estado != EstadoSaga.COMPENSADA:
+            self.latencias.registrar(tipo, PASO_SAGA, PASO_SAGA, duracion * 1000)
+
+    def _registrar_latencia_paso(self, paso_id: str, fin: datetime) -> None:
+        cp = self.c_pasos
+        if not (cp["fi"] and cp["saga_id"] and cp["nombre_paso"]):
+            return
+        col_tipo = f"s.{self.c_sagas['tipo']}" if self.c_sagas["tipo"] else "NULL"
+        col_serv = f"p.{cp['servicio']}" if cp["servicio"] else "NULL"
+        sql = f"""
+            SELECT {col_tipo} AS tipo, p.{cp['nombre_paso']} AS paso, {col_serv} AS servicio, p.{cp['fi']} AS fi
+            FROM saga_pasos p LEFT JOIN sagas s ON s.{self.c_sagas['pk']} = p.{cp['saga_id']}
+            WHERE p.{cp['id']}=:pid
+        """
+        with self.engine.begin() as conn:
+            row = conn.execute(text(sql), {"pid": paso_id}).mappings().first()
+        if row and isinstance(row["fi"], datetime):
+            self.latencias.registrar(row["tipo"], row["paso"], row["servicio"],
+                                     (fin - row["fi"]).total_seconds() * 1000)
 
-        self._insert_ignore("sagas", data)
+    def actualizar_estado_saga(self, saga_id: str, nuevo_estado: str, mensaje: Optional[str] = None,
+                               contexto_extra: Optional[Dict[str, Any]] = None) -> None:
+        previo = None
+        if (self.metricas is not None or self.latencias is not None) and nuevo_estado in (EstadoSaga.COMPLETADA, EstadoSaga.FALLIDA, EstadoSaga.COMPENSADA):
+            previo = self._snapshot_para_metricas(saga_id)
 
-    def actualizar_estado_saga(self, saga_id: str, nuevo_estado: str, mensaje: Optional[str] = None) -> None:
         ups: Dict[str, Any] = {}
         if self.c_sagas["estado"]:
             ups[self.c_sagas["estado"]] = nuevo_estado
         if nuevo_estado in _TERMINALES and self.c_sagas["ff"]:
             ups[self.c_sagas["ff"]] = _now_utc()
-        if mensaje and self.c_sagas["contexto"]:
-            # merge mensaje en JSON contexto/datos
+        contexto = None
+        if (mensaje or contexto_extra) and self.c_sagas["contexto"]:
+            # merge mensaje (y datos extra) en JSON contexto/datos
             sql = f"SELECT {self.c_sagas['contexto']} FROM sagas WHERE {self.c_sagas['pk']}=:pk"
             with self.engine.begin() as conn:
                 raw = conn.execute(text(sql), {"pk": saga_id}).scalar_one_or_none()
@@ -204,46 +354,28 @@ class SagaLoggerV2:
                 base = json.loads(raw or "{}")
             except Exception:
                 base = {}
-            base["mensaje"] = mensaje
+            if mensaje:
+                base["mensaje"] = mensaje
+            base.update(contexto_extra or {})
+            contexto = base
             ups[self.c_sagas["contexto"]] = json.dumps(base, ensure_ascii=False)
 
         self._update_by_pk("sagas", self.c_sagas["pk"], saga_id, ups)
+        if previo:
+            self._alimentar_metricas(previo, nuevo_estado)
+        # el contexto va completo para que el replay pueda reescribir la fila
+        evento = _EVENTO_POR_ESTADO_SAGA.get(nuevo_estado, TipoEventoSaga.SAGA_ACTUALIZADA)
+        self._journal(saga_id, evento, None, mensaje, estado=nuevo_estado, contexto=contexto)
 
     def marcar_completada(self, saga_id: str, datos_extra: Optional[Dict[str, Any]] = None) -> None:
-        self.actualizar_estado_saga(saga_id, EstadoSaga.COMPLETADA)
-        if datos_extra and self.c_sagas["contexto"]:
-            sql = f"SELECT {self.c_sagas['contexto']} FROM sagas WHERE {self.c_sagas['pk']}=:pk"
-            with self.engine.begin() as conn:
-                raw = conn.execute(text(sql), {"pk": saga_id}).scalar_one_or_none()
-            base = {}
-            try:
-                base = json.loads(raw or "{}")
-            except Exception:
-                base = {}
-            base.update(datos_extra)
-            self._update_by_pk("sagas", self.c_sagas["pk"], saga_id, {
-                self.c_sagas["contexto"]: json.dumps(base, ensure_ascii=False)
-            })
+        self.actualizar_estado_saga(saga_id, EstadoSaga.COMPLETADA, contexto_extra=datos_extra)
 
     def marcar_fallida(self, saga_id: str, mensaje: Optional[str] = None, paso_id: Optional[str] = None) -> None:
         # agrega error/ paso_fallido al JSON si existe
         extra: Dict[str, Any] = {}
         if mensaje: extra["error"] = mensaje
         if paso_id: extra["paso_fallido"] = paso_id
-        self.actualizar_estado_saga(saga_id, EstadoSaga.FALLIDA, mensaje or None)
-        if extra and self.c_sagas["contexto"]:
-            sql = f"SELECT {self.c_sagas['contexto']} FROM sagas WHERE {self.c_sagas['pk']}=:pk"
-            with self.engine.begin() as conn:
-                raw = conn.execute(text(sql), {"pk": saga_id}).scalar_one_or_none()
-            base = {}
-            try:
-                base = json.loads(raw or "{}")
-            except Exception:
-                base = {}
-            base.update(extra)
-            self._update_by_pk("sagas", self.c_sagas["pk"], saga_id, {
-                self.c_sagas["contexto"]: json.dumps(base, ensure_ascii=False)
-            })
+        self.actualizar_estado_saga(saga_id, EstadoSaga.FALLIDA, mensaje or None, contexto_extra=extra)
 
     def compensar_saga(self, saga_id: str, paso_id: Optional[str] = None, razon: Optional[str] = None) -> None:
         # marca paso compensado si viene
@@ -251,6 +383,9 @@ class SagaLoggerV2:
             sql = f"UPDATE saga_pasos SET {self.c_pasos['estado']}=:st, {self.c_pasos['ff']}=:ff WHERE {self.c_pasos['id']}=:pid"
             with self.engine.begin() as conn:
                 conn.execute(text(sql), {"st": EstadoPaso.COMPENSADO, "ff": _now_utc(), "pid": paso_id})
+                self._subir_version(conn, [saga_id])
+            self._journal(saga_id, TipoEventoSaga.COMPENSACION_COMPLETADA, paso_id, razon,
+                          estado=EstadoPaso.COMPENSADO)
         self.actualizar_estado_saga(saga_id, EstadoSaga.COMPENSADA, razon or "Compensación aplicada")
 
     def cancelar_saga(self, saga_id: str, razon: str) -> bool:
@@ -295,13 +430,125 @@ class SagaLoggerV2:
         servicio = servicio_destino or microservicio or "desconocido"
         n = self._next_paso_num(saga_id)
 
-        payload = {
-            "descripcion": descripcion or f"Envío a {servicio}",
-            "servicio": servicio,
-            "topico": topico_pulsar,
-            "entrada": datos_entrada
-        }
+        cols_vals = self._fila_paso(pid, saga_id, n, paso, servicio, topico_pulsar, datos_entrada)
+        self._insert_ignore("saga_pasos", cols_vals)
+        self._journal_paso_iniciado(saga_id, pid, n, paso, servicio, topico_pulsar, "ACCION", EstadoPaso.PENDIENTE,
+                                    datos_entrada)
+        return pid
 
+    def registrar_pasos_compensacion(self, saga_id: str, pasos: List[Dict[str, Any]]) -> List[str]:
+        """
+        Registra con un solo INSERT los pasos de una ola de compensación
+        (tipo_operacion=COMPENSACION, ya EJECUTANDO porque se publican de inmediato;
+        siguen EJECUTANDO hasta el ack del broker o, si esperan respuesta, hasta que
+        responde el servicio compensador o vencen).
+        Cada paso: {"nombre_paso", "servicio_destino", "topico_pulsar", "datos_entrada"}.
+        """
+        if not self.tiene_pasos:
+            return [str(uuid.uuid4()) for _ in pasos]
+
+        n = self._next_paso_num(saga_id)
+        ids: List[str] = []
+        filas: List[Dict[str, Any]] = []
+        for i, p in enumerate(pasos):
+            pid = str(uuid.uuid4())
+            ids.append(pid)
+            nombre_paso = p.get("nombre_paso") or "compensacion"
+            servicio = p.get("servicio_destino") or "desconocido"
+            filas.append(self._fila_paso(
+                pid, saga_id, n + i, nombre_paso, servicio,
+                p.get("topico_pulsar"),
+                p.get("datos_entrada"),
+                tipo_operacion="COMPENSACION",
+                estado=EstadoPaso.EJECUTANDO,
+            ))
+        self._insert_ignore_many("saga_pasos", filas)
+        for i, (pid, p) in enumerate(zip(ids, pasos)):
+            self._journal_paso_iniciado(saga_id, pid, n + i, p.get("nombre_paso") or "compensacion",
+                                        p.get("servicio_destino") or "desconocido", p.get("topico_pulsar"),
+                                        "COMPENSACION", EstadoPaso.EJECUTANDO, p.get("datos_entrada"))
+        return ids
+
+    def registrar_resultados_compensacion(self, resultados: List[Tuple[str, bool, Optional[str]]],
+                                          saga_id: Optional[str] = None) -> None:
+        """
+        Cierra los pasos de compensación con un único executemany, con el ack del broker
+        o la respuesta del servicio compensador (o al fallar la publicación / vencer el plazo).
+        resultados: [(paso_id, ok, error)] → COMPENSADO + compensacion_completada, o FALLIDO.
+        """
+        if not resultados or not (self.tiene_pasos and self.c_pasos["id"] and self.c_pasos["estado"]):
+            return
+        sets = [f"{self.c_pasos['estado']}=:st"]
+        if self.c_pasos["ff"]:      sets.append(f"{self.c_pasos['ff']}=:ff")
+        if self.c_pasos["comp_ok"]: sets.append(f"{self.c_pasos['comp_ok']}=:ok")
+        if self.c_pasos["err"]:     sets.append(f"{self.c_pasos['err']}=:err")
+        sql = f"UPDATE saga_pasos SET {', '.join(sets)} WHERE {self.c_pasos['id']}=:pid"
+
+        ahora = _now_utc()
+        params = [
+            {
+                "pid": pid,
+                "st": EstadoPaso.COMPENSADO if ok else EstadoPaso.FALLIDO,
+                "ff": ahora,
+                "ok": ok,
+                "err": error,
+            }
+            for pid, ok, error in resultados
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(text(sql), params)
+            if saga_id:
+                self._subir_version(conn, [saga_id])
+            else:
+                self._subir_version_por_pasos(conn, [p["pid"] for p in params])
+        for p in params:
+            self._journal(saga_id, TipoEventoSaga.COMPENSACION_COMPLETADA if p["ok"] else TipoEventoSaga.PASO_FALLIDO,
+                          p["pid"], p["err"], estado=p["st"], compensacion_completada=p["ok"], error=p["err"])
+
+    def pasos_compensacion(self, saga_id: str) -> List[Dict[str, Any]]:
+        """Pasos de compensación de la saga: [{id, nombre_paso, estado, request_data}] por número de paso."""
+        cp = self.c_pasos
+        if not (self.tiene_pasos and cp["id"] and cp["saga_id"] and cp["nombre_paso"]
+                and cp["estado"] and cp["tipo_operacion"]):
+            return []
+        col_req = cp["req"] or "NULL"
+        orden = cp["paso_numero"] or cp["id"]
+        sql = f"""
+            SELECT {cp['id']} AS id, {cp['nombre_paso']} AS nombre_paso, {cp['estado']} AS estado,
+                   {col_req} AS request_data
+            FROM saga_pasos
+            WHERE {cp['saga_id']}=:sid AND {cp['tipo_operacion']}='COMPENSACION'
+            ORDER BY {orden}
+        """
+        with self.engine.begin() as conn:
+            filas = conn.execute(text(sql), {"sid": saga_id}).mappings().all()
+        pasos = []
+        for f in filas:
+            paso = dict(f)
+            try:
+                paso["request_data"] = json.loads(paso["request_data"] or "{}")
+            except (TypeError, ValueError):
+                paso["request_data"] = {}
+            pasos.append(paso)
+        return pasos
+
+    def compensaciones_sin_respuesta(self, iniciadas_antes_de: datetime) -> List[Tuple[str, str]]:
+        """[(saga_id, paso_id)] de compensaciones EJECUTANDO publicadas antes de `iniciadas_antes_de`."""
+        cp = self.c_pasos
+        if not (self.tiene_pasos and cp["id"] and cp["saga_id"] and cp["estado"]
+                and cp["tipo_operacion"] and cp["fi"]):
+            return []
+        sql = f"""
+            SELECT {cp['saga_id']}, {cp['id']} FROM saga_pasos
+            WHERE {cp['tipo_operacion']}='COMPENSACION' AND {cp['estado']}=:st AND {cp['fi']} < :limite
+        """
+        with self.engine.begin() as conn:
+            filas = conn.execute(text(sql), {"st": EstadoPaso.EJECUTANDO, "limite": iniciadas_antes_de}).all()
+        return [(f[0], f[1]) for f in filas]
+
+    def _fila_paso(self, pid: str, saga_id: str, n: int, paso: str, servicio: str,
+                   topico_pulsar: Optional[str], datos_entrada: Optional[Dict[str, Any]],
+                   tipo_operacion: str = "ACCION", estado: str = EstadoPaso.PENDIENTE) -> Dict[str, Any]:
         cols_vals: Dict[str, Any] = {}
         # columnas obligatorias según tu esquema
         if self.c_pasos["id"]:          cols_vals[self.c_pasos["id"]] = pid
@@ -309,17 +556,16 @@ class SagaLoggerV2:
         if self.c_pasos["paso_numero"]: cols_vals[self.c_pasos["paso_numero"]] = n
         if self.c_pasos["nombre_paso"]: cols_vals[self.c_pasos["nombre_paso"]] = paso
         if self.c_pasos["servicio"]:    cols_vals[self.c_pasos["servicio"]] = servicio
-        if self.c_pasos["tipo_operacion"]: cols_vals[self.c_pasos["tipo_operacion"]] = "ACCION"
-        if self.c_pasos["estado"]:      cols_vals[self.c_pasos["estado"]] = EstadoPaso.PENDIENTE
+        if self.c_pasos["tipo_operacion"]: cols_vals[self.c_pasos["tipo_operacion"]] = tipo_operacion
+        if self.c_pasos["estado"]:      cols_vals[self.c_pasos["estado"]] = estado
         if self.c_pasos["req"]:         cols_vals[self.c_pasos["req"]] = json.dumps(datos_entrada or {}, ensure_ascii=False)
         if self.c_pasos["fi"]:          cols_vals[self.c_pasos["fi"]] = _now_utc()
         if self.c_pasos["comando"] and topico_pulsar:
             cols_vals[self.c_pasos["comando"]] = topico_pulsar
+        return cols_vals
 
-        self._insert_ignore("saga_pasos", cols_vals)
-        return pid
-
-    def actualizar_estado_paso_por_id(self, paso_id: str, nuevo_estado: str, detalle: Optional[Dict[str, Any] | str] = None) -> None:
+    def actualizar_estado_paso_por_id(self, paso_id: str, nuevo_estado: str, detalle: Optional[Dict[str, Any] | str] = None,
+                                      saga_id: Optional[str] = None) -> None:
         if not (self.tiene_pasos and self.c_pasos["id"] and self.c_pasos["estado"]):
             return
         st = self._map_estado_paso(nuevo_estado)
@@ -329,10 +575,25 @@ class SagaLoggerV2:
             ups[self.c_pasos["res"]] = json.dumps(detalle, ensure_ascii=False)
         elif isinstance(detalle, str) and self.c_pasos["err"]:
             ups[self.c_pasos["err"]] = detalle
+        fin = _now_utc()
         if st in {EstadoPaso.OK, EstadoPaso.FALLIDO, EstadoPaso.COMPENSADO} and self.c_pasos["ff"]:
-            ups[self.c_pasos["ff"]] = _now_utc()
+            ups[self.c_pasos["ff"]] = fin
         self._update_by_pk("saga_pasos", self.c_pasos["id"], paso_id, ups)
 
+        if self.latencias is not None and st in ("completado", "fallido"):
+            self._registrar_latencia_paso(paso_id, fin)
+
+        if self.journal is not None:
+            if saga_id is None and self.c_pasos["saga_id"]:
+                sql = f"SELECT {self.c_pasos['saga_id']} FROM saga_pasos WHERE {self.c_pasos['id']}=:pid"
+                with self.engine.begin() as conn:
+                    saga_id = conn.execute(text(sql), {"pid": paso_id}).scalar_one_or_none()
+            evento = {"completado": TipoEventoSaga.PASO_COMPLETADO,
+                      "fallido": TipoEventoSaga.PASO_FALLIDO}.get(st, TipoEventoSaga.PASO_INICIADO)
+            error = detalle if isinstance(detalle, str) else None
+            respuesta = detalle if isinstance(detalle, dict) else None
+            self._journal(saga_id, evento, paso_id, error, estado=st, error=error, response_data=respuesta)
+
     def actualizar_estado_paso(self, saga_id: str, paso: str, estado: str,
                                detalle: Optional[Dict[str, Any] | str] = None) -> None:
         """Actualiza por (saga_id, nombre_paso/paso). Si no existe, lo crea."""
@@ -353,7 +614,7 @@ class SagaLoggerV2:
             row = conn.execute(text(sql_sel), {"sid": saga_id, "p": paso}).first()
 
         if row and row[0]:
-            self.actualizar_estado_paso_por_id(row[0], st, detalle)
+            self.actualizar_estado_paso_por_id(row[0], st, detalle, saga_id=saga_id)
             return
 
         # si no existe, crearlo con estado solicitado
@@ -361,7 +622,17 @@ class SagaLoggerV2:
             saga_id=saga_id, nombre_paso=paso, servicio_destino="desconocido",
             topico_pulsar=None, datos_entrada=None
         )
-        self.actualizar_estado_paso_por_id(pid, st, detalle)
+        self.actualizar_estado_paso_por_id(pid, st, detalle, saga_id=saga_id)
+
+    # ------- journal --------
+    def reconstruir_desde_journal(self, desde_id: Optional[str] = None, saga_id: Optional[str] = None) -> Dict[str, Any]:
+        """Re-proyecta `sagas`/`saga_pasos` recorriendo `saga_eventos` en orden (p.ej. tras una migración fallida)."""
+        if self.journal is None:
+            raise RuntimeError("No existe la tabla `saga_eventos` en la BD actual.")
+        self.journal.flush()
+        return ReproductorJournal(self.engine).reproducir(
+            ProyeccionEstadoSagas(self), desde_id=desde_id, saga_id=saga_id
+        )
 
     # ------- consultas --------
     def obtener_estado_saga(self, saga_id: str) -> Optional[Dict[str, Any]]:
@@ -391,6 +662,38 @@ class SagaLoggerV2:
         data["finalizada"] = data.get("estado") in _TERMINALES
         return data
 
+    def version_saga(self, saga_id: str) -> Optional[str]:
+        """
+        Validador barato para GET condicionales: lee solo `sagas.version` por PK
+        (None si la saga no existe). Sin esa columna se arma con estado/fecha_fin
+        y el conteo/último cambio de los pasos, en una sola consulta.
+        """
+        pk = self.c_sagas["pk"]
+        if self.c_sagas["version"]:
+            sql = f"SELECT {self.c_sagas['version']} FROM sagas WHERE {pk}=:pk"
+            with self.engine.begin() as conn:
+                fila = conn.execute(text(sql), {"pk": saga_id}).first()
+            return None if fila is None else str(fila[0] or 0)
+
+        partes = [f"s.{self.c_sagas[k]}" for k in ("estado", "ff") if self.c_sagas.get(k)]
+        cp = self.c_pasos
+        if self.tiene_pasos and cp["saga_id"]:
+            fechas = [f"p.{cp[k]}" for k in ("fi", "ff") if cp.get(k)]
+            partes.append(f"(SELECT COUNT(*) FROM saga_pasos p WHERE p.{cp['saga_id']} = s.{pk})")
+            if cp["estado"]:
+                partes.append(
+                    f"(SELECT GROUP_CONCAT(p.{cp['estado']} ORDER BY p.{cp['id']}) "
+                    f"FROM saga_pasos p WHERE p.{cp['saga_id']} = s.{pk})"
+                )
+            for f in fechas:
+                partes.append(f"(SELECT MAX({f}) FROM saga_pasos p WHERE p.{cp['saga_id']} = s.{pk})")
+        sql = f"SELECT CONCAT_WS('|', s.{pk}, {', '.join(partes) or 'NULL'}) FROM sagas s WHERE s.{pk}=:pk"
+        with self.engine.begin() as conn:
+            fila = conn.execute(text(sql), {"pk": saga_id}).first()
+        if fila is None:
+            return None
+        return hashlib.sha1(str(fila[0]).encode("utf-8")).hexdigest()[:16]
+
     def obtener_progreso_detallado(self, saga_id: str) -> Optional[Dict[str, Any]]:
         base = self.obtener_estado_saga(saga_id)
         if not base:
@@ -423,6 +726,109 @@ class SagaLoggerV2:
                     item["fecha_fin"] = item.pop(self.c_pasos["ff"]).isoformat() + "Z"
                 pasos.append(item)
         return {"saga": base, "pasos": pasos}
+
+    def sagas_terminadas(self, saga_ids: List[str]) -> List[str]:
+        """De `saga_ids`, las que ya llegaron a un estado terminal."""
+        return [sid for sid, e in self.obtener_estados_sagas(saga_ids).items() if e["finalizada"]]
+
+    def obtener_estados_sagas(self, saga_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Estado de varias sagas con un único `WHERE id IN (...)` (polling multi-saga)."""
+        if not saga_ids:
+            return {}
+        cols = {"saga_id": self.c_sagas["pk"]}
+        for clave, col in (("estado", "estado"), ("fecha_fin", "ff")):
+            if self.c_sagas.get(col):
+                cols[clave] = self.c_sagas[col]
+        params = {f"id{i}": sid for i, sid in enumerate(saga_ids)}
+        sql = f"""
+            SELECT {', '.join(f'{c} AS {k}' for k, c in cols.items())}
+            FROM sagas
+            WHERE {self.c_sagas['pk']} IN ({', '.join(':' + k for k in params)})
+        """
+        with self.engine.begin() as conn:
+            filas = conn.execute(text(sql), params).mappings().all()
+        estados: Dict[str, Dict[str, Any]] = {}
+        for f in filas:
+            item = dict(f)
+            sid = item.pop("saga_id")
+            if isinstance(item.get("fecha_fin"), datetime):
+                item["fecha_fin"] = item["fecha_fin"].isoformat() + "Z"
+            item["finalizada"] = item.get("estado") in _TERMINALES
+            estados[sid] = item
+        return estados
+
+    # ------- listado (keyset) --------
+    @staticmethod
+    def _codificar_cursor(fi: datetime, pk: str) -> str:
+        crudo = json.dumps([fi.isoformat(), pk], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decodificar_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            fi, pk = json.loads(crudo)
+            return datetime.fromisoformat(fi), str(pk)
+        except Exception:
+            raise ValueError("cursor inválido")
+
+    def listar_sagas(self, estados: Optional[List[str]] = None, tipo: Optional[str] = None,
+                     desde: Optional[datetime] = None, cursor: Optional[str] = None,
+                     limite: int = 50) -> Dict[str, Any]:
+        """
+        Página de sagas (más recientes primero) con keyset sobre (fecha_inicio, id):
+        cada página es un range scan acotado, sin OFFSET ni COUNT(*).
+        Solo columnas de resumen; `siguiente_cursor` es None en la última página.
+        """
+        pk, fi = self.c_sagas["pk"], self.c_sagas["fi"]
+        if not fi:
+            raise RuntimeError("La tabla `sagas` no tiene fecha_inicio; no se puede paginar.")
+
+        resumen = {"saga_id": pk, "fecha_inicio": fi}
+        for clave, col in (("tipo", "tipo"), ("nombre", "nombre"), ("estado", "estado"),
+                           ("prioridad", "prioridad"), ("fecha_fin", "ff")):
+            if self.c_sagas.get(col):
+                resumen[clave] = self.c_sagas[col]
+
+        filtros: List[str] = []
+        params: Dict[str, Any] = {"lim": limite + 1}
+        if estados and self.c_sagas["estado"]:
+            marcas = []
+            for i, e in enumerate(estados):
+                marcas.append(f":e{i}")
+                params[f"e{i}"] = e
+            filtros.append(f"{self.c_sagas['estado']} IN ({', '.join(marcas)})")
+        if tipo and self.c_sagas["tipo"]:
+            filtros.append(f"{self.c_sagas['tipo']} = :tipo")
+            params["tipo"] = tipo
+        if desde:
+            filtros.append(f"{fi} >= :desde")
+            params["desde"] = desde
+        if cursor:
+            params["cfi"], params["cpk"] = self._decodificar_cursor(cursor)
+            filtros.append(f"({fi} < :cfi OR ({fi} = :cfi AND {pk} < :cpk))")
+
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        sql = f"""
+            SELECT {', '.join(f'{c} AS {k}' for k, c in resumen.items())}
+            FROM sagas {where}
+            ORDER BY {fi} DESC, {pk} DESC
+            LIMIT :lim
+        """
+        with self.engine.begin() as conn:
+            filas = [dict(r) for r in conn.execute(text(sql), params).mappings()]
+
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            siguiente = self._codificar_cursor(ultima["fecha_inicio"], ultima["saga_id"])
+        for f in filas:
+            for k in ("fecha_inicio", "fecha_fin"):
+                if isinstance(f.get(k), datetime):
+                    f[k] = f[k].isoformat() + "Z"
+            f["finalizada"] = f.get("estado") in _TERMINALES
+        return {"sagas": filas, "siguiente_cursor": siguiente, "limite": limite}
     
 
 
@@ -50,6 +50,7 @@ def ensure_schema(engine):
                   `error_mensaje` TEXT NULL,
                   `fecha_inicio` DATETIME NULL,
                   `fecha_fin` DATETIME NULL,
+                  `compensacion_completada` BOOLEAN DEFAULT FALSE,
                   PRIMARY KEY (`id`),
                   KEY `idx_saga` (`saga_id`)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,160 @@
+"""
+Cache de resultados de queries (alrededor de `ejecutar_query`).
+
+- Una región LRU por tipo de query, con su TTL y su máximo de entradas.
+- Cada resultado se guarda con etiquetas (p. ej. `campania:<id>`, `campanias:listas`);
+  `invalidar(*etiquetas)` descarta todas las entradas que las llevan.
+- Si una etiqueta se invalida mientras un handler está calculando un resultado que
+  la lleva, ese resultado se devuelve pero no se guarda: una lectura que empezó
+  antes de la mutación no puede dejar en cache el estado viejo.
+- Thread-safe: los endpoints síncronos de FastAPI corren en el threadpool.
+- La invalidación es local al proceso: no se propaga a otras réplicas del servicio.
+  Una réplica que no ejecutó el comando ni recibió el evento (las suscripciones de
+  Pulsar son compartidas, cada evento llega a una sola) sigue respondiendo lo
+  cacheado hasta que vence el TTL. Por eso los TTL deben ser cortos: son el tope de
+  cuánto puede atrasarse una réplica respecto de otra.
+"""
+from __future__ import annotations
+
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class _Region:
+
+    def __init__(self, nombre: str, ttl_segundos: float, max_entradas: int):
+        self.nombre = nombre
+        self.ttl = ttl_segundos
+        self.max_entradas = max(1, max_entradas)
+        # clave → (valor, expira, etiquetas)
+        self.entradas: "OrderedDict[Hashable, Tuple[Any, float, Tuple[str, ...]]]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidadas = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self.entradas),
+            "max_entradas": self.max_entradas,
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_acierto": round(self.aciertos / consultas, 4) if consultas else None,
+            "desalojos": self.desalojos,
+            "invalidadas": self.invalidadas,
+        }
+
+
+def _clave(query) -> Hashable:
+    if is_dataclass(query):
+        return tuple(getattr(query, f.name) for f in fields(query))
+    return tuple(sorted(vars(query).items()))
+
+
+class CacheQueries:
+
+    def __init__(self):
+        self._regiones: Dict[str, _Region] = {}
+        self._por_etiqueta: Dict[str, Set[Tuple[str, Hashable]]] = {}
+        # cargas en curso → etiquetas invalidadas mientras calculaban
+        self._en_vuelo: Dict[int, Set[str]] = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def cachear(self, ttl_segundos: float, max_entradas: int = 1000,
+                etiquetas: Optional[Callable[[Any], Iterable[str]]] = None):
+        """
+        Decorador para la función que ejecuta un tipo de query:
+
+            @ejecutar_query.register(ObtenerCampaniaPorId)
+            @cache_queries.cachear(ttl_segundos=30, etiquetas=lambda q: [f"campania:{q.id_campania}"])
+            def ejecutar_query_obtener_campania_por_id(query): ...
+        """
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(query):
+                nombre = type(query).__name__
+                clave = _clave(query)
+                with self._lock:
+                    region = self._regiones.get(nombre)
+                    if region is None:
+                        region = self._regiones[nombre] = _Region(nombre, ttl_segundos, max_entradas)
+                    entrada = region.entradas.get(clave)
+                    if entrada is not None and time.monotonic() < entrada[1]:
+                        region.aciertos += 1
+                        region.entradas.move_to_end(clave)
+                        return entrada[0]
+                    region.fallos += 1
+                    token = next(self._tokens)
+                    self._en_vuelo[token] = set()
+
+                try:
+                    resultado = funcion(query)
+                except Exception:
+                    with self._lock:
+                        self._en_vuelo.pop(token, None)
+                    raise
+
+                tags = tuple(etiquetas(query)) if etiquetas else ()
+                with self._lock:
+                    invalidadas = self._en_vuelo.pop(token, set())
+                    if "*" not in invalidadas and not invalidadas.intersection(tags):
+                        self._guardar(region, clave, resultado, tags)
+                return resultado
+
+            return envoltura
+        return decorador
+
+    def invalidar(self, *etiquetas: str):
+        with self._lock:
+            for invalidadas in self._en_vuelo.values():
+                invalidadas.update(etiquetas)
+            for etiqueta in etiquetas:
+                for nombre, clave in self._por_etiqueta.pop(etiqueta, ()):
+                    region = self._regiones.get(nombre)
+                    if region is not None and region.entradas.pop(clave, None) is not None:
+                        region.invalidadas += 1
+
+    def limpiar(self):
+        with self._lock:
+            for region in self._regiones.values():
+                region.entradas.clear()
+            self._por_etiqueta.clear()
+            for invalidadas in self._en_vuelo.values():
+                # cualquier carga en curso queda sin guardar
+                invalidadas.add("*")
+
+    def estadisticas(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {nombre: region.estadisticas() for nombre, region in self._regiones.items()}
+
+    # Internos (con el lock tomado)
+    def _guardar(self, region: _Region, clave: Hashable, valor: Any, tags: Tuple[str, ...]):
+        anterior = region.entradas.pop(clave, None)
+        if anterior is not None:
+            self._desindexar(region.nombre, clave, anterior[2])
+        region.entradas[clave] = (valor, time.monotonic() + region.ttl, tags)
+        for etiqueta in tags:
+            self._por_etiqueta.setdefault(etiqueta, set()).add((region.nombre, clave))
+        while len(region.entradas) > region.max_entradas:
+            vieja, (_, _, tags_viejas) = region.entradas.popitem(last=False)
+            self._desindexar(region.nombre, vieja, tags_viejas)
+            region.desalojos += 1
+
+    def _desindexar(self, nombre: str, clave: Hashable, tags: Tuple[str, ...]):
+        for etiqueta in tags:
+            claves = self._por_etiqueta.get(etiqueta)
+            if claves is not None:
+                claves.discard((nombre, clave))
+                if not claves:
+                    del self._por_etiqueta[etiqueta]
+
+
+cache_queries = CacheQueries()
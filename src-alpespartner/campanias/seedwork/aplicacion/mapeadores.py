@@ -0,0 +1,173 @@
+"""
+Mapeadores entidad → DTO generados por par (entidad, DTO).
+
+A partir de los campos del DTO y de las anotaciones de la entidad se genera (una
+sola vez) el código de una función especializada:
+
+- objetos valor de un solo campo se desenvuelven (`campania.nombre.nombre`),
+- enums se convierten a su valor, fechas a ISO-8601 cuando el DTO espera texto,
+- el id se convierte a str,
+
+con un camino rápido por tipo exacto y, si el valor no es del tipo anotado (None,
+un primitivo ya plano, un texto que no es miembro del enum), la conversión
+genérica `_primitivo`. Los atributos de cada fila se leen con un solo
+`attrgetter` y el DTO se arma sin pasar por su `__init__` cuando es un dataclass
+sin `__post_init__` ni `__slots__`.
+
+    mapeador = compilar_mapeador(Campaña, CampañaDTO)
+    dto = mapeador.mapear(campania)
+    dtos = mapeador.map_many(campanias)
+"""
+from __future__ import annotations
+
+import threading
+import typing
+from dataclasses import MISSING, fields, is_dataclass
+from datetime import date, datetime
+from enum import Enum
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from campanias.seedwork.dominio.objetos_valor import ObjetoValor
+
+
+def _primitivo(valor, atributo: Optional[str] = None, iso: bool = False):
+    """Conversión genérica (camino lento): objeto valor / enum / fecha → primitivo"""
+    if isinstance(valor, Enum):
+        valor = valor.value
+    elif atributo and hasattr(valor, atributo):
+        valor = getattr(valor, atributo)
+    if iso and isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _tipo_plano(tipo) -> Any:
+    """Optional[X] → X"""
+    if typing.get_origin(tipo) is typing.Union:
+        argumentos = [a for a in typing.get_args(tipo) if a is not type(None)]
+        if len(argumentos) == 1:
+            return argumentos[0]
+    return tipo
+
+
+def _es_subclase(tipo, base) -> bool:
+    return isinstance(tipo, type) and issubclass(tipo, base)
+
+
+class MapeadorCompilado:
+    """Conversión entidad → DTO especializada para un par de tipos"""
+
+    def __init__(self, tipo_entidad: type, tipo_dto: type, campos: Optional[Dict[str, str]] = None):
+        if not is_dataclass(tipo_dto):
+            raise TypeError(f"{tipo_dto.__name__} no es un dataclass")
+        self.tipo_entidad = tipo_entidad
+        self.tipo_dto = tipo_dto
+        # campo del DTO → atributo de la entidad (por defecto el mismo nombre)
+        self.campos = dict(campos or {})
+        self.fuente, espacio = self._generar()
+        exec(compile(self.fuente, f"<mapeador {tipo_entidad.__name__}→{tipo_dto.__name__}>", "exec"), espacio)
+        self.mapear: Callable[[Any], Any] = espacio["mapear"]
+        self.map_many: Callable[[Iterable[Any]], List[Any]] = espacio["map_many"]
+
+    def _generar(self) -> Tuple[str, Dict[str, Any]]:
+        anotaciones_entidad = {f.name: f.type for f in fields(self.tipo_entidad)} if is_dataclass(self.tipo_entidad) else {}
+        espacio: Dict[str, Any] = {
+            "_primitivo": _primitivo, "_str": str, "_datetime": datetime, "_dto": self.tipo_dto,
+            "_nuevo": object.__new__, "_asignar": object.__setattr__,
+        }
+        atributos: List[str] = []
+        expresiones: List[Tuple[str, str]] = []
+
+        for i, campo in enumerate(fields(self.tipo_dto)):
+            if not campo.init:
+                continue
+            atributo = self.campos.get(campo.name, campo.name)
+            if atributo not in anotaciones_entidad and not hasattr(self.tipo_entidad, atributo):
+                if campo.default is MISSING and campo.default_factory is MISSING:
+                    raise TypeError(f"{self.tipo_entidad.__name__} no tiene atributo para {self.tipo_dto.__name__}.{campo.name}")
+                continue
+            variable = f"a{len(atributos)}"
+            atributos.append(atributo)
+            expresiones.append((campo.name, self._expresion(
+                variable, anotaciones_entidad.get(atributo), _tipo_plano(campo.type), espacio, i
+            )))
+
+        espacio["_leer"] = attrgetter(*atributos) if len(atributos) > 1 else (lambda e, _g=attrgetter(*atributos): (_g(e),))
+        directo = (
+            not hasattr(self.tipo_dto, "__post_init__")
+            and "__slots__" not in vars(self.tipo_dto)
+            and all(f.init for f in fields(self.tipo_dto))
+        )
+        if directo:
+            # sin __init__ los campos que la entidad no tiene toman su default aquí
+            mapeados = {nombre for nombre, _ in expresiones}
+            for campo in fields(self.tipo_dto):
+                if campo.name in mapeados:
+                    continue
+                if campo.default is not MISSING:
+                    espacio[f"_d_{campo.name}"] = campo.default
+                    expresiones.append((campo.name, f"_d_{campo.name}"))
+                else:
+                    espacio[f"_f_{campo.name}"] = campo.default_factory
+                    expresiones.append((campo.name, f"_f_{campo.name}()"))
+            cuerpo = "{" + ", ".join(f"{nombre!r}: {expr}" for nombre, expr in expresiones) + "}"
+            construir = [f"    o = _nuevo(_dto)", f"    _asignar(o, '__dict__', {cuerpo})"]
+        else:
+            construir = ["    o = _dto(" + ", ".join(f"{nombre}={expr}" for nombre, expr in expresiones) + ")"]
+
+        desempacar = "    " + ", ".join(f"a{i}" for i in range(len(atributos))) + ", = _leer(e)"
+        lineas = ["def _uno(e):", desempacar, *construir, "    return o", ""]
+        lineas += [
+            "def mapear(e):",
+            "    return None if e is None else _uno(e)",
+            "",
+            "def map_many(entidades, _uno=_uno):",
+            "    return [_uno(e) for e in entidades]",
+        ]
+        return "\n".join(lineas) + "\n", espacio
+
+    @staticmethod
+    def _expresion(variable: str, tipo_entidad, tipo_dto, espacio: Dict[str, Any], i: int) -> str:
+        iso = tipo_dto is str
+        if tipo_entidad is None:
+            # sin anotación (p. ej. la propiedad `id`): si el DTO espera texto, texto
+            if iso:
+                return (f"({variable} if {variable} is None or {variable}.__class__ is _str"
+                        f" else _str(_primitivo({variable}, None, True)))")
+            return f"_primitivo({variable})"
+        tipo_entidad = _tipo_plano(tipo_entidad)
+        clase = f"_t{i}"
+        espacio[clase] = tipo_entidad
+
+        if _es_subclase(tipo_entidad, Enum):
+            return f"({variable}._value_ if {variable}.__class__ is {clase} else _primitivo({variable}))"
+        if _es_subclase(tipo_entidad, ObjetoValor) and is_dataclass(tipo_entidad) and len(fields(tipo_entidad)) == 1:
+            interno = fields(tipo_entidad)[0]
+            acceso = f"{variable}.{interno.name}"
+            if iso and _es_subclase(_tipo_plano(interno.type), (datetime, date)):
+                return (f"(({acceso}.isoformat() if {acceso}.__class__ is _datetime else _primitivo({acceso}, None, True))"
+                        f" if {variable}.__class__ is {clase} else _primitivo({variable}, {interno.name!r}, True))")
+            return f"({acceso} if {variable}.__class__ is {clase} else _primitivo({variable}, {interno.name!r}))"
+        if _es_subclase(tipo_entidad, (datetime, date)) and iso:
+            return f"({variable}.isoformat() if {variable}.__class__ is {clase} else _primitivo({variable}, None, True))"
+        if iso and tipo_entidad is not str:
+            # identificadores (uuid.UUID) y otros → texto
+            return f"(None if {variable} is None else _str({variable}))"
+        return variable
+
+
+_mapeadores: Dict[Tuple[type, type, Tuple[Tuple[str, str], ...]], MapeadorCompilado] = {}
+_lock = threading.Lock()
+
+
+def compilar_mapeador(tipo_entidad: type, tipo_dto: type, campos: Optional[Dict[str, str]] = None) -> MapeadorCompilado:
+    """Mapeador del par (entidad, DTO) con su renombre de `campos`; se genera una vez y se reutiliza"""
+    clave = (tipo_entidad, tipo_dto, tuple(sorted((campos or {}).items())))
+    mapeador = _mapeadores.get(clave)
+    if mapeador is None:
+        with _lock:
+            mapeador = _mapeadores.get(clave)
+            if mapeador is None:
+                mapeador = _mapeadores[clave] = MapeadorCompilado(tipo_entidad, tipo_dto, campos)
+    return mapeador
@@ -1,6 +1,7 @@
 from functools import singledispatch
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import Optional
 
 
 class Query(ABC):
@@ -10,6 +11,11 @@ class Query(ABC):
 class QueryResultado:
     resultado: None
 
+@dataclass
+class QueryResultadoPaginado(QueryResultado):
+    total: int = 0  # elementos que cumplen el filtro, no solo los de la página
+    siguiente_cursor: Optional[str] = None  # paginación keyset: None en la última página
+
 class QueryHandler(ABC):
     @abstractmethod
     def handle(self, query: Query) -> QueryResultado:
@@ -4,7 +4,7 @@ En este archivo usted encontrará las entidades reusables parte del seedwork del
 
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, InitVar
 from .eventos import EventoDominio
 from .mixins import ValidarReglasMixin
 from .reglas import IdEntidadEsInmutable
@@ -12,13 +12,17 @@ from .excepciones import IdDebeSerInmutableExcepcion
 from datetime import datetime
 import uuid
 
-@dataclass
+@dataclass(slots=True)
 class Entidad:
-    id: uuid.UUID = field(hash=True)
+    # `id` no es un slot: es un InitVar que pasa por el setter de la propiedad
+    id: InitVar[uuid.UUID] = None
     _id: uuid.UUID = field(init=False, repr=False, hash=True)
     fecha_creacion: datetime =  field(default=datetime.now())
     fecha_actualizacion: datetime = field(default=datetime.now())
 
+    def __post_init__(self, id):
+        self.id = id
+
     @classmethod
     def siguiente_id(self) -> uuid.UUID:
         return uuid.uuid4()
@@ -34,7 +38,7 @@ class Entidad:
         self._id = self.siguiente_id()
         
 
-@dataclass
+@dataclass(slots=True)
 class AgregacionRaiz(Entidad, ValidarReglasMixin):
     eventos: list[EventoDominio] = field(default_factory=list)
     eventos_compensacion: list[EventoDominio] = field(default_factory=list)
@@ -50,7 +54,7 @@ class AgregacionRaiz(Entidad, ValidarReglasMixin):
         self.eventos_compensacion = list()
 
 
-@dataclass
+@dataclass(slots=True)
 class Locacion(Entidad):
     def __str__(self) -> str:
         ...
\ No newline at end of file
@@ -4,18 +4,22 @@ En este archivo usted encontrará las clases para eventos reusables parte del se
 
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, InitVar
 from .reglas import IdEntidadEsInmutable
 from .excepciones import IdDebeSerInmutableExcepcion
 from datetime import datetime
 import uuid
 
-@dataclass
+@dataclass(slots=True)
 class EventoDominio():
-    id: uuid.UUID = field(hash=True)
+    # `id` no es un slot: es un InitVar que pasa por el setter de la propiedad
+    id: InitVar[uuid.UUID] = None
     _id: uuid.UUID = field(init=False, repr=False, hash=True)
     fecha_evento: datetime =  field(default=datetime.now())
 
+    def __post_init__(self, id):
+        self.id = id
+
 
     @classmethod
     def siguiente_id(self) -> uuid.UUID:
@@ -8,6 +8,8 @@ from .reglas import ReglaNegocio
 from .excepciones import ReglaNegocioExcepcion
 
 class ValidarReglasMixin:
+    __slots__ = ()
+
     def validar_regla(self, regla: ReglaNegocio):
         if not regla.es_valido():
             raise ReglaNegocioExcepcion(regla)
\ No newline at end of file
@@ -10,12 +10,40 @@ from typing import Optional
 from enum import Enum
 import re
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ObjetoValor:
     """Clase base para todos los objetos valor"""
     pass
 
-@dataclass(frozen=True)
+MAX_INTERNADOS = 10_000
+_internados: dict = {}
+
+class Internado:
+    """
+    Mixin para objetos valor con pocos valores posibles (monedas, banderas):
+    construir uno igual a otro ya creado devuelve la misma instancia.
+    Va antes de ObjetoValor en las bases: `class Moneda(Internado, ObjetoValor)`.
+    """
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        if not args and not kwargs:
+            # copy / pickle reconstruyen sin argumentos
+            return object.__new__(cls)
+        clave = (cls, args, tuple(sorted(kwargs.items())))
+        try:
+            return _internados[clave]
+        except KeyError:
+            pass
+        except TypeError:
+            # argumentos no hashables: no se internan
+            return object.__new__(cls)
+        instancia = object.__new__(cls)
+        if len(_internados) >= MAX_INTERNADOS:
+            return instancia
+        return _internados.setdefault(clave, instancia)
+
+@dataclass(frozen=True, slots=True)
 class Codigo(ObjetoValor):
     """Código genérico para identificadores"""
     codigo: str
@@ -26,7 +54,7 @@ class Codigo(ObjetoValor):
         if len(self.codigo) > 20:
             raise ValueError("El código no puede tener más de 20 caracteres")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Email(ObjetoValor):
     """Email válido para contacto"""
     email: str
@@ -43,7 +71,7 @@ class Email(ObjetoValor):
         """Retorna el dominio del email"""
         return self.email.split('@')[1]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Presupuesto(ObjetoValor):
     """Presupuesto con moneda"""
     monto: float
@@ -55,7 +83,7 @@ class Presupuesto(ObjetoValor):
         if not self.moneda or len(self.moneda) != 3:
             raise ValueError("La moneda debe tener 3 caracteres")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PeriodoCampana(ObjetoValor):
     """Período de duración de una campaña"""
     fecha_inicio: datetime
@@ -75,7 +103,7 @@ class PeriodoCampana(ObjetoValor):
             fecha_actual = datetime.now()
         return self.fecha_inicio <= fecha_actual <= self.fecha_fin
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SegmentoAudiencia(ObjetoValor):
     """Segmento de audiencia objetivo"""
     nombre: str
@@ -96,7 +124,7 @@ class TipoCampana(Enum):
     VIDEO = "video"
     INFLUENCER = "influencer"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Canal(ObjetoValor):
     """Canal de marketing"""
     tipo: TipoCampana
@@ -107,7 +135,7 @@ class Canal(ObjetoValor):
         if not self.nombre or not self.nombre.strip():
             raise ValueError("El nombre del canal no puede estar vacío")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MetricaObjetivo(ObjetoValor):
     """Métrica objetivo de la campaña"""
     nombre: str
@@ -0,0 +1,117 @@
+"""
+Bus de eventos en proceso para la unidad de trabajo.
+
+Reemplaza a `pydispatch.dispatcher.send(signal=f'{Tipo}Dominio', ...)`:
+
+- Los handlers se registran por (tipo de evento, fase). La lista de handlers de
+  cada tipo (incluidos los registrados para sus clases base) se resuelve una vez
+  y se guarda como tupla; publicar es un lookup en un dict, sin formatear strings
+  ni resolver weakrefs.
+- Los handlers `async def` se detectan al registrarlos y se ejecutan en el event
+  loop del hilo que publica, o en un loop propio en segundo plano si no hay uno.
+- `publicar_lote` despacha todos los eventos de un commit de una vez: los handlers
+  síncronos se llaman en orden y cada handler async recibe una sola tarea que
+  procesa el lote completo.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Fase(Enum):
+    DOMINIO = "Dominio"            # al registrar el batch, antes del commit
+    INTEGRACION = "Integracion"    # después del commit
+
+
+class BusEventos:
+
+    def __init__(self):
+        # (tipo, fase) → handlers registrados exactamente para ese tipo
+        self._handlers: Dict[Tuple[type, Fase], List[Tuple[Callable, bool]]] = {}
+        # (tipo, fase) → (síncronos, asíncronos) incluyendo los de sus clases base
+        self._resueltos: Dict[Tuple[type, Fase], Tuple[Tuple[Callable, ...], Tuple[Callable, ...]]] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop = None
+        self._tareas: Set[asyncio.Future] = set()
+
+    def suscribir(self, tipo_evento: type, handler: Callable, fase: Fase = Fase.DOMINIO):
+        es_async = asyncio.iscoroutinefunction(handler)
+        with self._lock:
+            handlers = self._handlers.setdefault((tipo_evento, fase), [])
+            if any(h is handler for h, _ in handlers):
+                return
+            handlers.append((handler, es_async))
+            # cualquier subclase pudo quedar resuelta sin este handler
+            self._resueltos = {}
+
+    def desuscribir(self, tipo_evento: type, handler: Callable, fase: Fase = Fase.DOMINIO):
+        with self._lock:
+            handlers = self._handlers.get((tipo_evento, fase), [])
+            handlers[:] = [(h, a) for h, a in handlers if h is not handler]
+            self._resueltos = {}
+
+    def handlers(self, tipo_evento: type, fase: Fase) -> Tuple[Tuple[Callable, ...], Tuple[Callable, ...]]:
+        resueltos = self._resueltos.get((tipo_evento, fase))
+        if resueltos is None:
+            with self._lock:
+                sincronos, asincronos = [], []
+                for clase in tipo_evento.__mro__:
+                    for handler, es_async in self._handlers.get((clase, fase), ()):
+                        (asincronos if es_async else sincronos).append(handler)
+                resueltos = (tuple(sincronos), tuple(asincronos))
+                self._resueltos[(tipo_evento, fase)] = resueltos
+        return resueltos
+
+    def publicar(self, evento: Any, fase: Fase = Fase.DOMINIO):
+        sincronos, asincronos = self.handlers(type(evento), fase)
+        for handler in sincronos:
+            handler(evento=evento)
+        for handler in asincronos:
+            self._programar(handler, (evento,))
+
+    def publicar_lote(self, eventos: Iterable[Any], fase: Fase = Fase.DOMINIO):
+        """Despacha los eventos en orden; los handlers async reciben una tarea por lote"""
+        pendientes_async: Dict[Callable, List[Any]] = {}
+        for evento in eventos:
+            sincronos, asincronos = self.handlers(type(evento), fase)
+            for handler in sincronos:
+                handler(evento=evento)
+            for handler in asincronos:
+                pendientes_async.setdefault(handler, []).append(evento)
+        for handler, lote in pendientes_async.items():
+            self._programar(handler, lote)
+
+    # Handlers asíncronos
+    def _programar(self, handler: Callable, eventos):
+        async def correr():
+            for evento in eventos:
+                try:
+                    await handler(evento=evento)
+                except Exception as e:
+                    logger.error(f"Error en handler async {getattr(handler, '__qualname__', handler)}: {e}")
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            tarea = asyncio.run_coroutine_threadsafe(correr(), self._loop_fondo())
+        else:
+            tarea = loop.create_task(correr())
+        # referencia fuerte hasta que termine
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    def _loop_fondo(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="bus-eventos", daemon=True).start()
+            return self._loop
+
+
+bus_eventos = BusEventos()
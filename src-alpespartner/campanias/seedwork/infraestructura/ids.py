@@ -0,0 +1,18 @@
+"""Identificadores ordenables por tiempo para journals append-only."""
+import itertools
+import time
+import uuid
+
+_secuencia = itertools.count()
+
+
+def nuevo_id_ordenable() -> str:
+    """
+    Id de 36 caracteres ordenable por tiempo: <ms epoch 13 díg>-<secuencia 6 díg>-<aleatorio 15 hex>.
+    Usado como PK, mantiene el orden de inserción al recorrer la tabla por PK.
+    El orden es por reloj y por proceso: entre réplicas, o si el reloj salta, no es
+    monótono. No sirve como posición de checkpoint; para eso, una secuencia de la BD.
+    """
+    ms = int(time.time() * 1000)
+    seq = next(_secuencia) % 1_000_000
+    return f"{ms:013d}-{seq:06d}-{uuid.uuid4().hex[:15]}"
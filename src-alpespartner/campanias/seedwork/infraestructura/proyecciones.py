@@ -1,5 +1,46 @@
-from functools import singledispatch
+"""
+Proyecciones de lectura del seedwork.
+
+- `ProyeccionLectura`: mantiene una tabla de lectura desnormalizada. Acumula en
+  memoria el efecto de los eventos (`aplicar`) y lo escribe en un solo upsert por
+  lote (`escribir`).
+- `MotorProyecciones`: recibe eventos ya normalizados (`EventoProyectable`), los
+  acumula y, cada `tamano_lote` eventos o `intervalo_segundos`, en una misma
+  transacción:
+    1. los agrega al journal de eventos (descartando los ya vistos por `id`); la
+       posición la asigna la BD (AUTO_INCREMENT), no el reloj de cada réplica,
+    2. los aplica a cada proyección y escribe sus upserts,
+    3. avanza el checkpoint de cada proyección (última posición del journal; nunca
+       retrocede aunque un flush atrasado escriba una posición menor).
+  `registrar` devuelve un futuro que se resuelve cuando esa transacción hizo
+  commit: recién entonces el consumidor puede confirmar el mensaje. Si la BD no
+  está, el lote se reintenta sin perder eventos y, pasado `max_pendientes`,
+  `registrar` lanza ProyeccionesSaturadas para que el consumidor deje de confirmar.
+  Tras `max_intentos` fallos seguidos el lote se escribe evento por evento: el que
+  falla solo se aparta a `tabla_descartes` (y su mensaje se confirma) para que un
+  evento envenenado no bloquee la proyección.
+  `reconstruir()` vacía las tablas y vuelve a proyectar el journal completo;
+  `ponerse_al_dia()` reproduce solo lo que falta desde cada checkpoint.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import singledispatch
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
 
 class Proyeccion(ABC):
     @abstractmethod
@@ -13,4 +54,369 @@ class ProyeccionHandler(ABC):
 
 @singledispatch
 def ejecutar_proyeccion(proyeccion):
-    raise NotImplementedError(f'No existe implementación para la proyección de tipo {type(proyeccion).__name__}')
\ No newline at end of file
+    raise NotImplementedError(f'No existe implementación para la proyección de tipo {type(proyeccion).__name__}')
+
+
+# =====================================================================
+# Proyecciones de lectura
+# =====================================================================
+
+@dataclass
+class EventoProyectable:
+    """Evento normalizado tal como se guarda en el journal de proyecciones."""
+    id: str                              # id estable del evento (deduplicación)
+    tipo: str
+    agregado_id: str
+    datos: Dict[str, Any] = field(default_factory=dict)
+    fecha: datetime = field(default_factory=datetime.utcnow)
+    posicion: Optional[int] = None       # asignada por la BD al entrar al journal
+
+
+class ProyeccionLectura(ABC):
+    """Proyección que mantiene una tabla de lectura a partir de eventos."""
+
+    nombre: str = ""
+    tipos_evento: frozenset = frozenset()
+
+    def maneja(self, evento: EventoProyectable) -> bool:
+        return evento.tipo in self.tipos_evento
+
+    @abstractmethod
+    def aplicar(self, evento: EventoProyectable) -> None:
+        """Acumula el efecto del evento en memoria."""
+
+    @abstractmethod
+    def escribir(self, conn) -> int:
+        """Escribe lo acumulado (upsert por lotes) y vacía el acumulado. Devuelve filas escritas."""
+
+    @abstractmethod
+    def descartar(self) -> None:
+        """Olvida lo acumulado (la transacción que lo iba a escribir falló)."""
+
+    @abstractmethod
+    def reiniciar(self, conn) -> None:
+        """Vacía la tabla de lectura antes de una reconstrucción."""
+
+
+def _datos_json(evento: EventoProyectable) -> str:
+    # compacto: sin espacios ni claves nulas
+    return json.dumps({k: v for k, v in evento.datos.items() if v is not None},
+                      ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class ProyeccionesSaturadas(Exception):
+    """Hay demasiados eventos sin escribir (BD caída o lenta): no aceptar más por ahora."""
+
+
+class MotorProyecciones:
+
+    def __init__(self, engine: Engine, proyecciones: Iterable[ProyeccionLectura],
+                 tabla_journal: str, tabla_checkpoint: str = "proyecciones_checkpoint",
+                 tabla_descartes: str = "proyecciones_descartes",
+                 tamano_lote: int = 200, intervalo_segundos: float = 1.0,
+                 max_pendientes: Optional[int] = None, max_intentos: int = 5) -> None:
+        self.engine = engine
+        self.proyecciones: Dict[str, ProyeccionLectura] = {p.nombre: p for p in proyecciones}
+        self.tabla_journal = tabla_journal
+        self.tabla_checkpoint = tabla_checkpoint
+        self.tabla_descartes = tabla_descartes
+        self.tamano_lote = max(1, tamano_lote)
+        self.intervalo_segundos = intervalo_segundos
+        self.max_pendientes = max_pendientes or self.tamano_lote * 50
+        self.max_intentos = max(1, max_intentos)
+        self._fallos_seguidos = 0
+        self._buffer: List[Tuple[EventoProyectable, Future]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._detener = threading.Event()
+        self._lote_lleno = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name=f"proyecciones-{tabla_journal}", daemon=True)
+        self._hilo.start()
+
+    # ------------------------------------------------------------------
+    # Alimentación en vivo
+    # ------------------------------------------------------------------
+
+    def registrar(self, evento: Optional[EventoProyectable]) -> Optional[Future]:
+        """
+        Encola el evento para el próximo flush. El futuro se resuelve (True si era
+        nuevo, False si ya estaba en el journal) cuando el lote que lo contiene hizo
+        commit. Lanza ProyeccionesSaturadas si hay `max_pendientes` sin escribir.
+        """
+        if evento is None:
+            return None
+        futuro: Future = Future()
+        with self._lock:
+            if len(self._buffer) >= self.max_pendientes:
+                raise ProyeccionesSaturadas(f"{len(self._buffer)} eventos sin proyectar en {self.tabla_journal}")
+            self._buffer.append((evento, futuro))
+            lleno = len(self._buffer) >= self.tamano_lote
+        if lleno:
+            # el flush corre en el hilo del motor, no en el del consumidor
+            self._lote_lleno.set()
+        return futuro
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                lote, self._buffer = self._buffer, []
+            if not lote:
+                return 0
+            try:
+                nuevos = self._escribir_lote(lote)
+            except Exception as e:
+                self._fallos_seguidos += 1
+                if self._fallos_seguidos >= self.max_intentos:
+                    log.error("Lote de %d eventos falló %d veces, se aísla el evento que falla: %s",
+                              len(lote), self._fallos_seguidos, e)
+                    return self._aislar(lote)
+                # nada se descarta: el lote vuelve adelante y se reintenta en el próximo ciclo;
+                # sus mensajes siguen sin confirmar y el tope de `registrar` frena la entrada
+                log.error("No se pudo proyectar lote de %d eventos (intento %d/%d): %s",
+                          len(lote), self._fallos_seguidos, self.max_intentos, e)
+                self._devolver(lote)
+                return 0
+            self._fallos_seguidos = 0
+            self._resolver(lote, nuevos)
+            return len(nuevos)
+
+    def _escribir_lote(self, lote: List[Tuple[EventoProyectable, Future]]) -> List[EventoProyectable]:
+        """Journal + proyecciones + checkpoints en una transacción; si falla, las proyecciones olvidan lo acumulado."""
+        try:
+            with self.engine.begin() as conn:
+                nuevos = self._agregar_al_journal(conn, [evento for evento, _ in lote])
+                self._proyectar(conn, nuevos, self.proyecciones.values())
+            return nuevos
+        except Exception:
+            for p in self.proyecciones.values():
+                p.descartar()
+            raise
+
+    def _aislar(self, lote: List[Tuple[EventoProyectable, Future]]) -> int:
+        """
+        Escribe el lote evento por evento. El que falla solo va a `tabla_descartes` y su
+        futuro se resuelve (False) para que el consumidor lo confirme. Si tampoco se puede
+        escribir el descarte, la que falla es la BD: lo que queda vuelve al buffer.
+        """
+        escritos = 0
+        for i, (evento, futuro) in enumerate(lote):
+            try:
+                nuevos = self._escribir_lote([(evento, futuro)])
+            except Exception as e:
+                try:
+                    self._descartar_evento(evento, e)
+                except Exception as e_descarte:
+                    log.error("No se pudo apartar el evento %s, se reintenta el resto: %s", evento.id, e_descarte)
+                    self._devolver(lote[i:])
+                    return escritos
+                log.error("Evento %s (%s de %s) apartado en %s: %s",
+                          evento.id, evento.tipo, evento.agregado_id, self.tabla_descartes, e)
+                self._resolver([(evento, futuro)], [])
+                continue
+            self._resolver([(evento, futuro)], nuevos)
+            escritos += len(nuevos)
+        self._fallos_seguidos = 0
+        return escritos
+
+    def _descartar_evento(self, evento: EventoProyectable, error: Exception) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {self.tabla_descartes} (evento_id, tabla_journal, tipo, agregado_id, datos, fecha, error)
+                VALUES (:evento_id, :tabla_journal, :tipo, :agregado_id, :datos, :fecha, :error)
+                ON DUPLICATE KEY UPDATE error=VALUES(error), veces=veces+1
+            """), {
+                "evento_id": evento.id,
+                "tabla_journal": self.tabla_journal,
+                "tipo": evento.tipo,
+                "agregado_id": evento.agregado_id,
+                "datos": _datos_json(evento),
+                "fecha": evento.fecha,
+                "error": (str(error) or type(error).__name__)[:2000],
+            })
+
+    def _devolver(self, lote: List[Tuple[EventoProyectable, Future]]) -> None:
+        with self._lock:
+            self._buffer[:0] = lote
+
+    @staticmethod
+    def _resolver(lote: List[Tuple[EventoProyectable, Future]], nuevos: List[EventoProyectable]) -> None:
+        ids_nuevos = {evento.id for evento in nuevos}
+        for evento, futuro in lote:
+            if not futuro.done():
+                futuro.set_result(evento.id in ids_nuevos)
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _agregar_al_journal(self, conn, lote: List[EventoProyectable]) -> List[EventoProyectable]:
+        # redeliveries del broker: se descartan los ids ya vistos (en el lote o en el journal)
+        unicos: Dict[str, EventoProyectable] = {}
+        for evento in lote:
+            unicos.setdefault(evento.id, evento)
+        existentes = {
+            fila[0] for fila in conn.execute(
+                text(f"SELECT evento_id FROM {self.tabla_journal} WHERE evento_id IN :ids")
+                .bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(unicos)}
+            )
+        }
+        nuevos = [e for e in unicos.values() if e.id not in existentes]
+        if not nuevos:
+            return []
+        conn.execute(text(f"""
+            INSERT INTO {self.tabla_journal} (evento_id, tipo, agregado_id, datos, fecha)
+            VALUES (:evento_id, :tipo, :agregado_id, :datos, :fecha)
+        """), [
+            {
+                "evento_id": e.id,
+                "tipo": e.tipo,
+                "agregado_id": e.agregado_id,
+                "datos": _datos_json(e),
+                "fecha": e.fecha,
+            }
+            for e in nuevos
+        ])
+        # la posición es el AUTO_INCREMENT de la fila: un único orden para todas las réplicas
+        posiciones = dict(conn.execute(
+            text(f"SELECT evento_id, posicion FROM {self.tabla_journal} WHERE evento_id IN :ids")
+            .bindparams(bindparam("ids", expanding=True)),
+            {"ids": [e.id for e in nuevos]}
+        ).all())
+        for evento in nuevos:
+            evento.posicion = posiciones[evento.id]
+        nuevos.sort(key=lambda e: e.posicion)
+        return nuevos
+
+    def _proyectar(self, conn, eventos: List[EventoProyectable], proyecciones: Iterable[ProyeccionLectura]) -> None:
+        if not eventos:
+            return
+        checkpoints = []
+        for p in proyecciones:
+            n = 0
+            for evento in eventos:
+                if p.maneja(evento):
+                    p.aplicar(evento)
+                    n += 1
+            if n:
+                p.escribir(conn)
+            checkpoints.append({"proyeccion": p.nombre, "posicion": eventos[-1].posicion, "eventos": n})
+        conn.execute(text(f"""
+            INSERT INTO {self.tabla_checkpoint} (proyeccion, ultima_posicion, eventos)
+            VALUES (:proyeccion, :posicion, :eventos)
+            ON DUPLICATE KEY UPDATE ultima_posicion=GREATEST(COALESCE(ultima_posicion, 0), VALUES(ultima_posicion)),
+                                    eventos=eventos+VALUES(eventos)
+        """), checkpoints)
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            self._lote_lleno.wait(self.intervalo_segundos)
+            self._lote_lleno.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("Error en el flush de proyecciones: %s", e)
+
+    def cerrar(self) -> None:
+        self._detener.set()
+        self._lote_lleno.set()
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Replay desde el journal
+    # ------------------------------------------------------------------
+
+    def checkpoints(self) -> Dict[str, Optional[int]]:
+        with self.engine.connect() as conn:
+            filas = conn.execute(text(f"SELECT proyeccion, ultima_posicion FROM {self.tabla_checkpoint}")).all()
+        vistos = {f[0]: f[1] for f in filas}
+        return {nombre: vistos.get(nombre) for nombre in self.proyecciones}
+
+    def eventos(self, desde: Optional[int] = None) -> Iterator[EventoProyectable]:
+        """Recorre el journal en orden de posición con un cursor del lado del servidor."""
+        where = "WHERE posicion > :desde" if desde else ""
+        sql = f"""
+            SELECT posicion, evento_id, tipo, agregado_id, datos, fecha
+            FROM {self.tabla_journal} {where}
+            ORDER BY posicion
+        """
+        with self.engine.connect() as conn:
+            res = conn.execution_options(stream_results=True, max_row_buffer=self.tamano_lote * 5) \
+                      .execute(text(sql), {"desde": desde}).mappings()
+            for lote in res.partitions(self.tamano_lote * 5):
+                for fila in lote:
+                    try:
+                        datos = json.loads(fila["datos"] or "{}")
+                    except Exception:
+                        datos = {}
+                    yield EventoProyectable(id=fila["evento_id"], tipo=fila["tipo"],
+                                            agregado_id=fila["agregado_id"], datos=datos,
+                                            fecha=fila["fecha"], posicion=fila["posicion"])
+
+    def reconstruir(self, nombres: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Vacía las tablas de las proyecciones indicadas (todas por defecto) y reproduce el journal."""
+        seleccion = [self.proyecciones[n] for n in (nombres or self.proyecciones)]
+        with self._flush_lock:
+            with self.engine.begin() as conn:
+                for p in seleccion:
+                    p.reiniciar(conn)
+                conn.execute(
+                    text(f"DELETE FROM {self.tabla_checkpoint} WHERE proyeccion IN :nombres")
+                    .bindparams(bindparam("nombres", expanding=True)),
+                    {"nombres": [p.nombre for p in seleccion]}
+                )
+            return self._reproducir(seleccion, desde=None)
+
+    def ponerse_al_dia(self) -> Dict[str, Any]:
+        """Proyecta lo que cada proyección aún no vio (p. ej. una proyección nueva o tras una caída)."""
+        with self._flush_lock:
+            checkpoints = self.checkpoints()
+            # se lee desde el checkpoint más atrasado; cada proyección salta lo que ya tiene
+            desde = min((c or 0 for c in checkpoints.values()), default=0) or None
+            return self._reproducir(list(self.proyecciones.values()), desde=desde, checkpoints=checkpoints)
+
+    def _reproducir(self, proyecciones: List[ProyeccionLectura], desde: Optional[int],
+                    checkpoints: Optional[Dict[str, Optional[int]]] = None) -> Dict[str, Any]:
+        checkpoints = checkpoints or {}
+        inicio = time.monotonic()
+        n, lote = 0, []
+
+        def escribir_lote():
+            with self.engine.begin() as conn:
+                for p in proyecciones:
+                    pendientes = [e for e in lote if (checkpoints.get(p.nombre) or 0) < e.posicion]
+                    self._proyectar(conn, pendientes, [p])
+
+        try:
+            for evento in self.eventos(desde=desde):
+                lote.append(evento)
+                n += 1
+                if len(lote) >= self.tamano_lote * 5:
+                    escribir_lote()
+                    lote = []
+            if lote:
+                escribir_lote()
+        except Exception:
+            for p in proyecciones:
+                p.descartar()
+            raise
+        duracion = time.monotonic() - inicio
+        log.info("Replay de proyecciones %s: %d eventos en %.2fs",
+                 [p.nombre for p in proyecciones], n, duracion)
+        return {"proyecciones": [p.nombre for p in proyecciones], "eventos": n,
+                "duracion_s": round(duracion, 3)}
+
+
+_motores: Dict[str, MotorProyecciones] = {}
+_motores_lock = threading.Lock()
+
+
+def motor_para(clave: str, fabrica) -> MotorProyecciones:
+    """Un motor (y un hilo de flush) por clave; `fabrica()` lo crea la primera vez."""
+    with _motores_lock:
+        motor = _motores.get(clave)
+        if motor is None:
+            motor = fabrica()
+            _motores[clave] = motor
+            atexit.register(motor.cerrar)
+        return motor
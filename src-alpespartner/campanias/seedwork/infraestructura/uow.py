@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
 from enum import Enum
+from typing import Optional
 
 from campanias.seedwork.dominio.entidades import AgregacionRaiz
-from pydispatch import dispatcher
+from campanias.seedwork.infraestructura.bus import bus_eventos, Fase
 
-import pickle
 import logging
 import traceback
 
@@ -64,6 +66,10 @@ class UnidadTrabajo(ABC):
         self._publicar_eventos_post_commit()
         self._limpiar_batches()
 
+    def pendiente(self) -> bool:
+        """Hay trabajo registrado sin confirmar"""
+        return bool(self.batches)
+
     @abstractmethod
     def rollback(self, savepoint=None):
         self._limpiar_batches()
@@ -78,91 +84,86 @@ class UnidadTrabajo(ABC):
         self._publicar_eventos_dominio(batch, repositorio_eventos_func)
 
     def _publicar_eventos_dominio(self, batch, repositorio_eventos_func):
-        for evento in self._obtener_eventos(batches=[batch]):
-            if repositorio_eventos_func:
+        eventos = self._obtener_eventos(batches=[batch])
+        if repositorio_eventos_func:
+            for evento in eventos:
                 repositorio_eventos_func(evento)
-            dispatcher.send(signal=f'{type(evento).__name__}Dominio', evento=evento)
+        bus_eventos.publicar_lote(eventos, Fase.DOMINIO)
 
     def _publicar_eventos_post_commit(self):
         try:
-            for evento in self._obtener_eventos():
-                dispatcher.send(signal=f'{type(evento).__name__}Integracion', evento=evento)
+            bus_eventos.publicar_lote(self._obtener_eventos(), Fase.INTEGRACION)
         except:
             logging.error('ERROR: Suscribiendose al tópico de eventos!')
             traceback.print_exc()
             
 
-def is_flask():
-    try:
-        from flask import session
-        return True
-    except Exception as e:
-        return False
-
-def registrar_unidad_de_trabajo(serialized_obj):
-    from campanias.config.db import get_db
-    from flask import session
-    
+# La unidad de trabajo vive en un ContextVar: cada request (middleware) o mensaje
+# (consumidor) abre su propio ámbito, y los hilos del threadpool de FastAPI
+# heredan el contexto del request que los usa.
+_uow_actual: ContextVar[Optional[UnidadTrabajo]] = ContextVar("uow_actual", default=None)
 
-    session['uow'] = serialized_obj
 
-def flask_uow():
-    from flask import session
-    from campanias.config.db import get_db
-    if session.get('uow'):
-        return session['uow']
+def _nueva_unidad_de_trabajo() -> UnidadTrabajo:
+    from campanias.config.uow import UnidadTrabajoSQLAlchemy
+    return UnidadTrabajoSQLAlchemy()
 
-    # TODO: Implementar UnidadTrabajoSQLAlchemy específica para campanias
-    # uow_serialized = pickle.dumps(UnidadTrabajoSQLAlchemy())
-    # if session.get('uow_metodo') == 'pulsar':
-    #     uow_serialized = pickle.dumps(UnidadTrabajoPulsar())
-    
-    # Por ahora retornamos una unidad de trabajo básica
-    uow_serialized = pickle.dumps(UnidadTrabajo())
-    
-    registrar_unidad_de_trabajo(uow_serialized)
-    return uow_serialized
 
 def unidad_de_trabajo() -> UnidadTrabajo:
-    if is_flask():
-        return pickle.loads(flask_uow())
-    else:
-        raise Exception('No hay unidad de trabajo')
+    """
+    UoW del ámbito actual. Fuera de `ambito_unidad_trabajo()` no se crea una: quedaría
+    ligada al contexto en curso (p. ej. una tarea de fondo) sin que nadie la cierre,
+    con su conexión abierta si alcanzó a ejecutar algún batch.
+    """
+    uow = _uow_actual.get()
+    if uow is None:
+        raise RuntimeError("No hay unidad de trabajo: usar `with ambito_unidad_trabajo():`")
+    return uow
+
+
+@contextmanager
+def ambito_unidad_trabajo(uow: Optional[UnidadTrabajo] = None):
+    """
+    Liga una UoW nueva (o la indicada, p. ej. sobre otro engine) a la vida de un
+    request o del manejo de un mensaje. Lo que no se haya confirmado al salir se descarta.
+    """
+    uow = _nueva_unidad_de_trabajo() if uow is None else uow
+    token = _uow_actual.set(uow)
+    try:
+        yield uow
+    finally:
+        try:
+            if uow.pendiente():
+                uow.rollback()
+        finally:
+            _uow_actual.reset(token)
+
 
-def guardar_unidad_trabajo(uow: UnidadTrabajo):
-    if is_flask():
-        registrar_unidad_de_trabajo(pickle.dumps(uow))
-    else:
-        raise Exception('No hay unidad de trabajo')
+def conexion_actual(engine):
+    """Conexión de la transacción abierta por la UoW del ámbito (None si no hay) para ese engine"""
+    uow = _uow_actual.get()
+    conexion_para = getattr(uow, "conexion_para", None)
+    return conexion_para(engine) if conexion_para else None
 
 
 class UnidadTrabajoPuerto:
 
     @staticmethod
     def commit():
-        uow = unidad_de_trabajo()
-        uow.commit()
-        guardar_unidad_trabajo(uow)
+        unidad_de_trabajo().commit()
 
     @staticmethod
     def rollback(savepoint=None):
-        uow = unidad_de_trabajo()
-        uow.rollback(savepoint=savepoint)
-        guardar_unidad_trabajo(uow)
+        unidad_de_trabajo().rollback(savepoint=savepoint)
 
     @staticmethod
     def savepoint():
-        uow = unidad_de_trabajo()
-        uow.savepoint()
-        guardar_unidad_trabajo(uow)
+        return unidad_de_trabajo().savepoint()
 
     @staticmethod
     def dar_savepoints():
-        uow = unidad_de_trabajo()
-        return uow.savepoints()
+        return unidad_de_trabajo().savepoints()
 
     @staticmethod
     def registrar_batch(operacion, *args, lock=Lock.PESIMISTA, **kwargs):
-        uow = unidad_de_trabajo()
-        uow.registrar_batch(operacion, *args, lock=lock, **kwargs)
-        guardar_unidad_trabajo(uow)
+        unidad_de_trabajo().registrar_batch(operacion, *args, lock=lock, **kwargs)
@@ -1,7 +1,50 @@
 from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
 
 class Vista(ABC):
 
     @abstractmethod
     def obtener_por(**kwargs):
-        ...
\ No newline at end of file
+        ...
+
+
+class VistaTabla(Vista):
+    """Vista sobre una tabla de lectura mantenida por una proyección: una fila por agregado."""
+
+    tabla: str = ""
+    pk: str = "id"
+    columnas: tuple = ()
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from campanias.config.db import engine
+        self.engine = engine
+
+    def obtener_por(self, limite: Optional[int] = None, desplazamiento: int = 0,
+                    orden: Optional[str] = None, **filtros) -> List[Dict[str, Any]]:
+        """Filas que cumplen los filtros de igualdad (filtros con valor None se ignoran)."""
+        filtros = {k: v for k, v in filtros.items() if v is not None and k in self.columnas + (self.pk,)}
+        where = " AND ".join(f"{c} = :{c}" for c in filtros)
+        sql = f"SELECT {self._select()} FROM {self.tabla}"
+        if where:
+            sql += f" WHERE {where}"
+        if orden:
+            sql += f" ORDER BY {orden}"
+        if limite is not None:
+            sql += " LIMIT :limite OFFSET :desplazamiento"
+            filtros.update(limite=limite, desplazamiento=desplazamiento)
+        with self.engine.connect() as conn:
+            return [dict(fila) for fila in conn.execute(text(sql), filtros).mappings()]
+
+    def obtener(self, id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            fila = conn.execute(
+                text(f"SELECT {self._select()} FROM {self.tabla} WHERE {self.pk} = :id"), {"id": id}
+            ).mappings().first()
+        return dict(fila) if fila else None
+
+    def _select(self) -> str:
+        return ", ".join((self.pk,) + tuple(c for c in self.columnas if c != self.pk)) if self.columnas else "*"
@@ -1,8 +1,16 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
+from sqlalchemy import bindparam, text
+from typing import Any, Dict, List
 import uvicorn
 import os
 
+from config.db import engine
+
+# Máximo de campanias por consulta de métricas en lote
+MAX_LOTE_METRICAS = int(os.getenv("CONVERSIONES_MAX_LOTE_METRICAS", "500"))
+
 app = FastAPI(
     title="Conversiones Microservice",
     description="Microservicio de gestión de conversiones para AlpesPartner",
@@ -30,6 +38,80 @@ async def health_check():
 async def listar_conversiones():
     return {"conversiones": [], "message": "Lista de conversiones"}
 
+class MetricasBatchRequest(BaseModel):
+    campania_ids: List[str] = Field(..., min_length=1, max_length=MAX_LOTE_METRICAS)
+
+
+# Una sola pasada agrupada por campaña (usa idx_campania)
+_SQL_METRICAS = text("""
+    SELECT campania_id,
+           COUNT(*)                                  AS total_conversiones,
+           SUM(validada)                             AS conversiones_validadas,
+           COALESCE(SUM(valor_conversion), 0)        AS valor_total,
+           COUNT(DISTINCT afiliado_id)               AS afiliados_con_conversiones,
+           SUM(tipo_conversion = 'COMPRA')           AS compras,
+           SUM(tipo_conversion = 'REGISTRO')         AS registros,
+           SUM(tipo_conversion = 'CLICK')            AS clicks,
+           MAX(fecha_conversion)                     AS ultima_conversion
+    FROM conversiones
+    WHERE campania_id IN :ids
+    GROUP BY campania_id
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def _metricas_vacias() -> Dict[str, Any]:
+    return {
+        "total_conversiones": 0,
+        "conversiones_validadas": 0,
+        "valor_total": 0.0,
+        "valor_promedio": 0.0,
+        "afiliados_con_conversiones": 0,
+        "compras": 0,
+        "registros": 0,
+        "clicks": 0,
+        "ultima_conversion": None
+    }
+
+
+def _consultar_metricas(campania_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Métricas por campaña; las campanias sin conversiones quedan con métricas en cero"""
+    ids = list(dict.fromkeys(campania_ids))
+    metricas = {campania_id: _metricas_vacias() for campania_id in ids}
+    with engine.connect() as conn:
+        for fila in conn.execute(_SQL_METRICAS, {"ids": ids}).mappings():
+            total = int(fila["total_conversiones"])
+            valor_total = float(fila["valor_total"])
+            metricas[fila["campania_id"]] = {
+                "total_conversiones": total,
+                "conversiones_validadas": int(fila["conversiones_validadas"] or 0),
+                "valor_total": valor_total,
+                "valor_promedio": round(valor_total / total, 2) if total else 0.0,
+                "afiliados_con_conversiones": int(fila["afiliados_con_conversiones"]),
+                "compras": int(fila["compras"] or 0),
+                "registros": int(fila["registros"] or 0),
+                "clicks": int(fila["clicks"] or 0),
+                "ultima_conversion": fila["ultima_conversion"].isoformat() if fila["ultima_conversion"] else None
+            }
+    return metricas
+
+
+@app.post("/conversiones/metricas:batch")
+def obtener_metricas_batch(request: MetricasBatchRequest):
+    """Métricas de conversión de varias campanias en una sola consulta"""
+    try:
+        return {"metricas": _consultar_metricas(request.campania_ids)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error consultando métricas: {str(e)}")
+
+
+@app.get("/conversiones/campania/{campania_id}/metricas")
+def obtener_metricas_campania(campania_id: str):
+    try:
+        return _consultar_metricas([campania_id])[campania_id]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error consultando métricas: {str(e)}")
+
+
 if __name__ == "__main__":
     port = int(os.getenv("APP_PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,235 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from bff.config import config
+from bff.modulos.clientes.base_cliente import BaseClienteHTTP, ClienteHTTPException
+from bff.modulos.clientes.resiliencia import (
+    ABIERTO, CERRADO, SEMI_ABIERTO, InterruptorCircuito, reunir_con_plazo
+)
+
+
+def _correr(corrutina):
+    return asyncio.run(asyncio.wait_for(corrutina, timeout=5))
+
+
+def _interruptor(**kwargs):
+    parametros = dict(ventana_segundos=30, min_muestras=4, umbral_errores=0.5, umbral_latencia_ms=1000,
+                      umbral_lentas=0.8, espera_apertura_segundos=0.05, sondas=2)
+    parametros.update(kwargs)
+    return InterruptorCircuito("servicio", **parametros)
+
+
+# ------- circuit breaker --------
+
+def test_no_abre_sin_el_minimo_de_muestras():
+    circuito = _interruptor()
+    for _ in range(3):
+        circuito.registrar(False, 10)
+    assert circuito.estado == CERRADO
+
+
+def test_abre_por_tasa_de_errores_y_rechaza_mientras_espera():
+    circuito = _interruptor()
+    for exito in (True, False, True, False):
+        circuito.registrar(exito, 10)
+    assert circuito.estado == ABIERTO
+    assert not circuito.permitir()
+    assert circuito.estadisticas()["rechazadas"] == 1
+
+
+def test_abre_por_tasa_de_llamadas_lentas():
+    circuito = _interruptor()
+    for ms in (1500, 1500, 1500, 1500):
+        circuito.registrar(True, ms)
+    assert circuito.estado == ABIERTO
+
+
+def test_semi_abierto_deja_pasar_solo_las_sondas_y_cierra_si_salen_bien():
+    circuito = _interruptor()
+    for _ in range(4):
+        circuito.registrar(False, 10)
+    time.sleep(0.06)
+    assert circuito.permitir() and circuito.permitir()
+    assert circuito.estado == SEMI_ABIERTO
+    assert not circuito.permitir()
+    circuito.registrar(True, 10)
+    circuito.registrar(True, 10)
+    assert circuito.estado == CERRADO
+    assert circuito.estadisticas()["muestras"] == 0
+
+
+def test_sonda_fallida_vuelve_a_abrir():
+    circuito = _interruptor()
+    for _ in range(4):
+        circuito.registrar(False, 10)
+    time.sleep(0.06)
+    assert circuito.permitir()
+    circuito.registrar(False, 10)
+    assert circuito.estado == ABIERTO
+    assert circuito.aperturas == 2
+
+
+def test_sonda_cancelada_libera_su_lugar():
+    circuito = _interruptor(sondas=1)
+    for _ in range(4):
+        circuito.registrar(False, 10)
+    time.sleep(0.06)
+    assert circuito.permitir()
+    assert not circuito.permitir()
+    circuito.cancelada()
+    assert circuito.permitir()
+
+
+def test_ventana_descarta_muestras_viejas():
+    circuito = _interruptor(ventana_segundos=0.05)
+    for _ in range(3):
+        circuito.registrar(False, 10)
+    time.sleep(0.06)
+    circuito.registrar(False, 10)
+    assert circuito.estado == CERRADO
+    assert circuito.estadisticas()["muestras"] == 1
+
+
+def test_p95_solo_de_llamadas_exitosas():
+    circuito = _interruptor(min_muestras=20, umbral_errores=1.1)
+    assert circuito.p95_ms() is None
+    for ms in range(1, 101):
+        circuito.registrar(True, ms)
+    circuito.registrar(False, 5000)
+    assert circuito.p95_ms() == 95
+
+
+# ------- plazo de agregados --------
+
+def test_reunir_con_plazo_devuelve_lo_que_llego_y_cancela_el_resto():
+    cancelada = asyncio.Event()
+
+    async def lenta():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelada.set()
+            raise
+
+    async def rapida():
+        return {"id": "c-1"}
+
+    async def falla():
+        raise ClienteHTTPException("caído", status_code=503)
+
+    async def prueba():
+        partes, faltantes = await reunir_con_plazo(
+            {"campania": rapida(), "afiliados": lenta(), "metricas": falla()}, plazo_segundos=0.05
+        )
+        await asyncio.sleep(0)
+        assert cancelada.is_set()
+        return partes, faltantes
+
+    partes, faltantes = _correr(prueba())
+    assert partes["campania"] == {"id": "c-1"}
+    assert isinstance(partes["metricas"], ClienteHTTPException)
+    assert faltantes == ["afiliados"]
+
+
+# ------- hedging --------
+
+class _Cliente(BaseClienteHTTP):
+    pass
+
+
+def _cliente(responder):
+    cliente = _Cliente("http://servicio")
+    cliente.client = httpx.AsyncClient(base_url="http://servicio", transport=httpx.MockTransport(responder))
+    cliente.circuito = _interruptor(min_muestras=5)
+    BaseClienteHTTP._instancias.remove(cliente)
+    return cliente
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(config, "hedging_get", True)
+    monkeypatch.setattr(config, "hedging_min_ms", 20)
+
+
+def test_sin_p95_no_hay_cobertura(hedging):
+    async def responder(request):
+        return httpx.Response(200, json={"ok": True})
+
+    async def prueba():
+        cliente = _cliente(responder)
+        assert await cliente.get("/x") == {"ok": True}
+        return cliente
+
+    cliente = _correr(prueba())
+    assert cliente.coberturas_lanzadas == 0
+
+
+def test_cobertura_gana_cuando_la_primera_se_demora(hedging):
+    llamadas = []
+
+    async def responder(request):
+        llamadas.append(request.url.path)
+        if len(llamadas) == 6:
+            await asyncio.sleep(1)  # la primera petición medida se cuelga
+            return httpx.Response(200, json={"de": "primera"})
+        return httpx.Response(200, json={"de": "cobertura" if len(llamadas) == 7 else "calentamiento"})
+
+    async def prueba():
+        cliente = _cliente(responder)
+        for _ in range(5):
+            await cliente.get("/x")
+        inicio = time.monotonic()
+        respuesta = await cliente.get("/x")
+        return cliente, respuesta, time.monotonic() - inicio
+
+    cliente, respuesta, segundos = _correr(prueba())
+    assert respuesta == {"de": "cobertura"}
+    assert segundos < 0.5
+    assert (cliente.coberturas_lanzadas, cliente.coberturas_ganadas) == (1, 1)
+
+
+def test_error_http_de_la_primera_no_espera_a_la_cobertura(hedging):
+    llamadas = []
+
+    async def responder(request):
+        llamadas.append(request.url.path)
+        if len(llamadas) == 6:
+            await asyncio.sleep(0.05)
+            return httpx.Response(404, json={"error": "no existe"})
+        if len(llamadas) == 7:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"ok": True})
+
+    async def prueba():
+        cliente = _cliente(responder)
+        for _ in range(5):
+            await cliente.get("/x")
+        inicio = time.monotonic()
+        with pytest.raises(ClienteHTTPException) as error:
+            await cliente.get("/x")
+        return error.value, time.monotonic() - inicio
+
+    error, segundos = _correr(prueba())
+    assert error.status_code == 404
+    assert segundos < 0.5
+
+
+def test_circuito_abierto_falla_rapido_sin_llamar_al_servicio():
+    llamadas = []
+
+    async def responder(request):
+        llamadas.append(request)
+        return httpx.Response(200, json={})
+
+    async def prueba():
+        cliente = _cliente(responder)
+        cliente.circuito._abrir(time.monotonic())
+        with pytest.raises(ClienteHTTPException) as error:
+            await cliente.post("/x", {"a": 1})
+        return error.value
+
+    assert _correr(prueba()).status_code == 503
+    assert llamadas == []
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from bff.config import config
+from bff.modulos.servicios.difusor_sagas import DifusorEventosSaga, difusor_sagas
+from bff.modulos.servicios.sagas_service import SagasService
+
+
+def _correr(corrutina):
+    return asyncio.run(asyncio.wait_for(corrutina, timeout=5))
+
+
+@pytest.mark.parametrize("paso, estado, esperado", [
+    ("solicitar_afiliados_elegibles", "OK", "COMPLETADA"),
+    # campanias compensa cuando afiliados falla: la saga todavía no terminó
+    ("solicitar_afiliados_elegibles", "FALLIDO", "COMPENSANDO"),
+    ("solicitar_afiliados_elegibles", "ENVIADO", "EN_PROGRESO"),
+    ("compensar_busqueda_afiliados", "OK", "COMPENSANDO"),
+    ("compensar_comisiones", "FALLIDO", "COMPENSANDO"),
+])
+def test_estado_de_la_saga_depende_del_paso(paso, estado, esperado):
+    evento = DifusorEventosSaga.normalizar({"saga_id": "s1", "paso": paso, "estado": estado})
+    assert evento["estado"] == esperado
+    assert evento["estado_paso"] == estado
+
+
+def test_publicar_reparte_solo_a_los_suscriptores_de_la_saga():
+    async def prueba():
+        difusor = DifusorEventosSaga(tamanio_buffer=2)
+        vistos = []
+        difusor.agregar_oyente(vistos.append)
+        s1, s2 = difusor.suscribir("s1"), difusor.suscribir("s2")
+        for i in range(3):
+            difusor.publicar({"saga_id": "s1", "n": i})
+        # buffer de 2: se descarta el más viejo
+        assert [(await s1.siguiente(0.1))["n"] for _ in range(2)] == [1, 2]
+        assert s1.descartados == 1
+        assert await s2.siguiente(0.01) is None
+        difusor.desuscribir(s1)
+        assert difusor.estadisticas()["clientes"] == 1
+        return vistos
+
+    assert len(_correr(prueba())) == 3
+
+
+def test_stream_relee_el_estado_mientras_la_saga_compensa(monkeypatch):
+    monkeypatch.setattr(config, "intervalo_polling_saga", 0.01)
+    servicio = SagasService()
+    lecturas = iter([{"estado": "EN_PROGRESO"}, {"estado": "COMPENSANDO"}, {"estado": "COMPENSADA"}])
+
+    async def obtener_estado_saga(saga_id, usar_cache=True):
+        return next(lecturas)
+
+    servicio.obtener_estado_saga = obtener_estado_saga
+
+    async def prueba():
+        estados = []
+        async for evento in servicio.stream_eventos_saga("s1", timeout_segundos=2):
+            if evento["estado"] != "HEARTBEAT":
+                estados.append(evento["estado"])
+            if evento["estado"] == "EN_PROGRESO":
+                difusor_sagas.publicar(DifusorEventosSaga.normalizar(
+                    {"saga_id": "s1", "paso": "solicitar_afiliados_elegibles", "estado": "FALLIDO"}
+                ))
+        return estados
+
+    # el cierre de la compensación no llega por el tópico: sale de releer campanias
+    assert _correr(prueba()) == ["EN_PROGRESO", "COMPENSANDO", "COMPENSADA"]
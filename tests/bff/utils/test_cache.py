@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from bff.utils.cache import CacheAsincrona
+
+
+def _correr(corrutina):
+    return asyncio.run(asyncio.wait_for(corrutina, timeout=5))
+
+
+class _Cargador:
+    def __init__(self, retardo: float = 0.0, falla: bool = False):
+        self.llamadas = 0
+        self.retardo = retardo
+        self.falla = falla
+
+    async def __call__(self):
+        self.llamadas += 1
+        await asyncio.sleep(self.retardo)
+        if self.falla:
+            raise ConnectionError("servicio caído")
+        return f"v{self.llamadas}"
+
+
+def test_single_flight_una_carga_para_peticiones_simultaneas():
+    async def prueba():
+        cache = CacheAsincrona("t-single-flight", max_entradas=10, ttl_segundos=60)
+        cargador = _Cargador(retardo=0.05)
+        valores = await asyncio.gather(*(cache.obtener("c", cargador) for _ in range(20)))
+        assert valores == ["v1"] * 20
+        assert cargador.llamadas == 1
+        assert cache.estadisticas()["cargas_compartidas"] == 19
+        assert await cache.obtener("c", cargador) == "v1"
+        assert cache.aciertos == 1
+
+    _correr(prueba())
+
+
+def test_error_de_carga_se_propaga_a_todos_y_no_se_guarda():
+    async def prueba():
+        cache = CacheAsincrona("t-error", max_entradas=10, ttl_segundos=60)
+        cargador = _Cargador(retardo=0.01, falla=True)
+        resultados = await asyncio.gather(*(cache.obtener("c", cargador) for _ in range(3)),
+                                          return_exceptions=True)
+        assert all(isinstance(r, ConnectionError) for r in resultados)
+        assert cargador.llamadas == 1
+        assert cache.errores_carga == 1
+        cargador.falla = False
+        assert await cache.obtener("c", cargador) == "v2"
+
+    _correr(prueba())
+
+
+def test_cancelar_al_primer_cliente_no_cancela_la_carga_compartida():
+    async def prueba():
+        cache = CacheAsincrona("t-cancelar", max_entradas=10, ttl_segundos=60)
+        cargador = _Cargador(retardo=0.05)
+        primero = asyncio.ensure_future(cache.obtener("c", cargador))
+        segundo = asyncio.ensure_future(cache.obtener("c", cargador))
+        await asyncio.sleep(0.01)
+        primero.cancel()
+        assert await segundo == "v1"
+        assert cargador.llamadas == 1
+
+    _correr(prueba())
+
+
+def test_obsoleto_se_responde_y_se_refresca_en_segundo_plano():
+    async def prueba():
+        cache = CacheAsincrona("t-swr", max_entradas=10, ttl_segundos=0.02, ventana_obsoleta_segundos=60)
+        cargador = _Cargador(retardo=0.02)
+        assert await cache.obtener("c", cargador) == "v1"
+        await asyncio.sleep(0.03)
+        # vencido pero dentro de la ventana: responde sin esperar la recarga
+        assert await cache.obtener("c", cargador) == "v1"
+        assert cache.aciertos_obsoletos == 1
+        assert cache.cargas == 2
+        assert await cache._en_vuelo["c"] == "v2"
+        assert cache._entradas["c"].valor == "v2"
+
+    _correr(prueba())
+
+
+def test_fuera_de_la_ventana_obsoleta_se_espera_la_carga():
+    async def prueba():
+        cache = CacheAsincrona("t-sin-ventana", max_entradas=10, ttl_segundos=0.01)
+        cargador = _Cargador()
+        assert await cache.obtener("c", cargador) == "v1"
+        await asyncio.sleep(0.02)
+        assert await cache.obtener("c", cargador) == "v2"
+        assert cache.aciertos_obsoletos == 0
+
+    _correr(prueba())
+
+
+def test_invalidar_durante_la_carga_no_guarda_el_resultado():
+    async def prueba():
+        cache = CacheAsincrona("t-invalidar", max_entradas=10, ttl_segundos=60)
+        cargador = _Cargador(retardo=0.03)
+        carga = asyncio.ensure_future(cache.obtener("c", cargador))
+        await asyncio.sleep(0.01)
+        cache.invalidar("c")
+        assert await carga == "v1"
+        assert cache.consultar("c") is None
+
+    _correr(prueba())
+
+
+def test_lru_desaloja_la_menos_usada():
+    cache = CacheAsincrona("t-lru", max_entradas=2, ttl_segundos=60)
+    cache.poner("a", 1)
+    cache.poner("b", 2)
+    assert cache.consultar("a") == 1
+    cache.poner("c", 3)
+    assert cache.consultar("b") is None
+    assert (cache.consultar("a"), cache.consultar("c")) == (1, 3)
+    assert cache.desalojos == 1
+
+
+@pytest.mark.parametrize("ttl", [0.0, -1.0])
+def test_poner_con_ttl_vencido_no_queda_vigente(ttl):
+    cache = CacheAsincrona("t-ttl", max_entradas=2, ttl_segundos=60)
+    cache.poner("a", 1, ttl_segundos=ttl)
+    assert cache.consultar("a") is None
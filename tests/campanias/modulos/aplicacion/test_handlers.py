@@ -0,0 +1,55 @@
+from campanias.modulos.aplicacion.handlers import (
+    ObtenerCampaniasActivas, ObtenerCampaniasActivasHandler, ObtenerTodasLasCampanias,
+    ObtenerTodasLasCampaniasHandler, TAMANO_PAGINA_POR_DEFECTO
+)
+
+
+class _RepositorioRegistrador:
+    """Registra cómo consulta el handler; no devuelve campanias"""
+
+    def __init__(self):
+        self.llamadas = []
+
+    def obtener_pagina(self, **kwargs):
+        self.llamadas.append(("desplazamiento", kwargs))
+        return [], 120
+
+    def obtener_pagina_cursor(self, **kwargs):
+        self.llamadas.append(("cursor", kwargs))
+        return [], "cursor-2"
+
+
+def _handler(clase):
+    handler = clase.__new__(clase)
+    handler._repositorio = _RepositorioRegistrador()
+    return handler
+
+
+def test_primera_pagina_sin_desplazamiento_devuelve_cursor():
+    handler = _handler(ObtenerTodasLasCampaniasHandler)
+    resultado = handler.handle(ObtenerTodasLasCampanias(estado="ACTIVA"))
+    modo, kwargs = handler._repositorio.llamadas[0]
+    assert modo == "cursor"
+    assert kwargs["cursor"] is None
+    assert kwargs["limite"] == TAMANO_PAGINA_POR_DEFECTO
+    assert resultado.siguiente_cursor == "cursor-2"
+    assert resultado.total == -1
+
+
+def test_con_desplazamiento_pagina_con_total_y_limite_acotado():
+    handler = _handler(ObtenerTodasLasCampaniasHandler)
+    resultado = handler.handle(ObtenerTodasLasCampanias(desplazamiento=0))
+    modo, kwargs = handler._repositorio.llamadas[0]
+    assert modo == "desplazamiento"
+    assert kwargs["limite"] == TAMANO_PAGINA_POR_DEFECTO
+    assert resultado.total == 120
+    assert resultado.siguiente_cursor is None
+
+
+def test_activas_leen_una_pagina_keyset():
+    handler = _handler(ObtenerCampaniasActivasHandler)
+    resultado = handler.handle(ObtenerCampaniasActivas(canal_publicidad="EMAIL", limite=20, cursor="cursor-1"))
+    modo, kwargs = handler._repositorio.llamadas[0]
+    assert modo == "cursor"
+    assert (kwargs["cursor"], kwargs["limite"], kwargs["canal"]) == ("cursor-1", 20, "EMAIL")
+    assert resultado.siguiente_cursor == "cursor-2"
@@ -0,0 +1,188 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from campanias.modulos.infraestructura.busqueda import IndiceCampanias, tokenizar
+from campanias.modulos.infraestructura.proyecciones import TipoEventoProyeccion
+from campanias.seedwork.infraestructura.proyecciones import EventoProyectable
+
+CAMPANIAS = {
+    "c-1": dict(nombre="Promociones de Verano", descripcion="Descuentos en tiendas", canal_publicidad="EMAIL",
+                segmento_audiencia="Jóvenes", estado="ACTIVA", presupuesto=500, moneda="USD"),
+    "c-2": dict(nombre="Campaña Económica", descripcion="Promoción para familias", canal_publicidad="Web",
+                segmento_audiencia="familias", estado="PAUSADA", presupuesto=1500, moneda="USD"),
+    "c-3": dict(nombre="Navidad en tienda", descripcion="Regalos y promociones", canal_publicidad="WEB",
+                segmento_audiencia="jovenes", estado="Activa", presupuesto=3000, moneda="EUR"),
+    "c-4": dict(nombre="Lanzamiento app", descripcion="Cashback móvil", canal_publicidad="MOBILE",
+                segmento_audiencia="general", estado="BORRADOR", presupuesto=None, moneda="COP"),
+}
+
+
+def _indice(**kwargs) -> IndiceCampanias:
+    indice = IndiceCampanias(**kwargs)
+    indice._cargado = True  # sin repositorio: solo lo que se indexa en la prueba
+    for id_campania, campos in CAMPANIAS.items():
+        indice.indexar(id_campania, **campos)
+    return indice
+
+
+def _ids(indice, **criterios):
+    pagina, total = indice.buscar(limite=100, **criterios)
+    assert total == len(pagina)
+    return [c["id"] for c in pagina]
+
+
+def test_tokenizar_pliega_acentos_plurales_y_stopwords():
+    assert tokenizar("Promociones de la Campaña Económica") == ["promocion", "campana", "economica"]
+    assert tokenizar("Tiendas y regalos") == ["tienda", "regalo"]
+    assert tokenizar(None) == []
+
+
+def test_texto_combina_terminos_con_and_sin_importar_acentos_ni_plural():
+    assert _ids(_indice(), texto="promoción") == ["c-1", "c-2", "c-3"]
+    assert _ids(_indice(), texto="promociones tienda") == ["c-1", "c-3"]
+    assert _ids(_indice(), texto="campana economica") == ["c-2"]
+    assert _ids(_indice(), texto="inexistente") == []
+
+
+def test_facetas_normalizan_nombre_valor_y_mayusculas():
+    indice = _indice()
+    assert _ids(indice, canal="web") == ["c-2", "c-3"]
+    assert _ids(indice, canal=" Web ") == []  # canal inexistente: sin resultados, sin error
+    assert _ids(indice, segmento="JOVENES") == ["c-1", "c-3"]
+    assert _ids(indice, estado="activa") == ["c-1", "c-3"]
+    assert _ids(indice, estado="CREADA") == ["c-4"]  # el borrador se llama CREADA en BD
+
+
+@pytest.mark.parametrize("criterios, esperado", [
+    (dict(presupuesto_minimo=500, presupuesto_maximo=1500), ["c-1", "c-2"]),
+    (dict(presupuesto_minimo=1000), ["c-2", "c-3"]),
+    (dict(presupuesto_maximo=499), []),
+    (dict(presupuesto_minimo=2000, presupuesto_maximo=1000), []),
+    # pocos candidatos: se revisan uno por uno en vez de armar el bitmap del rango
+    (dict(presupuesto_minimo=1000, estado="ACTIVA"), ["c-3"]),
+])
+def test_rango_de_presupuesto(criterios, esperado):
+    assert _ids(_indice(), **criterios) == esperado
+
+
+def test_paginacion_y_total():
+    indice = _indice()
+    pagina, total = indice.buscar(limite=2, desplazamiento=1)
+    assert total == 4
+    assert [c["id"] for c in pagina] == ["c-2", "c-3"]
+    assert pagina[0]["canal_publicidad"] == "WEB"
+    assert pagina[0]["presupuesto"] == 1500.0
+
+
+def test_actualizar_mueve_terminos_facetas_y_presupuesto():
+    indice = _indice()
+    indice.indexar("c-1", nombre="Liquidación", descripcion="", estado="PAUSADA", presupuesto=5000)
+    assert _ids(indice, texto="verano") == []
+    # la descripción vacía no cambia: el evento parcial no la trae
+    assert _ids(indice, texto="liquidacion tienda") == ["c-1"]
+    assert _ids(indice, estado="PAUSADA") == ["c-1", "c-2"]
+    assert _ids(indice, presupuesto_minimo=4000) == ["c-1"]
+
+
+def test_eliminar_quita_la_campania_de_todos_los_criterios():
+    indice = _indice()
+    indice.eliminar("c-3")
+    indice.eliminar("no-existe")
+    assert _ids(indice) == ["c-1", "c-2", "c-4"]
+    assert _ids(indice, texto="navidad") == []
+    assert _ids(indice, canal="WEB") == ["c-2"]
+    assert _ids(indice, presupuesto_minimo=2000) == []
+
+
+def test_aplicar_eventos_de_campania():
+    indice = _indice()
+    T = TipoEventoProyeccion
+    indice.aplicar(EventoProyectable("e1", T.CAMPANIA_CREADA, "c-5",
+                                     dict(nombre="Black Friday", canal_publicidad="EMAIL", presupuesto=800)))
+    assert _ids(indice, texto="friday", estado="BORRADOR") == ["c-5"]
+    indice.aplicar(EventoProyectable("e2", T.CAMPANIA_ACTIVADA, "c-5"))
+    assert _ids(indice, estado="ACTIVA") == ["c-1", "c-3", "c-5"]
+    indice.aplicar(EventoProyectable("e3", T.CAMPANIA_ELIMINADA, "c-5"))
+    indice.aplicar(EventoProyectable("e4", T.CONVERSION_REGISTRADA, "c-1", dict(monto=10)))
+    indice.aplicar(None)
+    assert _ids(indice, texto="friday") == []
+    assert indice.estadisticas()["documentos"] == 4
+
+
+class _RepositorioPaginado:
+    def __init__(self, filas, indice=None, evento_en_carga=None):
+        self.filas = filas
+        self.indice = indice
+        self.evento_en_carga = evento_en_carga
+
+    def obtener_pagina_cursor(self, cursor=None, limite=50, columnas=None):
+        desde = int(cursor or 0)
+        if desde == 0 and self.evento_en_carga:
+            # llega un evento mientras se lee la primera página
+            self.indice.aplicar(self.evento_en_carga)
+        pagina = self.filas[desde:desde + limite]
+        siguiente = desde + limite
+        return pagina, (str(siguiente) if siguiente < len(self.filas) else None)
+
+
+def _fila(id_campania, **campos):
+    return SimpleNamespace(id=id_campania, **{**dict(descripcion=None, canal_publicidad=None,
+                                                     segmento_audiencia=None, moneda=None), **campos})
+
+
+def test_cargar_por_paginas_y_los_eventos_durante_la_carga_mandan():
+    indice = IndiceCampanias(tamano_carga=2)
+    filas = [_fila(f"c-{i}", nombre=f"Campaña {i}", estado="ACTIVA", presupuesto=100 * i) for i in range(5)]
+    evento = EventoProyectable("e1", TipoEventoProyeccion.CAMPANIA_PAUSADA, "c-3")
+    indice.asegurar_carga(_RepositorioPaginado(filas, indice, evento))
+    assert indice.estadisticas()["documentos"] == 5
+    # la fila leída de BD es más vieja que el evento: c-3 queda pausada...
+    assert _ids(indice, estado="ACTIVA") == ["c-0", "c-1", "c-2", "c-4"]
+    # ...pero conserva lo que el evento parcial no traía
+    assert _ids(indice, texto="campaña 3") == ["c-3"]
+    assert sorted(_ids(indice, presupuesto_minimo=150, presupuesto_maximo=350)) == ["c-2", "c-3"]
+
+
+def test_campania_eliminada_durante_la_carga_no_reaparece():
+    indice = IndiceCampanias(tamano_carga=10)
+    filas = [_fila(f"c-{i}", nombre=f"Campaña {i}", estado="ACTIVA", presupuesto=100) for i in range(3)]
+    evento = EventoProyectable("e1", TipoEventoProyeccion.CAMPANIA_ELIMINADA, "c-1")
+    indice.asegurar_carga(_RepositorioPaginado(filas, indice, evento))
+    assert _ids(indice) == ["c-0", "c-2"]
+
+
+def test_compactar_libera_documentos_y_conserva_los_resultados():
+    generador = random.Random(3)
+    sin_compactar = IndiceCampanias(umbral_compactacion=10**9)
+    compacto = IndiceCampanias(umbral_compactacion=8)
+    for indice in (sin_compactar, compacto):
+        indice._cargado = True
+    vivos = set()
+    consultas = [dict(), dict(texto="promo"), dict(canal="WEB", presupuesto_minimo=300, presupuesto_maximo=700),
+                 dict(estado="ACTIVA", segmento="jovenes", texto="oferta"), dict(limite=5, desplazamiento=3)]
+    for paso in range(2000):
+        if vivos and generador.random() < 0.45:
+            id_campania = generador.choice(sorted(vivos))
+            vivos.discard(id_campania)
+            for indice in (sin_compactar, compacto):
+                indice.eliminar(id_campania)
+        else:
+            id_campania = f"c-{generador.randrange(300)}"
+            vivos.add(id_campania)
+            campos = dict(nombre=generador.choice(["Promo tiendas", "Descuento verano", "Navidad"]),
+                          descripcion="oferta especial", canal_publicidad=generador.choice(["EMAIL", "WEB"]),
+                          segmento_audiencia=generador.choice(["jovenes", "familias"]),
+                          estado=generador.choice(["ACTIVA", "PAUSADA"]), presupuesto=generador.randrange(100, 1000))
+            for indice in (sin_compactar, compacto):
+                indice.indexar(id_campania, **campos)
+        if paso % 100 == 0:
+            for criterios in consultas:
+                criterios = {"limite": 1000, **criterios}
+                assert compacto.buscar(**criterios) == sin_compactar.buscar(**criterios)
+
+    assert len(compacto._docs) < len(sin_compactar._docs)
+    assert compacto.estadisticas()["libres"] < max(8, len(compacto._docs) // 4)
+    assert len(compacto._docs) - compacto.estadisticas()["libres"] == len(vivos)
+    assert len(compacto._vivos[""]) <= len(sin_compactar._vivos[""])
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from campanias.sagas.admision import ControladorAdmision, Prioridad, SagaRechazada
+
+
+def _correr(corrutina):
+    return asyncio.run(asyncio.wait_for(corrutina, timeout=5))
+
+
+async def _con_planificador(controlador, prueba):
+    planificador = asyncio.create_task(controlador.ejecutar())
+    try:
+        return await prueba()
+    finally:
+        planificador.cancel()
+
+
+def test_prioridad_desconocida_se_normaliza_a_media():
+    assert Prioridad.normalizar("alta") is Prioridad.ALTA
+    assert Prioridad.normalizar(None) is Prioridad.MEDIA
+    assert Prioridad.normalizar("URGENTE") is Prioridad.MEDIA
+
+
+def test_cola_llena_rechaza_y_duplicada_se_ignora():
+    async def prueba():
+        controlador = ControladorAdmision(capacidad_por_prioridad=1)
+        assert controlador.encolar("s1", "BAJA", lambda: None) is not None
+        assert controlador.encolar("s1", "BAJA", lambda: None) is None
+        with pytest.raises(SagaRechazada) as error:
+            controlador.encolar("s2", "BAJA", lambda: None)
+        assert error.value.prioridad is Prioridad.BAJA
+        # la cola de otra prioridad no está llena
+        assert controlador.encolar("s3", "ALTA", lambda: None) is not None
+        assert controlador.estado()["rechazadas"] == 1
+
+    _correr(prueba())
+
+
+def test_futuro_se_resuelve_cuando_la_saga_arranco():
+    iniciadas = []
+
+    async def prueba():
+        controlador = ControladorAdmision(max_en_vuelo=2, reserva_alta_prioridad=0)
+
+        async def lanzar():
+            futuro = controlador.encolar("s1", "MEDIA", lambda: iniciadas.append("s1"))
+            assert await futuro == "s1"
+            assert controlador.estado()["en_vuelo"] == 1
+            controlador.liberar("s1")
+            assert controlador.estado()["en_vuelo"] == 0
+
+        await _con_planificador(controlador, lanzar)
+
+    _correr(prueba())
+    assert iniciadas == ["s1"]
+
+
+def test_error_al_iniciar_libera_el_cupo_y_propaga_la_excepcion():
+    def falla():
+        raise RuntimeError("sin broker")
+
+    async def prueba():
+        controlador = ControladorAdmision(max_en_vuelo=1, reserva_alta_prioridad=0)
+
+        async def lanzar():
+            with pytest.raises(RuntimeError):
+                await controlador.encolar("s1", "MEDIA", falla)
+            assert controlador.estado()["en_vuelo"] == 0
+
+        await _con_planificador(controlador, lanzar)
+
+    _correr(prueba())
+
+
+def test_limite_en_vuelo_y_reserva_para_alta_prioridad():
+    async def prueba():
+        controlador = ControladorAdmision(max_en_vuelo=2, reserva_alta_prioridad=1)
+
+        async def lanzar():
+            assert await controlador.encolar("baja-1", "BAJA", lambda: None) == "baja-1"
+            # el único cupo no reservado está ocupado: la segunda BAJA espera
+            baja_2 = controlador.encolar("baja-2", "BAJA", lambda: None)
+            critica = controlador.encolar("critica", "CRITICA", lambda: None)
+            assert await critica == "critica"
+            await asyncio.sleep(0.05)
+            assert not baja_2.done()
+            controlador.liberar("baja-1")
+            await asyncio.sleep(0.05)
+            # la CRITICA en vuelo sigue contando contra el cupo no reservado
+            assert not baja_2.done()
+            controlador.liberar("critica")
+            assert await baja_2 == "baja-2"
+
+        await _con_planificador(controlador, lanzar)
+
+    _correr(prueba())
+
+
+def test_round_robin_ponderado_entre_prioridades():
+    async def prueba():
+        controlador = ControladorAdmision(max_en_vuelo=100)
+        for i in range(8):
+            controlador.encolar(f"critica-{i}", "CRITICA", lambda: None)
+            controlador.encolar(f"baja-{i}", "BAJA", lambda: None)
+        return [controlador._siguiente().prioridad for _ in range(9)]
+
+    orden = _correr(prueba())
+    # pesos 8:1 → una BAJA cada nueve arranques, sin esperar a vaciar CRITICA
+    assert orden.count(Prioridad.CRITICA) == 8
+    assert orden.count(Prioridad.BAJA) == 1
+
+
+def test_cancelar_saga_encolada_resuelve_su_futuro_con_none():
+    async def prueba():
+        controlador = ControladorAdmision()
+        futuro = controlador.encolar("s1", "MEDIA", lambda: None)
+        assert controlador.cancelar("s1")
+        assert futuro.result() is None
+        assert not controlador.cancelar("s1")
+        assert controlador.estado()["colas"]["MEDIA"] == 0
+
+    _correr(prueba())
+
+
+def test_lease_vencido_libera_el_cupo():
+    async def prueba():
+        controlador = ControladorAdmision(max_en_vuelo=1, reserva_alta_prioridad=0, ttl_en_vuelo_segundos=0)
+
+        async def lanzar():
+            assert await controlador.encolar("s1", "MEDIA", lambda: None) == "s1"
+            # sin evento terminal para s1: el lease vencido deja arrancar a s2
+            assert await controlador.encolar("s2", "MEDIA", lambda: None) == "s2"
+
+        await _con_planificador(controlador, lanzar)
+
+    _correr(prueba())
+
+
+def test_reconciliar_libera_sagas_cerradas_en_otra_replica():
+    consultadas = []
+
+    def terminadas(saga_ids):
+        consultadas.append(sorted(saga_ids))
+        return [sid for sid in saga_ids if sid == "s1"]
+
+    async def prueba():
+        controlador = ControladorAdmision(max_en_vuelo=1, reserva_alta_prioridad=0)
+
+        async def lanzar():
+            assert await controlador.encolar("s1", "MEDIA", lambda: None) == "s1"
+            s2 = controlador.encolar("s2", "MEDIA", lambda: None)
+            # s1 se cerró en otra réplica: acá nadie llama a liberar
+            reconciliador = asyncio.create_task(controlador.reconciliar(terminadas, 0.01))
+            try:
+                assert await s2 == "s2"
+            finally:
+                reconciliador.cancel()
+
+        await _con_planificador(controlador, lanzar)
+
+    _correr(prueba())
+    assert consultadas[0] == ["s1"]
@@ -0,0 +1,86 @@
+import random
+
+from campanias.sagas.latencias import (
+    HistogramaLatencia, PASO_SAGA, RegistroLatencias, _MAX_INDICE, _indice, _rango
+)
+
+
+def test_cada_valor_cae_en_el_rango_de_su_bucket():
+    for ms in list(range(0, 2048)) + [10**5, 10**7, 2**31]:
+        bajo, alto = _rango(_indice(ms))
+        assert bajo <= ms <= alto
+
+
+def test_buckets_exactos_hasta_31_ms_y_error_relativo_acotado_despues():
+    for ms in range(32):
+        assert _rango(_indice(ms)) == (ms, ms)
+    for ms in (32, 100, 1_000, 65_000, 10**6):
+        bajo, alto = _rango(_indice(ms))
+        assert (alto - bajo + 1) / bajo <= 1 / 16
+
+
+def test_valores_enormes_caen_en_el_ultimo_bucket():
+    assert _indice(10**15) == _MAX_INDICE
+    assert _indice(-5) == 0
+
+
+def test_percentiles_aproximan_los_exactos():
+    generador = random.Random(7)
+    muestras = [generador.lognormvariate(5, 1) for _ in range(20_000)]
+    h = HistogramaLatencia()
+    for ms in muestras:
+        h.registrar(ms)
+    ordenadas = sorted(int(ms) for ms in muestras)
+    for q in (0.5, 0.95, 0.99):
+        exacto = ordenadas[int(q * len(ordenadas)) - 1]
+        assert abs(h.percentil(q) - exacto) <= exacto / 16 + 1
+    resumen = h.resumen()
+    assert resumen["muestras"] == 20_000
+    assert resumen["max_ms"] == ordenadas[-1]
+
+
+def test_percentil_vacio_y_tope_en_el_maximo():
+    h = HistogramaLatencia()
+    assert h.percentil(0.5) is None
+    h.registrar(1000)
+    # el punto medio del bucket no puede pasar del máximo observado
+    assert h.percentil(0.99) == 1000.0
+
+
+def test_fusionar_equivale_a_registrar_todo_en_uno():
+    a, b, todo = HistogramaLatencia(), HistogramaLatencia(), HistogramaLatencia()
+    for i, ms in enumerate([3, 40, 250, 250, 9000, 12]):
+        (a if i % 2 else b).registrar(ms)
+        todo.registrar(ms)
+    a.fusionar(b)
+    assert (a.buckets, a.total, a.suma_ms, a.max_ms) == (todo.buckets, todo.total, todo.suma_ms, todo.max_ms)
+
+
+def test_buckets_json_ida_y_vuelta():
+    h = HistogramaLatencia()
+    for ms in (1, 50, 50, 700):
+        h.registrar(ms)
+    copia = HistogramaLatencia.desde_fila(h.buckets_json(), h.total, h.suma_ms, h.max_ms)
+    assert copia.buckets == h.buckets
+    assert copia.resumen() == h.resumen()
+    assert HistogramaLatencia.desde_fila(None, None, None, None).total == 0
+
+
+class _EngineCaido:
+    url = "mysql://caido"
+
+    def begin(self):
+        raise ConnectionError("BD no disponible")
+
+
+def test_flush_fallido_conserva_los_deltas():
+    registro = RegistroLatencias(_EngineCaido(), intervalo_segundos=3600)
+    try:
+        registro.registrar("lanzamiento", None, None, 120)
+        registro.registrar("lanzamiento", "crear", "campanias", 30)
+        assert registro.flush() == 0
+        registro.registrar("lanzamiento", None, None, 80)
+        assert registro._deltas[("lanzamiento", PASO_SAGA, PASO_SAGA)].total == 2
+        assert registro._deltas[("lanzamiento", "crear", "campanias")].total == 1
+    finally:
+        registro._detener.set()
@@ -0,0 +1,58 @@
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+from campanias.sagas.metricas import AgregadorMetricasSagas
+
+HOY = date(2025, 1, 1)
+
+
+class _EngineRegistrador:
+    """Guarda las filas del upsert; `durante` corre en medio de cada escritura"""
+
+    def __init__(self, durante=lambda: None, falla=False):
+        self.lotes, self.durante, self.falla = [], durante, falla
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, sql, params):
+        self.durante()
+        if self.falla:
+            raise ConnectionError("BD no disponible")
+        self.lotes.append([(p["tipo"], p["ini"], p["comp"]) for p in params])
+
+
+def _agregador(engine):
+    agregador = AgregadorMetricasSagas.__new__(AgregadorMetricasSagas)
+    agregador.engine = engine
+    agregador._deltas = {}
+    agregador._lock = threading.Lock()
+    agregador._flush_lock = threading.Lock()
+    return agregador
+
+
+def test_lo_registrado_durante_el_upsert_sale_en_el_flush_siguiente():
+    engine = _EngineRegistrador()
+    agregador = _agregador(engine)
+    engine.durante = lambda: agregador.saga_terminada("lanzar", HOY, "COMPLETADA", 1.0)
+    agregador.saga_iniciada("lanzar", HOY)
+
+    assert agregador.flush() == 1
+    engine.durante = lambda: None
+    assert agregador.flush() == 1
+    assert engine.lotes == [[("lanzar", 1, 0)], [("lanzar", 0, 1)]]
+    assert agregador.flush() == 0
+
+
+def test_upsert_fallido_reincorpora_sin_duplicar_lo_nuevo():
+    engine = _EngineRegistrador(falla=True)
+    agregador = _agregador(engine)
+    engine.durante = lambda: agregador.saga_iniciada("lanzar", HOY)
+    agregador.saga_iniciada("lanzar", HOY)
+
+    assert agregador.flush() == 0
+    engine.durante, engine.falla = (lambda: None), False
+    assert agregador.flush() == 1
+    assert engine.lotes == [[("lanzar", 2, 0)]]
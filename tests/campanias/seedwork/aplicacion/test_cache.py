@@ -0,0 +1,123 @@
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from campanias.seedwork.aplicacion.cache import CacheQueries
+
+
+@dataclass
+class ObtenerCampania:
+    id_campania: str
+
+
+@dataclass
+class ListarCampanias:
+    estado: str = None
+
+
+def _cache_con_handlers(ttl_segundos=60, max_entradas=100):
+    cache = CacheQueries()
+    llamadas = []
+
+    @cache.cachear(ttl_segundos=ttl_segundos, max_entradas=max_entradas,
+                   etiquetas=lambda q: [f"campania:{q.id_campania}"])
+    def obtener(query):
+        llamadas.append(query)
+        return {"id": query.id_campania, "version": len(llamadas)}
+
+    @cache.cachear(ttl_segundos=ttl_segundos, etiquetas=lambda q: ["campanias:listas"])
+    def listar(query):
+        llamadas.append(query)
+        return [len(llamadas)]
+
+    return cache, obtener, listar, llamadas
+
+
+def test_segunda_consulta_igual_sale_de_la_cache():
+    cache, obtener, _, llamadas = _cache_con_handlers()
+    assert obtener(ObtenerCampania("c-1")) == obtener(ObtenerCampania("c-1"))
+    assert len(llamadas) == 1
+    assert cache.estadisticas()["ObtenerCampania"]["aciertos"] == 1
+
+
+def test_invalidar_etiqueta_solo_descarta_sus_entradas():
+    cache, obtener, listar, llamadas = _cache_con_handlers()
+    obtener(ObtenerCampania("c-1"))
+    obtener(ObtenerCampania("c-2"))
+    listar(ListarCampanias())
+    cache.invalidar("campania:c-1", "campanias:listas")
+    assert obtener(ObtenerCampania("c-1"))["version"] == 4
+    assert obtener(ObtenerCampania("c-2"))["version"] == 2
+    assert listar(ListarCampanias()) == [5]
+    assert cache.estadisticas()["ObtenerCampania"]["invalidadas"] == 1
+
+
+def test_invalidacion_durante_el_calculo_no_guarda_el_resultado_viejo():
+    cache = CacheQueries()
+    empezo, seguir = threading.Event(), threading.Event()
+    versiones = iter(["vieja", "nueva"])
+
+    @cache.cachear(ttl_segundos=60, etiquetas=lambda q: [f"campania:{q.id_campania}"])
+    def obtener(query):
+        version = next(versiones)
+        if version == "vieja":
+            empezo.set()
+            seguir.wait(5)
+        return version
+
+    resultado = []
+    lectura = threading.Thread(target=lambda: resultado.append(obtener(ObtenerCampania("c-1"))))
+    lectura.start()
+    empezo.wait(5)
+    cache.invalidar("campania:c-1")  # la mutación llega mientras la lectura está en curso
+    seguir.set()
+    lectura.join(5)
+    assert resultado == ["vieja"]
+    assert obtener(ObtenerCampania("c-1")) == "nueva"
+
+
+def test_limpiar_descarta_todo_y_las_cargas_en_curso():
+    cache, obtener, listar, llamadas = _cache_con_handlers()
+    obtener(ObtenerCampania("c-1"))
+    listar(ListarCampanias())
+    cache.limpiar()
+    obtener(ObtenerCampania("c-1"))
+    listar(ListarCampanias())
+    assert len(llamadas) == 4
+
+
+def test_ttl_vencido_vuelve_a_calcular():
+    cache, obtener, _, llamadas = _cache_con_handlers(ttl_segundos=0.01)
+    obtener(ObtenerCampania("c-1"))
+    time.sleep(0.02)
+    obtener(ObtenerCampania("c-1"))
+    assert len(llamadas) == 2
+
+
+def test_lru_desaloja_y_deja_de_indexar_la_etiqueta():
+    cache, obtener, _, llamadas = _cache_con_handlers(max_entradas=2)
+    for id_campania in ("c-1", "c-2", "c-3"):
+        obtener(ObtenerCampania(id_campania))
+    assert cache.estadisticas()["ObtenerCampania"]["desalojos"] == 1
+    assert "campania:c-1" not in cache._por_etiqueta
+    obtener(ObtenerCampania("c-1"))
+    assert len(llamadas) == 4
+
+
+def test_error_del_handler_no_se_cachea():
+    cache = CacheQueries()
+    intentos = []
+
+    @cache.cachear(ttl_segundos=60)
+    def obtener(query):
+        intentos.append(query)
+        if len(intentos) == 1:
+            raise ConnectionError("BD caída")
+        return "ok"
+
+    with pytest.raises(ConnectionError):
+        obtener(ObtenerCampania("c-1"))
+    assert obtener(ObtenerCampania("c-1")) == "ok"
+    assert cache._en_vuelo == {}
@@ -0,0 +1,158 @@
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+
+import pytest
+
+from campanias.modulos.aplicacion.dto import CampañaDTO
+from campanias.modulos.aplicacion.mapeadores import mapeador_campania_dto
+from campanias.modulos.dominio.entidades import Campaña
+from campanias.modulos.dominio.objetos_valor import (
+    CanalPublicidad, CodigoCampana, DescripcionCampaña, EstadoCampana, FechaFin, FechaInicio,
+    Moneda, NombreCampaña, ObjetivoCampana, Presupuesto, SegmentoAudiencia, TipoCampana
+)
+from campanias.seedwork.aplicacion.mapeadores import MapeadorCompilado, compilar_mapeador
+
+
+# Conversión que hacían los query handlers antes del mapeador compilado
+def _texto(valor, atributo: Optional[str] = None):
+    if isinstance(valor, Enum):
+        return valor.value
+    if atributo and hasattr(valor, atributo):
+        return getattr(valor, atributo)
+    return valor
+
+
+def _iso(fecha) -> Optional[str]:
+    return fecha.isoformat() if fecha else None
+
+
+def _campania_a_dto_anterior(campania) -> CampañaDTO:
+    return CampañaDTO(
+        fecha_creacion=_iso(campania.fecha_creacion),
+        fecha_actualizacion=_iso(campania.fecha_actualizacion),
+        id=str(campania.id),
+        nombre=_texto(campania.nombre, "nombre"),
+        descripcion=_texto(campania.descripcion, "descripcion"),
+        tipo=_texto(campania.tipo),
+        canal_publicidad=_texto(campania.canal_publicidad),
+        objetivo=_texto(campania.objetivo),
+        fecha_inicio=_iso(_texto(campania.fecha_inicio, "fecha_inicio")),
+        fecha_fin=_iso(_texto(campania.fecha_fin, "fecha_fin")),
+        presupuesto=_texto(campania.presupuesto, "presupuesto"),
+        moneda=_texto(campania.moneda, "moneda"),
+        codigo_campana=_texto(campania.codigo_campana, "codigo_campana"),
+        segmento_audiencia=_texto(campania.segmento_audiencia, "segmento_audiencia"),
+        estado=_texto(campania.estado)
+    )
+
+
+def _campania(**cambios) -> Campaña:
+    campos = dict(
+        nombre=NombreCampaña("Campaña de verano"),
+        descripcion=DescripcionCampaña("Descuentos en tiendas"),
+        estado=EstadoCampana.ACTIVA,
+        tipo=TipoCampana.DESCUENTO,
+        canal_publicidad=CanalPublicidad.REDES_SOCIALES,
+        objetivo=ObjetivoCampana.VENTAS,
+        fecha_inicio=FechaInicio(datetime(2025, 1, 1, 8, 30)),
+        fecha_fin=FechaFin(datetime(2025, 2, 1)),
+        presupuesto=Presupuesto(1500.5),
+        moneda=Moneda("USD"),
+        codigo_campana=CodigoCampana("VER-2025"),
+        segmento_audiencia=SegmentoAudiencia("jovenes"),
+    )
+    campos.update(cambios)
+    return Campaña(**campos)
+
+
+def _desde_repositorio(**cambios) -> Campaña:
+    campania = _campania(**cambios)
+    campania._id = "1f0e8a1c-0000-4000-8000-000000000001"
+    campania.fecha_creacion = datetime(2024, 12, 30, 10, 0, 5)
+    campania.fecha_actualizacion = datetime(2025, 1, 2, 9, 15)
+    return campania
+
+
+CASOS = {
+    "completa": lambda: _campania(),
+    "desde_repositorio": lambda: _desde_repositorio(),
+    "columnas_ausentes": lambda: _desde_repositorio(
+        tipo=None, canal_publicidad=None, objetivo=None, nombre=NombreCampaña(None),
+        fecha_inicio=FechaInicio(None), fecha_fin=FechaFin(None), codigo_campana=CodigoCampana(None),
+    ),
+    "primitivos_ya_planos": lambda: _desde_repositorio(
+        estado="CREADA", tipo="PROMOCIONAL", nombre="texto plano", presupuesto=99.0, moneda="EUR",
+    ),
+    "fechas_date": lambda: _campania(fecha_inicio=FechaInicio(date(2025, 3, 1)), fecha_fin=FechaFin(date(2025, 4, 1))),
+    "id_uuid": lambda: _campania(id=uuid.UUID("12345678-1234-5678-1234-567812345678")),
+}
+
+
+@pytest.mark.parametrize("caso", CASOS)
+def test_mapear_da_lo_mismo_que_la_conversion_anterior(caso):
+    campania = CASOS[caso]()
+    assert mapeador_campania_dto.mapear(campania) == _campania_a_dto_anterior(campania)
+
+
+def test_map_many_da_lo_mismo_que_mapear_uno_a_uno():
+    campanias = [construir() for construir in CASOS.values()]
+    assert mapeador_campania_dto.map_many(campanias) == [_campania_a_dto_anterior(c) for c in campanias]
+    assert mapeador_campania_dto.map_many([]) == []
+    assert mapeador_campania_dto.mapear(None) is None
+
+
+def test_dto_generado_es_un_campaniadto_normal():
+    dto = mapeador_campania_dto.mapear(_desde_repositorio())
+    assert type(dto) is CampañaDTO
+    assert dto.id == "1f0e8a1c-0000-4000-8000-000000000001"
+    assert dto.fecha_inicio == "2025-01-01T08:30:00"
+    assert hash(dto) == hash(_campania_a_dto_anterior(_desde_repositorio()))
+
+
+def test_compilar_mapeador_reutiliza_el_del_par():
+    assert compilar_mapeador(Campaña, CampañaDTO) is mapeador_campania_dto
+
+
+@dataclass(frozen=True)
+class _DTOConDefaults:
+    nombre: str
+    etiquetas: list = field(default_factory=list)
+    origen: str = "bd"
+
+
+@dataclass
+class _EntidadMinima:
+    nombre: NombreCampaña
+
+
+def test_campos_sin_atributo_toman_su_default():
+    mapeador = MapeadorCompilado(_EntidadMinima, _DTOConDefaults)
+    a, b = mapeador.map_many([_EntidadMinima(NombreCampaña("a")), _EntidadMinima(NombreCampaña("b"))])
+    assert a == _DTOConDefaults("a") and b == _DTOConDefaults("b")
+    assert a.etiquetas is not b.etiquetas
+
+
+def test_cache_distingue_el_renombre_de_campos():
+    @dataclass
+    class _EntidadConAlias:
+        nombre: NombreCampaña
+        alias: NombreCampaña
+
+    entidad = _EntidadConAlias(NombreCampaña("a"), NombreCampaña("b"))
+    por_nombre = compilar_mapeador(_EntidadConAlias, _DTOConDefaults)
+    por_alias = compilar_mapeador(_EntidadConAlias, _DTOConDefaults, {"nombre": "alias"})
+    assert por_alias is not por_nombre
+    assert compilar_mapeador(_EntidadConAlias, _DTOConDefaults, {"nombre": "alias"}) is por_alias
+    assert (por_nombre.mapear(entidad).nombre, por_alias.mapear(entidad).nombre) == ("a", "b")
+
+
+def test_campo_obligatorio_sin_atributo_es_un_error():
+    @dataclass(frozen=True)
+    class _DTOObligatorio:
+        inexistente: str
+
+    with pytest.raises(TypeError):
+        MapeadorCompilado(_EntidadMinima, _DTOObligatorio)
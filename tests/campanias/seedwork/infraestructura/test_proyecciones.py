@@ -0,0 +1,92 @@
+import pytest
+
+from campanias.seedwork.infraestructura.proyecciones import (
+    EventoProyectable, MotorProyecciones, ProyeccionesSaturadas
+)
+
+
+class _MotorEnMemoria(MotorProyecciones):
+    """Motor sin BD: el 'journal' es una lista y `envenenados` fallan siempre al proyectarse"""
+
+    def __init__(self, envenenados=(), bd_caida=False, **kwargs):
+        self.journal, self.descartes = [], []
+        self.envenenados, self.bd_caida = set(envenenados), bd_caida
+        super().__init__(None, [], tabla_journal="eventos", intervalo_segundos=3600, **kwargs)
+
+    def _escribir_lote(self, lote):
+        if self.bd_caida:
+            raise ConnectionError("BD no disponible")
+        veneno = [e.id for e, _ in lote if e.id in self.envenenados]
+        if veneno:
+            raise ValueError(f"no se puede proyectar {veneno[0]}")
+        nuevos = [e for e, _ in lote if e.id not in {j.id for j in self.journal}]
+        for evento in nuevos:
+            evento.posicion = len(self.journal) + 1
+            self.journal.append(evento)
+        return nuevos
+
+    def _descartar_evento(self, evento, error):
+        if self.bd_caida:
+            raise ConnectionError("BD no disponible")
+        self.descartes.append((evento.id, str(error)))
+
+
+def _evento(i):
+    return EventoProyectable(id=f"e{i}", tipo="CampaniaCreada", agregado_id=f"c{i}")
+
+
+@pytest.fixture
+def motores():
+    creados = []
+    yield creados.append
+    for motor in creados:
+        motor._detener.set()
+        motor._lote_lleno.set()
+
+
+def test_lote_fallido_se_reintenta_hasta_max_intentos_y_aparta_el_envenenado(motores):
+    motor = _MotorEnMemoria(envenenados={"e2"}, max_intentos=3)
+    motores(motor)
+    futuros = [motor.registrar(_evento(i)) for i in range(1, 5)]
+    assert motor.flush() == 0
+    assert motor.flush() == 0
+    assert motor.pendientes() == 4 and not any(f.done() for f in futuros)
+
+    assert motor.flush() == 3
+    assert [e.id for e in motor.journal] == ["e1", "e3", "e4"]
+    assert [d[0] for d in motor.descartes] == ["e2"]
+    # todos se resuelven: el consumidor confirma también el apartado
+    assert [f.result() for f in futuros] == [True, False, True, True]
+    assert motor.pendientes() == 0 and motor._fallos_seguidos == 0
+
+
+def test_con_la_bd_caida_no_se_aparta_nada(motores):
+    motor = _MotorEnMemoria(bd_caida=True, max_intentos=1)
+    motores(motor)
+    futuros = [motor.registrar(_evento(i)) for i in range(3)]
+    assert motor.flush() == 0
+    assert motor.descartes == []
+    assert motor.pendientes() == 3 and not any(f.done() for f in futuros)
+
+    motor.bd_caida = False
+    assert motor.flush() == 3
+    assert all(f.result() for f in futuros)
+
+
+def test_tope_de_pendientes_frena_la_entrada(motores):
+    motor = _MotorEnMemoria(bd_caida=True, max_pendientes=2)
+    motores(motor)
+    motor.registrar(_evento(1))
+    motor.registrar(_evento(2))
+    with pytest.raises(ProyeccionesSaturadas):
+        motor.registrar(_evento(3))
+
+
+def test_evento_repetido_se_resuelve_como_no_nuevo(motores):
+    motor = _MotorEnMemoria()
+    motores(motor)
+    primero = motor.registrar(_evento(1))
+    motor.flush()
+    repetido = motor.registrar(_evento(1))
+    assert motor.flush() == 0
+    assert primero.result() is True and repetido.result() is False
@@ -0,0 +1,161 @@
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import pytest
+
+from campanias import despachadores
+from campanias.despachadores import Despachador, _olas_compensacion
+from campanias.sagas.saga_logger_v2 import EstadoPaso, EstadoSaga
+
+
+class _LoggerEnMemoria:
+    """Lo que el despachador usa de SagaLoggerV2 para compensar, sin BD"""
+
+    def __init__(self):
+        self.pasos = []
+        self.estados = []
+
+    def actualizar_estado_saga(self, saga_id, nuevo_estado, mensaje=None, contexto_extra=None):
+        self.estados.append(nuevo_estado)
+
+    def pasos_compensacion(self, saga_id):
+        return [dict(p) for p in self.pasos if p["saga_id"] == saga_id]
+
+    def registrar_pasos_compensacion(self, saga_id, pasos):
+        ids = []
+        for p in pasos:
+            ids.append(str(uuid.uuid4()))
+            self.pasos.append({"id": ids[-1], "saga_id": saga_id, "nombre_paso": p["nombre_paso"],
+                               "estado": EstadoPaso.EJECUTANDO, "request_data": p["datos_entrada"],
+                               "fi": datetime.utcnow()})
+        return ids
+
+    def registrar_resultados_compensacion(self, resultados, saga_id=None):
+        for paso_id, ok, _ in resultados:
+            paso = next(p for p in self.pasos if p["id"] == paso_id)
+            paso["estado"] = EstadoPaso.COMPENSADO if ok else EstadoPaso.FALLIDO
+
+    def compensaciones_sin_respuesta(self, iniciadas_antes_de):
+        return [(p["saga_id"], p["id"]) for p in self.pasos
+                if p["estado"] == EstadoPaso.EJECUTANDO and p["fi"] < iniciadas_antes_de]
+
+    def estado_de(self, nombre_paso):
+        return next(p["estado"] for p in self.pasos if p["nombre_paso"] == nombre_paso)
+
+
+def _paso(nombre, depende_de=(), espera_respuesta=True):
+    return {"nombre_paso": nombre, "servicio_destino": nombre, "topico_pulsar": f"comando-{nombre}",
+            "accion": "deshacer", "depende_de": depende_de, "espera_respuesta": espera_respuesta}
+
+
+def _despachador(rechazados=()):
+    despachador = Despachador.__new__(Despachador)
+    despachador.saga_logger = _LoggerEnMemoria()
+    despachador.timeout_ack_segundos = 1
+    despachador.timeout_respuesta_segundos = 60
+    despachador.publicados = []
+
+    def enviar(topico, payload):
+        despachador.publicados.append(topico)
+        futuro = Future()
+        if topico in rechazados:
+            futuro.set_exception(RuntimeError("Pulsar respondió Timeout"))
+        else:
+            futuro.set_result("msg-id")
+        return futuro
+
+    despachador._send_json_async = enviar
+    return despachador
+
+
+@pytest.fixture
+def plan_con_respuesta(monkeypatch):
+    # a y c no dependen de nada; b espera a; d espera a b y c
+    plan = (_paso("a"), _paso("b", ("a",)), _paso("c"), _paso("d", ("b", "c")))
+    monkeypatch.setattr(despachadores, "PLAN_COMPENSACION_CAMPANIA", plan)
+    return plan
+
+
+def test_olas_respetan_las_dependencias(plan_con_respuesta):
+    olas = [[p["nombre_paso"] for p in ola] for ola in _olas_compensacion(plan_con_respuesta)]
+    assert olas == [["a", "c"], ["b"], ["d"]]
+
+
+def test_dependencia_ciclica_o_inexistente_falla():
+    with pytest.raises(RuntimeError):
+        _olas_compensacion((_paso("a", ("b",)), _paso("b", ("a",))))
+    with pytest.raises(RuntimeError):
+        _olas_compensacion((_paso("a", ("no-existe",)),))
+
+
+def test_plan_actual_se_cierra_con_el_ack_del_broker():
+    despachador = _despachador()
+    despachador.compensar_saga_campania({"id": "c-1"}, "s1")
+    assert sorted(despachador.publicados) == ["comando-cancelar-busqueda-afiliados",
+                                              "comando-desconfigurar-comisiones"]
+    assert {p["estado"] for p in despachador.saga_logger.pasos} == {EstadoPaso.COMPENSADO}
+    assert despachador.saga_logger.estados == [EstadoSaga.COMPENSANDO, EstadoSaga.COMPENSADA]
+
+
+def test_ola_siguiente_sale_solo_cuando_respondio_la_anterior(plan_con_respuesta):
+    despachador = _despachador()
+    logger = despachador.saga_logger
+    despachador.compensar_saga_campania({"id": "c-1"}, "s1")
+    assert despachador.publicados == ["comando-a", "comando-c"]
+
+    assert despachador.registrar_respuesta_compensacion("s1", "a", True)
+    # c sigue sin responder: b no sale todavía
+    assert despachador.publicados == ["comando-a", "comando-c"]
+    assert despachador.registrar_respuesta_compensacion("s1", "c", True)
+    assert despachador.publicados[-1] == "comando-b"
+
+    assert despachador.registrar_respuesta_compensacion("s1", "b", True)
+    assert despachador.publicados[-1] == "comando-d"
+    assert logger.estados == [EstadoSaga.COMPENSANDO]
+    assert despachador.registrar_respuesta_compensacion("s1", "d", True)
+    assert logger.estados == [EstadoSaga.COMPENSANDO, EstadoSaga.COMPENSADA]
+
+
+def test_respuesta_sin_paso_en_curso_se_ignora(plan_con_respuesta):
+    despachador = _despachador()
+    despachador.compensar_saga_campania({"id": "c-1"}, "s1")
+    assert not despachador.registrar_respuesta_compensacion("s1", "b", True)
+    assert not despachador.registrar_respuesta_compensacion("otra", "a", True)
+    assert despachador.registrar_respuesta_compensacion("s1", "a", True)
+    # respuesta duplicada: el paso ya está cerrado
+    assert not despachador.registrar_respuesta_compensacion("s1", "a", True)
+
+
+def test_respuesta_fallida_cierra_la_saga_sin_publicar_la_ola_siguiente(plan_con_respuesta):
+    despachador = _despachador()
+    despachador.compensar_saga_campania({"id": "c-1"}, "s1")
+    despachador.registrar_respuesta_compensacion("s1", "a", False, "sin permisos")
+    despachador.registrar_respuesta_compensacion("s1", "c", True)
+    assert despachador.publicados == ["comando-a", "comando-c"]
+    assert despachador.saga_logger.estados[-1] == EstadoSaga.FALLIDA
+
+
+def test_comando_rechazado_por_el_broker_queda_fallido():
+    despachador = _despachador(rechazados={"comando-desconfigurar-comisiones"})
+    despachador.compensar_saga_campania({"id": "c-1"}, "s1")
+    logger = despachador.saga_logger
+    assert logger.estado_de("compensar_comisiones") == EstadoPaso.FALLIDO
+    assert logger.estado_de("compensar_busqueda_afiliados") == EstadoPaso.COMPENSADO
+    assert logger.estados[-1] == EstadoSaga.FALLIDA
+
+
+def test_paso_sin_respuesta_vence_y_la_saga_falla(plan_con_respuesta):
+    despachador = _despachador()
+    logger = despachador.saga_logger
+    despachador.compensar_saga_campania({"id": "c-1"}, "s1")
+    despachador.registrar_respuesta_compensacion("s1", "a", True)
+    assert despachador.vencer_compensaciones() == 0
+
+    for paso in logger.pasos:
+        paso["fi"] -= timedelta(seconds=despachador.timeout_respuesta_segundos + 1)
+    assert despachador.vencer_compensaciones() == 1
+    assert logger.estado_de("a") == EstadoPaso.COMPENSADO
+    assert logger.estado_de("c") == EstadoPaso.FALLIDO
+    assert logger.estados[-1] == EstadoSaga.FALLIDA
+    assert "comando-b" not in despachador.publicados